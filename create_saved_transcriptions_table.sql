@@ -35,3 +35,77 @@ $$ language 'plpgsql';
 CREATE TRIGGER update_saved_transcriptions_updated_at 
   BEFORE UPDATE ON saved_transcriptions 
   FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Saved captions are stored once, in the shared transcript they came from
+-- (python-backend/setup_captions_table.sql creates transcripts; run it first)
+ALTER TABLE saved_transcriptions ADD COLUMN IF NOT EXISTS transcript_id UUID REFERENCES transcripts(id);
+ALTER TABLE saved_transcriptions ALTER COLUMN captions DROP NOT NULL;
+
+-- Moves the captions of a saved transcription into the transcript a task
+-- produced them from, or else into one keyed by their content, so saving the
+-- same captions again stores no new copy
+CREATE OR REPLACE FUNCTION intern_saved_transcription()
+RETURNS TRIGGER AS $$
+DECLARE
+    saved_video_id TEXT;
+    saved_texts TEXT[];
+    transcript_uuid UUID;
+BEGIN
+    IF NEW.captions IS NULL OR jsonb_typeof(NEW.captions) <> 'array' THEN
+        RETURN NEW;
+    END IF;
+    
+    saved_video_id := substring(NEW.video_url FROM '(?:v=|youtu\.be/|embed/)([^&?#/]+)');
+    IF saved_video_id IS NULL THEN
+        RETURN NEW;
+    END IF;
+    
+    saved_texts := ARRAY(
+        SELECT e.value->>'text'
+        FROM jsonb_array_elements(NEW.captions) WITH ORDINALITY AS e(value, ordinality)
+        ORDER BY e.ordinality
+    );
+    
+    SELECT t.id INTO transcript_uuid
+    FROM transcripts t
+    WHERE t.video_id = saved_video_id
+      AND t.language = NEW.language
+      AND t.caption_count = cardinality(saved_texts)
+      AND ARRAY(
+          SELECT e.value->>'text'
+          FROM jsonb_array_elements(t.captions) WITH ORDINALITY AS e(value, ordinality)
+          ORDER BY e.ordinality
+      ) = saved_texts
+    ORDER BY t.last_used_at DESC
+    LIMIT 1
+    FOR NO KEY UPDATE;
+    
+    IF transcript_uuid IS NULL THEN
+        INSERT INTO transcripts (video_id, language, engine, model, captions, caption_count)
+        VALUES (saved_video_id, NEW.language, 'saved', md5(NEW.captions::TEXT),
+                NEW.captions, jsonb_array_length(NEW.captions))
+        ON CONFLICT (video_id, language, engine, model) DO UPDATE SET last_used_at = NOW()
+        RETURNING id INTO transcript_uuid;
+    END IF;
+    
+    NEW.transcript_id := transcript_uuid;
+    NEW.captions := NULL;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS saved_transcriptions_intern ON saved_transcriptions;
+CREATE TRIGGER saved_transcriptions_intern
+    BEFORE INSERT OR UPDATE OF captions ON saved_transcriptions
+    FOR EACH ROW EXECUTE FUNCTION intern_saved_transcription();
+
+DROP TRIGGER IF EXISTS saved_transcriptions_transcript_refs ON saved_transcriptions;
+CREATE TRIGGER saved_transcriptions_transcript_refs
+    AFTER INSERT OR DELETE ON saved_transcriptions
+    FOR EACH ROW EXECUTE FUNCTION track_transcript_refs();
+
+DROP TRIGGER IF EXISTS saved_transcriptions_transcript_ref_change ON saved_transcriptions;
+CREATE TRIGGER saved_transcriptions_transcript_ref_change
+    AFTER UPDATE ON saved_transcriptions
+    FOR EACH ROW WHEN (OLD.transcript_id IS DISTINCT FROM NEW.transcript_id)
+    EXECUTE FUNCTION track_transcript_refs();
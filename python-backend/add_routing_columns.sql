@@ -0,0 +1,3 @@
+-- Optional per-task routing hints read by the backend engine router
+ALTER TABLE caption_tasks ADD COLUMN IF NOT EXISTS deadline_seconds INTEGER;
+ALTER TABLE caption_tasks ADD COLUMN IF NOT EXISTS quality_tier TEXT CHECK (quality_tier IN ('fast', 'balanced', 'best'));
@@ -0,0 +1,4 @@
+-- Add per-stage progress reporting to caption tasks
+ALTER TABLE caption_tasks ADD COLUMN IF NOT EXISTS progress INTEGER NOT NULL DEFAULT 0 CHECK (progress >= 0 AND progress <= 100);
+ALTER TABLE caption_tasks ADD COLUMN IF NOT EXISTS progress_message TEXT;
+ALTER TABLE caption_tasks ADD COLUMN IF NOT EXISTS eta_seconds INTEGER;
@@ -2,240 +2,376 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 import os
 from youtube_transcriber import YouTubeTranscriber
-from supabase_service import SupabaseService
+from task_storage import get_task_storage
+from progress_tracker import ProgressTracker, get_throughput_model
+from resilience import breaker_metrics
+from hedging import get_latency_tracker
+from engine_router import EngineRouter
+from model_pool import get_model_pool
+from worker_lifecycle import DrainController
+from rate_limiter import get_openai_governor
+from download_manager import get_download_manager
+from engine_config import EngineManager, get_engine_manager, write_config_file
+from task_worker import TaskWorker
+from feature_cache import get_feature_cache
+from encoder_batcher import encoder_batcher_metrics
+from caption_window import caption_window, decode_cursor
+from http_pool import http_pool_metrics
 import threading
 import time
 import uuid
 
-app = Flask(__name__)
-CORS(app)  # Enable CORS for React Native app
+def require_admin():
+    """Reject admin calls without the configured ADMIN_TOKEN, if one is set"""
+    admin_token = os.getenv('ADMIN_TOKEN')
+    if admin_token and request.headers.get('X-Admin-Token') != admin_token:
+        return jsonify({'error': 'Unauthorized'}), 401
+    return None
 
-# Initialize Supabase service
-supabase_service = SupabaseService()
-
-# In-memory task storage for direct API calls
-tasks = {}
-
-def process_pending_tasks():
-    """Background task to process pending tasks from Supabase"""
-    print("🔄 Background processor started - checking for tasks every 5 seconds")
-    while True:
+def create_app(start_worker: bool = False, drain_controller: DrainController = None,
+               engine_router: EngineRouter = None, worker_concurrency: int = None,
+               pipeline=None, engines: EngineManager = None):
+    """
+    Build the HTTP app. Nothing runs at import time; the Supabase task worker
+    only starts here when `start_worker` is set (the all-in-one dev server).
+    Production runs the worker tier separately with `python -m backend worker`.
+    """
+    app = Flask(__name__)
+    CORS(app)  # Enable CORS for React Native app
+    
+    # In-memory task storage for direct API calls
+    tasks = {}
+    
+    # Picks engine and model size per job from deadline, queue depth and API health
+    engine_router = engine_router or EngineRouter()
+    
+    # Coordinates graceful shutdown: stop claiming, finish or hand back in-flight jobs
+    drain_controller = drain_controller or DrainController()
+    
+    # Hot-swappable model size and engine defaults for new jobs
+    engines = engines or get_engine_manager()
+    
+    def current_queue_depth():
+        """Direct API jobs that are waiting or running"""
+        return sum(1 for task in list(tasks.values()) if task['status'] in ('pending', 'processing'))
+    
+    worker = None
+    if start_worker:
+        worker = TaskWorker(
+            get_task_storage(),
+            concurrency=worker_concurrency or int(os.getenv('WORKER_CONCURRENCY', 1)),
+            drain=drain_controller,
+            router=engine_router,
+            extra_queue_depth=current_queue_depth,
+            pipeline=pipeline,
+            engines=engines
+        )
+        worker.start()
+    
+    app.extensions['matric'] = {
+        'tasks': tasks,
+        'engine_router': engine_router,
+        'drain_controller': drain_controller,
+        'worker': worker,
+        'engines': engines,
+    }
+    
+    @app.route('/process', methods=['POST'])
+    def process_video():
+        """Start video processing."""
         try:
-            # Get pending tasks from Supabase
-            pending_tasks = supabase_service.get_pending_tasks()
-            print(f"📊 Found {len(pending_tasks)} pending tasks")
-            
-            for task in pending_tasks:
-                print(f"🔄 Processing task: {task['id']}")
-                print(f"   Video URL: {task['video_url']}")
-                print(f"   Language: {task['language']}")
-                
+            data = request.get_json()
+            print(f"📥 Received data: {data}")
+            
+            url = data.get('url')
+            language = data.get('language', 'en')
+            deadline_seconds = data.get('deadline_seconds')
+            quality_tier = data.get('quality')
+            
+            print(f"🔗 URL: {url}")
+            print(f"🌍 Language: {language}")
+            
+            if not url:
+                print("❌ No URL provided")
+                return jsonify({'error': 'URL is required'}), 400
+            
+            if not drain_controller.should_accept():
+                return jsonify({'error': 'Server is draining, retry on another instance'}), 503
+            
+            # Generate task ID
+            task_id = str(uuid.uuid4())
+            
+            # Initialize task
+            tasks[task_id] = {
+                'status': 'pending',
+                'url': url,
+                'language': language,
+                'progress': 0,
+                'message': 'Initializing...',
+                'eta_seconds': None,
+                'captions': None,
+                'error': None
+            }
+            
+            def abandon():
+                # In-memory tasks don't survive a restart, so tell the client to resubmit
+                tasks[task_id]['status'] = 'failed'
+                tasks[task_id]['error'] = 'Server restarting - please resubmit'
+            
+            # Start processing in background
+            def process_task():
+                with drain_controller.track(task_id, 'direct', requeue=abandon) as cancel_token, \
+                        engines.checkout() as engine:
+                    run_task(cancel_token, engine)
+            
+            def run_task(cancel_token, engine):
+                transcriber = None
                 try:
-                    # Update status to processing
-                    print(f"   Updating status to 'processing'...")
-                    supabase_service.update_task_status(task['id'], 'processing')
+                    tasks[task_id]['status'] = 'processing'
+                    tasks[task_id]['message'] = 'Processing video...'
+                    
+                    # Initialize transcriber with the active engine settings
+                    transcriber = YouTubeTranscriber(
+                        model_size=engine.model_size,
+                        use_fast_api=engine.use_fast_api,
+                        hedge_short_clips=engine.hedge_short_clips,
+                        local_engine=engine.local_engine
+                    )
                     
-                    # Initialize transcriber with fast API enabled and optimized for speed
-                    print(f"   Initializing transcriber with fast API and speed optimizations...")
-                    transcriber = YouTubeTranscriber(model_size="tiny", use_fast_api=True)
+                    def report_progress(status):
+                        tasks[task_id]['progress'] = status['progress']
+                        tasks[task_id]['message'] = status['message']
+                        tasks[task_id]['eta_seconds'] = status['eta_seconds']
                     
                     # Process video
-                    print(f"   Processing video...")
-                    result = transcriber.process_video(task['video_url'], task['language'])
+                    print(f"🎬 Processing video with URL: {url}")
+                    result = transcriber.process_video(
+                        url,
+                        language,
+                        progress=ProgressTracker(callback=report_progress),
+                        router=engine_router,
+                        deadline_seconds=float(deadline_seconds) if deadline_seconds is not None else None,
+                        quality_tier=quality_tier or engine.quality_tier,
+                        queue_depth=current_queue_depth() - 1,
+                        task_id=task_id,
+                        cancel_token=cancel_token
+                    )
+                    print(f"📝 Processing result: {result}")
                     
                     if result and result.get('captions'):
-                        # Save captions to Supabase
-                        print(f"   Saving {len(result['captions'])} captions...")
-                        supabase_service.save_captions(task['id'], result['captions'])
-                        print(f"✅ Task {task['id']} completed successfully")
+                        tasks[task_id]['status'] = 'completed'
+                        tasks[task_id]['progress'] = 100
+                        tasks[task_id]['eta_seconds'] = 0
+                        tasks[task_id]['message'] = 'Completed successfully'
+                        tasks[task_id]['captions'] = result['captions']
+                        print(f"✅ Task {task_id} completed with {len(result['captions'])} captions")
+                    elif cancel_token.cancelled:
+                        abandon()
                     else:
-                        # Update status to failed
-                        print(f"   No captions generated, marking as failed")
-                        supabase_service.update_task_status(
-                            task['id'], 
-                            'failed', 
-                            'No captions generated'
-                        )
-                        print(f"❌ Task {task['id']} failed - no captions")
-                    
-                    # Clean up
-                    transcriber.cleanup()
+                        tasks[task_id]['status'] = 'failed'
+                        tasks[task_id]['error'] = 'No captions generated'
+                        print(f"❌ Task {task_id} failed - no captions")
                     
                 except Exception as e:
-                    print(f"❌ Error processing task {task['id']}: {e}")
-                    print(f"   Error details: {str(e)}")
-                    supabase_service.update_task_status(
-                        task['id'], 
-                        'failed', 
-                        str(e)
-                    )
+                    tasks[task_id]['status'] = 'failed'
+                    tasks[task_id]['error'] = str(e)
+                    print(f"❌ Task {task_id} failed: {e}")
+                finally:
+                    # Clean up
+                    if transcriber:
+                        transcriber.cleanup()
             
-            # Wait before checking for new tasks
-            print(f"⏰ Waiting 5 seconds before next check...")
-            time.sleep(5)
+            # Start processing in background thread; not a daemon, so shutdown waits for the drain
+            thread = threading.Thread(target=process_task)
+            thread.start()
+            
+            # Add timeout for the task
+            def timeout_task():
+                time.sleep(300)  # 5 minutes timeout
+                if task_id in tasks and tasks[task_id]['status'] == 'processing':
+                    tasks[task_id]['status'] = 'failed'
+                    tasks[task_id]['error'] = 'Processing timeout - took too long'
+                    print(f"⏰ Task {task_id} timed out after 5 minutes")
+            
+            timeout_thread = threading.Thread(target=timeout_task)
+            timeout_thread.daemon = True
+            timeout_thread.start()
+            
+            return jsonify({'task_id': task_id})
             
         except Exception as e:
-            print(f"❌ Error in background processor: {e}")
-            print(f"   Error details: {str(e)}")
-            time.sleep(10)
+            return jsonify({'error': str(e)}), 500
 
-# Start background processor
-processor_thread = threading.Thread(target=process_pending_tasks, daemon=True)
-processor_thread.start()
+    @app.route('/status/<task_id>', methods=['GET'])
+    def get_status(task_id):
+        """Get processing status."""
+        try:
+            if task_id not in tasks:
+                return jsonify({'error': 'Task not found'}), 404
+            
+            task = tasks[task_id]
+            return jsonify({
+                'status': task['status'],
+                'progress': task['progress'],
+                'message': task['message'],
+                'eta_seconds': task['eta_seconds'],
+                'error': task['error']
+            })
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
 
-@app.route('/process', methods=['POST'])
-def process_video():
-    """Start video processing."""
-    try:
-        data = request.get_json()
-        print(f"📥 Received data: {data}")
-        
-        url = data.get('url')
-        language = data.get('language', 'en')
-        
-        print(f"🔗 URL: {url}")
-        print(f"🌍 Language: {language}")
-        
-        if not url:
-            print("❌ No URL provided")
-            return jsonify({'error': 'URL is required'}), 400
-        
-        # Generate task ID
-        task_id = str(uuid.uuid4())
-        
-        # Initialize task
-        tasks[task_id] = {
-            'status': 'pending',
-            'url': url,
-            'language': language,
-            'progress': 0,
-            'message': 'Initializing...',
-            'captions': None,
-            'error': None
-        }
-        
-        # Start processing in background
-        def process_task():
-            try:
-                tasks[task_id]['status'] = 'processing'
-                tasks[task_id]['message'] = 'Processing video...'
-                tasks[task_id]['progress'] = 25
-                
-                # Initialize transcriber with fast API enabled and optimized for speed
-                transcriber = YouTubeTranscriber(model_size="tiny", use_fast_api=True)
-                
-                tasks[task_id]['progress'] = 50
-                tasks[task_id]['message'] = 'Transcribing audio...'
-                
-                # Process video
-                print(f"🎬 Processing video with URL: {url}")
-                result = transcriber.process_video(url, language)
-                print(f"📝 Processing result: {result}")
-                
-                if result and result.get('captions'):
-                    tasks[task_id]['status'] = 'completed'
-                    tasks[task_id]['progress'] = 100
-                    tasks[task_id]['message'] = 'Completed successfully'
-                    tasks[task_id]['captions'] = result['captions']
-                    print(f"✅ Task {task_id} completed with {len(result['captions'])} captions")
-                else:
-                    tasks[task_id]['status'] = 'failed'
-                    tasks[task_id]['error'] = 'No captions generated'
-                    print(f"❌ Task {task_id} failed - no captions")
-                
-                # Clean up
-                transcriber.cleanup()
-                
-            except Exception as e:
-                tasks[task_id]['status'] = 'failed'
-                tasks[task_id]['error'] = str(e)
-                print(f"❌ Task {task_id} failed: {e}")
-        
-        # Start processing in background thread
-        thread = threading.Thread(target=process_task)
-        thread.daemon = True
-        thread.start()
-        
-        # Add timeout for the task
-        def timeout_task():
-            time.sleep(300)  # 5 minutes timeout
-            if task_id in tasks and tasks[task_id]['status'] == 'processing':
-                tasks[task_id]['status'] = 'failed'
-                tasks[task_id]['error'] = 'Processing timeout - took too long'
-                print(f"⏰ Task {task_id} timed out after 5 minutes")
-        
-        timeout_thread = threading.Thread(target=timeout_task)
-        timeout_thread.daemon = True
-        timeout_thread.start()
+    @app.route('/captions/<task_id>', methods=['GET'])
+    def get_captions(task_id):
+        """Get completed captions; with from/to/after, one time-range page of them."""
+        try:
+            if any(key in request.args for key in ('from', 'to', 'after')):
+                return get_caption_range(task_id)
+            
+            if task_id not in tasks:
+                return jsonify({'error': 'Task not found'}), 404
+            
+            task = tasks[task_id]
+            
+            if task['status'] != 'completed':
+                return jsonify({'error': 'Task not completed'}), 400
+            
+            if not task['captions']:
+                return jsonify({'error': 'No captions available'}), 400
+            
+            return jsonify({'captions': task['captions']})
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def get_caption_range(task_id):
+        """Captions overlapping [from, to) seconds, paged by keyset cursor, so players fetch only around the playhead."""
+        try:
+            start = float(request.args.get('from', 0))
+            end = float(request.args['to']) if 'to' in request.args else None
+            limit = int(request.args['limit']) if 'limit' in request.args else None
+            after = request.args.get('after')
+            if after:
+                decode_cursor(after)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid range parameters: {e}'}), 400
         
-        return jsonify({'task_id': task_id})
+        if task_id in tasks:
+            # Direct API task, still in memory
+            task = tasks[task_id]
+            if task['status'] != 'completed' or not task['captions']:
+                return jsonify({'error': 'Task not completed'}), 400
+            captions, next_cursor = caption_window(task['captions'], start, end, after, limit)
+        else:
+            # Worker tasks are stored in Supabase
+            captions, next_cursor = get_task_storage().get_captions_in_range(task_id, start, end, after, limit)
         
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return jsonify({'captions': captions, 'next_cursor': next_cursor, 'from': start, 'to': end})
 
-@app.route('/status/<task_id>', methods=['GET'])
-def get_status(task_id):
-    """Get processing status."""
-    try:
-        if task_id not in tasks:
-            return jsonify({'error': 'Task not found'}), 404
-        
-        task = tasks[task_id]
+    @app.route('/health', methods=['GET'])
+    def health_check():
+        """Health check endpoint; reports not-ready while draining so load balancers stop routing here."""
+        if drain_controller.draining:
+            return jsonify({
+                'status': 'draining',
+                'timestamp': time.time(),
+                'message': 'Backend is draining before shutdown'
+            }), 503
         return jsonify({
-            'status': task['status'],
-            'progress': task['progress'],
-            'message': task['message'],
-            'error': task['error']
+            'status': 'healthy',
+            'timestamp': time.time(),
+            'message': 'Backend processing tasks from Supabase and direct API'
         })
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
 
-@app.route('/captions/<task_id>', methods=['GET'])
-def get_captions(task_id):
-    """Get completed captions."""
-    try:
-        if task_id not in tasks:
-            return jsonify({'error': 'Task not found'}), 404
-        
-        task = tasks[task_id]
-        
-        if task['status'] != 'completed':
-            return jsonify({'error': 'Task not completed'}), 400
-        
-        if not task['captions']:
-            return jsonify({'error': 'No captions available'}), 400
-        
-        return jsonify({'captions': task['captions']})
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    @app.route('/ready', methods=['GET'])
+    def readiness_check():
+        """Readiness probe: 503 once a drain has started."""
+        return health_check()
 
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Health check endpoint."""
-    return jsonify({
-        'status': 'healthy',
-        'timestamp': time.time(),
-        'message': 'Backend processing tasks from Supabase and direct API'
-    })
+    @app.route('/admin/drain', methods=['POST', 'GET'])
+    def admin_drain():
+        """Start a graceful drain (POST) or report drain progress (GET)."""
+        unauthorized = require_admin()
+        if unauthorized:
+            return unauthorized
+        if request.method == 'POST':
+            data = request.get_json(silent=True) or {}
+            timeout = data.get('timeout_seconds')
+            drain_controller.begin_drain(timeout=float(timeout) if timeout is not None else None, reason='admin endpoint')
+        return jsonify(drain_controller.status())
 
-@app.route('/stats', methods=['GET'])
-def get_stats():
-    """Get processing statistics."""
-    try:
-        pending_tasks = supabase_service.get_pending_tasks()
+    @app.route('/admin/engine', methods=['POST', 'GET'])
+    def admin_engine():
+        """Warm and switch engine settings without downtime (POST) or report swap status (GET)."""
+        unauthorized = require_admin()
+        if unauthorized:
+            return unauthorized
+        if request.method == 'POST':
+            changes = request.get_json(silent=True) or {}
+            try:
+                status = engines.swap(changes)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            except RuntimeError as e:
+                return jsonify({'error': str(e)}), 409
+            # Workers watching the shared config file follow the same switch
+            config_path = os.getenv('ENGINE_CONFIG_PATH')
+            if config_path:
+                write_config_file(config_path, engines.active.merged(changes))
+            return jsonify(status), 202
+        return jsonify(engines.status())
+
+    @app.route('/stats', methods=['GET'])
+    def get_stats():
+        """Get processing statistics."""
+        try:
+            return jsonify({
+                'pending_tasks': get_task_storage().count_pending_tasks(),
+                'status': 'running'
+            })
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/metrics', methods=['GET'])
+    def get_metrics():
+        """Dependency health and pipeline throughput metrics."""
         return jsonify({
-            'pending_tasks': len(pending_tasks),
-            'status': 'running'
+            'circuit_breakers': breaker_metrics(),
+            'stage_throughput': get_throughput_model().snapshot(),
+            'short_clip_latency': get_latency_tracker().snapshot(),
+            'model_pool': get_model_pool().snapshot(),
+            'openai_quota': get_openai_governor().snapshot(),
+            'downloads': get_download_manager().snapshot(),
+            'engine': engines.status(),
+            'pipeline_stages': pipeline.snapshot() if pipeline else None,
+            'feature_cache': get_feature_cache().snapshot() if get_feature_cache() else None,
+            'encoder_batches': encoder_batcher_metrics(),
+            'http_pools': http_pool_metrics(),
+            'write_behind': worker.storage.snapshot() if worker and hasattr(worker.storage, 'snapshot') else None,
+            'timestamp': time.time()
         })
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        
+    return app
 
 if __name__ == '__main__':
     print("🚀 Starting Matric Backend - Supabase Integration")
     print("📊 Processing tasks from Supabase database")
-    print("🔄 Background processor started")
+    
+    # Development all-in-one: HTTP and an embedded worker in one process.
+    # The reloader would import this module twice and start two workers.
+    app = create_app(start_worker=True)
+    
+    # Follow engine switches made through another instance's admin endpoint
+    if os.getenv('ENGINE_CONFIG_PATH'):
+        app.extensions['matric']['engines'].watch_file(os.getenv('ENGINE_CONFIG_PATH'))
+    
+    # SIGTERM/SIGINT drain in-flight jobs before exiting
+    app.extensions['matric']['drain_controller'].install_signal_handlers()
     
     # Run the Flask app
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    app.run(
+        host=os.getenv('HOST', '0.0.0.0'),
+        port=int(os.getenv('PORT', 5001)),
+        debug=os.getenv('FLASK_DEBUG', 'true').lower() in ('1', 'true'),
+        use_reloader=False
+    )
@@ -0,0 +1,197 @@
+"""
+Command line entry points for the Matric backend.
+
+    python -m backend serve [--host 0.0.0.0] [--port 5001] [--with-worker]
+    python -m backend worker [--concurrency 2] [--poll-interval 5] [--staged] [--write-behind]
+    python -m backend prefork [--workers 4] [--concurrency 1] [--preload tiny,base]
+    python -m backend retention [--once] [--interval 3600] [--archive-dir archive]
+
+The HTTP tier and the transcription workers scale independently: run as many
+`serve` replicas (or `gunicorn wsgi:app` workers) and `worker` processes as
+load requires. Workers claim Supabase tasks atomically, so any number of them
+can poll the same queue.
+"""
+import os
+import signal
+import argparse
+
+from worker_lifecycle import DrainController
+
+
+def serve(args):
+    """HTTP tier; embeds a worker only when asked to"""
+    from api_server import create_app
+
+    drain_controller = DrainController()
+    app = create_app(
+        start_worker=args.with_worker,
+        drain_controller=drain_controller,
+        worker_concurrency=args.concurrency,
+        pipeline=build_pipeline(args) if args.with_worker and args.staged else None
+    )
+    drain_controller.install_signal_handlers()
+    follow_engine_config(app.extensions['matric']['engines'])
+    print(f"🚀 Serving Matric API on {args.host}:{args.port}"
+          f"{' with embedded worker' if args.with_worker else ''}")
+    app.run(host=args.host, port=args.port, debug=False, use_reloader=False, threaded=True)
+
+
+def build_pipeline(args):
+    from staged_pipeline import StagedPipeline
+
+    return StagedPipeline(
+        download_workers=args.download_workers,
+        transcode_workers=args.transcode_workers,
+        inference_processes=args.inference_processes
+    )
+
+
+def log_pipeline_metrics(pipeline, interval: float):
+    """Print per-stage queue and utilization figures periodically"""
+    import json
+    import time
+    import threading
+
+    def report():
+        while True:
+            time.sleep(interval)
+            print(f"📊 Pipeline stages: {json.dumps(pipeline.snapshot())}")
+
+    threading.Thread(target=report, name='pipeline-metrics', daemon=True).start()
+
+
+def follow_engine_config(engines):
+    """Swap engines when ENGINE_CONFIG_PATH changes or on SIGHUP"""
+    config_path = os.getenv('ENGINE_CONFIG_PATH')
+    if not config_path:
+        return
+    engines.watch_file(config_path, float(os.getenv('ENGINE_CONFIG_POLL_INTERVAL', 10)))
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, lambda signum, frame: engines.reload_from_file(config_path))
+
+
+def worker(args):
+    """Transcription tier: poll task storage and process up to N tasks at once"""
+    from task_storage import get_task_storage
+    from task_worker import TaskWorker
+    from engine_config import get_engine_manager
+
+    drain_controller = DrainController()
+    # SIGTERM/SIGINT stop claiming, finish or hand back in-flight tasks, then exit
+    drain_controller.install_signal_handlers()
+    pipeline = None
+    if args.staged:
+        pipeline = build_pipeline(args)
+        log_pipeline_metrics(pipeline, float(os.getenv('PIPELINE_METRICS_INTERVAL', 60)))
+    print(f"🚀 Starting Matric worker (pid {os.getpid()}, concurrency {args.concurrency}"
+          f"{', staged pools' if pipeline else ''})")
+    task_worker = TaskWorker(
+        get_task_storage(),
+        concurrency=args.concurrency,
+        poll_interval=args.poll_interval,
+        drain=drain_controller,
+        pipeline=pipeline,
+        engines=get_engine_manager(),
+        write_behind=args.write_behind
+    )
+    follow_engine_config(task_worker.engines)
+    task_worker.run()
+    drain_controller.wait_until_drained(timeout=drain_controller.drain_timeout + drain_controller.abandon_grace)
+
+
+def add_pipeline_arguments(parser):
+    parser.add_argument('--staged', action='store_true',
+                        default=os.getenv('PIPELINE_STAGED', 'false').lower() == 'true',
+                        help='Run download, transcode and inference on separate pools')
+    parser.add_argument('--download-workers', type=int, help='I/O threads for downloads (staged)')
+    parser.add_argument('--transcode-workers', type=int, help='ffmpeg transcodes at once (staged)')
+    parser.add_argument('--inference-processes', type=int, help='Whisper processes (staged)')
+
+
+def prefork(args):
+    """Load models once, then fork workers that share the weight pages"""
+    from prefork import PreforkServer
+
+    if not hasattr(os, 'fork'):
+        raise SystemExit("Prefork mode requires os.fork (POSIX)")
+    PreforkServer(
+        workers=args.workers,
+        concurrency=args.concurrency,
+        preload_sizes=[size.strip() for size in args.preload.split(',') if size.strip()],
+        poll_interval=args.poll_interval
+    ).run()
+
+
+def retention(args):
+    """Archive and delete tasks past the retention window and keep partitions ahead"""
+    from task_storage import get_task_storage
+    from retention import RetentionWorker
+
+    retention_worker = RetentionWorker(
+        get_task_storage(),
+        archive_dir=args.archive_dir,
+        batch_size=args.batch_size,
+        batch_pause=args.batch_pause
+    )
+    if args.once:
+        retention_worker.run_cycle()
+        return
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda signum, frame: retention_worker.stop())
+    retention_worker.run(interval=args.interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m backend', description='Matric backend')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help='Run the HTTP API')
+    serve_parser.add_argument('--host', default=os.getenv('HOST', '0.0.0.0'))
+    serve_parser.add_argument('--port', type=int, default=int(os.getenv('PORT', 5001)))
+    serve_parser.add_argument('--with-worker', action='store_true',
+                              help='Also process Supabase tasks in this process')
+    serve_parser.add_argument('--concurrency', type=int, default=int(os.getenv('WORKER_CONCURRENCY', 1)),
+                              help='Embedded worker concurrency')
+    add_pipeline_arguments(serve_parser)
+    serve_parser.set_defaults(handler=serve)
+
+    worker_parser = commands.add_parser('worker', help='Run a transcription worker')
+    worker_parser.add_argument('--concurrency', type=int, default=int(os.getenv('WORKER_CONCURRENCY', 1)),
+                               help='Tasks processed at the same time')
+    worker_parser.add_argument('--poll-interval', type=float, default=float(os.getenv('WORKER_POLL_INTERVAL', 5)),
+                               help='Seconds between polls when idle')
+    worker_parser.add_argument('--write-behind', action='store_true',
+                               default=os.getenv('WRITE_BEHIND', 'false').lower() == 'true',
+                               help='Queue status, progress and caption writes instead of waiting on Supabase')
+    add_pipeline_arguments(worker_parser)
+    worker_parser.set_defaults(handler=worker)
+
+    prefork_parser = commands.add_parser('prefork', help='Run forked workers sharing preloaded models')
+    prefork_parser.add_argument('--workers', type=int, default=int(os.getenv('PREFORK_WORKERS', 2)),
+                                help='Worker processes')
+    prefork_parser.add_argument('--concurrency', type=int, default=int(os.getenv('WORKER_CONCURRENCY', 1)),
+                                help='Tasks each worker processes at the same time')
+    prefork_parser.add_argument('--preload', default=os.getenv('PREFORK_PRELOAD_MODELS', 'tiny'),
+                                help='Comma-separated model sizes loaded before forking')
+    prefork_parser.add_argument('--poll-interval', type=float, default=float(os.getenv('WORKER_POLL_INTERVAL', 5)),
+                                help='Seconds between polls when idle')
+    prefork_parser.set_defaults(handler=prefork)
+
+    retention_parser = commands.add_parser('retention', help='Archive old tasks and manage monthly partitions')
+    retention_parser.add_argument('--once', action='store_true', help='Run one cycle and exit (e.g. from cron)')
+    retention_parser.add_argument('--interval', type=float, default=float(os.getenv('RETENTION_INTERVAL', 3600)),
+                                  help='Seconds between cycles')
+    retention_parser.add_argument('--archive-dir', default=os.getenv('RETENTION_ARCHIVE_DIR', 'archive'),
+                                  help='Where archived tasks are written')
+    retention_parser.add_argument('--batch-size', type=int, default=int(os.getenv('RETENTION_BATCH_SIZE', 200)),
+                                  help='Tasks archived and deleted per batch')
+    retention_parser.add_argument('--batch-pause', type=float, default=float(os.getenv('RETENTION_BATCH_PAUSE', 2)),
+                                  help='Seconds between batches')
+    retention_parser.set_defaults(handler=retention)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
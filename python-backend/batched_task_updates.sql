@@ -0,0 +1,23 @@
+-- Batched task status/progress updates for the write-behind queue (write_behind.py)
+
+-- Apply status/progress changes for many tasks in one statement (write-behind
+-- flushes). Each element has an id plus only the columns to change.
+CREATE OR REPLACE FUNCTION apply_task_updates(updates JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    updated_count INTEGER := 0;
+BEGIN
+    UPDATE caption_tasks t
+    SET status = COALESCE(u.value->>'status', t.status),
+        error_message = CASE WHEN u.value ? 'error_message' THEN u.value->>'error_message' ELSE t.error_message END,
+        progress = COALESCE(ROUND((u.value->>'progress')::NUMERIC)::INTEGER, t.progress),
+        progress_message = CASE WHEN u.value ? 'progress_message' THEN u.value->>'progress_message' ELSE t.progress_message END,
+        eta_seconds = CASE WHEN u.value ? 'eta_seconds' THEN ROUND((u.value->>'eta_seconds')::NUMERIC)::INTEGER ELSE t.eta_seconds END,
+        updated_at = NOW()
+    FROM jsonb_array_elements(updates) AS u(value)
+    WHERE t.id = (u.value->>'id')::UUID;
+    
+    GET DIAGNOSTICS updated_count = ROW_COUNT;
+    RETURN updated_count;
+END;
+$$ LANGUAGE plpgsql;
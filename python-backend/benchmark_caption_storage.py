@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Compare caption storage formats for transcripts of increasing length.
+
+- rows:   one `captions` row per caption (estimated: tuple header, UUIDs,
+          DECIMALs, timestamp and the three indexes' entries)
+- jsonb:  the JSON array kept in caption_tasks.captions / saved_transcriptions
+- packed: one caption_blobs blob (caption_codec.py), exact
+
+Also times encoding and decoding the packed blob. Captions are synthetic
+speech-like segments of about three seconds; pass --captions-file with a
+JSON array of real captions to measure those instead.
+
+Usage:
+    python benchmark_caption_storage.py [--sizes 100,1000,10000] [--captions-file captions.json]
+"""
+
+import json
+import time
+import random
+import argparse
+
+from caption_codec import encode_captions, decode_captions
+
+WORDS = ('the and to of a in that is it you we this for on with so be are what have was not can they '
+         'about just one there like do know think going really right model data video people time make '
+         'because see here now then want these get way how some look actually thing first will').split()
+
+# Approximate on-disk bytes of one captions row beyond its text: 24 tuple header +
+# 4 line pointer + 2x16 UUID + 3x~8 DECIMAL + 4 INTEGER + 8 TIMESTAMPTZ + alignment,
+# plus entries in the task_id, start_time and (task_id, sequence_order) indexes
+ROW_OVERHEAD = 24 + 4 + 32 + 24 + 4 + 8 + 8
+INDEX_OVERHEAD = (8 + 16 + 4) + (8 + 8 + 4) + (8 + 16 + 4 + 4)
+
+
+def synthetic_captions(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    captions = []
+    start = 0.0
+    for _ in range(count):
+        duration = round(rng.uniform(1.5, 4.5), 3)
+        captions.append({
+            'text': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 14))).capitalize() + '.',
+            'startTime': round(start, 3),
+            'endTime': round(start + duration, 3),
+            'confidence': round(rng.uniform(-0.6, 0.0), 4),
+        })
+        start += duration + rng.choice((0.0, 0.0, 0.2))
+    return captions
+
+
+def row_bytes(captions: list) -> int:
+    return sum(ROW_OVERHEAD + INDEX_OVERHEAD + len(c['text'].encode('utf-8')) + 1 for c in captions)
+
+
+def timed(fn, repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='100,1000,10000')
+    parser.add_argument('--captions-file', help='JSON array of captions to measure instead of synthetic ones')
+    args = parser.parse_args()
+
+    if args.captions_file:
+        with open(args.captions_file, 'r') as f:
+            datasets = [json.load(f)]
+    else:
+        datasets = [synthetic_captions(int(size)) for size in args.sizes.split(',')]
+
+    print(f"{'captions':>9} {'rows~':>10} {'jsonb':>10} {'packed':>9} {'vs rows':>8} {'encode':>9} {'decode':>9}")
+    for captions in datasets:
+        packed = encode_captions(captions)
+        as_json = len(json.dumps(captions).encode('utf-8'))
+        rows = row_bytes(captions)
+        encode_time = timed(lambda: encode_captions(captions))
+        decode_time = timed(lambda: decode_captions(packed))
+        print(f"{len(captions):>9} {rows / 1024:>8.0f}kB {as_json / 1024:>8.0f}kB {len(packed) / 1024:>7.1f}kB "
+              f"{rows / len(packed):>7.0f}x {encode_time * 1000:>7.1f}ms {decode_time * 1000:>7.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Benchmark the download manager against a local HTTP server serving fixture media.
+
+The server caps every connection's throughput (like a CDN throttling single
+streams), supports Range requests, and can drop the first transfer of a file
+part-way through. Three comparisons are run:
+
+- HLS with serial vs concurrent fragment downloads
+- Resuming a dropped single-stream download vs restarting it
+- Several jobs sharing one bandwidth budget
+
+Usage:
+    python benchmark_download.py [--size-mb 8] [--segments 16] [--conn-kbps 4000]
+"""
+
+import os
+import re
+import time
+import math
+import wave
+import shutil
+import argparse
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from download_manager import DownloadManager, BandwidthBudget
+from resilience import RetryPolicy
+
+
+class FixtureServer:
+    """Serves a WAV fixture as a single file and as an HLS playlist of byte segments."""
+    def __init__(self, fixture_path: str, segments: int, conn_bytes_per_second: float, drop_after: int = 0):
+        self.fixture_path = fixture_path
+        self.size = os.path.getsize(fixture_path)
+        self.segments = segments
+        self.segment_size = math.ceil(self.size / segments)
+        self.conn_bytes_per_second = conn_bytes_per_second
+        self.drop_after = drop_after
+        self.dropped = set()
+        self.bytes_served = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.port = self.httpd.server_address[1]
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.port}/{path}"
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+
+    def reset(self, drop_after: int = 0):
+        with self._lock:
+            self.bytes_served = 0
+            self.dropped = set()
+            self.drop_after = drop_after
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                self.do_GET(head_only=True)
+
+            def do_GET(self, head_only=False):
+                if self.path == '/audio.m3u8':
+                    body = server.playlist().encode()
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/vnd.apple.mpegurl')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    if not head_only:
+                        self.wfile.write(body)
+                    return
+
+                match = re.match(r'^/seg(\d+)\.ts$', self.path)
+                if match:
+                    index = int(match.group(1))
+                    start = index * server.segment_size
+                    end = min(server.size, start + server.segment_size) - 1
+                    content_type = 'video/mp2t'
+                elif self.path == '/audio.wav':
+                    start, end = 0, server.size - 1
+                    content_type = 'audio/wav'
+                else:
+                    self.send_error(404)
+                    return
+
+                status = 200
+                range_header = self.headers.get('Range')
+                if range_header and self.path == '/audio.wav':
+                    range_match = re.match(r'bytes=(\d+)-(\d*)', range_header)
+                    if range_match:
+                        start = int(range_match.group(1))
+                        if range_match.group(2):
+                            end = min(end, int(range_match.group(2)))
+                        status = 206
+
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Accept-Ranges', 'bytes')
+                self.send_header('Content-Length', str(end - start + 1))
+                if status == 206:
+                    self.send_header('Content-Range', f"bytes {start}-{end}/{server.size}")
+                self.end_headers()
+                if not head_only:
+                    self.stream(start, end)
+
+            def stream(self, start: int, end: int):
+                chunk = 64 * 1024
+                sent = 0
+                began = time.time()
+                drop_at = None
+                with server._lock:
+                    if server.drop_after and self.path not in server.dropped:
+                        server.dropped.add(self.path)
+                        drop_at = server.drop_after
+                with open(server.fixture_path, 'rb') as f:
+                    f.seek(start)
+                    remaining = end - start + 1
+                    while remaining > 0:
+                        data = f.read(min(chunk, remaining))
+                        if drop_at is not None and sent + len(data) > drop_at:
+                            # Simulate a dropped connection mid-transfer
+                            self.wfile.write(data[:max(0, drop_at - sent)])
+                            self.wfile.flush()
+                            self.close_connection = True
+                            return
+                        self.wfile.write(data)
+                        sent += len(data)
+                        remaining -= len(data)
+                        with server._lock:
+                            server.bytes_served += len(data)
+                        # Per-connection throughput cap
+                        ahead = sent / server.conn_bytes_per_second - (time.time() - began)
+                        if ahead > 0:
+                            time.sleep(ahead)
+
+        return Handler
+
+    def playlist(self) -> str:
+        duration = 4.0
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3', f'#EXT-X-TARGETDURATION:{int(duration)}', '#EXT-X-MEDIA-SEQUENCE:0']
+        for index in range(self.segments):
+            lines += [f'#EXTINF:{duration:.1f},', f'seg{index}.ts']
+        lines.append('#EXT-X-ENDLIST')
+        return '\n'.join(lines) + '\n'
+
+
+def write_fixture(path: str, size_mb: float):
+    """Mono 16 kHz WAV of a quiet sawtooth, roughly `size_mb` large."""
+    sample_rate = 16000
+    frames = int(size_mb * 1024 * 1024 / 2)
+    with wave.open(path, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        period = bytes(bytearray((i * 8) % 256 for i in range(200)))
+        block = period * (sample_rate // 100)
+        written = 0
+        while written < frames * 2:
+            wav_file.writeframes(block[:frames * 2 - written])
+            written += len(block)
+
+
+def timed_download(manager: DownloadManager, url: str, out_dir: str) -> float:
+    os.makedirs(out_dir, exist_ok=True)
+    started = time.time()
+    manager.download(url, os.path.join(out_dir, 'audio.%(ext)s'))
+    return time.time() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=float, default=8)
+    parser.add_argument('--segments', type=int, default=16)
+    parser.add_argument('--conn-kbps', type=float, default=4000, help='Per-connection cap in kilobytes/s')
+    parser.add_argument('--fragments', type=int, default=4)
+    parser.add_argument('--jobs', type=int, default=4)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='download-bench-')
+    fixture = os.path.join(work_dir, 'fixture.wav')
+    write_fixture(fixture, args.size_mb)
+    server = FixtureServer(fixture, args.segments, args.conn_kbps * 1024).start()
+    no_retry_wait = RetryPolicy(max_attempts=4, base_delay=0.0, max_delay=0.0)
+    results = []
+
+    print("🚀 Download Manager Benchmark")
+    print("=" * 50)
+    print(f"Fixture: {server.size / 1024 / 1024:.1f}MB, {args.segments} HLS segments, "
+          f"{args.conn_kbps:.0f}KB/s per connection")
+
+    try:
+        # 1. Serial vs concurrent HLS fragments
+        for fragments in (1, args.fragments):
+            manager = DownloadManager(BandwidthBudget(max_connections=64), fragments=fragments,
+                                      retry_policy=no_retry_wait, chunk_size=0)
+            server.reset()
+            seconds = timed_download(manager, server.url('audio.m3u8'), os.path.join(work_dir, f'hls-{fragments}'))
+            results.append((f"HLS, {fragments} concurrent fragments", seconds, server.bytes_served))
+
+        # 2. Resume vs restart after a dropped connection at 60%
+        drop_after = int(server.size * 0.6)
+        for resume in (True, False):
+            # The dropped transfer must fail the attempt rather than be retried inside yt-dlp
+            manager = DownloadManager(BandwidthBudget(), fragments=1, retry_policy=no_retry_wait, chunk_size=0,
+                                      ydl_options={'continuedl': resume, 'retries': 0})
+            out_dir = os.path.join(work_dir, f"resume-{resume}")
+            server.reset(drop_after=drop_after)
+            seconds = timed_download(manager, server.url('audio.wav'), out_dir)
+            label = "Dropped single stream, resumed .part" if resume else "Dropped single stream, restarted"
+            results.append((label, seconds, server.bytes_served))
+
+        # 3. Several jobs sharing one budget
+        budget_bps = args.conn_kbps * 1024 * 2
+        manager = DownloadManager(BandwidthBudget(bytes_per_second=budget_bps, max_connections=8),
+                                  fragments=args.fragments, retry_policy=no_retry_wait, chunk_size=0)
+        server.reset()
+        started = time.time()
+        threads = [
+            threading.Thread(target=timed_download,
+                             args=(manager, server.url('audio.m3u8'), os.path.join(work_dir, f'shared-{i}')))
+            for i in range(args.jobs)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        seconds = time.time() - started
+        results.append((f"{args.jobs} HLS jobs, {budget_bps / 1024:.0f}KB/s shared budget", seconds, server.bytes_served))
+
+        print(f"\n{'Scenario':<48} {'Seconds':>8} {'MB served':>10} {'MB/s':>7}")
+        for label, seconds, served in results:
+            mb = served / 1024 / 1024
+            print(f"{label:<48} {seconds:>8.2f} {mb:>10.1f} {mb / seconds:>7.2f}")
+    finally:
+        server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
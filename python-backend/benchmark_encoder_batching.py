@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark cross-job encoder batching under concurrent load.
+
+Runs the fixture corpus as `--jobs` concurrent transcriptions, each on its own
+pooled model as the task worker does, first with per-job encoding and then
+with ENCODER_BATCHING. Reports audio-seconds transcribed per wall second and
+per CPU second, and the batch sizes actually formed.
+
+Usage:
+    python benchmark_encoder_batching.py --corpus fixtures/audio [--model base] [--jobs 4]
+"""
+
+import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import whisper
+
+from model_pool import WhisperModelPool
+from transcription_engines import WhisperEngine
+from encoder_batcher import encoder_batcher_metrics
+from benchmark_quantization import corpus_files
+
+
+def run_load(model_size: str, clips, jobs: int, language: str, batching: bool):
+    os.environ['ENCODER_BATCHING'] = 'true' if batching else 'false'
+    # A fresh pool, so models wrapped for batching aren't reused by the other mode
+    pool = WhisperModelPool(max_idle=jobs)
+    engines = [WhisperEngine(model_size, model_pool=pool, feature_cache=None) for _ in range(jobs)]
+    # Warm-up outside the measurement
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        list(executor.map(lambda engine: engine.transcribe(clips[0][:whisper.audio.SAMPLE_RATE], language), engines))
+
+    queue = list(clips) * jobs
+    wall_started, cpu_started = time.time(), time.process_time()
+
+    def worker(engine):
+        while queue:
+            try:
+                audio = queue.pop()
+            except IndexError:
+                return
+            engine.transcribe(audio, language)
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        list(executor.map(worker, engines))
+    wall, cpu = time.time() - wall_started, time.process_time() - cpu_started
+    for engine in engines:
+        engine.close()
+    return wall, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', required=True, help='Directory of audio fixtures')
+    parser.add_argument('--model', default='base')
+    parser.add_argument('--jobs', type=int, default=4)
+    parser.add_argument('--language', default='en')
+    args = parser.parse_args()
+
+    paths = corpus_files(args.corpus)
+    if not paths:
+        parser.error(f"No audio files in {args.corpus}")
+    clips = [whisper.load_audio(path) for path in paths]
+    audio_seconds = sum(len(audio) for audio in clips) / whisper.audio.SAMPLE_RATE * args.jobs
+
+    print("🚀 Encoder Batching Benchmark")
+    print("=" * 50)
+    print(f"{args.jobs} concurrent jobs, {args.model} model, {audio_seconds:.0f}s of audio per run\n")
+    print(f"{'Mode':<10} {'Wall s':>8} {'CPU s':>8} {'Audio s/wall s':>15} {'Audio s/CPU s':>14}")
+    for batching in (False, True):
+        wall, cpu = run_load(args.model, clips, args.jobs, args.language, batching)
+        label = 'batched' if batching else 'per-job'
+        print(f"{label:<10} {wall:>8.1f} {cpu:>8.1f} {audio_seconds / wall:>15.2f} {audio_seconds / cpu:>14.2f}")
+
+    for model_id, snapshot in encoder_batcher_metrics().items():
+        print(f"\n📦 {model_id}: {snapshot['batches']} batches, mean {snapshot['mean_batch']} windows, "
+              f"largest {snapshot['largest_batch']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark memory and startup time of N inference processes per model loading mode.
+
+- private: every process loads its own copy (the default)
+- mmap:    every process maps the shared FP32 checkpoint (WHISPER_MMAP)
+- prefork: the parent loads once and forks; children share pages copy-on-write
+
+Each process decodes one second of silence so every weight page is touched,
+then reports its RSS/PSS. PSS splits shared pages between the processes
+sharing them, so it is the number that adds up to real memory use.
+
+Usage:
+    python benchmark_model_memory.py [--model tiny] [--processes 4] [--modes private,mmap,prefork]
+"""
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+
+from prefork import memory_usage
+
+
+def touch_model(model):
+    import numpy as np
+    import whisper
+    model.transcribe(np.zeros(whisper.audio.SAMPLE_RATE, dtype=np.float32), language='en', fp16=False, verbose=None)
+
+
+def child(mode: str, model_size: str, started: float, ready, results, model=None):
+    import torch
+    torch.set_num_threads(1)
+    if model is None:
+        from model_pool import load_whisper_model
+        model = load_whisper_model(model_size, mmap=(mode == 'mmap'))
+    startup = time.time() - started
+    touch_model(model)
+    ready.wait()
+    usage = memory_usage(os.getpid()) or {}
+    results.put((startup, usage))
+    # Stay alive until every sibling has measured, so shared pages are counted as shared
+    ready.wait()
+
+
+def run_mode(mode: str, model_size: str, processes: int):
+    context = multiprocessing.get_context('fork' if mode == 'prefork' else 'spawn')
+    barrier = context.Barrier(processes + 1)
+    results = context.Queue()
+    model = None
+    if mode == 'prefork':
+        import gc
+        from model_pool import load_whisper_model
+        model = load_whisper_model(model_size, mmap=False)
+        gc.collect()
+        gc.freeze()
+
+    workers = []
+    for _ in range(processes):
+        sys.stdout.flush()
+        process = context.Process(target=child, args=(mode, model_size, time.time(), barrier, results, model))
+        process.start()
+        workers.append(process)
+
+    barrier.wait()
+    measurements = [results.get() for _ in workers]
+    barrier.wait()
+    for process in workers:
+        process.join()
+    return measurements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='tiny')
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--modes', default='private,mmap,prefork')
+    args = parser.parse_args()
+
+    print("🚀 Model Memory Benchmark")
+    print("=" * 50)
+    print(f"{args.processes} processes, {args.model} model\n")
+    print(f"{'Mode':<10} {'Startup s':>10} {'RSS MB':>8} {'PSS MB':>8} {'Private MB':>11} {'Total PSS MB':>13}")
+    for mode in [m.strip() for m in args.modes.split(',') if m.strip()]:
+        measurements = run_mode(mode, args.model, args.processes)
+        startup = sum(m[0] for m in measurements) / len(measurements)
+        rss = sum(m[1].get('rss', 0) for m in measurements) / len(measurements) / 1024
+        pss = sum(m[1].get('pss', 0) for m in measurements) / len(measurements) / 1024
+        private = sum(m[1].get('private_dirty', 0) for m in measurements) / len(measurements) / 1024
+        print(f"{mode:<10} {startup:>10.2f} {rss:>8.0f} {pss:>8.0f} {private:>11.0f} {pss * len(measurements):>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark int8 dynamically quantized Whisper against FP32 on a fixture corpus.
+
+Every audio file in the corpus directory is transcribed by both variants of
+each model size with the service's local decoding options. Reported per size:
+
+- real-time factor (processing seconds per second of audio, lower is faster)
+- serialized weight size
+- word error rate of the int8 transcript measured against the FP32 one
+
+Usage:
+    python benchmark_quantization.py --corpus fixtures/audio [--models tiny,base] [--language en]
+"""
+
+import io
+import os
+import time
+import argparse
+from typing import List
+
+import torch
+import whisper
+
+from model_pool import load_whisper_model
+from transcription_engines import WhisperEngine
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.m4a', '.flac', '.ogg', '.webm', '.mp4')
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level edit distance divided by the reference length."""
+    ref = reference.lower().split()
+    hyp = hypothesis.lower().split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def weight_megabytes(model) -> float:
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / 1024 / 1024
+
+
+def corpus_files(corpus: str) -> List[str]:
+    return sorted(
+        os.path.join(corpus, name) for name in os.listdir(corpus)
+        if name.lower().endswith(AUDIO_EXTENSIONS)
+    )
+
+
+def run_variant(model, clips, language: str):
+    """Transcribe every clip; returns (seconds, transcripts)."""
+    options = WhisperEngine.transcribe_options(language)
+    options['verbose'] = None
+    # Warm-up so one-time allocations don't count against the first clip
+    model.transcribe(clips[0][:whisper.audio.SAMPLE_RATE], **options)
+    started = time.time()
+    transcripts = [model.transcribe(audio, **options)['text'].strip() for audio in clips]
+    return time.time() - started, transcripts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', required=True, help='Directory of audio fixtures')
+    parser.add_argument('--models', default='tiny,base')
+    parser.add_argument('--language', default='en')
+    parser.add_argument('--threads', type=int, default=None, help='torch CPU threads')
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    paths = corpus_files(args.corpus)
+    if not paths:
+        parser.error(f"No audio files in {args.corpus}")
+    clips = [whisper.load_audio(path) for path in paths]
+    audio_seconds = sum(len(audio) for audio in clips) / whisper.audio.SAMPLE_RATE
+
+    print("🚀 Quantization Benchmark")
+    print("=" * 50)
+    print(f"Corpus: {len(clips)} clips, {audio_seconds:.0f}s of audio, {torch.get_num_threads()} threads\n")
+    print(f"{'Model':<8} {'Variant':<8} {'RTF':>7} {'Speedup':>8} {'Weights MB':>11} {'WER vs FP32':>12}")
+
+    for size in [s.strip() for s in args.models.split(',') if s.strip()]:
+        fp32 = load_whisper_model(size, mmap=False, quantize=False)
+        fp32_seconds, reference = run_variant(fp32, clips, args.language)
+        fp32_mb = weight_megabytes(fp32)
+        del fp32
+
+        int8 = load_whisper_model(size, mmap=False, quantize=True)
+        int8_seconds, transcripts = run_variant(int8, clips, args.language)
+        int8_mb = weight_megabytes(int8)
+        del int8
+
+        wer = sum(word_error_rate(r, h) for r, h in zip(reference, transcripts)) / len(clips)
+        print(f"{size:<8} {'fp32':<8} {fp32_seconds / audio_seconds:>7.3f} {1.0:>7.2f}x {fp32_mb:>11.0f} {'-':>12}")
+        print(f"{size:<8} {'int8':<8} {int8_seconds / audio_seconds:>7.3f} "
+              f"{fp32_seconds / int8_seconds:>7.2f}x {int8_mb:>11.0f} {wer:>11.1%}")
+        for path, ref, hyp in zip(paths, reference, transcripts):
+            if ref != hyp:
+                print(f"   ↳ {os.path.basename(path)} differs ({word_error_rate(ref, hyp):.1%})")
+
+
+if __name__ == "__main__":
+    main()
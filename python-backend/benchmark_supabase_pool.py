@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-call Supabase latency with and without connection pooling.
+
+Runs a local PostgREST-compatible stub (plain HTTP or, with --tls, HTTPS with
+a throwaway self-signed certificate) and sends the calls a worker makes,
+a pending-task poll and an RPC, from several threads through the
+PooledPostgrestClient that SupabaseService uses:
+
+- no-pool: keep-alive disabled, so every call opens a new connection
+- pooled:  one shared keep-alive pool for all threads
+
+Usage:
+    python benchmark_supabase_pool.py [--threads 8] [--calls 200] [--tls] [--server-latency-ms 2]
+"""
+
+import os
+import ssl
+import json
+import time
+import tempfile
+import argparse
+import threading
+import statistics
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from http_pool import HTTPPool
+from supabase_service import PooledPostgrestClient, PENDING_TASK_COLUMNS
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers PostgREST table reads and RPCs with small JSON bodies over HTTP/1.1 keep-alive."""
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; without this, Nagle plus delayed
+    # ACKs add ~40ms to every response on a reused connection
+    disable_nagle_algorithm = True
+    latency = 0.0
+
+    def _respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        time.sleep(self.latency)
+        body = b'0' if '/rpc/' in self.path else json.dumps([]).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _respond
+    do_POST = _respond
+    do_PATCH = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+def self_signed_context(directory: str) -> ssl.SSLContext:
+    cert = os.path.join(directory, 'cert.pem')
+    key = os.path.join(directory, 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+         '-subj', '/CN=localhost', '-keyout', key, '-out', cert],
+        check=True, capture_output=True
+    )
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+def start_stub(tls: bool, latency: float):
+    StubHandler.latency = latency
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    scheme = 'http'
+    if tls:
+        context = self_signed_context(tempfile.mkdtemp())
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = 'https'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://127.0.0.1:{server.server_address[1]}/rest/v1"
+
+
+def run_variant(name: str, base_url: str, pool: HTTPPool, threads: int, calls: int):
+    client = PooledPostgrestClient(base_url, pool=pool, headers={'apikey': 'stub', 'Authorization': 'Bearer stub'})
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(index: int):
+        mine = []
+        for call in range(calls):
+            started = time.perf_counter()
+            if call % 2:
+                client.rpc('count_pending_tasks', {}).execute()
+            else:
+                client.table('caption_tasks').select(PENDING_TASK_COLUMNS).eq('status', 'pending') \
+                    .order('created_at').limit(50).execute()
+            mine.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(mine)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    client.session.close()
+
+    latencies.sort()
+    stats = pool.snapshot()
+    print(f"{name:>8} {statistics.mean(latencies) * 1000:>8.2f}ms {latencies[len(latencies) // 2] * 1000:>8.2f}ms "
+          f"{latencies[int(len(latencies) * 0.95)] * 1000:>8.2f}ms {len(latencies) / elapsed:>9.0f}/s "
+          f"{stats['connects']:>9} {stats['tls_handshakes']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--calls', type=int, default=200, help='Calls per thread')
+    parser.add_argument('--tls', action='store_true', help='Serve HTTPS so handshakes include TLS')
+    parser.add_argument('--server-latency-ms', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, base_url = start_stub(args.tls, args.server_latency_ms / 1000)
+    print(f"🧪 {args.threads} threads x {args.calls} calls against {base_url}")
+    print(f"{'variant':>8} {'mean':>10} {'p50':>10} {'p95':>10} {'throughput':>11} {'connects':>9} {'tls':>6}")
+    try:
+        run_variant('no-pool', base_url, HTTPPool('no-pool', max_connections=args.threads, max_keepalive=0,
+                                                  verify=False), args.threads, args.calls)
+        run_variant('pooled', base_url, HTTPPool('pooled', max_connections=args.threads, verify=False),
+                    args.threads, args.calls)
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
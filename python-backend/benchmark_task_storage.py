@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark the task storage calls a worker makes for each job, per backend.
+
+For every task: create it, poll, claim, report progress a few times, save its
+captions, then read a time range back the way the player does when seeking.
+Prints the latency of each call. With --videos below --tasks, tasks repeat the
+same videos, as popular videos do; run with CAPTION_STORAGE=shared to see repeat
+tasks reuse one stored transcript instead of saving their captions again.
+
+- sqlite:   embedded SQLiteTaskStorage in a throwaway database (default)
+- supabase: the configured Supabase project (SUPABASE_URL); creates real tasks
+
+Usage:
+    python benchmark_task_storage.py [--backend sqlite|supabase] [--tasks 50] [--captions 600]
+        [--progress-updates 10] [--synchronous NORMAL|FULL] [--videos 5]
+"""
+
+import os
+import time
+import tempfile
+import argparse
+import statistics
+from collections import defaultdict
+
+from engine_config import EngineConfig
+from transcripts import transcript_key
+
+
+def make_captions(count: int):
+    return [
+        {'text': f"Caption number {i} with a few words in it", 'startTime': i * 3.0,
+         'endTime': i * 3.0 + 2.8, 'confidence': 0.87}
+        for i in range(count)
+    ]
+
+
+def build_storage(args):
+    if args.backend == 'sqlite':
+        from sqlite_storage import SQLiteTaskStorage
+        return SQLiteTaskStorage(os.path.join(tempfile.mkdtemp(), 'benchmark.db'), synchronous=args.synchronous)
+    from supabase_service import get_supabase_service
+    return get_supabase_service()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', choices=('sqlite', 'supabase'), default='sqlite')
+    parser.add_argument('--tasks', type=int, default=50)
+    parser.add_argument('--captions', type=int, default=600, help='Captions per task (600 is about 30 minutes)')
+    parser.add_argument('--progress-updates', type=int, default=10, help='Progress reports per task')
+    parser.add_argument('--synchronous', choices=('NORMAL', 'FULL'), default='NORMAL', help='SQLite durability level')
+    parser.add_argument('--videos', type=int, default=None, help='Distinct videos the tasks cycle through (default: one per task)')
+    args = parser.parse_args()
+
+    storage = build_storage(args)
+    captions = make_captions(args.captions)
+    videos = args.videos or args.tasks
+    engine = EngineConfig(model_size='base', use_fast_api=False)
+    timings = defaultdict(list)
+
+    def timed(name, call, *call_args, **call_kwargs):
+        started = time.perf_counter()
+        result = call(*call_args, **call_kwargs)
+        timings[name].append(time.perf_counter() - started)
+        return result
+
+    print(f"🧪 {args.tasks} tasks over {videos} videos x {args.captions} captions on {args.backend} "
+          f"(CAPTION_STORAGE={storage.caption_storage})")
+    started = time.perf_counter()
+    for index in range(args.tasks):
+        task = timed('create_task', storage.create_task, f"https://www.youtube.com/watch?v=benchmark{index % videos}")
+        timed('get_pending_tasks', storage.get_pending_tasks)
+        timed('claim_task', storage.claim_task, task['id'])
+        transcript = transcript_key(task['video_url'], 'en', engine) if storage.shares_transcripts else None
+        if transcript and timed('reuse_transcript', storage.reuse_transcript, task['id'], transcript):
+            continue
+        for step in range(args.progress_updates):
+            timed('update_task_progress', storage.update_task_progress, task['id'],
+                  int(step * 90 / args.progress_updates), 'Transcribing', args.progress_updates - step)
+        timed('save_captions', storage.save_captions, task['id'], captions, transcript=transcript)
+        timed('get_captions_in_range', storage.get_captions_in_range, task['id'],
+              args.captions * 1.5, args.captions * 1.5 + 60)
+    elapsed = time.perf_counter() - started
+
+    print(f"{'call':>22} {'calls':>6} {'mean':>10} {'p50':>10} {'p95':>10}")
+    for name, values in timings.items():
+        values.sort()
+        print(f"{name:>22} {len(values):>6} {statistics.mean(values) * 1000:>8.3f}ms "
+              f"{values[len(values) // 2] * 1000:>8.3f}ms {values[int(len(values) * 0.95)] * 1000:>8.3f}ms")
+    print(f"📊 {elapsed * 1000 / args.tasks:.1f}ms of storage time per task")
+    if args.backend == 'sqlite':
+        storage.close()
+        size = sum(os.path.getsize(storage.path + suffix) for suffix in ('', '-wal') if os.path.exists(storage.path + suffix))
+        print(f"💾 Database is {size / 1024:.0f}KB")
+
+
+if __name__ == '__main__':
+    main()
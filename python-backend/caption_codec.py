@@ -0,0 +1,147 @@
+import zlib
+from typing import List, Dict, Tuple
+
+# Header of every packed blob: magic and format version
+MAGIC = b'CAP'
+FORMAT_VERSION = 1
+
+# Confidence (-1..1, see fix_confidence_constraint.sql) is kept to 1/127
+CONFIDENCE_SCALE = 127
+
+
+def _write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("Truncated caption blob")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value // 2 if value % 2 == 0 else -(value + 1) // 2
+
+
+def encode_captions(captions: List[Dict]) -> bytes:
+    """
+    Pack captions into one compact, columnar blob.
+
+    Times become integer milliseconds, stored as the delta from the previous
+    caption's start plus the duration, both as varints. Confidence is
+    quantized to a signed byte. Texts are concatenated and zlib-compressed
+    as one block after a column of their byte lengths.
+
+    Args:
+        captions (list): Dicts with text, startTime, endTime (seconds) and confidence
+
+    Returns:
+        bytes: The blob, decoded by `decode_captions`
+    """
+    out = bytearray(MAGIC)
+    out.append(FORMAT_VERSION)
+    _write_varint(out, len(captions))
+
+    previous_start = 0
+    for caption in captions:
+        start = round(float(caption.get('startTime', 0)) * 1000)
+        end = round(float(caption.get('endTime', 0)) * 1000)
+        _write_varint(out, _zigzag(start - previous_start))
+        _write_varint(out, _zigzag(end - start))
+        previous_start = start
+
+    for caption in captions:
+        confidence = caption.get('confidence')
+        quantized = round(max(-1.0, min(1.0, float(confidence or 0))) * CONFIDENCE_SCALE)
+        out.append(quantized & 0xFF)
+
+    texts = [(caption.get('text') or '').encode('utf-8') for caption in captions]
+    for text in texts:
+        _write_varint(out, len(text))
+    out += zlib.compress(b''.join(texts), 9)
+    return bytes(out)
+
+
+def decode_captions(data: bytes) -> List[Dict]:
+    """
+    Unpack a blob made by `encode_captions`.
+
+    Returns:
+        list: Dicts with text, startTime, endTime and confidence, in their original order
+
+    Raises:
+        ValueError: If the blob is not a caption blob or is damaged
+    """
+    data = bytes(data)
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a caption blob")
+    pos = len(MAGIC)
+    if pos >= len(data) or data[pos] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported caption blob version {data[pos] if pos < len(data) else None}")
+    pos += 1
+    count, pos = _read_varint(data, pos)
+
+    times = []
+    start = 0
+    for _ in range(count):
+        delta, pos = _read_varint(data, pos)
+        duration, pos = _read_varint(data, pos)
+        start += _unzigzag(delta)
+        times.append((start, start + _unzigzag(duration)))
+
+    if pos + count > len(data):
+        raise ValueError("Truncated caption blob")
+    confidences = [(byte - 256 if byte > 127 else byte) / CONFIDENCE_SCALE for byte in data[pos:pos + count]]
+    pos += count
+
+    lengths = []
+    for _ in range(count):
+        length, pos = _read_varint(data, pos)
+        lengths.append(length)
+    try:
+        text_block = zlib.decompress(data[pos:])
+    except zlib.error as e:
+        raise ValueError(f"Damaged caption text block: {e}")
+    if len(text_block) != sum(lengths):
+        raise ValueError("Caption text block does not match its lengths")
+
+    captions = []
+    offset = 0
+    for (start_ms, end_ms), confidence, length in zip(times, confidences, lengths):
+        captions.append({
+            'text': text_block[offset:offset + length].decode('utf-8'),
+            'startTime': start_ms / 1000,
+            'endTime': end_ms / 1000,
+            'confidence': round(confidence, 4),
+        })
+        offset += length
+    return captions
+
+
+def to_postgres_bytea(data: bytes) -> str:
+    """bytea literal PostgREST accepts in JSON."""
+    return '\\x' + data.hex()
+
+
+def from_postgres_bytea(value) -> bytes:
+    """bytea as PostgREST returns it in JSON (hex), or raw bytes from a driver."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value)
+    if value.startswith('\\x'):
+        return bytes.fromhex(value[2:])
+    raise ValueError("Unexpected bytea encoding")
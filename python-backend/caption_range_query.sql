@@ -0,0 +1,63 @@
+-- Time-range caption reads for player seeking: a (task_id, start_time) index
+-- and a keyset-paginated range function
+
+-- Superseded by the composite index; on its own it can't narrow by task
+DROP INDEX IF EXISTS idx_captions_start_time;
+CREATE INDEX IF NOT EXISTS idx_captions_task_start ON captions(task_id, start_time, sequence_order);
+-- Captions longer than the 30 s the range scan allows for; normally none, so it stays tiny
+CREATE INDEX IF NOT EXISTS idx_captions_long_segments ON captions(task_id, start_time, sequence_order)
+    WHERE end_time - start_time > 30;
+
+-- Captions overlapping [from_time, to_time) for player seeking, ordered by start
+-- time and paged by keyset: pass the last row's start_time and sequence_order
+-- as after_start/after_sequence to get the next page.
+CREATE OR REPLACE FUNCTION get_captions_in_range(
+    task_uuid UUID,
+    from_time NUMERIC,
+    to_time NUMERIC DEFAULT NULL,
+    after_start NUMERIC DEFAULT NULL,
+    after_sequence INTEGER DEFAULT NULL,
+    page_size INTEGER DEFAULT 200
+)
+RETURNS TABLE (
+    id UUID,
+    text TEXT,
+    start_time DECIMAL(10,3),
+    end_time DECIMAL(10,3),
+    confidence DECIMAL(5,4),
+    sequence_order INTEGER
+) AS $$
+DECLARE
+    row_limit INTEGER := LEAST(GREATEST(page_size, 1), 1001);
+BEGIN
+    RETURN QUERY
+    SELECT r.id, r.text, r.start_time, r.end_time, r.confidence, r.sequence_order
+    FROM (
+        -- Whisper segments are at most 30 seconds long, which bounds the index range scan
+        (SELECT c.id, c.text, c.start_time, c.end_time, c.confidence, c.sequence_order
+        FROM captions c
+        WHERE c.task_id = task_uuid
+          AND c.start_time >= from_time - 30
+          AND c.end_time >= from_time
+          AND (to_time IS NULL OR c.start_time < to_time)
+          AND (after_start IS NULL OR (c.start_time, c.sequence_order) > (after_start, after_sequence))
+        ORDER BY c.start_time, c.sequence_order
+        LIMIT row_limit)
+        UNION ALL
+        -- Longer segments (API output, imported transcripts) starting before that,
+        -- read from idx_captions_long_segments, which holds only them
+        (SELECT c.id, c.text, c.start_time, c.end_time, c.confidence, c.sequence_order
+        FROM captions c
+        WHERE c.task_id = task_uuid
+          AND c.end_time - c.start_time > 30
+          AND c.start_time < from_time - 30
+          AND c.end_time >= from_time
+          AND (to_time IS NULL OR c.start_time < to_time)
+          AND (after_start IS NULL OR (c.start_time, c.sequence_order) > (after_start, after_sequence))
+        ORDER BY c.start_time, c.sequence_order
+        LIMIT row_limit)
+    ) r
+    ORDER BY r.start_time ASC, r.sequence_order ASC
+    LIMIT row_limit;
+END;
+$$ LANGUAGE plpgsql STABLE;
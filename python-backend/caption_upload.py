@@ -0,0 +1,94 @@
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Set, Tuple
+
+# (first sequence_order, captions) for one upload request
+Chunk = Tuple[int, List[dict]]
+
+
+def chunk_captions(captions: List[dict], chunk_size: int) -> List[Chunk]:
+    """Split captions into consecutive chunks, each tagged with the position of its first caption."""
+    chunk_size = max(1, chunk_size)
+    return [(start, captions[start:start + chunk_size]) for start in range(0, len(captions), chunk_size)]
+
+
+def chunk_digest(chunk: Chunk) -> str:
+    """Identifies a chunk by position and content, so changed captions are never skipped."""
+    first_sequence, captions = chunk
+    payload = json.dumps([first_sequence, captions], sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class ChunkedUploader:
+    """
+    Uploads caption chunks with bounded parallelism and remembers which ones
+    landed, per task, so a failed save can be resumed without resending them.
+
+    Uploads must be idempotent (the database upserts by position), since a
+    chunk whose response was lost is sent again.
+
+    Args:
+        upload (callable): Called as upload(task_id, first_sequence, captions)
+        chunk_size (int): Captions per request
+        max_parallel (int): Chunks in flight at once
+    """
+    def __init__(self, upload: Callable[[str, int, List[dict]], None], chunk_size: int = 500,
+                 max_parallel: int = 4):
+        self.upload = upload
+        self.chunk_size = max(1, chunk_size)
+        self.max_parallel = max(1, max_parallel)
+        self._landed: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def landed(self, task_id: str) -> Set[str]:
+        with self._lock:
+            return set(self._landed.get(task_id, ()))
+
+    def upload_all(self, task_id: str, captions: List[dict]) -> int:
+        """
+        Upload every chunk not already landed for this task.
+
+        Returns:
+            int: Chunks sent by this call
+
+        Raises:
+            Exception: The first chunk error, after the other in-flight chunks finished
+        """
+        chunks = chunk_captions(captions, self.chunk_size)
+        landed = self.landed(task_id)
+        pending = [(chunk_digest(chunk), chunk) for chunk in chunks]
+        pending = [(digest, chunk) for digest, chunk in pending if digest not in landed]
+        if not pending:
+            return 0
+
+        def send(digest: str, chunk: Chunk):
+            first_sequence, rows = chunk
+            self.upload(task_id, first_sequence, rows)
+            with self._lock:
+                self._landed.setdefault(task_id, set()).add(digest)
+
+        error = None
+        with ThreadPoolExecutor(max_workers=min(self.max_parallel, len(pending)),
+                                thread_name_prefix='caption-upload') as executor:
+            futures = [executor.submit(send, digest, chunk) for digest, chunk in pending]
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                try:
+                    future.result()
+                except Exception as e:
+                    if error is None:
+                        error = e
+                        # Don't start chunks that haven't begun; the next attempt resumes them
+                        for other in futures:
+                            other.cancel()
+        if error is not None:
+            raise error
+        return len(pending)
+
+    def forget(self, task_id: str):
+        """Drop the landed record once the task's captions are committed."""
+        with self._lock:
+            self._landed.pop(task_id, None)
@@ -0,0 +1,69 @@
+from typing import List, Dict, Optional, Tuple
+
+# Whisper never emits a segment longer than its 30-second window, so range reads
+# scan captions by start time from this long before `from`. Longer ones (API
+# output, imported transcripts) are read separately through an index holding only them.
+MAX_SEGMENT_SECONDS = 30.0
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(start_time: float, sequence: int) -> str:
+    """Opaque keyset cursor: the (start time, position) of the last caption returned."""
+    return f"{float(start_time):.3f}:{int(sequence)}"
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    """
+    Raises:
+        ValueError: If the cursor was not made by `encode_cursor`
+    """
+    try:
+        start_time, sequence = cursor.split(':')
+        return float(start_time), int(sequence)
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid caption cursor: {cursor!r}")
+
+
+def page_size(limit: Optional[int]) -> int:
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+
+def caption_window(captions: List[Dict], start: float = 0.0, end: Optional[float] = None,
+                   after: Optional[str] = None, limit: Optional[int] = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Captions overlapping [start, end), ordered by start time, one keyset page at a time.
+    Same semantics as the get_captions_in_range RPC, for captions already in memory.
+
+    Args:
+        captions (list): Captions in sequence order
+        start (float): Window start in seconds
+        end (float): Window end in seconds, None for the end of the video
+        after (str): Cursor returned with the previous page
+        limit (int): Page size, capped at MAX_PAGE_SIZE
+
+    Returns:
+        tuple: (captions, cursor for the next page or None when this was the last)
+    """
+    limit = page_size(limit)
+    after_key = decode_cursor(after) if after else None
+
+    matches = []
+    for sequence, caption in enumerate(captions):
+        caption_start = float(caption['startTime'])
+        if float(caption['endTime']) < start:
+            continue
+        if end is not None and caption_start >= end:
+            continue
+        key = (round(caption_start, 3), sequence)
+        if after_key is not None and key <= after_key:
+            continue
+        matches.append((key, caption))
+    matches.sort(key=lambda match: match[0])
+
+    page = matches[:limit]
+    next_cursor = encode_cursor(*page[-1][0]) if len(matches) > limit else None
+    return [caption for _, caption in page], next_cursor
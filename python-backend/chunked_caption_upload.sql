@@ -0,0 +1,80 @@
+-- Chunked, resumable caption uploads: unique caption positions, a chunk upsert
+-- and a finalize function that marks the task completed once every chunk landed
+
+-- Keep the newest row where earlier uploads left duplicate positions
+DELETE FROM captions a
+USING captions b
+WHERE a.task_id = b.task_id
+  AND a.sequence_order = b.sequence_order
+  AND (a.created_at, a.id) < (b.created_at, b.id);
+
+DROP INDEX IF EXISTS idx_captions_sequence;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_captions_task_sequence ON captions(task_id, sequence_order);
+
+-- Upsert one chunk of a task's captions, numbered from first_sequence.
+-- Keyed by (task_id, sequence_order), so re-sending a chunk is harmless.
+CREATE OR REPLACE FUNCTION upsert_caption_chunk(
+    task_uuid UUID,
+    first_sequence INTEGER,
+    captions_data JSONB
+)
+RETURNS INTEGER AS $$
+DECLARE
+    upserted_count INTEGER := 0;
+BEGIN
+    INSERT INTO captions (
+        task_id,
+        text,
+        start_time,
+        end_time,
+        confidence,
+        sequence_order
+    )
+    SELECT
+        task_uuid,
+        c.text,
+        c.start_time::DECIMAL(10,3),
+        c.end_time::DECIMAL(10,3),
+        COALESCE(c.confidence::DECIMAL(5,4), 0.0),
+        first_sequence + (c.ordinality - 1)::INTEGER
+    FROM ROWS FROM (
+        jsonb_to_recordset(captions_data) AS (text TEXT, "startTime" NUMERIC, "endTime" NUMERIC, confidence NUMERIC)
+    ) WITH ORDINALITY AS c(text, start_time, end_time, confidence, ordinality)
+    ON CONFLICT (task_id, sequence_order) DO UPDATE SET
+        text = EXCLUDED.text,
+        start_time = EXCLUDED.start_time,
+        end_time = EXCLUDED.end_time,
+        confidence = EXCLUDED.confidence;
+    
+    GET DIAGNOSTICS upserted_count = ROW_COUNT;
+    RETURN upserted_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Commit marker for chunked uploads: drop rows left over from an earlier, longer
+-- upload, check every caption landed, and only then mark the task completed.
+CREATE OR REPLACE FUNCTION finalize_captions_for_task(
+    task_uuid UUID,
+    caption_count INTEGER
+)
+RETURNS INTEGER AS $$
+DECLARE
+    stored_count INTEGER := 0;
+BEGIN
+    DELETE FROM captions WHERE task_id = task_uuid AND sequence_order >= caption_count;
+    
+    SELECT COUNT(*) INTO stored_count FROM captions WHERE task_id = task_uuid;
+    IF stored_count <> caption_count THEN
+        RAISE EXCEPTION 'Task % has % of % captions stored', task_uuid, stored_count, caption_count;
+    END IF;
+    
+    UPDATE caption_tasks
+    SET status = 'completed',
+        progress = 100,
+        eta_seconds = 0,
+        updated_at = NOW()
+    WHERE id = task_uuid;
+    
+    RETURN stored_count;
+END;
+$$ LANGUAGE plpgsql;
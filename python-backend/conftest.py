@@ -0,0 +1,30 @@
+"""
+Factories shared by the test scripts. pytest loads this module first; the
+scripts import from it, so they also run on their own (python test_x.py).
+"""
+
+import os
+import tempfile
+
+from sqlite_storage import SQLiteTaskStorage
+
+
+def make_captions(count, step=2.0, length=2.5):
+    """`count` captions 'line 0', 'line 1', ... starting `step` seconds apart, each `length` seconds long"""
+    return [
+        {'text': f"line {i}", 'startTime': i * step, 'endTime': i * step + length, 'confidence': 0.9}
+        for i in range(count)
+    ]
+
+
+def make_storage(mode='rows', **kwargs):
+    """SQLite task storage in a fresh temporary directory, storing captions as CAPTION_STORAGE `mode`"""
+    previous = os.environ.get('CAPTION_STORAGE')
+    os.environ['CAPTION_STORAGE'] = mode
+    try:
+        return SQLiteTaskStorage(os.path.join(tempfile.mkdtemp(), 'matric.db'), **kwargs)
+    finally:
+        if previous is None:
+            del os.environ['CAPTION_STORAGE']
+        else:
+            os.environ['CAPTION_STORAGE'] = previous
@@ -0,0 +1,299 @@
+import os
+import copy
+import http.client
+import threading
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List, Callable
+
+from resilience import RetryPolicy, retry_call
+from rate_limiter import RateLimitTimeout
+
+# Used when the extractor reports no usable audio-only formats
+FALLBACK_FORMAT = 'worstaudio/worst'
+
+# Whisper resamples to 16 kHz mono; anything much above speech bitrates is wasted bytes
+DEFAULT_MIN_AUDIO_KBPS = 32.0
+
+DOWNLOAD_RETRY_POLICY = RetryPolicy.from_env('download', max_attempts=4, base_delay=0.5, max_delay=5.0)
+
+# Protocols yt-dlp downloads fragment by fragment, which can run concurrently
+FRAGMENTED_PROTOCOLS = ('m3u8', 'm3u8_native', 'http_dash_segments', 'dash')
+
+
+def parse_bytes(value: Optional[str]) -> float:
+    """Parse sizes such as '800K', '10M' or '1048576' into bytes; empty means 0."""
+    if not value:
+        return 0.0
+    value = value.strip().upper().rstrip('B')
+    multipliers = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    if value and value[-1] in multipliers:
+        return float(value[:-1]) * multipliers[value[-1]]
+    return float(value)
+
+
+def _bitrate(fmt: Dict[str, Any]) -> Optional[float]:
+    return fmt.get('abr') or fmt.get('tbr')
+
+
+def select_audio_format(formats: List[Dict[str, Any]],
+                        min_kbps: float = DEFAULT_MIN_AUDIO_KBPS) -> Optional[Dict[str, Any]]:
+    """
+    Pick the smallest audio-only format that is still adequate for speech.
+
+    Args:
+        formats (list): yt-dlp format dicts
+        min_kbps (float): Lowest bitrate considered adequate
+
+    Returns:
+        dict: The chosen format, or None if there is no audio-only format
+    """
+    audio_only = [
+        f for f in formats
+        if f.get('vcodec') == 'none' and f.get('acodec') not in (None, 'none') and f.get('format_id')
+    ]
+    if not audio_only:
+        return None
+
+    with_bitrate = [f for f in audio_only if _bitrate(f)]
+    if with_bitrate:
+        adequate = [f for f in with_bitrate if _bitrate(f) >= min_kbps]
+        if adequate:
+            return min(adequate, key=lambda f: (_bitrate(f), f.get('filesize') or f.get('filesize_approx') or 0))
+        # Everything is below the floor: take the best of what there is
+        return max(with_bitrate, key=_bitrate)
+
+    return min(audio_only, key=lambda f: f.get('filesize') or f.get('filesize_approx') or float('inf'))
+
+
+def is_fragmented(fmt: Optional[Dict[str, Any]]) -> bool:
+    """Whether yt-dlp will fetch this format in fragments (DASH/HLS)."""
+    if not fmt:
+        return False
+    return bool(fmt.get('fragments')) or (fmt.get('protocol') or '').startswith(FRAGMENTED_PROTOCOLS)
+
+
+def is_retryable_download_error(error: Exception) -> bool:
+    """Dropped connections, timeouts, short reads and 5xx responses are worth resuming."""
+    exc_info = getattr(error, 'exc_info', None)
+    cause = exc_info[1] if exc_info and exc_info[1] is not None else error
+    status = getattr(cause, 'status', None) or getattr(cause, 'code', None)
+    if isinstance(status, int):
+        return status >= 500 or status in (408, 429)
+    if isinstance(cause, (OSError, http.client.HTTPException)):
+        return True
+    return type(cause).__name__ in ('ContentTooShortError', 'TransportError', 'IncompleteRead')
+
+
+class BandwidthBudget:
+    """
+    Bandwidth and connection budget shared by every download in the process.
+
+    Each download leases connections (one per concurrent fragment) and gets an
+    even per-connection share of the bandwidth, rebalanced whenever a download
+    starts or finishes. The share is applied through yt-dlp's `ratelimit`
+    parameter, which its downloaders re-read while transferring.
+
+    Args:
+        bytes_per_second (float): Total bandwidth for all downloads, 0 for unlimited
+        max_connections (int): Total concurrent connections for all downloads
+    """
+    def __init__(self, bytes_per_second: float = 0, max_connections: int = 32):
+        self.bytes_per_second = float(bytes_per_second)
+        self.max_connections = max(1, max_connections)
+        self._condition = threading.Condition()
+        self._in_use = 0
+        self._leases: Dict[int, Dict[str, Any]] = {}
+        self.waits = 0
+
+    def per_connection_rate(self) -> Optional[float]:
+        with self._condition:
+            return self._rate_locked()
+
+    def _rate_locked(self) -> Optional[float]:
+        if not self.bytes_per_second:
+            return None
+        return self.bytes_per_second / max(1, self._in_use)
+
+    def _rebalance_locked(self):
+        rate = self._rate_locked()
+        for params in self._leases.values():
+            if rate is None:
+                params.pop('ratelimit', None)
+            else:
+                params['ratelimit'] = int(rate)
+
+    @contextmanager
+    def lease(self, wanted: int, params: Dict[str, Any], timeout: float = None):
+        """
+        Reserve up to `wanted` connections, waiting until at least one is free.
+
+        Args:
+            wanted (int): Connections the download could use
+            params (dict): yt-dlp params whose `ratelimit` tracks this lease's share
+            timeout (float): Give up after this many seconds
+
+        Yields:
+            int: Connections granted
+
+        Raises:
+            RateLimitTimeout: If no connection became free in time
+        """
+        with self._condition:
+            if self._in_use >= self.max_connections:
+                self.waits += 1
+            if not self._condition.wait_for(lambda: self._in_use < self.max_connections, timeout=timeout):
+                raise RateLimitTimeout(f"No download connection free within {timeout:.0f}s")
+            granted = max(1, min(wanted, self.max_connections - self._in_use))
+            self._in_use += granted
+            self._leases[id(params)] = params
+            self._rebalance_locked()
+        try:
+            yield granted
+        finally:
+            with self._condition:
+                self._in_use -= granted
+                self._leases.pop(id(params), None)
+                self._rebalance_locked()
+                self._condition.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._condition:
+            rate = self._rate_locked()
+            return {
+                'bytes_per_second': self.bytes_per_second or None,
+                'max_connections': self.max_connections,
+                'connections_in_use': self._in_use,
+                'active_downloads': len(self._leases),
+                'per_connection_rate': int(rate) if rate else None,
+                'waits': self.waits,
+            }
+
+
+class DownloadManager:
+    """
+    yt-dlp wrapper that picks a small speech-adequate audio format, fetches
+    DASH/HLS fragments concurrently, keeps `.part` files so retries resume
+    where they stopped, and draws on a shared bandwidth budget.
+
+    Args:
+        budget (BandwidthBudget): Shared bandwidth and connection budget
+        fragments (int): Concurrent fragment downloads per fragmented job
+        min_audio_kbps (float): Lowest audio bitrate considered adequate
+        retry_policy (RetryPolicy): Backoff between resumed attempts
+        chunk_size (int): HTTP range size for single-stream downloads, 0 to disable
+        ydl_options (dict): Extra yt-dlp options, applied last
+    """
+    def __init__(self, budget: BandwidthBudget = None, fragments: int = None,
+                 min_audio_kbps: float = None, retry_policy: RetryPolicy = None,
+                 chunk_size: int = None, ydl_options: Dict[str, Any] = None):
+        self.budget = budget or BandwidthBudget()
+        self.fragments = fragments or int(os.getenv('DOWNLOAD_FRAGMENTS', 4))
+        self.min_audio_kbps = min_audio_kbps if min_audio_kbps is not None else float(
+            os.getenv('DOWNLOAD_MIN_AUDIO_KBPS', DEFAULT_MIN_AUDIO_KBPS)
+        )
+        self.retry_policy = retry_policy or DOWNLOAD_RETRY_POLICY
+        self.chunk_size = chunk_size if chunk_size is not None else int(
+            parse_bytes(os.getenv('DOWNLOAD_CHUNK_SIZE', '10M'))
+        )
+        self.connection_timeout = float(os.getenv('DOWNLOAD_CONNECTION_WAIT', 300))
+        self.ydl_options = ydl_options or {}
+
+    def _params(self, output_template: str, progress_hooks, postprocessor_hooks, postprocessors) -> Dict[str, Any]:
+        params = {
+            'outtmpl': output_template,
+            'postprocessors': postprocessors or [],
+            'progress_hooks': list(progress_hooks or []),
+            'postprocessor_hooks': list(postprocessor_hooks or []),
+            'quiet': True,
+            'no_warnings': True,
+            'nocheckcertificate': True,  # Skip SSL verification for speed
+            # Keep partial files and resume them on the next attempt
+            'continuedl': True,
+            'nopart': False,
+            'retries': 10,
+            'fragment_retries': 10,
+            # A missing fragment should fail the attempt, not leave a gap in the audio
+            'skip_unavailable_fragments': False,
+        }
+        if self.chunk_size:
+            # Ranged requests sidestep per-connection throttling and resume cleanly
+            params['http_chunk_size'] = self.chunk_size
+        params.update(self.ydl_options)
+        return params
+
+    def download(self, url: str, output_template: str,
+                 progress_hooks: List[Callable] = None,
+                 postprocessor_hooks: List[Callable] = None,
+                 postprocessors: List[Dict[str, Any]] = None,
+                 on_info: Callable[[Dict[str, Any], Optional[Dict[str, Any]]], None] = None) -> Dict[str, Any]:
+        """
+        Download the audio of a video.
+
+        Args:
+            url (str): Video URL
+            output_template (str): yt-dlp output template
+            progress_hooks (list): yt-dlp progress hooks
+            postprocessor_hooks (list): yt-dlp postprocessor hooks
+            postprocessors (list): yt-dlp postprocessors, e.g. FFmpegExtractAudio
+            on_info (callable): Called with the video info and chosen format before downloading
+
+        Returns:
+            dict: Video info as reported by the extractor
+        """
+        import yt_dlp
+
+        params = self._params(output_template, progress_hooks, postprocessor_hooks, postprocessors)
+        with yt_dlp.YoutubeDL(params) as ydl:
+            # Extract once; retries below only repeat the transfer
+            info = retry_call(
+                lambda: ydl.extract_info(url, download=False, process=False),
+                policy=self.retry_policy,
+                is_retryable=is_retryable_download_error,
+                description="Video info"
+            )
+            fmt = select_audio_format(info.get('formats') or [], self.min_audio_kbps)
+            ydl.params['format'] = fmt['format_id'] if fmt else FALLBACK_FORMAT
+            if fmt:
+                print(f"🎧 Audio format {fmt['format_id']} ({fmt.get('acodec')}, "
+                      f"{_bitrate(fmt) or '?'} kbps, {fmt.get('protocol', 'https')})")
+            if on_info:
+                on_info(info, fmt)
+
+            formats = info.get('formats') or []
+            fragmented = is_fragmented(fmt) if fmt else any(is_fragmented(f) for f in formats)
+            wanted = self.fragments if fragmented else 1
+            with self.budget.lease(wanted, ydl.params, timeout=self.connection_timeout) as granted:
+                ydl.params['concurrent_fragment_downloads'] = granted
+                retry_call(
+                    lambda: ydl.process_ie_result(copy.deepcopy(info), download=True),
+                    policy=self.retry_policy,
+                    is_retryable=is_retryable_download_error,
+                    description="Audio download"
+                )
+        return info
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'fragments_per_download': self.fragments,
+            'min_audio_kbps': self.min_audio_kbps,
+            'budget': self.budget.snapshot(),
+        }
+
+
+_download_manager = None
+_download_manager_lock = threading.Lock()
+
+
+def get_download_manager() -> DownloadManager:
+    """
+    Shared manager, so every job in the process draws on one budget
+    (DOWNLOAD_BANDWIDTH_LIMIT, e.g. '20M' bytes/s, and DOWNLOAD_MAX_CONNECTIONS).
+    """
+    global _download_manager
+    with _download_manager_lock:
+        if _download_manager is None:
+            _download_manager = DownloadManager(BandwidthBudget(
+                bytes_per_second=parse_bytes(os.getenv('DOWNLOAD_BANDWIDTH_LIMIT')),
+                max_connections=int(os.getenv('DOWNLOAD_MAX_CONNECTIONS', 32)),
+            ))
+        return _download_manager
@@ -0,0 +1,134 @@
+import os
+import time
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+
+class MicroBatcher:
+    """
+    Collects single requests from many threads and runs them as batches.
+
+    A server thread waits for the first request, then keeps collecting until
+    `max_batch` requests are pending or `max_wait` seconds have passed, calls
+    `run_batch` once for all of them and hands each caller its own result.
+
+    Args:
+        run_batch (callable): Maps a list of (context, item) pairs to a list of results,
+            one per item. `context` is whatever the submitter passed along, e.g.
+            the module to run the batch on.
+        max_batch (int): Most requests per batch
+        max_wait (float): Longest a request waits for others to join, in seconds
+        name (str): Used for the thread name and logs
+    """
+    def __init__(self, run_batch: Callable[[List[Tuple[Any, Any]]], List[Any]],
+                 max_batch: int = 8, max_wait: float = 0.02, name: str = 'batcher'):
+        self.run_batch = run_batch
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self.name = name
+        self._pending: List[Tuple[Any, Any, Future]] = []
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+
+    def submit(self, item, context=None) -> Future:
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._serve, name=f"{self.name}-batcher", daemon=True)
+                self._thread.start()
+            future = Future()
+            self._pending.append((context, item, future))
+            self._condition.notify_all()
+            return future
+
+    def __call__(self, item, context=None):
+        """Submit and wait for the result."""
+        return self.submit(item, context).result()
+
+    def _next_batch(self) -> List[Tuple[Any, Any, Future]]:
+        with self._condition:
+            self._condition.wait_for(lambda: self._pending)
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            return batch
+
+    def _serve(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                results = self.run_batch([(context, item) for context, item, _ in batch])
+            except BaseException as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
+            self.batches += 1
+            self.items += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._condition:
+            pending = len(self._pending)
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch': round(self.items / self.batches, 2) if self.batches else 0,
+            'largest_batch': self.largest_batch,
+            'pending': pending,
+            'max_batch': self.max_batch,
+            'max_wait_ms': round(self.max_wait * 1000, 1),
+        }
+
+
+def encoder_batching_enabled() -> bool:
+    return os.getenv('ENCODER_BATCHING', 'false').lower() == 'true'
+
+
+def _encode_batch(requests: List[Tuple[Any, Any]]) -> List[Any]:
+    """Run the encoder of the first request on every request's mel window at once."""
+    import torch
+
+    encoder = requests[0][0]
+    with torch.no_grad():
+        outputs = encoder(torch.cat([mel for _, mel in requests]))
+    sizes = [mel.shape[0] for _, mel in requests]
+    return list(torch.split(outputs, sizes))
+
+
+_batchers: Dict[str, MicroBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_encoder_batcher(model_id: str) -> MicroBatcher:
+    """
+    Shared batcher for every model with this id. Copies of one model size have
+    identical encoder weights, so windows from different jobs (each holding its
+    own pooled model) can be encoded together on any one of them.
+    """
+    with _batchers_lock:
+        batcher = _batchers.get(model_id)
+        if batcher is None:
+            batcher = MicroBatcher(
+                _encode_batch,
+                max_batch=int(os.getenv('ENCODER_BATCH_SIZE', 8)),
+                max_wait=float(os.getenv('ENCODER_BATCH_MAX_WAIT_MS', 20)) / 1000,
+                name=f"encoder-{model_id}",
+            )
+            _batchers[model_id] = batcher
+        return batcher
+
+
+def encoder_batcher_metrics() -> Dict[str, Dict[str, Any]]:
+    with _batchers_lock:
+        batchers = dict(_batchers)
+    return {model_id: batcher.snapshot() for model_id, batcher in batchers.items()}
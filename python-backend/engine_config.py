@@ -0,0 +1,265 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict, fields, replace
+from typing import Optional, Dict, Any, Callable, List
+
+from engine_router import QUALITY_TIERS, LOCAL_MODEL_SIZES
+from rate_limiter import configured_api_keys
+from transcription_engines import local_engine_names, release_local_models, warm_engine
+
+# Model sizes an engine config may select; routing never goes above the selected one
+MODEL_SIZES = LOCAL_MODEL_SIZES
+
+
+@dataclass(frozen=True)
+class EngineConfig:
+    """Engine settings new jobs start with."""
+    model_size: str = 'tiny'
+    use_fast_api: bool = True
+    quality_tier: Optional[str] = None
+    hedge_short_clips: Optional[bool] = None
+    local_engine: str = 'whisper'
+
+    @classmethod
+    def from_env(cls) -> 'EngineConfig':
+        return cls(
+            model_size=os.getenv('ENGINE_MODEL_SIZE', 'tiny'),
+            use_fast_api=os.getenv('ENGINE_USE_FAST_API', 'true').lower() == 'true',
+            quality_tier=os.getenv('ENGINE_QUALITY_TIER') or None,
+            local_engine=os.getenv('ENGINE_LOCAL_ENGINE', 'whisper'),
+        )
+
+    def merged(self, changes: Dict[str, Any]) -> 'EngineConfig':
+        """
+        Copy with `changes` applied.
+
+        Raises:
+            ValueError: On unknown keys or invalid values
+        """
+        known = {f.name for f in fields(self)}
+        unknown = set(changes) - known
+        if unknown:
+            raise ValueError(f"Unknown engine settings: {', '.join(sorted(unknown))}")
+        config = replace(self, **changes)
+        if config.model_size not in MODEL_SIZES:
+            raise ValueError(f"model_size must be one of {', '.join(MODEL_SIZES)}")
+        if config.quality_tier is not None and config.quality_tier not in QUALITY_TIERS:
+            raise ValueError(f"quality_tier must be one of {', '.join(QUALITY_TIERS)}")
+        if config.local_engine not in local_engine_names():
+            raise ValueError(f"local_engine must be one of {', '.join(local_engine_names())}")
+        return config
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class _Generation:
+    def __init__(self, number: int, config: EngineConfig):
+        self.number = number
+        self.config = config
+        self.in_flight = 0
+        self.activated_at = time.time()
+        self.retired = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'generation': self.number,
+            'config': self.config.to_dict(),
+            'in_flight': self.in_flight,
+            'active_seconds': round(time.time() - self.activated_at, 1),
+        }
+
+
+def warm_local_model(model_size: str, local_engine: str = 'whisper'):
+    """Load a local engine's model in this process and run one window so the first job isn't cold."""
+    warm_engine(local_engine, model_size)
+
+
+class EngineManager:
+    """
+    Hot-swappable engine configuration.
+
+    Jobs check out the active generation for their whole run. A swap warms the
+    new model in the background, then switches new jobs over atomically; jobs
+    already running finish on the old generation, whose model is released from
+    the pool once its last job is done.
+
+    Args:
+        config (EngineConfig): Initial configuration
+        warmer (callable): Loads and warms a model size for a local engine before a switch
+        model_pool: Pool whose models are retired after a drain
+    """
+    def __init__(self, config: EngineConfig = None, warmer: Callable[[str, str], None] = None, model_pool=None):
+        self.warmer = warmer or warm_local_model
+        self._model_pool = model_pool
+        self._lock = threading.Lock()
+        self._generations = 1
+        self._active = _Generation(1, config or EngineConfig.from_env())
+        self._draining: List[_Generation] = []
+        self._swap: Dict[str, Any] = {'state': 'idle'}
+
+    @property
+    def model_pool(self):
+        if self._model_pool is None:
+            from model_pool import get_model_pool
+            self._model_pool = get_model_pool()
+        return self._model_pool
+
+    @property
+    def active(self) -> EngineConfig:
+        with self._lock:
+            return self._active.config
+
+    @contextmanager
+    def checkout(self):
+        """
+        Pin the active configuration for the duration of a job.
+
+        Yields:
+            EngineConfig: Settings the job should use
+        """
+        with self._lock:
+            generation = self._active
+            generation.in_flight += 1
+        try:
+            yield generation.config
+        finally:
+            with self._lock:
+                generation.in_flight -= 1
+                drained = generation.retired and generation.in_flight == 0
+            if drained:
+                self._release(generation)
+
+    def swap(self, changes: Dict[str, Any], wait: bool = False) -> Dict[str, Any]:
+        """
+        Warm and switch to a new configuration.
+
+        Args:
+            changes (dict): Settings to change, e.g. {'model_size': 'base'}
+            wait (bool): Block until the switch is done or failed
+
+        Returns:
+            dict: Swap status
+
+        Raises:
+            ValueError: If the settings are invalid
+            RuntimeError: If another swap is still warming up
+        """
+        with self._lock:
+            if self._swap['state'] == 'warming':
+                raise RuntimeError("An engine swap is already in progress")
+            target = self._active.config.merged(changes)
+            if target.use_fast_api and not self._active.config.use_fast_api and not configured_api_keys():
+                raise ValueError("Cannot enable the fast API: no OpenAI API keys configured")
+            self._swap = {'state': 'warming', 'target': target.to_dict(), 'started_at': time.time()}
+
+        thread = threading.Thread(target=self._run_swap, args=(target,), name='engine-swap', daemon=True)
+        thread.start()
+        if wait:
+            thread.join()
+        return self.status()
+
+    def _run_swap(self, target: EngineConfig):
+        started = time.time()
+        try:
+            print(f"🔥 Warming {target.local_engine}/{target.model_size} model for engine swap...")
+            self.warmer(target.model_size, target.local_engine)
+        except Exception as e:
+            print(f"❌ Engine swap failed while warming: {e}")
+            with self._lock:
+                self._swap = dict(self._swap, state='failed', error=str(e), seconds=round(time.time() - started, 2))
+            return
+
+        with self._lock:
+            old = self._active
+            self._generations += 1
+            self._active = _Generation(self._generations, target)
+            old.retired = True
+            self._draining.append(old)
+            drained = old.in_flight == 0
+            self._swap = dict(self._swap, state='switched', generation=self._generations,
+                              seconds=round(time.time() - started, 2))
+        print(f"🔀 Engine switched to generation {self._generations}: {target.to_dict()} "
+              f"({old.in_flight} jobs finishing on generation {old.number})")
+        if drained:
+            self._release(old)
+
+    def _release(self, generation: _Generation):
+        """Free models only the drained generation needed."""
+        with self._lock:
+            if generation not in self._draining:
+                return
+            self._draining.remove(generation)
+            still_needed = {(g.config.local_engine, g.config.model_size) for g in [self._active] + self._draining}
+        engine, size = generation.config.local_engine, generation.config.model_size
+        if (engine, size) not in still_needed:
+            freed = release_local_models(engine, size, self.model_pool if engine == 'whisper' else None)
+            print(f"♻️ Generation {generation.number} drained, released {engine}/{size} model ({freed} idle copies)")
+        else:
+            print(f"♻️ Generation {generation.number} drained")
+
+    def reload_from_file(self, path: str) -> Optional[Dict[str, Any]]:
+        """Swap to the settings in a JSON file if they differ from the active ones."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                changes = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not read engine config {path}: {e}")
+            return None
+        try:
+            if self.active.merged(changes) == self.active:
+                return None
+            return self.swap(changes)
+        except (ValueError, RuntimeError) as e:
+            print(f"⚠️ Engine config {path} not applied: {e}")
+            return None
+
+    def watch_file(self, path: str, interval: float = 10.0) -> threading.Thread:
+        """Poll a JSON config file and swap whenever it changes."""
+        def watch():
+            last_mtime = None
+            while True:
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    mtime = None
+                if mtime is not None and mtime != last_mtime:
+                    last_mtime = mtime
+                    self.reload_from_file(path)
+                time.sleep(interval)
+
+        thread = threading.Thread(target=watch, name='engine-config-watch', daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'active': self._active.to_dict(),
+                'draining': [g.to_dict() for g in self._draining],
+                'swap': dict(self._swap),
+            }
+
+
+_engine_manager = None
+_engine_manager_lock = threading.Lock()
+
+
+def get_engine_manager() -> EngineManager:
+    """Process-wide engine configuration, seeded from ENGINE_* environment variables."""
+    global _engine_manager
+    with _engine_manager_lock:
+        if _engine_manager is None:
+            _engine_manager = EngineManager()
+        return _engine_manager
+
+
+def write_config_file(path: str, config: EngineConfig):
+    """Persist a config so workers watching the file pick it up."""
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(config.to_dict(), f, indent=2)
+    os.replace(tmp_path, path)
@@ -0,0 +1,231 @@
+import os
+import json
+import time
+import threading
+from dataclasses import dataclass, asdict, field
+from typing import Optional, Dict, Any, List
+
+from progress_tracker import ThroughputModel, get_throughput_model, engine_key
+from resilience import get_breaker
+from rate_limiter import configured_api_keys
+
+# Local model sizes the router may pick, worst to best quality
+LOCAL_MODEL_SIZES = ['tiny', 'base', 'small', 'medium', 'large']
+
+# Largest local model each quality tier is allowed to use; a job's configured
+# model size caps them all, so 'best' means up to that size
+QUALITY_TIERS = {
+    'fast': 'tiny',
+    'balanced': 'base',
+    'best': 'large',
+}
+
+# Relative transcript quality used to rank candidates (whisper-1 is large-v2)
+QUALITY_SCORES = {
+    'openai-api': 10,
+    'local-large': 9,
+    'local-medium': 8,
+    'local-small': 6,
+    'local-base': 4,
+    'local-tiny': 2,
+}
+
+# The API path compresses down to 8 kHz / 8-bit mono before giving up (24MB limit)
+OPENAI_MAX_AUDIO_SECONDS = 24 * 1024 * 1024 / 8000
+
+# Fraction of linear speed-up a chunked-parallel run achieves per extra worker
+CHUNKED_EFFICIENCY = 0.7
+
+
+@dataclass
+class RoutingDecision:
+    """Engine and model chosen for one job, with the reasoning behind it."""
+    engine: str
+    model_size: str
+    use_fast_api: bool
+    chunk_workers: int = 1
+    expected_seconds: float = 0.0
+    deadline_seconds: Optional[float] = None
+    quality_tier: Optional[str] = 'fast'
+    meets_deadline: bool = True
+    reason: str = ''
+    candidates: List[Dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class EngineRouter:
+    """
+    Picks the engine and model size most likely to meet a job's deadline at the
+    best quality, using measured real-time factors, queue depth and API health.
+
+    Args:
+        throughput_model (ThroughputModel): Source of per-engine real-time factors
+        log_path (str): JSONL file routing decisions are appended to
+        max_chunk_workers (int): Upper bound for chunked-parallel runs
+        degrade_queue_depth (int): Queue depth at which model size is reduced
+    """
+    def __init__(self, throughput_model: ThroughputModel = None, log_path: str = None,
+                 max_chunk_workers: int = None, degrade_queue_depth: int = None):
+        self.model = throughput_model or get_throughput_model()
+        self.log_path = log_path or os.getenv(
+            'ROUTING_LOG_PATH',
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'routing_decisions.log')
+        )
+        self.max_chunk_workers = max_chunk_workers or int(
+            os.getenv('ROUTER_MAX_CHUNK_WORKERS', max(1, (os.cpu_count() or 2) // 2))
+        )
+        self.degrade_queue_depth = degrade_queue_depth or int(os.getenv('ROUTER_DEGRADE_QUEUE_DEPTH', 4))
+        self.default_tier = os.getenv('ROUTER_DEFAULT_TIER', 'fast')
+        self.openai_available = bool(configured_api_keys())
+        self._log_lock = threading.Lock()
+
+    def _max_size(self, quality_tier: Optional[str], max_model_size: Optional[str]) -> str:
+        """Largest local size a job may use: its tier's limit, capped at the job's configured size."""
+        if max_model_size not in LOCAL_MODEL_SIZES:
+            return QUALITY_TIERS.get(quality_tier, QUALITY_TIERS[self.default_tier])
+        if quality_tier not in QUALITY_TIERS:
+            # No tier asked for: the configured size is what the job wants
+            return max_model_size
+        return min(QUALITY_TIERS[quality_tier], max_model_size, key=LOCAL_MODEL_SIZES.index)
+
+    def _allowed_sizes(self, max_size: str, queue_depth: int) -> List[str]:
+        """Local sizes up to `max_size`, shrunk one step per load threshold."""
+        sizes = LOCAL_MODEL_SIZES[:LOCAL_MODEL_SIZES.index(max_size) + 1]
+        steps_down = queue_depth // self.degrade_queue_depth if self.degrade_queue_depth else 0
+        return sizes[:max(1, len(sizes) - steps_down)]
+
+    def _candidates(self, duration: float, sizes: List[str], queue_depth: int,
+                    local_engine: str = 'whisper', allow_chunked: bool = True,
+                    allow_api: bool = True) -> List[Dict[str, Any]]:
+        candidates = []
+        # Decoding still has to happen after routing, whatever the engine
+        overhead = self.model.estimate_seconds('convert', 'default', duration)
+        if allow_api and self.openai_available and duration <= OPENAI_MAX_AUDIO_SECONDS \
+                and get_breaker('openai').is_available():
+            candidates.append({
+                'engine': 'openai-api',
+                # Local model the job falls back to if the API fails
+                'model_size': sizes[-1],
+                'use_fast_api': True,
+                'chunk_workers': 1,
+                'quality': QUALITY_SCORES['openai-api'],
+                'seconds': overhead + self.model.estimate_seconds('transcribe', 'openai-api', duration),
+            })
+        # Concurrent local jobs share the same cores
+        contention = 1 + queue_depth
+        for size in sizes:
+            key = engine_key(False, size, local_engine)
+            # Every local engine runs the same Whisper weights, so quality follows the size
+            quality = QUALITY_SCORES[engine_key(False, size)]
+            local_seconds = self.model.estimate_seconds('transcribe', key, duration) * contention
+            candidates.append({
+                'engine': 'local',
+                'model_size': size,
+                'use_fast_api': False,
+                'chunk_workers': 1,
+                'quality': quality,
+                'seconds': overhead + local_seconds,
+            })
+            workers = min(self.max_chunk_workers, max(1, int(duration // 30))) if allow_chunked else 1
+            if workers > 1:
+                chunked_key = f"chunked-{size}"
+                if self.model.samples('transcribe', chunked_key):
+                    chunked_seconds = self.model.estimate_seconds('transcribe', chunked_key, duration) * contention
+                else:
+                    chunked_seconds = local_seconds / (1 + (workers - 1) * CHUNKED_EFFICIENCY)
+                candidates.append({
+                    'engine': 'chunked-parallel',
+                    'model_size': size,
+                    'use_fast_api': False,
+                    'chunk_workers': workers,
+                    # Chunk boundaries cost a little accuracy
+                    'quality': quality - 0.5,
+                    'seconds': overhead + chunked_seconds,
+                })
+        return candidates
+
+    def route(self, duration: float, deadline_seconds: Optional[float] = None,
+              quality_tier: Optional[str] = None, queue_depth: int = 0,
+              task_id: str = None, local_engine: str = 'whisper',
+              allow_chunked: bool = True, allow_api: bool = True,
+              max_model_size: Optional[str] = None) -> RoutingDecision:
+        """
+        Choose an engine for a job.
+
+        Args:
+            duration (float): Audio duration in seconds
+            deadline_seconds (float): Seconds left for the job once audio is downloaded
+            quality_tier (str): 'fast', 'balanced' or 'best'; None leaves the size to `max_model_size`
+            queue_depth (int): Jobs waiting or running besides this one
+            task_id (str): Included in the decision log
+            local_engine (str): Local engine whose throughput is estimated
+            allow_chunked (bool): Whether the local engine can split a job into parallel chunks
+            allow_api (bool): Whether the job's engine settings allow the OpenAI API
+            max_model_size (str): The job's configured local model size, which routing never exceeds
+
+        Returns:
+            RoutingDecision: The chosen engine, model size and expected time
+        """
+        max_size = self._max_size(quality_tier, max_model_size)
+        if quality_tier in QUALITY_TIERS:
+            tier = quality_tier
+        else:
+            tier = None if max_model_size in LOCAL_MODEL_SIZES else self.default_tier
+        duration = max(float(duration or 0), 1.0)
+        sizes = self._allowed_sizes(max_size, queue_depth)
+        candidates = self._candidates(duration, sizes, queue_depth, local_engine, allow_chunked, allow_api)
+
+        if deadline_seconds is not None:
+            feasible = [c for c in candidates if c['seconds'] <= deadline_seconds]
+            if feasible:
+                best = max(feasible, key=lambda c: (c['quality'], -c['seconds']))
+                reason = f"best quality expected within {deadline_seconds:.0f}s deadline"
+            else:
+                best = min(candidates, key=lambda c: c['seconds'])
+                reason = f"no engine expected within {deadline_seconds:.0f}s, picked fastest"
+        else:
+            # No deadline: the API when healthy, otherwise the largest local model allowed
+            api = [c for c in candidates if c['engine'] == 'openai-api']
+            if api:
+                best = api[0]
+                reason = "no deadline, API healthy"
+            else:
+                local = [c for c in candidates if c['engine'] == 'local']
+                best = max(local, key=lambda c: c['quality'])
+                reason = "no deadline, API unavailable" if allow_api else "no deadline, API not enabled for this job"
+
+        if len(sizes) < LOCAL_MODEL_SIZES.index(max_size) + 1:
+            reason += f"; model size degraded to {sizes[-1]} at queue depth {queue_depth}"
+
+        decision = RoutingDecision(
+            engine=best['engine'],
+            model_size=best['model_size'],
+            use_fast_api=best['use_fast_api'],
+            chunk_workers=best['chunk_workers'],
+            expected_seconds=round(best['seconds'], 2),
+            deadline_seconds=deadline_seconds,
+            quality_tier=tier,
+            meets_deadline=deadline_seconds is None or best['seconds'] <= deadline_seconds,
+            reason=reason,
+            candidates=[{k: (round(v, 2) if isinstance(v, float) else v) for k, v in c.items()} for c in candidates],
+        )
+        self._log(decision, duration, queue_depth, task_id)
+        return decision
+
+    def _log(self, decision: RoutingDecision, duration: float, queue_depth: int, task_id: str):
+        print(f"🧭 Routed {task_id or 'job'}: {decision.engine}/{decision.model_size} "
+              f"(~{decision.expected_seconds:.0f}s, {decision.reason})")
+        entry = {
+            'timestamp': time.time(),
+            'task_id': task_id,
+            'duration': duration,
+            'queue_depth': queue_depth,
+            **decision.to_dict(),
+        }
+        try:
+            with self._log_lock, open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+        except OSError as e:
+            print(f"⚠️ Could not write routing log: {e}")
@@ -0,0 +1,251 @@
+import io
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+# Bumped whenever what a key maps to changes, so stale disk entries are never read
+CACHE_VERSION = 1
+
+
+def audio_fingerprint(audio) -> str:
+    """Content hash of 16 kHz mono float32 PCM samples."""
+    import numpy as np
+
+    samples = np.ascontiguousarray(audio, dtype=np.float32)
+    return hashlib.blake2b(samples.tobytes(), digest_size=16).hexdigest()
+
+
+def _sizeof(value) -> int:
+    size = getattr(value, 'nbytes', None)
+    return size if size is not None else len(value)
+
+
+class MemoryTier:
+    """
+    Least-recently-used entries up to a byte budget.
+
+    Args:
+        max_bytes (int): Total size of the values kept
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[str, Any]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value):
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= _sizeof(previous)
+            self._entries[key] = value
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= _sizeof(evicted)
+                self.evictions += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes,
+                    'max_bytes': self.max_bytes, 'evictions': self.evictions}
+
+
+class DiskTier:
+    """
+    Byte blobs in a directory, evicted least-recently-used (by mtime) past a
+    byte budget. Several processes may share the directory; the budget is
+    enforced by whichever process writes.
+
+    Args:
+        directory (str): Where entries are stored
+        max_bytes (int): Total size of the files kept
+    """
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._bytes = None
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _path(self, key: str) -> str:
+        name = hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def _files(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.bin'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # Reads count as use for eviction
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Feature cache write failed: {e}")
+            return
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(size for _, size, _ in self._files())
+            else:
+                self._bytes += len(data)
+            if self._bytes > self.max_bytes:
+                self._evict_locked()
+
+    def _evict_locked(self):
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        # Evict down to 90% so a full cache doesn't rescan on every write
+        target = self.max_bytes * 0.9
+        for _, size, name in files:
+            if total <= target:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+                total -= size
+                self.evictions += 1
+            except OSError:
+                pass
+        self._bytes = total
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'directory': self.directory, 'bytes': self._bytes,
+                    'max_bytes': self.max_bytes, 'evictions': self.evictions}
+
+
+class FeatureCache:
+    """
+    Content-addressed cache of expensive audio features: log-mel spectrograms,
+    Whisper encoder outputs and detected languages. Lookups go through a
+    memory tier, then a disk tier (promoting hits back to memory).
+
+    Args:
+        memory_bytes (int): Memory tier budget
+        disk_dir (str): Disk tier directory, None for memory only
+        disk_bytes (int): Disk tier budget
+    """
+    def __init__(self, memory_bytes: int, disk_dir: Optional[str] = None, disk_bytes: int = 0):
+        self.memory = MemoryTier(memory_bytes)
+        self.disk = DiskTier(disk_dir, disk_bytes) if disk_dir and disk_bytes else None
+        self._lock = threading.Lock()
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def _count(self, key: str, hit: bool):
+        kind = key.split(':', 1)[0]
+        with self._lock:
+            counts = self.hits if hit else self.misses
+            counts[kind] = counts.get(kind, 0) + 1
+
+    def _get(self, key: str, decode):
+        key = f"v{CACHE_VERSION}:{key}"
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            data = self.disk.get(key)
+            if data is not None:
+                value = decode(data)
+                self.memory.put(key, value)
+        return value
+
+    def _put(self, key: str, value, encode):
+        key = f"v{CACHE_VERSION}:{key}"
+        self.memory.put(key, value)
+        if self.disk is not None:
+            self.disk.put(key, encode(value))
+
+    def get_array(self, key: str):
+        """Cached numpy array, or None."""
+        import numpy as np
+
+        value = self._get(key, lambda data: np.load(io.BytesIO(data), allow_pickle=False))
+        self._count(key, value is not None)
+        return value
+
+    def put_array(self, key: str, array):
+        import numpy as np
+
+        def encode(value) -> bytes:
+            buffer = io.BytesIO()
+            np.save(buffer, value, allow_pickle=False)
+            return buffer.getvalue()
+
+        self._put(key, array, encode)
+
+    def get_json(self, key: str) -> Optional[Any]:
+        value = self._get(key, lambda data: data)
+        self._count(key, value is not None)
+        return json.loads(value) if value is not None else None
+
+    def put_json(self, key: str, value: Any):
+        self._put(key, json.dumps(value).encode('utf-8'), lambda data: data)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {'hits': dict(self.hits), 'misses': dict(self.misses)}
+        return {
+            **counts,
+            'memory': self.memory.snapshot(),
+            'disk': self.disk.snapshot() if self.disk else None,
+        }
+
+
+_feature_cache = None
+_feature_cache_lock = threading.Lock()
+
+
+def get_feature_cache() -> Optional[FeatureCache]:
+    """
+    Process-wide feature cache, or None unless FEATURE_CACHE=true. Sized by
+    FEATURE_CACHE_MEMORY_MB and FEATURE_CACHE_DISK_MB, stored in FEATURE_CACHE_DIR.
+    """
+    global _feature_cache
+    if os.getenv('FEATURE_CACHE', 'false').lower() != 'true':
+        return None
+    with _feature_cache_lock:
+        if _feature_cache is None:
+            default_dir = os.path.join(os.path.expanduser('~'), '.cache', 'matric', 'features')
+            _feature_cache = FeatureCache(
+                memory_bytes=int(float(os.getenv('FEATURE_CACHE_MEMORY_MB', 512)) * 1024 * 1024),
+                disk_dir=os.getenv('FEATURE_CACHE_DIR', default_dir),
+                disk_bytes=int(float(os.getenv('FEATURE_CACHE_DISK_MB', 4096)) * 1024 * 1024),
+            )
+        return _feature_cache
@@ -0,0 +1,158 @@
+import os
+import time
+import threading
+from collections import deque
+from typing import Callable, Optional, Dict, Any, Deque, Tuple
+
+
+class TranscriptionCancelled(Exception):
+    """Raised inside an engine when the job no longer needs its result."""
+
+
+class CancellationToken:
+    """Cooperative cancellation flag checked by engines between windows."""
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise TranscriptionCancelled()
+
+
+class LatencyTracker:
+    """
+    Rolling window of observed engine latencies for percentile-based hedge delays.
+
+    Args:
+        window (int): Number of most recent samples kept per engine
+    """
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, engine: str, seconds: float):
+        with self._lock:
+            samples = self._samples.setdefault(engine, deque(maxlen=self.window))
+            samples.append(seconds)
+
+    def count(self, engine: str) -> int:
+        with self._lock:
+            return len(self._samples.get(engine, ()))
+
+    def percentile(self, engine: str, p: float) -> Optional[float]:
+        """Latency at quantile `p` (0-1), or None without samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(engine, ()))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, int(round(p * (len(samples) - 1)))))
+        return samples[index]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            engines = list(self._samples.keys())
+        return {
+            engine: {
+                'samples': self.count(engine),
+                'p50': self.percentile(engine, 0.5),
+                'p95': self.percentile(engine, 0.95),
+                'p99': self.percentile(engine, 0.99),
+            }
+            for engine in engines
+        }
+
+
+_latency_tracker = LatencyTracker(window=int(os.getenv('HEDGE_LATENCY_WINDOW', 200)))
+
+
+def get_latency_tracker() -> LatencyTracker:
+    """Process-wide latency samples for short clips."""
+    return _latency_tracker
+
+
+def hedge_delay(engine: str, percentile: float = None, default: float = None,
+                min_samples: int = None) -> float:
+    """
+    Seconds to wait on `engine` before starting a hedge, taken from its latency
+    distribution once enough samples exist.
+    """
+    percentile = percentile if percentile is not None else float(os.getenv('HEDGE_PERCENTILE', 0.95))
+    default = default if default is not None else float(os.getenv('HEDGE_DEFAULT_DELAY', 3.0))
+    min_samples = min_samples if min_samples is not None else int(os.getenv('HEDGE_MIN_SAMPLES', 20))
+    if _latency_tracker.count(engine) < min_samples:
+        return default
+    return _latency_tracker.percentile(engine, percentile)
+
+
+def hedged_call(primary: Tuple[str, Callable[[CancellationToken], Any]],
+                secondary: Tuple[str, Callable[[CancellationToken], Any]],
+                delay: float) -> Tuple[Optional[str], Any]:
+    """
+    Run `primary`; if it hasn't answered after `delay` seconds, also start
+    `secondary`, return whichever produces a result first and cancel the other.
+
+    A callable signals failure by returning None or raising. If the primary
+    fails before the delay, the secondary starts immediately.
+
+    Args:
+        primary (tuple): (name, fn) where fn accepts a CancellationToken
+        secondary (tuple): (name, fn) run as the hedge
+        delay (float): Seconds to wait before hedging
+
+    Returns:
+        tuple: (winner name, result) or (None, None) if both failed
+    """
+    done = threading.Condition()
+    outcomes: Dict[str, Any] = {}
+    tokens = {primary[0]: CancellationToken(), secondary[0]: CancellationToken()}
+
+    def run(name: str, fn: Callable[[CancellationToken], Any]):
+        try:
+            result = fn(tokens[name])
+        except TranscriptionCancelled:
+            result = None
+        except Exception as e:
+            print(f"❌ Hedged engine {name} failed: {e}")
+            result = None
+        with done:
+            outcomes[name] = result
+            done.notify_all()
+
+    def start(name: str, fn: Callable[[CancellationToken], Any]):
+        threading.Thread(target=run, args=(name, fn), daemon=True, name=f"hedge-{name}").start()
+
+    def winner() -> Optional[str]:
+        for name in (primary[0], secondary[0]):
+            if outcomes.get(name) is not None:
+                return name
+        return None
+
+    start(*primary)
+    with done:
+        done.wait_for(lambda: primary[0] in outcomes, timeout=delay)
+        if outcomes.get(primary[0]) is not None:
+            return primary[0], outcomes[primary[0]]
+        primary_failed = primary[0] in outcomes
+    if primary_failed:
+        print(f"🔄 {primary[0]} failed, starting {secondary[0]}")
+    else:
+        print(f"⏱️ {primary[0]} slower than {delay:.2f}s hedge delay, starting {secondary[0]}")
+    start(*secondary)
+    with done:
+        done.wait_for(lambda: winner() is not None or len(outcomes) == 2)
+        name = winner()
+
+    if name is None:
+        return None, None
+    loser = secondary[0] if name == primary[0] else primary[0]
+    tokens[loser].cancel()
+    print(f"🏁 {name} won the hedge, cancelling {loser}")
+    return name, outcomes[name]
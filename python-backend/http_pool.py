@@ -0,0 +1,151 @@
+import os
+import time
+import threading
+import weakref
+from typing import Dict, Any, Optional
+
+import httpx
+
+
+class CountingTransport(httpx.HTTPTransport):
+    """HTTP transport that reports requests, latency and new connections to its pool."""
+    def __init__(self, pool: 'HTTPPool', **kwargs):
+        super().__init__(**kwargs)
+        self.http_pool = pool
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        # httpcore reports connection setup through the trace extension
+        request.extensions = {**request.extensions, 'trace': self.http_pool._trace}
+        started = time.perf_counter()
+        self.http_pool._started()
+        try:
+            return super().handle_request(request)
+        finally:
+            self.http_pool._finished(time.perf_counter() - started)
+
+    def connection_counts(self) -> Dict[str, int]:
+        # httpcore keeps its pool private; report nothing rather than fail if it changes
+        connections = getattr(getattr(self, '_pool', None), 'connections', None)
+        if connections is None:
+            return {}
+        connections = list(connections)
+        return {
+            'open': len(connections),
+            'idle': sum(1 for connection in connections if connection.is_idle()),
+        }
+
+
+class HTTPPool:
+    """
+    Keep-alive connection settings and counters shared by every HTTP client
+    built from it. Clients are thread-safe, so one per process is enough: all
+    threads reuse its warm connections instead of paying a TCP and TLS
+    handshake per call.
+
+    Args:
+        name (str): Used in metrics
+        max_connections (int): Connections open at once; callers beyond that wait
+        max_keepalive (int): Idle connections kept open (default: max_connections)
+        keepalive_expiry (float): Seconds an idle connection is kept. Should outlast
+            the gap between calls, e.g. the worker poll interval.
+        timeout (float): Read/write/pool timeout in seconds
+        connect_timeout (float): Connect timeout in seconds
+        verify (bool): Verify TLS certificates
+    """
+    def __init__(self, name: str = 'http', max_connections: int = 20, max_keepalive: Optional[int] = None,
+                 keepalive_expiry: float = 60.0, timeout: float = 30.0, connect_timeout: float = 5.0,
+                 verify: bool = True):
+        self.name = name
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections if max_keepalive is None else max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.verify = verify
+        self._transports: 'weakref.WeakSet[CountingTransport]' = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.total_seconds = 0.0
+        self.connects = 0
+        self.tls_handshakes = 0
+
+    @classmethod
+    def from_env(cls, name: str, **defaults) -> 'HTTPPool':
+        """Settings from {NAME}_POOL_SIZE, _KEEPALIVE_SECONDS, _TIMEOUT and _CONNECT_TIMEOUT."""
+        prefix = name.upper()
+        settings = {
+            'max_connections': (f'{prefix}_POOL_SIZE', int),
+            'keepalive_expiry': (f'{prefix}_KEEPALIVE_SECONDS', float),
+            'timeout': (f'{prefix}_TIMEOUT', float),
+            'connect_timeout': (f'{prefix}_CONNECT_TIMEOUT', float),
+        }
+        kwargs = dict(defaults)
+        for key, (env, parse) in settings.items():
+            if os.getenv(env):
+                kwargs[key] = parse(os.getenv(env))
+        return cls(name=name, **kwargs)
+
+    def client(self, client_class=httpx.Client, **kwargs) -> httpx.Client:
+        """A client on a new pooled transport; share it between threads rather than building more."""
+        transport = CountingTransport(self, limits=self.limits, verify=self.verify)
+        self._transports.add(transport)
+        return client_class(transport=transport, timeout=self.timeout, **kwargs)
+
+    def _trace(self, event_name: str, info: Dict[str, Any]):
+        if event_name == 'connection.connect_tcp.complete':
+            with self._lock:
+                self.connects += 1
+        elif event_name == 'connection.start_tls.complete':
+            with self._lock:
+                self.tls_handshakes += 1
+
+    def _started(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+
+    def _finished(self, seconds: float):
+        with self._lock:
+            self.in_flight -= 1
+            self.total_seconds += seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        connections = {'open': 0, 'idle': 0}
+        for transport in list(self._transports):
+            for key, value in transport.connection_counts().items():
+                connections[key] += value
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'in_flight': self.in_flight,
+                'mean_latency_ms': round(self.total_seconds / self.requests * 1000, 1) if self.requests else 0,
+                'connects': self.connects,
+                'tls_handshakes': self.tls_handshakes,
+                # Requests per new connection; 1.0 means no reuse at all
+                'reuse_ratio': round(self.requests / self.connects, 1) if self.connects else None,
+                'connections': connections,
+                'max_connections': self.limits.max_connections,
+                'keepalive_expiry': self.limits.keepalive_expiry,
+            }
+
+
+_pools: Dict[str, HTTPPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_http_pool(name: str, **defaults) -> HTTPPool:
+    """Process-wide pool for a dependency, configured from the environment on first use."""
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            pool = HTTPPool.from_env(name, **defaults)
+            _pools[name] = pool
+        return pool
+
+
+def http_pool_metrics() -> Dict[str, Dict[str, Any]]:
+    with _pools_lock:
+        pools = dict(_pools)
+    return {name: pool.snapshot() for name, pool in pools.items()}
@@ -0,0 +1,320 @@
+import os
+import hashlib
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict
+from typing import Dict, List, Any, Optional, Set
+
+import torch
+import whisper
+from whisper.model import ModelDimensions, Whisper, Linear
+
+
+def _cache_dir() -> str:
+    default = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.getenv('WHISPER_CACHE_DIR') or os.path.join(os.getenv('XDG_CACHE_HOME', default), 'whisper')
+
+
+def _fp32_checkpoint(model_size: str) -> str:
+    """
+    FP32 copy of a Whisper checkpoint, written once next to the original.
+
+    The published checkpoints are FP16 and get converted on every load, so
+    their tensors can't be mapped straight into the model. The converted file
+    can: every process mapping it shares the same page-cache pages.
+    """
+    path = os.path.join(_cache_dir(), f"{model_size}.fp32.pt")
+    if not os.path.exists(path):
+        print(f"📦 Writing memory-mappable FP32 checkpoint for {model_size}...")
+        model = whisper.load_model(model_size, device='cpu', download_root=_cache_dir())
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        torch.save({'dims': asdict(model.dims), 'model_state_dict': model.state_dict()}, tmp_path)
+        os.replace(tmp_path, path)
+    return path
+
+
+def quantized_sizes() -> Set[str]:
+    """Model sizes loaded with int8 linear layers (WHISPER_QUANTIZE_SIZES, e.g. 'small,medium' or 'all')."""
+    return {size.strip() for size in os.getenv('WHISPER_QUANTIZE_SIZES', '').split(',') if size.strip()}
+
+
+def should_quantize(model_size: str) -> bool:
+    sizes = quantized_sizes()
+    return 'all' in sizes or model_size in sizes
+
+
+def quantize_model(model):
+    """
+    Apply dynamic int8 quantization to the linear layers of a Whisper model.
+
+    Weights are stored as int8 and activations are quantized on the fly, so
+    the attention and MLP matmuls run through the int8 CPU kernels. Whisper's
+    own Linear only overrides forward() to cast weights to the input dtype,
+    which is a no-op in FP32, but quantize_dynamic matches module types
+    exactly, so they are turned back into plain nn.Linear first.
+
+    Args:
+        model (Whisper): FP32 model on the CPU
+
+    Returns:
+        Whisper: The same model with quantized linear layers
+    """
+    for module in model.modules():
+        if type(module) is Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def load_whisper_model(model_size: str, mmap: Optional[bool] = None, quantize: Optional[bool] = None):
+    """
+    Load a Whisper model for CPU inference.
+
+    Args:
+        model_size (str): Whisper model size
+        mmap (bool): Back the weights with a memory-mapped checkpoint instead of
+            private memory (defaults to the WHISPER_MMAP environment variable)
+        quantize (bool): Use dynamic int8 linear layers (defaults to whether the
+            size is listed in WHISPER_QUANTIZE_SIZES)
+
+    Returns:
+        Whisper: Model in evaluation mode
+    """
+    if quantize is None:
+        quantize = should_quantize(model_size)
+    if mmap is None:
+        # Quantized weights are private copies anyway, so mapping the FP32 file gains nothing
+        mmap = not quantize and os.getenv('WHISPER_MMAP', 'false').lower() == 'true'
+    if not mmap:
+        # The int8 kernels are CPU-only
+        model = whisper.load_model(model_size, device='cpu' if quantize else None)
+    else:
+        checkpoint = torch.load(_fp32_checkpoint(model_size), map_location='cpu', mmap=True, weights_only=False)
+        model = Whisper(ModelDimensions(**checkpoint['dims']))
+        # assign=True keeps the mapped tensors instead of copying them into fresh parameters
+        model.load_state_dict(checkpoint['model_state_dict'], assign=True)
+        model.set_alignment_heads(whisper._ALIGNMENT_HEADS[model_size])
+        model.requires_grad_(False)
+    # Set model to evaluation mode for faster inference
+    model.eval()
+    if quantize:
+        model = quantize_model(model)
+    return model
+
+
+class CachedEncoder(torch.nn.Module):
+    """
+    Wraps a Whisper audio encoder so each 30 s mel window is encoded once.
+
+    Outputs are keyed by a hash of the window's mel features, so a rerun of
+    the same audio (another language, a retry, a temperature fallback inside
+    one run) only pays for the decoder. Uncached windows of a batch are
+    encoded together in one call.
+
+    Args:
+        encoder: The model's AudioEncoder
+        model_id (str): Distinguishes models whose outputs differ, e.g. 'base-int8'
+        cache (FeatureCache): Where outputs are stored
+    """
+    def __init__(self, encoder, model_id: str, cache):
+        super().__init__()
+        self.encoder = encoder
+        self.model_id = model_id
+        self.cache = cache
+
+    def forward(self, mel):
+        keys = [
+            f"enc:{self.model_id}:{hashlib.blake2b(window.detach().cpu().numpy().tobytes(), digest_size=16).hexdigest()}"
+            for window in mel
+        ]
+        cached = [self.cache.get_array(key) for key in keys]
+        missing = [i for i, array in enumerate(cached) if array is None]
+        computed = self.encoder(mel[missing]) if missing else None
+        if computed is not None:
+            for i, output in zip(missing, computed):
+                self.cache.put_array(keys[i], output.detach().cpu().numpy())
+            if len(missing) == len(keys):
+                return computed
+
+        outputs = []
+        fresh = iter(computed) if computed is not None else iter(())
+        for array in cached:
+            outputs.append(next(fresh) if array is None else torch.from_numpy(array).to(mel.device))
+        return torch.stack(outputs)
+
+
+class BatchedEncoder(torch.nn.Module):
+    """
+    Wraps a Whisper audio encoder so concurrent jobs' windows are encoded in
+    one batch by a shared MicroBatcher instead of one at a time.
+
+    Args:
+        encoder: The model's AudioEncoder
+        batcher (MicroBatcher): Batcher shared by all models of the same size
+    """
+    def __init__(self, encoder, batcher):
+        super().__init__()
+        self.encoder = encoder
+        self.batcher = batcher
+
+    def forward(self, mel):
+        return self.batcher(mel, context=self.encoder)
+
+
+def _model_id(model_size: str) -> str:
+    return f"{model_size}-int8" if should_quantize(model_size) else model_size
+
+
+def enable_feature_cache(model, model_size: str, cache):
+    """Route a model's encoder through the feature cache (idempotent)."""
+    if not isinstance(model.encoder, CachedEncoder):
+        model.encoder = CachedEncoder(model.encoder, _model_id(model_size), cache)
+    return model
+
+
+def enable_encoder_batching(model, model_size: str):
+    """
+    Route a model's encoder through the shared batcher for its size
+    (idempotent). Cache lookups stay in front of the batcher.
+    """
+    from encoder_batcher import get_encoder_batcher
+
+    parent = model.encoder if isinstance(model.encoder, CachedEncoder) else model
+    if not isinstance(parent.encoder, BatchedEncoder):
+        parent.encoder = BatchedEncoder(parent.encoder, get_encoder_batcher(_model_id(model_size)))
+    return model
+
+
+_mel_context = threading.local()
+_mel_cache_installed = False
+_mel_cache_lock = threading.Lock()
+
+
+def _install_mel_cache():
+    """Make whisper.transcribe look up the calling thread's audio in the feature cache."""
+    global _mel_cache_installed
+    with _mel_cache_lock:
+        if _mel_cache_installed:
+            return
+        import whisper.transcribe
+
+        compute = whisper.transcribe.log_mel_spectrogram
+
+        def log_mel_spectrogram(audio, n_mels=80, padding=0, device=None):
+            context = getattr(_mel_context, 'value', None)
+            if context is None:
+                return compute(audio, n_mels, padding=padding, device=device)
+            cache, audio_hash = context
+            key = f"mel:{n_mels}:{padding}:{audio_hash}"
+            features = cache.get_array(key)
+            if features is not None:
+                mel = torch.from_numpy(features)
+                return mel.to(device) if device is not None else mel
+            mel = compute(audio, n_mels, padding=padding, device=device)
+            cache.put_array(key, mel.cpu().numpy())
+            return mel
+
+        whisper.transcribe.log_mel_spectrogram = log_mel_spectrogram
+        _mel_cache_installed = True
+
+
+@contextmanager
+def cached_mel_features(cache, audio_hash: str):
+    """
+    Serve the log-mel spectrogram of the audio with this hash from the cache
+    for Whisper transcriptions run by this thread.
+    """
+    _install_mel_cache()
+    previous = getattr(_mel_context, 'value', None)
+    _mel_context.value = (cache, audio_hash)
+    try:
+        yield
+    finally:
+        _mel_context.value = previous
+
+
+class WhisperModelPool:
+    """
+    Reusable local Whisper models, checked out by one job at a time.
+
+    Whisper installs its decoder kv-cache hooks on the model itself, so a model
+    must never decode for two callers concurrently. The pool hands each caller
+    an exclusive model and keeps released ones warm for the next job instead of
+    reloading weights from disk.
+
+    Args:
+        max_idle (int): Idle models kept per size
+    """
+    def __init__(self, max_idle: int = None):
+        self.max_idle = max_idle if max_idle is not None else int(os.getenv('WHISPER_POOL_MAX_IDLE', 2))
+        self._idle: Dict[str, List[Any]] = {}
+        self._in_use: Dict[str, int] = {}
+        self._retired = set()
+        self._lock = threading.Lock()
+
+    def acquire(self, model_size: str):
+        """Check out a model of the given size, loading one if none is idle."""
+        with self._lock:
+            self._retired.discard(model_size)
+            self._in_use[model_size] = self._in_use.get(model_size, 0) + 1
+            idle = self._idle.get(model_size)
+            if idle:
+                return idle.pop()
+        try:
+            print(f"📦 Loading optimized local Whisper model: {model_size}"
+                  f"{' (int8)' if should_quantize(model_size) else ''}")
+            return load_whisper_model(model_size)
+        except Exception:
+            with self._lock:
+                self._in_use[model_size] -= 1
+            raise
+
+    def release(self, model_size: str, model):
+        """Return a model; it is kept warm unless the pool is already full."""
+        with self._lock:
+            self._in_use[model_size] = max(0, self._in_use.get(model_size, 0) - 1)
+            if model_size in self._retired:
+                return
+            idle = self._idle.setdefault(model_size, [])
+            if len(idle) < self.max_idle:
+                idle.append(model)
+
+    def retire(self, model_size: str) -> int:
+        """
+        Free idle models of a size and drop the rest as they are released,
+        until the size is acquired again.
+
+        Returns:
+            int: Idle models freed
+        """
+        with self._lock:
+            self._retired.add(model_size)
+            return len(self._idle.pop(model_size, []))
+
+    @contextmanager
+    def checkout(self, model_size: str):
+        model = self.acquire(model_size)
+        try:
+            yield model
+        finally:
+            self.release(model_size, model)
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            sizes = set(self._idle) | set(self._in_use)
+            return {
+                size: {
+                    'idle': len(self._idle.get(size, [])),
+                    'in_use': self._in_use.get(size, 0),
+                    'retired': size in self._retired,
+                    'quantized': should_quantize(size),
+                }
+                for size in sizes
+            }
+
+
+_model_pool = WhisperModelPool()
+
+
+def get_model_pool() -> WhisperModelPool:
+    """Process-wide pool of warm Whisper models."""
+    return _model_pool
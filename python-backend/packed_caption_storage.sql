@@ -0,0 +1,67 @@
+-- Packed caption storage: one compressed blob per task (caption_codec.py),
+-- and a finalize function that knows which storage a task was written to
+
+-- Packed per-task captions (caption_codec.py): one compressed blob instead of a row per caption
+CREATE TABLE IF NOT EXISTS caption_blobs (
+    task_id UUID PRIMARY KEY REFERENCES caption_tasks(id) ON DELETE CASCADE,
+    caption_count INTEGER NOT NULL,
+    data BYTEA NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- The blob is already compressed; store it out of line without compressing again
+ALTER TABLE caption_blobs ALTER COLUMN data SET STORAGE EXTERNAL;
+
+ALTER TABLE caption_blobs ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow all operations for service role" ON caption_blobs
+    FOR ALL USING (true);
+
+-- The two-argument version would make PostgREST calls ambiguous
+DROP FUNCTION IF EXISTS finalize_captions_for_task(UUID, INTEGER);
+
+-- Commit marker for caption uploads: drop rows left over from an earlier, longer
+-- upload, check every caption landed in each expected storage, and only then
+-- mark the task completed.
+CREATE OR REPLACE FUNCTION finalize_captions_for_task(
+    task_uuid UUID,
+    caption_count INTEGER,
+    expect_rows BOOLEAN DEFAULT TRUE,
+    expect_packed BOOLEAN DEFAULT FALSE
+)
+RETURNS INTEGER AS $$
+DECLARE
+    stored_count INTEGER := 0;
+    packed_count INTEGER;
+BEGIN
+    IF expect_rows THEN
+        DELETE FROM captions WHERE task_id = task_uuid AND sequence_order >= caption_count;
+        
+        SELECT COUNT(*) INTO stored_count FROM captions WHERE task_id = task_uuid;
+        IF stored_count <> caption_count THEN
+            RAISE EXCEPTION 'Task % has % of % captions stored', task_uuid, stored_count, caption_count;
+        END IF;
+    ELSE
+        -- Packed only: rows from an earlier upload would be stale
+        DELETE FROM captions WHERE task_id = task_uuid;
+    END IF;
+    
+    IF expect_packed THEN
+        SELECT b.caption_count INTO packed_count FROM caption_blobs b WHERE b.task_id = task_uuid;
+        IF packed_count IS DISTINCT FROM caption_count THEN
+            RAISE EXCEPTION 'Task % has % of % packed captions', task_uuid, packed_count, caption_count;
+        END IF;
+    ELSE
+        DELETE FROM caption_blobs WHERE task_id = task_uuid;
+    END IF;
+    
+    UPDATE caption_tasks
+    SET status = 'completed',
+        progress = 100,
+        eta_seconds = 0,
+        updated_at = NOW()
+    WHERE id = task_uuid;
+    
+    RETURN caption_count;
+END;
+$$ LANGUAGE plpgsql;
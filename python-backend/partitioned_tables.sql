@@ -0,0 +1,594 @@
+-- Monthly partitions for databases set up before them: caption_tasks and
+-- captions are rebuilt as tables partitioned by creation month and their rows
+-- copied over, caption_blobs gets the task's created_at for its foreign key, and
+-- the functions that read or write captions are replaced. Same definitions as
+-- setup_database.sql and setup_captions_table.sql. Run shared_transcripts.sql
+-- first. The copy locks both tables, so stop workers and run it in a quiet period.
+
+BEGIN;
+
+-- Monthly partitions (<table>_YYYY_MM, UTC months) of a table partitioned by a
+-- timestamp, from from_month through months_ahead months from now. Creates the
+-- ones that don't exist yet and returns their names. There is no default
+-- partition, so the retention job runs this every cycle to stay ahead of inserts.
+CREATE OR REPLACE FUNCTION ensure_monthly_partitions(
+    parent_table TEXT,
+    months_ahead INTEGER DEFAULT 3,
+    from_month TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    month_start TIMESTAMP := date_trunc('month', COALESCE(from_month, NOW()) AT TIME ZONE 'UTC');
+    last_month TIMESTAMP := date_trunc('month', NOW() AT TIME ZONE 'UTC') + make_interval(months => months_ahead);
+    partition_name TEXT;
+BEGIN
+    WHILE month_start <= last_month LOOP
+        partition_name := parent_table || '_' || to_char(month_start, 'YYYY_MM');
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, parent_table,
+                month_start AT TIME ZONE 'UTC', (month_start + INTERVAL '1 month') AT TIME ZONE 'UTC'
+            );
+            -- Policies are on the parent; the partition itself is closed to direct API access
+            EXECUTE format('ALTER TABLE %I ENABLE ROW LEVEL SECURITY', partition_name);
+            RETURN NEXT partition_name;
+        END IF;
+        month_start := month_start + INTERVAL '1 month';
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Detach and drop the monthly partitions of a table that end on or before
+-- cutoff and no longer hold any rows: the retention job archives and deletes a
+-- month's finished tasks first, so a month with unfinished ones is kept.
+-- Returns the dropped names.
+CREATE OR REPLACE FUNCTION drop_expired_partitions(parent_table TEXT, cutoff TIMESTAMPTZ)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    partition_name TEXT;
+    is_empty BOOLEAN;
+BEGIN
+    FOR partition_name IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(parent_table)
+          AND c.relname ~ ('^' || parent_table || '_[0-9]{4}_[0-9]{2}$')
+          AND (to_date(right(c.relname, 7), 'YYYY_MM') + INTERVAL '1 month') AT TIME ZONE 'UTC' <= cutoff
+        ORDER BY c.relname
+    LOOP
+        EXECUTE format('SELECT NOT EXISTS (SELECT 1 FROM %I)', partition_name) INTO is_empty;
+        IF is_empty THEN
+            -- Detaching checks nothing still references the partition's rows
+            EXECUTE format('ALTER TABLE %I DETACH PARTITION %I', parent_table, partition_name);
+            EXECUTE format('DROP TABLE %I', partition_name);
+            RETURN NEXT partition_name;
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Move the current tables aside, with the index names the new ones will use
+ALTER TABLE caption_blobs DROP CONSTRAINT IF EXISTS caption_blobs_task_id_fkey;
+
+ALTER TABLE captions RENAME TO captions_unpartitioned;
+ALTER INDEX IF EXISTS captions_pkey RENAME TO captions_unpartitioned_pkey;
+DROP INDEX IF EXISTS idx_captions_task_id, idx_captions_task_start, idx_captions_task_sequence, idx_captions_long_segments;
+
+ALTER TABLE caption_tasks RENAME TO caption_tasks_unpartitioned;
+ALTER INDEX IF EXISTS caption_tasks_pkey RENAME TO caption_tasks_unpartitioned_pkey;
+DROP INDEX IF EXISTS idx_caption_tasks_status, idx_caption_tasks_created_at, idx_caption_tasks_pending;
+
+CREATE TABLE caption_tasks (
+    id UUID DEFAULT gen_random_uuid(),
+    video_url TEXT NOT NULL,
+    language TEXT NOT NULL DEFAULT 'en',
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'processing', 'completed', 'failed')),
+    captions JSONB,
+    error_message TEXT,
+    progress INTEGER NOT NULL DEFAULT 0 CHECK (progress >= 0 AND progress <= 100),
+    progress_message TEXT,
+    eta_seconds INTEGER,
+    deadline_seconds INTEGER,
+    quality_tier TEXT CHECK (quality_tier IN ('fast', 'balanced', 'best')),
+    transcript_id UUID REFERENCES transcripts(id),
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- Create an index on status for faster queries
+CREATE INDEX IF NOT EXISTS idx_caption_tasks_status ON caption_tasks(status);
+
+-- Create an index on created_at for ordering
+CREATE INDEX IF NOT EXISTS idx_caption_tasks_created_at ON caption_tasks(created_at DESC);
+
+-- Pending tasks only, oldest first: what every worker poll reads. Stays as small
+-- as the backlog no matter how many finished tasks the table holds.
+CREATE INDEX IF NOT EXISTS idx_caption_tasks_pending ON caption_tasks(created_at) WHERE status = 'pending';
+
+CREATE TABLE captions (
+    id UUID DEFAULT gen_random_uuid(),
+    task_id UUID NOT NULL,
+    task_created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    text TEXT NOT NULL,
+    start_time DECIMAL(10,3) NOT NULL,
+    end_time DECIMAL(10,3) NOT NULL,
+    confidence DECIMAL(5,4),
+    sequence_order INTEGER NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    
+    PRIMARY KEY (id, task_created_at),
+    CONSTRAINT fk_captions_task FOREIGN KEY (task_id, task_created_at)
+        REFERENCES caption_tasks(id, created_at) ON DELETE CASCADE,
+    CONSTRAINT check_time_order CHECK (start_time <= end_time),
+    CONSTRAINT check_confidence CHECK (confidence >= -1 AND confidence <= 1)
+) PARTITION BY RANGE (task_created_at);
+
+-- Time-range reads for player seeking (get_captions_in_range)
+CREATE INDEX IF NOT EXISTS idx_captions_task_start ON captions(task_id, start_time, sequence_order);
+-- Captions longer than the 30 s the range scan allows for; normally none, so it stays tiny
+CREATE INDEX IF NOT EXISTS idx_captions_long_segments ON captions(task_id, start_time, sequence_order)
+    WHERE end_time - start_time > 30;
+-- Unique so chunked uploads can upsert by position; also serves lookups by task
+CREATE UNIQUE INDEX IF NOT EXISTS idx_captions_task_sequence ON captions(task_id, task_created_at, sequence_order);
+
+-- A partition for every month with tasks, and the next few
+SELECT ensure_monthly_partitions(parent_table, 3, (SELECT MIN(created_at) FROM caption_tasks_unpartitioned))
+FROM (VALUES ('caption_tasks'), ('captions')) AS parents(parent_table);
+
+-- Copied before the reference triggers exist: the transcripts' counts already include these rows
+INSERT INTO caption_tasks (
+    id, video_url, language, status, captions, error_message, progress, progress_message,
+    eta_seconds, deadline_seconds, quality_tier, transcript_id, created_at, updated_at
+)
+SELECT
+    id, video_url, language, status, captions, error_message, progress, progress_message,
+    eta_seconds, deadline_seconds, quality_tier, transcript_id, COALESCE(created_at, updated_at, NOW()), updated_at
+FROM caption_tasks_unpartitioned;
+
+INSERT INTO captions (id, task_id, task_created_at, text, start_time, end_time, confidence, sequence_order, created_at)
+SELECT c.id, c.task_id, t.created_at, c.text, c.start_time, c.end_time, c.confidence, c.sequence_order, c.created_at
+FROM captions_unpartitioned c
+JOIN caption_tasks t ON t.id = c.task_id;
+
+ALTER TABLE caption_blobs ADD COLUMN IF NOT EXISTS task_created_at TIMESTAMP WITH TIME ZONE;
+UPDATE caption_blobs b SET task_created_at = t.created_at FROM caption_tasks t WHERE t.id = b.task_id;
+ALTER TABLE caption_blobs ALTER COLUMN task_created_at SET NOT NULL;
+ALTER TABLE caption_blobs ADD FOREIGN KEY (task_id, task_created_at)
+    REFERENCES caption_tasks(id, created_at) ON DELETE CASCADE;
+
+DROP TABLE captions_unpartitioned;
+DROP TABLE caption_tasks_unpartitioned;
+
+ALTER TABLE caption_tasks ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Allow all operations for service role" ON caption_tasks
+    FOR ALL USING (true);
+
+ALTER TABLE captions ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Allow all operations for service role" ON captions
+    FOR ALL USING (true);
+
+CREATE TRIGGER update_caption_tasks_updated_at 
+    BEFORE UPDATE ON caption_tasks 
+    FOR EACH ROW 
+    EXECUTE FUNCTION update_updated_at_column();
+
+DROP TRIGGER IF EXISTS caption_tasks_transcript_refs ON caption_tasks;
+CREATE TRIGGER caption_tasks_transcript_refs
+    AFTER INSERT OR DELETE ON caption_tasks
+    FOR EACH ROW EXECUTE FUNCTION track_transcript_refs();
+
+-- Progress updates don't pay for the trigger; only changed references do
+DROP TRIGGER IF EXISTS caption_tasks_transcript_ref_change ON caption_tasks;
+CREATE TRIGGER caption_tasks_transcript_ref_change
+    AFTER UPDATE ON caption_tasks
+    FOR EACH ROW WHEN (OLD.transcript_id IS DISTINCT FROM NEW.transcript_id)
+    EXECUTE FUNCTION track_transcript_refs();
+
+-- Fills in the task's created_at, which the key into partitioned caption_tasks
+-- needs, so writers only send the task id
+CREATE OR REPLACE FUNCTION fill_task_created_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.task_created_at IS NULL THEN
+        SELECT k.created_at INTO NEW.task_created_at FROM caption_tasks k WHERE k.id = NEW.task_id;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS caption_blobs_task_created_at ON caption_blobs;
+CREATE TRIGGER caption_blobs_task_created_at
+    BEFORE INSERT ON caption_blobs
+    FOR EACH ROW EXECUTE FUNCTION fill_task_created_at();
+
+-- Replaced by the version taking a lower bound; both would make PostgREST calls ambiguous
+DROP FUNCTION IF EXISTS count_pending_tasks();
+
+-- Count pending tasks in the database instead of fetching them to count. With
+-- since, only partitions from that month on are read.
+CREATE OR REPLACE FUNCTION count_pending_tasks(since TIMESTAMPTZ DEFAULT NULL)
+RETURNS BIGINT AS $$
+BEGIN
+    RETURN (
+        SELECT COUNT(*) FROM caption_tasks
+        WHERE status = 'pending' AND created_at >= COALESCE(since, '-infinity')
+    );
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Partition upkeep for the retention job: months ahead for tasks and their
+-- captions, and expired months dropped once their tasks are gone. Captions
+-- reference their task, so an empty task month has no captions left either.
+CREATE OR REPLACE FUNCTION ensure_task_partitions(months_ahead INTEGER DEFAULT 3)
+RETURNS SETOF TEXT AS $$
+BEGIN
+    RETURN QUERY SELECT ensure_monthly_partitions('caption_tasks', months_ahead);
+    RETURN QUERY SELECT ensure_monthly_partitions('captions', months_ahead);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION drop_expired_task_partitions(cutoff TIMESTAMPTZ)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    task_partition TEXT;
+    caption_partition TEXT;
+BEGIN
+    FOR task_partition IN SELECT drop_expired_partitions('caption_tasks', cutoff) LOOP
+        RETURN NEXT task_partition;
+        caption_partition := 'captions_' || right(task_partition, 7);
+        IF to_regclass(caption_partition) IS NOT NULL THEN
+            EXECUTE format('ALTER TABLE captions DETACH PARTITION %I', caption_partition);
+            EXECUTE format('DROP TABLE %I', caption_partition);
+            RETURN NEXT caption_partition;
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Store a task's captions as the canonical transcript for its key, point the
+-- task at it and mark the task completed. If another task stored the key first,
+-- its copy is kept and nothing is written again. Per-task copies from earlier
+-- saves are dropped.
+CREATE OR REPLACE FUNCTION save_transcript_for_task(
+    task_uuid UUID,
+    transcript_video_id TEXT,
+    transcript_language TEXT,
+    transcript_engine TEXT,
+    transcript_model TEXT,
+    captions_data JSONB
+)
+RETURNS UUID AS $$
+DECLARE
+    transcript_uuid UUID;
+    task_created TIMESTAMPTZ;
+BEGIN
+    INSERT INTO transcripts (video_id, language, engine, model, captions, caption_count)
+    VALUES (transcript_video_id, transcript_language, transcript_engine, transcript_model,
+            captions_data, jsonb_array_length(captions_data))
+    ON CONFLICT (video_id, language, engine, model) DO UPDATE SET last_used_at = NOW()
+    RETURNING id INTO transcript_uuid;
+    
+    SELECT k.created_at INTO task_created FROM caption_tasks k WHERE k.id = task_uuid;
+    DELETE FROM captions WHERE task_id = task_uuid AND task_created_at = task_created;
+    DELETE FROM caption_blobs WHERE task_id = task_uuid;
+    
+    UPDATE caption_tasks
+    SET transcript_id = transcript_uuid,
+        status = 'completed',
+        progress = 100,
+        eta_seconds = 0,
+        updated_at = NOW()
+    WHERE id = task_uuid AND created_at = task_created;
+    
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Task % not found', task_uuid;
+    END IF;
+    
+    RETURN transcript_uuid;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Complete a task from an existing transcript for its key without transcribing
+-- it again. Returns the transcript id, or NULL if there is none. The row lock
+-- waits out a concurrent release of the transcript's last reference.
+CREATE OR REPLACE FUNCTION reuse_transcript_for_task(
+    task_uuid UUID,
+    transcript_video_id TEXT,
+    transcript_language TEXT,
+    transcript_engine TEXT,
+    transcript_model TEXT
+)
+RETURNS UUID AS $$
+DECLARE
+    transcript_uuid UUID;
+    task_created TIMESTAMPTZ;
+BEGIN
+    SELECT t.id INTO transcript_uuid
+    FROM transcripts t
+    WHERE t.video_id = transcript_video_id
+      AND t.language = transcript_language
+      AND t.engine = transcript_engine
+      AND t.model = transcript_model
+    FOR NO KEY UPDATE;
+    
+    IF transcript_uuid IS NULL THEN
+        RETURN NULL;
+    END IF;
+    
+    SELECT k.created_at INTO task_created FROM caption_tasks k WHERE k.id = task_uuid;
+    DELETE FROM captions WHERE task_id = task_uuid AND task_created_at = task_created;
+    DELETE FROM caption_blobs WHERE task_id = task_uuid;
+    
+    UPDATE caption_tasks
+    SET transcript_id = transcript_uuid,
+        status = 'completed',
+        progress = 100,
+        eta_seconds = 0,
+        error_message = NULL,
+        updated_at = NOW()
+    WHERE id = task_uuid AND created_at = task_created;
+    
+    RETURN transcript_uuid;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Create a function to get captions for a task with proper ordering, from its
+-- caption rows or, for tasks stored as a shared transcript, from the transcript.
+-- Looking up the task's month first means only that month's partition is read.
+CREATE OR REPLACE FUNCTION get_captions_for_task(task_uuid UUID)
+RETURNS TABLE (
+    id UUID,
+    text TEXT,
+    start_time DECIMAL(10,3),
+    end_time DECIMAL(10,3),
+    confidence DECIMAL(5,4),
+    sequence_order INTEGER
+) AS $$
+DECLARE
+    task_created TIMESTAMPTZ;
+BEGIN
+    SELECT k.created_at INTO task_created FROM caption_tasks k WHERE k.id = task_uuid;
+    
+    RETURN QUERY
+    SELECT 
+        c.id,
+        c.text,
+        c.start_time,
+        c.end_time,
+        c.confidence,
+        c.sequence_order
+    FROM captions c
+    WHERE c.task_id = task_uuid AND c.task_created_at = task_created
+    ORDER BY c.sequence_order ASC;
+    
+    IF NOT FOUND THEN
+        RETURN QUERY
+        SELECT
+            -- Stable per-caption ids, as the app keys its list by them
+            md5(t.id::TEXT || ':' || e.ordinality)::UUID,
+            e.value->>'text',
+            (e.value->>'startTime')::DECIMAL(10,3),
+            (e.value->>'endTime')::DECIMAL(10,3),
+            (e.value->>'confidence')::DECIMAL(5,4),
+            (e.ordinality - 1)::INTEGER
+        FROM caption_tasks k
+        JOIN transcripts t ON t.id = k.transcript_id
+        CROSS JOIN LATERAL jsonb_array_elements(t.captions) WITH ORDINALITY AS e(value, ordinality)
+        WHERE k.id = task_uuid AND k.created_at = task_created
+        ORDER BY e.ordinality;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Captions overlapping [from_time, to_time) for player seeking, ordered by start
+-- time and paged by keyset: pass the last row's start_time and sequence_order
+-- as after_start/after_sequence to get the next page.
+CREATE OR REPLACE FUNCTION get_captions_in_range(
+    task_uuid UUID,
+    from_time NUMERIC,
+    to_time NUMERIC DEFAULT NULL,
+    after_start NUMERIC DEFAULT NULL,
+    after_sequence INTEGER DEFAULT NULL,
+    page_size INTEGER DEFAULT 200
+)
+RETURNS TABLE (
+    id UUID,
+    text TEXT,
+    start_time DECIMAL(10,3),
+    end_time DECIMAL(10,3),
+    confidence DECIMAL(5,4),
+    sequence_order INTEGER
+) AS $$
+DECLARE
+    task_created TIMESTAMPTZ;
+    row_limit INTEGER := LEAST(GREATEST(page_size, 1), 1001);
+BEGIN
+    SELECT k.created_at INTO task_created FROM caption_tasks k WHERE k.id = task_uuid;
+    
+    RETURN QUERY
+    SELECT r.id, r.text, r.start_time, r.end_time, r.confidence, r.sequence_order
+    FROM (
+        -- Whisper segments are at most 30 seconds long, which bounds the index range scan
+        (SELECT c.id, c.text, c.start_time, c.end_time, c.confidence, c.sequence_order
+        FROM captions c
+        WHERE c.task_id = task_uuid
+          AND c.task_created_at = task_created
+          AND c.start_time >= from_time - 30
+          AND c.end_time >= from_time
+          AND (to_time IS NULL OR c.start_time < to_time)
+          AND (after_start IS NULL OR (c.start_time, c.sequence_order) > (after_start, after_sequence))
+        ORDER BY c.start_time, c.sequence_order
+        LIMIT row_limit)
+        UNION ALL
+        -- Longer segments (API output, imported transcripts) starting before that,
+        -- read from idx_captions_long_segments, which holds only them
+        (SELECT c.id, c.text, c.start_time, c.end_time, c.confidence, c.sequence_order
+        FROM captions c
+        WHERE c.task_id = task_uuid
+          AND c.task_created_at = task_created
+          AND c.end_time - c.start_time > 30
+          AND c.start_time < from_time - 30
+          AND c.end_time >= from_time
+          AND (to_time IS NULL OR c.start_time < to_time)
+          AND (after_start IS NULL OR (c.start_time, c.sequence_order) > (after_start, after_sequence))
+        ORDER BY c.start_time, c.sequence_order
+        LIMIT row_limit)
+    ) r
+    ORDER BY r.start_time ASC, r.sequence_order ASC
+    LIMIT row_limit;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Create a function to insert multiple captions for a task.
+-- Set-based: one INSERT ... SELECT over the JSON array instead of one INSERT per caption.
+CREATE OR REPLACE FUNCTION insert_captions_for_task(
+    task_uuid UUID,
+    captions_data JSONB
+)
+RETURNS INTEGER AS $$
+DECLARE
+    inserted_count INTEGER := 0;
+    task_created TIMESTAMPTZ;
+BEGIN
+    SELECT k.created_at INTO task_created FROM caption_tasks k WHERE k.id = task_uuid;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Task % not found', task_uuid;
+    END IF;
+    
+    -- Delete existing captions for this task
+    DELETE FROM captions WHERE task_id = task_uuid AND task_created_at = task_created;
+    
+    -- Insert new captions, numbered in array order
+    INSERT INTO captions (
+        task_id,
+        task_created_at,
+        text,
+        start_time,
+        end_time,
+        confidence,
+        sequence_order
+    )
+    SELECT
+        task_uuid,
+        task_created,
+        c.text,
+        c.start_time::DECIMAL(10,3),
+        c.end_time::DECIMAL(10,3),
+        COALESCE(c.confidence::DECIMAL(5,4), 0.0),
+        (c.ordinality - 1)::INTEGER
+    FROM ROWS FROM (
+        jsonb_to_recordset(captions_data) AS (text TEXT, "startTime" NUMERIC, "endTime" NUMERIC, confidence NUMERIC)
+    ) WITH ORDINALITY AS c(text, start_time, end_time, confidence, ordinality);
+    
+    GET DIAGNOSTICS inserted_count = ROW_COUNT;
+    RETURN inserted_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Upsert one chunk of a task's captions, numbered from first_sequence.
+-- Keyed by the task and sequence_order, so re-sending a chunk is harmless.
+CREATE OR REPLACE FUNCTION upsert_caption_chunk(
+    task_uuid UUID,
+    first_sequence INTEGER,
+    captions_data JSONB
+)
+RETURNS INTEGER AS $$
+DECLARE
+    upserted_count INTEGER := 0;
+    task_created TIMESTAMPTZ;
+BEGIN
+    SELECT k.created_at INTO task_created FROM caption_tasks k WHERE k.id = task_uuid;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Task % not found', task_uuid;
+    END IF;
+    
+    INSERT INTO captions (
+        task_id,
+        task_created_at,
+        text,
+        start_time,
+        end_time,
+        confidence,
+        sequence_order
+    )
+    SELECT
+        task_uuid,
+        task_created,
+        c.text,
+        c.start_time::DECIMAL(10,3),
+        c.end_time::DECIMAL(10,3),
+        COALESCE(c.confidence::DECIMAL(5,4), 0.0),
+        first_sequence + (c.ordinality - 1)::INTEGER
+    FROM ROWS FROM (
+        jsonb_to_recordset(captions_data) AS (text TEXT, "startTime" NUMERIC, "endTime" NUMERIC, confidence NUMERIC)
+    ) WITH ORDINALITY AS c(text, start_time, end_time, confidence, ordinality)
+    ON CONFLICT (task_id, task_created_at, sequence_order) DO UPDATE SET
+        text = EXCLUDED.text,
+        start_time = EXCLUDED.start_time,
+        end_time = EXCLUDED.end_time,
+        confidence = EXCLUDED.confidence;
+    
+    GET DIAGNOSTICS upserted_count = ROW_COUNT;
+    RETURN upserted_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Replaces the two-argument version, which would make PostgREST calls ambiguous
+DROP FUNCTION IF EXISTS finalize_captions_for_task(UUID, INTEGER);
+
+-- Commit marker for caption uploads: drop rows left over from an earlier, longer
+-- upload, check every caption landed in each expected storage, and only then
+-- mark the task completed.
+CREATE OR REPLACE FUNCTION finalize_captions_for_task(
+    task_uuid UUID,
+    caption_count INTEGER,
+    expect_rows BOOLEAN DEFAULT TRUE,
+    expect_packed BOOLEAN DEFAULT FALSE
+)
+RETURNS INTEGER AS $$
+DECLARE
+    stored_count INTEGER := 0;
+    packed_count INTEGER;
+    task_created TIMESTAMPTZ;
+BEGIN
+    SELECT k.created_at INTO task_created FROM caption_tasks k WHERE k.id = task_uuid;
+    
+    IF expect_rows THEN
+        DELETE FROM captions
+        WHERE task_id = task_uuid AND task_created_at = task_created AND sequence_order >= caption_count;
+        
+        SELECT COUNT(*) INTO stored_count FROM captions WHERE task_id = task_uuid AND task_created_at = task_created;
+        IF stored_count <> caption_count THEN
+            RAISE EXCEPTION 'Task % has % of % captions stored', task_uuid, stored_count, caption_count;
+        END IF;
+    ELSE
+        -- Packed only: rows from an earlier upload would be stale
+        DELETE FROM captions WHERE task_id = task_uuid AND task_created_at = task_created;
+    END IF;
+    
+    IF expect_packed THEN
+        SELECT b.caption_count INTO packed_count FROM caption_blobs b WHERE b.task_id = task_uuid;
+        IF packed_count IS DISTINCT FROM caption_count THEN
+            RAISE EXCEPTION 'Task % has % of % packed captions', task_uuid, packed_count, caption_count;
+        END IF;
+    ELSE
+        DELETE FROM caption_blobs WHERE task_id = task_uuid;
+    END IF;
+    
+    -- Stored per task now: release any shared transcript it pointed at
+    UPDATE caption_tasks
+    SET status = 'completed',
+        progress = 100,
+        eta_seconds = 0,
+        transcript_id = NULL,
+        updated_at = NOW()
+    WHERE id = task_uuid AND created_at = task_created;
+    
+    RETURN caption_count;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMIT;
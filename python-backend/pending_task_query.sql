@@ -0,0 +1,14 @@
+-- Lean pending-task polling: a partial index for the ordered, limited poll and a
+-- count function for /stats
+
+-- Pending tasks only, oldest first: what every worker poll reads. Stays as small
+-- as the backlog no matter how many finished tasks the table holds.
+CREATE INDEX IF NOT EXISTS idx_caption_tasks_pending ON caption_tasks(created_at) WHERE status = 'pending';
+
+-- Count pending tasks in the database instead of fetching them to count
+CREATE OR REPLACE FUNCTION count_pending_tasks()
+RETURNS BIGINT AS $$
+BEGIN
+    RETURN (SELECT COUNT(*) FROM caption_tasks WHERE status = 'pending');
+END;
+$$ LANGUAGE plpgsql STABLE;
@@ -0,0 +1,167 @@
+import os
+import gc
+import sys
+import time
+import signal
+from typing import List, Dict, Optional
+
+
+def memory_usage(pid: int) -> Optional[Dict[str, int]]:
+    """RSS, PSS and shared memory of a process in kB (Linux only)."""
+    usage = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", 'r') as f:
+            for line in f:
+                parts = line.split()
+                if parts and parts[0] in ('Rss:', 'Pss:', 'Shared_Clean:', 'Shared_Dirty:', 'Private_Dirty:'):
+                    usage[parts[0].rstrip(':').lower()] = int(parts[1])
+    except OSError:
+        return None
+    return usage
+
+
+class PreforkServer:
+    """
+    Loads Whisper models once in a parent process, then forks task workers
+    that share the read-only weight pages copy-on-write. Workers skip model
+    loading entirely, so they start almost immediately and add little RSS.
+
+    Combine with WHISPER_MMAP=true so even models loaded later in a worker
+    share their pages through the page cache.
+
+    Args:
+        workers (int): Worker processes to fork
+        concurrency (int): Tasks each worker processes at the same time
+        preload_sizes (list): Model sizes loaded in the parent before forking
+        poll_interval (float): Seconds between task polls in each worker
+    """
+    def __init__(self, workers: int = 2, concurrency: int = 1, preload_sizes: List[str] = None,
+                 poll_interval: float = None):
+        self.workers = max(1, workers)
+        self.concurrency = max(1, concurrency)
+        self.preload_sizes = preload_sizes if preload_sizes is not None else ['tiny']
+        self.poll_interval = poll_interval
+        self.children: Dict[int, int] = {}
+        self.stopping = False
+
+    def preload(self):
+        """Load models into the parent's pool, one copy per concurrent task in a worker."""
+        from model_pool import get_model_pool
+
+        pool = get_model_pool()
+        pool.max_idle = max(pool.max_idle, self.concurrency)
+        for size in self.preload_sizes:
+            started = time.time()
+            models = [pool.acquire(size) for _ in range(self.concurrency)]
+            for model in models:
+                pool.release(size, model)
+            print(f"📦 Preloaded {self.concurrency}x {size} in {time.time() - started:.1f}s")
+        # Keep the collector from touching (and so un-sharing) the preloaded objects in children
+        gc.collect()
+        gc.freeze()
+
+    def _spawn(self, slot: int) -> int:
+        # Otherwise buffered parent output is written again by the child
+        sys.stdout.flush()
+        pid = os.fork()
+        if pid:
+            self.children[pid] = slot
+            return pid
+        try:
+            self._run_child(slot)
+        except BaseException as e:
+            print(f"❌ Worker {slot} crashed: {e}")
+            sys.stdout.flush()
+            os._exit(1)
+        sys.stdout.flush()
+        os._exit(0)
+
+    def _run_child(self, slot: int):
+        started = time.time()
+        # Restore default handlers; the worker installs its own drain handlers
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+        import torch
+        # Split the cores between workers instead of every worker using all of them
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // self.workers))
+
+        from task_storage import get_task_storage
+        from task_worker import TaskWorker
+        from worker_lifecycle import DrainController
+
+        drain_controller = DrainController()
+        drain_controller.install_signal_handlers()
+        print(f"🚀 Worker {slot} (pid {os.getpid()}) ready in {(time.time() - started) * 1000:.0f}ms")
+        TaskWorker(
+            get_task_storage(),
+            concurrency=self.concurrency,
+            poll_interval=self.poll_interval,
+            drain=drain_controller
+        ).run()
+        drain_controller.wait_until_drained(timeout=drain_controller.drain_timeout + drain_controller.abandon_grace)
+
+    def _forward(self, signum, frame):
+        if self.stopping:
+            # Second signal: stop waiting for drains
+            for pid in list(self.children):
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+            return
+        self.stopping = True
+        print(f"🛑 Prefork parent received {signal.Signals(signum).name}, draining {len(self.children)} workers")
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def report_memory(self):
+        parent = memory_usage(os.getpid())
+        if parent is None:
+            return
+        print(f"📊 Parent {os.getpid()}: RSS {parent.get('rss', 0) / 1024:.0f}MB, PSS {parent.get('pss', 0) / 1024:.0f}MB")
+        for pid, slot in sorted(self.children.items(), key=lambda item: item[1]):
+            usage = memory_usage(pid)
+            if usage:
+                shared = usage.get('shared_clean', 0) + usage.get('shared_dirty', 0)
+                print(f"📊 Worker {slot} ({pid}): RSS {usage.get('rss', 0) / 1024:.0f}MB, "
+                      f"PSS {usage.get('pss', 0) / 1024:.0f}MB, shared {shared / 1024:.0f}MB, "
+                      f"private {usage.get('private_dirty', 0) / 1024:.0f}MB")
+
+    def run(self):
+        """Preload, fork the workers and restart any that die until shut down."""
+        self.preload()
+        signal.signal(signal.SIGTERM, self._forward)
+        signal.signal(signal.SIGINT, self._forward)
+
+        for slot in range(self.workers):
+            self._spawn(slot)
+        print(f"🍴 Forked {self.workers} workers x {self.concurrency} concurrent tasks")
+        report_at = time.time() + float(os.getenv('PREFORK_MEMORY_REPORT_DELAY', 5))
+
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                if report_at and time.time() >= report_at:
+                    self.report_memory()
+                    report_at = None
+                time.sleep(0.5)
+                continue
+            slot = self.children.pop(pid, None)
+            if slot is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if self.stopping:
+                print(f"✅ Worker {slot} exited ({code})")
+            else:
+                print(f"⚠️ Worker {slot} exited unexpectedly ({code}), restarting")
+                time.sleep(1)
+                self._spawn(slot)
+        print("✅ All workers stopped")
+
@@ -0,0 +1,341 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Callable, Tuple
+
+# Relative share of total job time spent in each pipeline stage
+STAGE_WEIGHTS = {
+    'download': 0.35,
+    'convert': 0.10,
+    'transcribe': 0.55,
+}
+
+STAGE_ORDER = ['download', 'convert', 'transcribe']
+
+# Fallback throughput used until a stage has been measured.
+# download: bytes/s, convert and transcribe: audio-seconds/s
+DEFAULT_RATES = {
+    ('download', 'default'): 500_000.0,
+    ('convert', 'default'): 200.0,
+    ('transcribe', 'openai-api'): 30.0,
+    ('transcribe', 'local-tiny'): 8.0,
+    ('transcribe', 'local-base'): 4.0,
+    ('transcribe', 'local-small'): 1.5,
+    ('transcribe', 'local-medium'): 0.5,
+    ('transcribe', 'local-large'): 0.25,
+    # faster-whisper int8 on CPU, until measured
+    ('transcribe', 'ctranslate2-tiny'): 24.0,
+    ('transcribe', 'ctranslate2-base'): 12.0,
+    ('transcribe', 'ctranslate2-small'): 5.0,
+    ('transcribe', 'ctranslate2-medium'): 1.8,
+    ('transcribe', 'ctranslate2-large'): 0.9,
+}
+
+# Rough audio-only download size when yt-dlp doesn't report one (~64 kbit/s)
+DEFAULT_BYTES_PER_AUDIO_SECOND = 8_000.0
+
+DEFAULT_STATS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stage_stats.json')
+
+
+def engine_key(use_fast_api: bool, model_size: str, local_engine: str = 'whisper') -> str:
+    """Key used to group transcription throughput by engine and model."""
+    if use_fast_api:
+        return 'openai-api'
+    # Whisper keeps the original key so recorded throughput stays valid
+    return f"local-{model_size}" if local_engine == 'whisper' else f"{local_engine}-{model_size}"
+
+
+class ThroughputModel:
+    """
+    Exponentially weighted per-stage throughput, persisted across restarts.
+
+    Args:
+        path (str): JSON file the measurements are stored in
+        alpha (float): Weight given to each new measurement
+    """
+    def __init__(self, path: str = None, alpha: float = 0.3):
+        self.path = path or os.getenv('STAGE_STATS_PATH', DEFAULT_STATS_PATH)
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._rates: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._rates = json.load(f)
+        except (OSError, ValueError):
+            self._rates = {}
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._rates, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ Could not persist stage throughput: {e}")
+
+    @staticmethod
+    def _key(stage: str, key: str) -> str:
+        return f"{stage}:{key}"
+
+    def record(self, stage: str, key: str, units: float, seconds: float):
+        """Record that `units` of work for a stage took `seconds`."""
+        if not units or units <= 0 or seconds <= 0:
+            return
+        rate = units / seconds
+        with self._lock:
+            entry = self._rates.get(self._key(stage, key))
+            if entry:
+                entry['rate'] = (1 - self.alpha) * entry['rate'] + self.alpha * rate
+                entry['samples'] += 1
+            else:
+                entry = {'rate': rate, 'samples': 1}
+            self._rates[self._key(stage, key)] = entry
+            self._save()
+
+    def rate(self, stage: str, key: str = 'default') -> float:
+        """Current throughput estimate for a stage."""
+        with self._lock:
+            entry = self._rates.get(self._key(stage, key))
+        if entry:
+            return entry['rate']
+        return DEFAULT_RATES.get((stage, key)) or DEFAULT_RATES.get((stage, 'default'), 1.0)
+
+    def samples(self, stage: str, key: str = 'default') -> int:
+        with self._lock:
+            entry = self._rates.get(self._key(stage, key))
+        return entry['samples'] if entry else 0
+
+    def estimate_seconds(self, stage: str, key: str, units: float) -> float:
+        return units / max(self.rate(stage, key), 1e-6)
+
+    def estimate_job_seconds(self, duration: float, transcribe_key: str,
+                             size_bytes: float = None) -> Dict[str, float]:
+        """
+        Estimate wall time for a whole job.
+
+        Args:
+            duration (float): Audio duration in seconds
+            transcribe_key (str): Engine key, see `engine_key`
+            size_bytes (float): Download size, estimated from duration if unknown
+
+        Returns:
+            dict: Seconds per stage plus a 'total'
+        """
+        if size_bytes is None:
+            size_bytes = duration * DEFAULT_BYTES_PER_AUDIO_SECOND
+        estimate = {
+            'download': self.estimate_seconds('download', 'default', size_bytes),
+            'convert': self.estimate_seconds('convert', 'default', duration),
+            'transcribe': self.estimate_seconds('transcribe', transcribe_key, duration),
+        }
+        estimate['total'] = sum(estimate.values())
+        return estimate
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return json.loads(json.dumps(self._rates))
+
+
+_throughput_model = None
+_throughput_model_lock = threading.Lock()
+
+
+def get_throughput_model() -> ThroughputModel:
+    """Process-wide throughput model."""
+    global _throughput_model
+    with _throughput_model_lock:
+        if _throughput_model is None:
+            _throughput_model = ThroughputModel()
+        return _throughput_model
+
+
+class ProgressTracker:
+    """
+    Combines per-stage progress into one weighted percentage with an ETA.
+
+    Args:
+        callback (callable): Called with a status dict whenever progress is reported
+        min_interval (float): Minimum seconds between callbacks within a stage
+        throughput_model (ThroughputModel): Source of ETA estimates
+    """
+    def __init__(self, callback: Callable[[Dict[str, Any]], None] = None,
+                 min_interval: float = 0.0, throughput_model: ThroughputModel = None):
+        self.callback = callback
+        self.min_interval = min_interval
+        self.model = throughput_model or get_throughput_model()
+        self.fractions = {stage: 0.0 for stage in STAGE_ORDER}
+        self.stage = None
+        self.message = 'Initializing...'
+        self.duration = None
+        self.size_bytes = None
+        self.transcribe_key = 'local-base'
+        self._stage_started: Dict[str, float] = {}
+        self._last_emit = 0.0
+        self._lock = threading.Lock()
+
+    def set_duration(self, duration: Optional[float]):
+        if duration:
+            self.duration = float(duration)
+
+    def set_download_size(self, size_bytes: Optional[float]):
+        if size_bytes:
+            self.size_bytes = float(size_bytes)
+
+    def set_engine(self, key: str):
+        self.transcribe_key = key
+
+    def start_stage(self, stage: str, message: str = None):
+        with self._lock:
+            self.stage = stage
+            self._stage_started[stage] = time.time()
+            if message:
+                self.message = message
+        self._emit(force=True)
+
+    def update(self, stage: str, fraction: float, message: str = None):
+        with self._lock:
+            self.fractions[stage] = max(self.fractions[stage], min(max(fraction, 0.0), 1.0))
+            if message:
+                self.message = message
+        self._emit()
+
+    def finish_stage(self, stage: str, units: float = None, key: str = 'default'):
+        """Mark a stage complete and feed its measured throughput to the ETA model."""
+        started = self._stage_started.get(stage)
+        with self._lock:
+            self.fractions[stage] = 1.0
+        if started and units:
+            self.model.record(stage, key, units, time.time() - started)
+        self._emit(force=True)
+
+    @property
+    def percent(self) -> int:
+        done = sum(STAGE_WEIGHTS[s] * self.fractions[s] for s in STAGE_ORDER)
+        return int(round(100 * done / sum(STAGE_WEIGHTS.values())))
+
+    def _stage_remaining_seconds(self, stage: str) -> Optional[float]:
+        remaining = 1.0 - self.fractions[stage]
+        if remaining <= 0:
+            return 0.0
+        started = self._stage_started.get(stage)
+        if started and self.fractions[stage] > 0.05:
+            # Extrapolate from the stage's own observed pace
+            elapsed = time.time() - started
+            return elapsed * remaining / self.fractions[stage]
+        if stage == 'download':
+            size = self.size_bytes
+            if size is None and self.duration:
+                size = self.duration * DEFAULT_BYTES_PER_AUDIO_SECOND
+            if size is None:
+                return None
+            return remaining * self.model.estimate_seconds('download', 'default', size)
+        if not self.duration:
+            return None
+        key = self.transcribe_key if stage == 'transcribe' else 'default'
+        return remaining * self.model.estimate_seconds(stage, key, self.duration)
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        total = 0.0
+        for stage in STAGE_ORDER:
+            remaining = self._stage_remaining_seconds(stage)
+            if remaining is None:
+                return None
+            total += remaining
+        return total
+
+    def status(self) -> Dict[str, Any]:
+        eta = self.eta_seconds
+        return {
+            'stage': self.stage,
+            'progress': self.percent,
+            'message': self.message,
+            'eta_seconds': int(round(eta)) if eta is not None else None,
+        }
+
+    def _emit(self, force: bool = False):
+        if not self.callback:
+            return
+        now = time.time()
+        if not force and now - self._last_emit < self.min_interval:
+            return
+        self._last_emit = now
+        try:
+            self.callback(self.status())
+        except Exception as e:
+            print(f"⚠️ Progress callback failed: {e}")
+
+    def ytdlp_hook(self, d: Dict[str, Any]):
+        """yt-dlp `progress_hooks` entry reporting download bytes."""
+        if d.get('status') == 'downloading':
+            total = d.get('total_bytes') or d.get('total_bytes_estimate')
+            if total:
+                self.set_download_size(total)
+                self.update('download', d.get('downloaded_bytes', 0) / total, 'Downloading audio...')
+        elif d.get('status') == 'finished':
+            self.set_download_size(d.get('total_bytes') or d.get('downloaded_bytes'))
+            self.update('download', 1.0)
+
+    def ytdlp_postprocessor_hook(self, d: Dict[str, Any]):
+        """yt-dlp `postprocessor_hooks` entry reporting audio extraction."""
+        if d.get('status') == 'started':
+            self.update('convert', 0.1, 'Decoding audio...')
+        elif d.get('status') == 'finished':
+            self.update('convert', 0.5)
+
+
+_window_progress = threading.local()
+_whisper_tqdm_installed = False
+_whisper_tqdm_lock = threading.Lock()
+
+
+def _install_whisper_tqdm():
+    """Route whisper's per-window tqdm updates to the calling thread's callback."""
+    global _whisper_tqdm_installed
+    with _whisper_tqdm_lock:
+        if _whisper_tqdm_installed:
+            return
+        import tqdm
+        import whisper.transcribe
+
+        class _WindowProgressTqdm(tqdm.tqdm):
+            def __init__(self, *args, **kwargs):
+                self._window_callback = getattr(_window_progress, 'callback', None)
+                if self._window_callback:
+                    kwargs['disable'] = True
+                super().__init__(*args, **kwargs)
+                self._frames_done = 0
+
+            def update(self, n=1):
+                super().update(n)
+                if self._window_callback and self.total:
+                    self._frames_done += n
+                    self._window_callback(min(self._frames_done / self.total, 1.0))
+
+        class _TqdmModule:
+            tqdm = _WindowProgressTqdm
+
+        whisper.transcribe.tqdm = _TqdmModule
+        _whisper_tqdm_installed = True
+
+
+@contextmanager
+def whisper_window_progress(callback: Callable[[float], None]):
+    """
+    Report local Whisper progress as each 30 s window is decoded.
+
+    Args:
+        callback (callable): Called with the fraction of audio frames processed
+    """
+    _install_whisper_tqdm()
+    previous = getattr(_window_progress, 'callback', None)
+    _window_progress.callback = callback
+    try:
+        yield
+    finally:
+        _window_progress.callback = previous
@@ -0,0 +1,320 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List
+
+try:
+    import fcntl
+except ImportError:  # Windows: cross-process buckets are unavailable
+    fcntl = None
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a call waited longer than allowed for quota."""
+
+
+class TokenBucket:
+    """
+    In-process token bucket.
+
+    Args:
+        capacity (float): Maximum burst, e.g. the per-minute limit
+        refill_per_second (float): Steady-state rate
+    """
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.refill_per_second)
+        self._updated = now
+
+    def try_acquire(self, amount: float) -> float:
+        """
+        Take `amount` tokens if available.
+
+        Returns:
+            float: 0 if acquired, otherwise seconds until enough tokens accrue
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.refill_per_second
+
+    def refund(self, amount: float):
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    def drain(self):
+        """Empty the bucket, e.g. after the provider returned 429."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = 0.0
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+class FileTokenBucket:
+    """
+    Token bucket whose state lives in a file so several worker processes
+    share one quota. Uses wall-clock time and an exclusive flock per update.
+
+    Args:
+        path (str): State file; a `.lock` sibling is used for locking
+        capacity (float): Maximum burst
+        refill_per_second (float): Steady-state rate
+    """
+    def __init__(self, path: str, capacity: float, refill_per_second: float):
+        if fcntl is None:
+            raise RuntimeError("Cross-process rate limiting requires fcntl (POSIX)")
+        self.path = path
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def _locked_state(self):
+        with self._thread_lock, open(f"{self.path}.lock", 'a+') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        state = json.load(f)
+                except (OSError, ValueError):
+                    state = {'tokens': self.capacity, 'updated': time.time()}
+                now = time.time()
+                elapsed = max(0.0, now - state['updated'])
+                state['tokens'] = min(self.capacity, state['tokens'] + elapsed * self.refill_per_second)
+                state['updated'] = now
+                yield state
+                tmp_path = f"{self.path}.tmp.{os.getpid()}"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(state, f)
+                os.replace(tmp_path, self.path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def try_acquire(self, amount: float) -> float:
+        amount = min(amount, self.capacity)
+        with self._locked_state() as state:
+            if state['tokens'] >= amount:
+                state['tokens'] -= amount
+                return 0.0
+            return (amount - state['tokens']) / self.refill_per_second
+
+    def refund(self, amount: float):
+        with self._locked_state() as state:
+            state['tokens'] = min(self.capacity, state['tokens'] + amount)
+
+    def drain(self):
+        with self._locked_state() as state:
+            state['tokens'] = 0.0
+
+    @property
+    def available(self) -> float:
+        with self._locked_state() as state:
+            return state['tokens']
+
+
+class ApiKeySlot:
+    """Quota and concurrency state for one API key."""
+    def __init__(self, api_key: str, request_bucket, audio_bucket, max_concurrency: int, client=None):
+        self.api_key = api_key
+        self.key_id = f"...{api_key[-4:]}" if len(api_key) > 4 else '...'
+        self.request_bucket = request_bucket
+        self.audio_bucket = audio_bucket
+        self.max_concurrency = max_concurrency
+        self.client = client
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.calls = 0
+        self.throttled = 0
+
+    def load(self) -> float:
+        """Lower is better: in-flight calls first, then how depleted the request bucket is."""
+        return self.in_flight + 1 - self.request_bucket.available / self.request_bucket.capacity
+
+
+def configured_api_keys() -> List[str]:
+    """OpenAI keys from OPENAI_API_KEYS (comma separated) or OPENAI_API_KEY."""
+    keys = os.getenv('OPENAI_API_KEYS') or os.getenv('OPENAI_API_KEY') or ''
+    return [key.strip() for key in keys.split(',') if key.strip()]
+
+
+class OpenAIQuotaGovernor:
+    """
+    Process-wide (optionally cross-process) governor for OpenAI transcription
+    calls: token buckets for requests/min and audio-seconds/min per key, a
+    concurrency cap per key, and least-loaded key rotation. Calls that don't
+    fit the quota wait in line instead of failing with 429.
+
+    Args:
+        api_keys (list): Keys to rotate between
+        requests_per_minute (float): Request quota per key
+        audio_seconds_per_minute (float): Audio quota per key, 0 for unlimited
+        max_concurrency (int): Concurrent calls per key
+        shared_state_dir (str): Directory for file-backed buckets shared across processes
+        client_factory (callable): Builds a client for a key
+    """
+    def __init__(self, api_keys: List[str], requests_per_minute: float = 50,
+                 audio_seconds_per_minute: float = 0, max_concurrency: int = 4,
+                 shared_state_dir: str = None, client_factory=None):
+        self._condition = threading.Condition()
+        self.slots: List[ApiKeySlot] = []
+        self.waiting = 0
+        self.total_wait_seconds = 0.0
+        for key in api_keys:
+            self.slots.append(ApiKeySlot(
+                key,
+                self._bucket('requests', key, requests_per_minute, shared_state_dir),
+                self._bucket('audio', key, audio_seconds_per_minute, shared_state_dir)
+                if audio_seconds_per_minute else None,
+                max_concurrency,
+                client_factory(key) if client_factory else None,
+            ))
+
+    @staticmethod
+    def _bucket(kind: str, api_key: str, per_minute: float, shared_state_dir: Optional[str]):
+        if shared_state_dir:
+            os.makedirs(shared_state_dir, exist_ok=True)
+            key_hash = hashlib.sha256(api_key.encode()).hexdigest()[:12]
+            return FileTokenBucket(os.path.join(shared_state_dir, f"openai-{kind}-{key_hash}.json"),
+                                   per_minute, per_minute / 60.0)
+        return TokenBucket(per_minute, per_minute / 60.0)
+
+    def _try_slot(self, slot: ApiKeySlot, audio_seconds: float) -> float:
+        """Reserve quota on one key; returns 0 on success or seconds to wait."""
+        now = time.time()
+        if slot.blocked_until > now:
+            return slot.blocked_until - now
+        if slot.in_flight >= slot.max_concurrency:
+            return 0.05
+        wait = slot.request_bucket.try_acquire(1)
+        if wait:
+            return wait
+        if slot.audio_bucket:
+            wait = slot.audio_bucket.try_acquire(audio_seconds)
+            if wait:
+                slot.request_bucket.refund(1)
+                return wait
+        return 0.0
+
+    @contextmanager
+    def acquire(self, audio_seconds: float = 0.0, timeout: float = None):
+        """
+        Wait for quota on the least-loaded key.
+
+        Args:
+            audio_seconds (float): Audio length the call will consume
+            timeout (float): Give up after this many seconds
+
+        Yields:
+            ApiKeySlot: The key to use; its `client` is ready for requests
+
+        Raises:
+            RateLimitTimeout: If no quota became available in time
+        """
+        if not self.slots:
+            raise RuntimeError("No OpenAI API keys configured")
+        started = time.time()
+        slot = None
+        with self._condition:
+            self.waiting += 1
+            try:
+                while slot is None:
+                    waits = []
+                    for candidate in sorted(self.slots, key=lambda s: s.load()):
+                        wait = self._try_slot(candidate, audio_seconds)
+                        if not wait:
+                            slot = candidate
+                            break
+                        waits.append(wait)
+                    if slot:
+                        break
+                    sleep_for = min(min(waits), 1.0)
+                    if timeout is not None and time.time() - started + sleep_for > timeout:
+                        raise RateLimitTimeout(f"No OpenAI quota available within {timeout:.0f}s")
+                    # Releases the lock while waiting; woken early when a call finishes
+                    self._condition.wait(sleep_for)
+                slot.in_flight += 1
+                slot.calls += 1
+            finally:
+                self.waiting -= 1
+                self.total_wait_seconds += time.time() - started
+        try:
+            yield slot
+        finally:
+            with self._condition:
+                slot.in_flight -= 1
+                self._condition.notify_all()
+
+    def report_throttled(self, slot: ApiKeySlot, retry_after: float = None):
+        """Back off a key that got a 429 anyway (e.g. quota shared with other apps)."""
+        with self._condition:
+            slot.throttled += 1
+            slot.blocked_until = max(slot.blocked_until, time.time() + (retry_after or 1.0))
+        slot.request_bucket.drain()
+        print(f"🚦 OpenAI key {slot.key_id} throttled, pausing it for {retry_after or 1.0:.1f}s")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                'waiting': self.waiting,
+                'total_wait_seconds': round(self.total_wait_seconds, 2),
+                'keys': [
+                    {
+                        'key': slot.key_id,
+                        'in_flight': slot.in_flight,
+                        'calls': slot.calls,
+                        'throttled': slot.throttled,
+                        'requests_available': round(slot.request_bucket.available, 2),
+                        'audio_seconds_available': round(slot.audio_bucket.available, 1)
+                        if slot.audio_bucket else None,
+                    }
+                    for slot in self.slots
+                ],
+            }
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def _make_openai_client(api_key: str):
+    import openai
+    # Retries are handled by the caller's retry policy so the breaker sees every failure
+    return openai.OpenAI(api_key=api_key, max_retries=0, timeout=float(os.getenv('OPENAI_TIMEOUT', 120)))
+
+
+def get_openai_governor() -> OpenAIQuotaGovernor:
+    """
+    Shared governor configured from OPENAI_API_KEYS/OPENAI_API_KEY, OPENAI_RPM,
+    OPENAI_AUDIO_SECONDS_PER_MINUTE, OPENAI_MAX_CONCURRENCY and, for limits
+    shared across processes, OPENAI_RATE_LIMIT_DIR.
+    """
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = OpenAIQuotaGovernor(
+                configured_api_keys(),
+                requests_per_minute=float(os.getenv('OPENAI_RPM', 50)),
+                audio_seconds_per_minute=float(os.getenv('OPENAI_AUDIO_SECONDS_PER_MINUTE', 0)),
+                max_concurrency=int(os.getenv('OPENAI_MAX_CONCURRENCY', 4)),
+                shared_state_dir=os.getenv('OPENAI_RATE_LIMIT_DIR') or None,
+                client_factory=_make_openai_client,
+            )
+        return _governor
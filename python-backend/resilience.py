@@ -0,0 +1,221 @@
+import os
+import time
+import random
+import threading
+from typing import Callable, Optional, Dict, Any, TypeVar
+
+T = TypeVar('T')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because the dependency's breaker is open."""
+    def __init__(self, name: str, retry_in: float = 0.0):
+        super().__init__(f"Circuit breaker '{name}' is open (retry in {retry_in:.1f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class RetryPolicy:
+    """
+    Jittered exponential backoff for idempotent calls.
+
+    Args:
+        max_attempts (int): Total attempts including the first call
+        base_delay (float): Backoff ceiling for the first retry, in seconds
+        max_delay (float): Upper bound for any single backoff
+        multiplier (float): Growth factor of the ceiling per retry
+    """
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.2,
+                 max_delay: float = 2.0, multiplier: float = 2.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+
+    @classmethod
+    def from_env(cls, name: str, **defaults) -> 'RetryPolicy':
+        """Build a policy overridable via `<NAME>_RETRY_ATTEMPTS` / `<NAME>_RETRY_BASE_DELAY`."""
+        prefix = name.upper()
+        policy = cls(**defaults)
+        policy.max_attempts = int(os.getenv(f'{prefix}_RETRY_ATTEMPTS', policy.max_attempts))
+        policy.base_delay = float(os.getenv(f'{prefix}_RETRY_BASE_DELAY', policy.base_delay))
+        return policy
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number `attempt` (1-based)."""
+        ceiling = min(self.max_delay, self.base_delay * (self.multiplier ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """
+    Per-dependency breaker: after repeated failures new calls are refused
+    for a cool-down window, then a single trial call decides whether to close.
+
+    Args:
+        name (str): Dependency name, used in logs and metrics
+        failure_threshold (int): Consecutive failures that open the breaker
+        cooldown (float): Seconds to stay open before allowing a trial call
+    """
+    def __init__(self, name: str, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.total_failures = 0
+        self.total_rejections = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.time() - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Whether a call may proceed now; reserves the trial slot when half-open."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.total_rejections += 1
+            return False
+
+    def is_available(self) -> bool:
+        """Non-reserving check used to route new work away from an open breaker."""
+        return self.state != OPEN
+
+    def retry_in(self) -> float:
+        with self._lock:
+            if self._current_state() != OPEN:
+                return 0.0
+            return max(0.0, self.cooldown - (time.time() - self._opened_at))
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                print(f"✅ Circuit breaker '{self.name}' closed")
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.total_failures += 1
+            self._failures += 1
+            state = self._current_state()
+            if state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if state != OPEN:
+                    self.times_opened += 1
+                    print(f"⚡ Circuit breaker '{self.name}' opened for {self.cooldown:.0f}s "
+                          f"after {self._failures} failures")
+                self._state = OPEN
+                self._opened_at = time.time()
+                self._trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            return {
+                'state': state,
+                'consecutive_failures': self._failures,
+                'total_failures': self.total_failures,
+                'total_rejections': self.total_rejections,
+                'times_opened': self.times_opened,
+                'retry_in_seconds': round(max(0.0, self.cooldown - (time.time() - self._opened_at)), 1)
+                if state == OPEN else 0.0,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """
+    Shared breaker for a dependency. Thresholds can be tuned with
+    `<NAME>_BREAKER_FAILURES` and `<NAME>_BREAKER_COOLDOWN`.
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            prefix = name.upper()
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=int(os.getenv(f'{prefix}_BREAKER_FAILURES', 5)),
+                cooldown=float(os.getenv(f'{prefix}_BREAKER_COOLDOWN', 30)),
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+def breaker_metrics() -> Dict[str, Dict[str, Any]]:
+    """State of every breaker created so far, for the metrics endpoint."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+def retry_call(fn: Callable[[], T], policy: RetryPolicy = None,
+               breaker: Optional[CircuitBreaker] = None,
+               is_retryable: Callable[[Exception], bool] = None,
+               description: str = 'call') -> T:
+    """
+    Run an idempotent call with jittered exponential retries behind a breaker.
+
+    Only errors accepted by `is_retryable` count against the breaker; any other
+    error means the dependency answered and is re-raised immediately.
+
+    Args:
+        fn (callable): Zero-argument function performing the call
+        policy (RetryPolicy): Backoff settings
+        breaker (CircuitBreaker): Optional breaker guarding the dependency
+        is_retryable (callable): Classifies exceptions as transient
+        description (str): Used in retry log lines
+
+    Returns:
+        The value returned by `fn`
+
+    Raises:
+        CircuitOpenError: If the breaker refuses the call
+    """
+    policy = policy or RetryPolicy()
+    attempt = 0
+    while True:
+        if breaker and not breaker.allow_request():
+            raise CircuitOpenError(breaker.name, breaker.retry_in())
+        try:
+            result = fn()
+        except Exception as e:
+            retryable = is_retryable(e) if is_retryable else True
+            if breaker:
+                if retryable:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            attempt += 1
+            if not retryable or attempt >= policy.max_attempts:
+                raise
+            delay = policy.backoff(attempt)
+            print(f"🔁 {description} failed ({e}); retry {attempt}/{policy.max_attempts - 1} in {delay * 1000:.0f}ms")
+            time.sleep(delay)
+            continue
+        if breaker:
+            breaker.record_success()
+        return result
@@ -0,0 +1,135 @@
+import os
+import gzip
+import json
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Any, List
+
+from task_storage import TASK_RETENTION_DAYS, retention_cutoff
+
+
+class RetentionWorker:
+    """
+    Keeps task storage to the retention window. Each cycle it creates the
+    monthly partitions coming up, fails tasks that never finished within the
+    window, archives the finished tasks past it with their captions to gzipped
+    JSON Lines files, deletes them, and drops the monthly partitions that
+    leaves empty.
+
+    Work is throttled: tasks are archived and deleted `batch_size` at a time,
+    with a `batch_pause` between batches and at most `max_batches` per cycle,
+    so a large backlog is worked off over several cycles instead of in one
+    burst of deletes competing with the workers.
+
+    Each batch is written to its own archive file, fsynced and renamed into
+    place before its tasks are deleted. A cycle failing in between archives
+    those tasks again next time, so readers should keep one record per task id.
+
+    Args:
+        storage: Task storage to trim (TaskStorage)
+        archive_dir (str): Root of the archive; files go in one directory per task month
+        retention_days (float): Age in days after which tasks are archived
+        batch_size (int): Tasks archived and deleted per batch
+        batch_pause (float): Seconds between batches
+        max_batches (int): Batches per cycle
+        months_ahead (int): Monthly partitions kept ready past the current month
+    """
+    def __init__(self, storage, archive_dir: str = None, retention_days: float = None,
+                 batch_size: int = None, batch_pause: float = None, max_batches: int = None,
+                 months_ahead: int = None):
+        self.storage = storage
+        self.archive_dir = os.path.expanduser(archive_dir or os.getenv('RETENTION_ARCHIVE_DIR', 'archive'))
+        self.retention_days = retention_days if retention_days is not None else TASK_RETENTION_DAYS
+        if self.retention_days <= 0:
+            raise ValueError("TASK_RETENTION_DAYS must be positive")
+        self.batch_size = max(1, batch_size or int(os.getenv('RETENTION_BATCH_SIZE', 200)))
+        self.batch_pause = batch_pause if batch_pause is not None else float(os.getenv('RETENTION_BATCH_PAUSE', 2))
+        self.max_batches = max(1, max_batches or int(os.getenv('RETENTION_MAX_BATCHES', 50)))
+        self.months_ahead = months_ahead if months_ahead is not None else int(os.getenv('RETENTION_PARTITIONS_AHEAD', 3))
+        self._stop = threading.Event()
+
+    def run(self, interval: float = None):
+        """Run cycles every `interval` (RETENTION_INTERVAL) seconds until stop()"""
+        interval = interval if interval is not None else float(os.getenv('RETENTION_INTERVAL', 3600))
+        print(f"🗄️ Retention worker keeping {self.retention_days:g} days, archiving to {self.archive_dir}")
+        while not self._stop.is_set():
+            try:
+                self.run_cycle()
+            except Exception as e:
+                # Nothing is deleted before it is archived; the next cycle picks up where this one failed
+                print(f"❌ Retention cycle failed: {e}")
+            self._stop.wait(interval)
+        print("🛑 Retention worker stopped")
+
+    def stop(self):
+        self._stop.set()
+
+    def run_cycle(self) -> Dict[str, Any]:
+        """
+        One pass over the storage.
+
+        Returns:
+            dict: Partitions created and dropped, tasks expired and archived, archive files written
+        """
+        cutoff = retention_cutoff(self.retention_days)
+        stats = {'partitions_created': self.storage.ensure_partitions(self.months_ahead),
+                 'expired': self.storage.expire_stale_tasks(cutoff),
+                 'archived': 0, 'files': [], 'partitions_dropped': []}
+        if stats['partitions_created']:
+            print(f"🗓️ Created partitions {', '.join(stats['partitions_created'])}")
+        if stats['expired']:
+            print(f"⌛ Failed {stats['expired']} tasks left unfinished past the retention window")
+
+        for batch_number in range(self.max_batches):
+            if batch_number and self._stop.wait(self.batch_pause):
+                break
+            tasks = self.storage.get_expired_tasks(cutoff, self.batch_size)
+            if not tasks:
+                break
+            stats['files'].extend(self.archive(tasks))
+            stats['archived'] += self.storage.delete_tasks([task['id'] for task in tasks])
+            if len(tasks) < self.batch_size:
+                break
+
+        stats['partitions_dropped'] = self.storage.drop_expired_partitions(cutoff)
+        if stats['archived'] or stats['partitions_dropped']:
+            print(f"🗄️ Archived {stats['archived']} tasks to {len(stats['files'])} files"
+                  f"{', dropped ' + ', '.join(stats['partitions_dropped']) if stats['partitions_dropped'] else ''}")
+        return stats
+
+    def archive(self, tasks: List[Dict[str, Any]]) -> List[str]:
+        """
+        Write tasks with their captions to archive files, one per task month.
+
+        Args:
+            tasks (list): Task rows (TASK_COLUMNS)
+
+        Returns:
+            list: Paths of the files written
+        """
+        by_month: Dict[str, List[Dict[str, Any]]] = {}
+        for task in tasks:
+            record = {'task': task, 'captions': self.storage.get_stored_captions(task['id'])}
+            by_month.setdefault(str(task['created_at'])[:7], []).append(record)
+        return [self._write_file(month, records) for month, records in by_month.items()]
+
+    def _write_file(self, month: str, records: List[Dict[str, Any]]) -> str:
+        directory = os.path.join(self.archive_dir, month)
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+        path = os.path.join(directory, f"tasks-{stamp}.jsonl.gz")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6) as f:
+                for record in records:
+                    f.write((json.dumps(record, default=str) + '\n').encode('utf-8'))
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, path)
+        return path
+
+
+def read_archive(path: str) -> List[Dict[str, Any]]:
+    """Records ({'task': ..., 'captions': [...]}) of one archive file"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
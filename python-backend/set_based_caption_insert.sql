@@ -0,0 +1,36 @@
+-- Replace the row-by-row caption insert loop with a single set-based INSERT ... SELECT
+CREATE OR REPLACE FUNCTION insert_captions_for_task(
+    task_uuid UUID,
+    captions_data JSONB
+)
+RETURNS INTEGER AS $$
+DECLARE
+    inserted_count INTEGER := 0;
+BEGIN
+    -- Delete existing captions for this task
+    DELETE FROM captions WHERE task_id = task_uuid;
+    
+    -- Insert new captions, numbered in array order
+    INSERT INTO captions (
+        task_id,
+        text,
+        start_time,
+        end_time,
+        confidence,
+        sequence_order
+    )
+    SELECT
+        task_uuid,
+        c.text,
+        c.start_time::DECIMAL(10,3),
+        c.end_time::DECIMAL(10,3),
+        COALESCE(c.confidence::DECIMAL(5,4), 0.0),
+        (c.ordinality - 1)::INTEGER
+    FROM ROWS FROM (
+        jsonb_to_recordset(captions_data) AS (text TEXT, "startTime" NUMERIC, "endTime" NUMERIC, confidence NUMERIC)
+    ) WITH ORDINALITY AS c(text, start_time, end_time, confidence, ordinality);
+    
+    GET DIAGNOSTICS inserted_count = ROW_COUNT;
+    RETURN inserted_count;
+END;
+$$ LANGUAGE plpgsql;
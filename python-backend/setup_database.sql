@@ -1,14 +1,23 @@
--- Create the caption_tasks table
+-- Create the caption_tasks table, partitioned by creation month so old months
+-- can be archived and dropped whole (retention.py) and queries bounded by
+-- created_at only read the recent ones. The partition key has to be part of
+-- the primary key.
 CREATE TABLE IF NOT EXISTS caption_tasks (
-    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    id UUID DEFAULT gen_random_uuid(),
     video_url TEXT NOT NULL,
     language TEXT NOT NULL DEFAULT 'en',
     status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'processing', 'completed', 'failed')),
     captions JSONB,
     error_message TEXT,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-);
+    progress INTEGER NOT NULL DEFAULT 0 CHECK (progress >= 0 AND progress <= 100),
+    progress_message TEXT,
+    eta_seconds INTEGER,
+    deadline_seconds INTEGER,
+    quality_tier TEXT CHECK (quality_tier IN ('fast', 'balanced', 'best')),
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
 
 -- Create an index on status for faster queries
 CREATE INDEX IF NOT EXISTS idx_caption_tasks_status ON caption_tasks(status);
@@ -16,6 +25,74 @@ CREATE INDEX IF NOT EXISTS idx_caption_tasks_status ON caption_tasks(status);
 -- Create an index on created_at for ordering
 CREATE INDEX IF NOT EXISTS idx_caption_tasks_created_at ON caption_tasks(created_at DESC);
 
+-- Pending tasks only, oldest first: what every worker poll reads. Stays as small
+-- as the backlog no matter how many finished tasks the table holds.
+CREATE INDEX IF NOT EXISTS idx_caption_tasks_pending ON caption_tasks(created_at) WHERE status = 'pending';
+
+-- Monthly partitions (<table>_YYYY_MM, UTC months) of a table partitioned by a
+-- timestamp, from from_month through months_ahead months from now. Creates the
+-- ones that don't exist yet and returns their names. There is no default
+-- partition, so the retention job runs this every cycle to stay ahead of inserts.
+CREATE OR REPLACE FUNCTION ensure_monthly_partitions(
+    parent_table TEXT,
+    months_ahead INTEGER DEFAULT 3,
+    from_month TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    month_start TIMESTAMP := date_trunc('month', COALESCE(from_month, NOW()) AT TIME ZONE 'UTC');
+    last_month TIMESTAMP := date_trunc('month', NOW() AT TIME ZONE 'UTC') + make_interval(months => months_ahead);
+    partition_name TEXT;
+BEGIN
+    WHILE month_start <= last_month LOOP
+        partition_name := parent_table || '_' || to_char(month_start, 'YYYY_MM');
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, parent_table,
+                month_start AT TIME ZONE 'UTC', (month_start + INTERVAL '1 month') AT TIME ZONE 'UTC'
+            );
+            -- Policies are on the parent; the partition itself is closed to direct API access
+            EXECUTE format('ALTER TABLE %I ENABLE ROW LEVEL SECURITY', partition_name);
+            RETURN NEXT partition_name;
+        END IF;
+        month_start := month_start + INTERVAL '1 month';
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Detach and drop the monthly partitions of a table that end on or before
+-- cutoff and no longer hold any rows: the retention job archives and deletes a
+-- month's finished tasks first, so a month with unfinished ones is kept.
+-- Returns the dropped names.
+CREATE OR REPLACE FUNCTION drop_expired_partitions(parent_table TEXT, cutoff TIMESTAMPTZ)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    partition_name TEXT;
+    is_empty BOOLEAN;
+BEGIN
+    FOR partition_name IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(parent_table)
+          AND c.relname ~ ('^' || parent_table || '_[0-9]{4}_[0-9]{2}$')
+          AND (to_date(right(c.relname, 7), 'YYYY_MM') + INTERVAL '1 month') AT TIME ZONE 'UTC' <= cutoff
+        ORDER BY c.relname
+    LOOP
+        EXECUTE format('SELECT NOT EXISTS (SELECT 1 FROM %I)', partition_name) INTO is_empty;
+        IF is_empty THEN
+            -- Detaching checks nothing still references the partition's rows
+            EXECUTE format('ALTER TABLE %I DETACH PARTITION %I', parent_table, partition_name);
+            EXECUTE format('DROP TABLE %I', partition_name);
+            RETURN NEXT partition_name;
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT ensure_monthly_partitions('caption_tasks');
+
 -- Enable Row Level Security (RLS)
 ALTER TABLE caption_tasks ENABLE ROW LEVEL SECURITY;
 
@@ -37,3 +114,40 @@ CREATE TRIGGER update_caption_tasks_updated_at
     BEFORE UPDATE ON caption_tasks 
     FOR EACH ROW 
     EXECUTE FUNCTION update_updated_at_column();
+
+-- Replaced by the version taking a lower bound; both would make PostgREST calls ambiguous
+DROP FUNCTION IF EXISTS count_pending_tasks();
+
+-- Count pending tasks in the database instead of fetching them to count. With
+-- since, only partitions from that month on are read.
+CREATE OR REPLACE FUNCTION count_pending_tasks(since TIMESTAMPTZ DEFAULT NULL)
+RETURNS BIGINT AS $$
+BEGIN
+    RETURN (
+        SELECT COUNT(*) FROM caption_tasks
+        WHERE status = 'pending' AND created_at >= COALESCE(since, '-infinity')
+    );
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Apply status/progress changes for many tasks in one statement (write-behind
+-- flushes). Each element has an id plus only the columns to change.
+CREATE OR REPLACE FUNCTION apply_task_updates(updates JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    updated_count INTEGER := 0;
+BEGIN
+    UPDATE caption_tasks t
+    SET status = COALESCE(u.value->>'status', t.status),
+        error_message = CASE WHEN u.value ? 'error_message' THEN u.value->>'error_message' ELSE t.error_message END,
+        progress = COALESCE(ROUND((u.value->>'progress')::NUMERIC)::INTEGER, t.progress),
+        progress_message = CASE WHEN u.value ? 'progress_message' THEN u.value->>'progress_message' ELSE t.progress_message END,
+        eta_seconds = CASE WHEN u.value ? 'eta_seconds' THEN ROUND((u.value->>'eta_seconds')::NUMERIC)::INTEGER ELSE t.eta_seconds END,
+        updated_at = NOW()
+    FROM jsonb_array_elements(updates) AS u(value)
+    WHERE t.id = (u.value->>'id')::UUID;
+    
+    GET DIAGNOSTICS updated_count = ROW_COUNT;
+    RETURN updated_count;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,312 @@
+-- Shared transcripts for databases set up before them: the transcripts table,
+-- reference counting, the task functions that use it, and saved transcriptions
+-- moved into it. Same definitions as setup_captions_table.sql and
+-- create_saved_transcriptions_table.sql.
+
+-- Canonical transcripts (CAPTION_STORAGE=shared): one copy of a video's captions
+-- per (video, language, engine, model), referenced by tasks and saved
+-- transcriptions and deleted once nothing references it any more
+CREATE TABLE IF NOT EXISTS transcripts (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    video_id TEXT NOT NULL,
+    language TEXT NOT NULL,
+    engine TEXT NOT NULL,
+    model TEXT NOT NULL,
+    captions JSONB NOT NULL,
+    caption_count INTEGER NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    last_used_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_transcripts_key ON transcripts(video_id, language, engine, model);
+
+ALTER TABLE transcripts ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow all operations for service role" ON transcripts
+    FOR ALL USING (true);
+
+ALTER TABLE caption_tasks ADD COLUMN IF NOT EXISTS transcript_id UUID REFERENCES transcripts(id);
+
+-- Keeps transcripts.ref_count equal to the rows pointing at each transcript and
+-- deletes a transcript with its last reference. Attached to every table with a
+-- transcript_id column.
+CREATE OR REPLACE FUNCTION track_transcript_refs()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        IF OLD.transcript_id IS NOT NULL THEN
+            UPDATE transcripts SET ref_count = ref_count - 1 WHERE id = OLD.transcript_id;
+            DELETE FROM transcripts WHERE id = OLD.transcript_id AND ref_count <= 0;
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        IF NEW.transcript_id IS NOT NULL THEN
+            UPDATE transcripts SET ref_count = ref_count + 1, last_used_at = NOW() WHERE id = NEW.transcript_id;
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS caption_tasks_transcript_refs ON caption_tasks;
+CREATE TRIGGER caption_tasks_transcript_refs
+    AFTER INSERT OR DELETE ON caption_tasks
+    FOR EACH ROW EXECUTE FUNCTION track_transcript_refs();
+
+-- Progress updates don't pay for the trigger; only changed references do
+DROP TRIGGER IF EXISTS caption_tasks_transcript_ref_change ON caption_tasks;
+CREATE TRIGGER caption_tasks_transcript_ref_change
+    AFTER UPDATE ON caption_tasks
+    FOR EACH ROW WHEN (OLD.transcript_id IS DISTINCT FROM NEW.transcript_id)
+    EXECUTE FUNCTION track_transcript_refs();
+
+-- Store a task's captions as the canonical transcript for its key, point the
+-- task at it and mark the task completed. If another task stored the key first,
+-- its copy is kept and nothing is written again. Per-task copies from earlier
+-- saves are dropped.
+CREATE OR REPLACE FUNCTION save_transcript_for_task(
+    task_uuid UUID,
+    transcript_video_id TEXT,
+    transcript_language TEXT,
+    transcript_engine TEXT,
+    transcript_model TEXT,
+    captions_data JSONB
+)
+RETURNS UUID AS $$
+DECLARE
+    transcript_uuid UUID;
+BEGIN
+    INSERT INTO transcripts (video_id, language, engine, model, captions, caption_count)
+    VALUES (transcript_video_id, transcript_language, transcript_engine, transcript_model,
+            captions_data, jsonb_array_length(captions_data))
+    ON CONFLICT (video_id, language, engine, model) DO UPDATE SET last_used_at = NOW()
+    RETURNING id INTO transcript_uuid;
+    
+    DELETE FROM captions WHERE task_id = task_uuid;
+    DELETE FROM caption_blobs WHERE task_id = task_uuid;
+    
+    UPDATE caption_tasks
+    SET transcript_id = transcript_uuid,
+        status = 'completed',
+        progress = 100,
+        eta_seconds = 0,
+        updated_at = NOW()
+    WHERE id = task_uuid;
+    
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Task % not found', task_uuid;
+    END IF;
+    
+    RETURN transcript_uuid;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Complete a task from an existing transcript for its key without transcribing
+-- it again. Returns the transcript id, or NULL if there is none. The row lock
+-- waits out a concurrent release of the transcript's last reference.
+CREATE OR REPLACE FUNCTION reuse_transcript_for_task(
+    task_uuid UUID,
+    transcript_video_id TEXT,
+    transcript_language TEXT,
+    transcript_engine TEXT,
+    transcript_model TEXT
+)
+RETURNS UUID AS $$
+DECLARE
+    transcript_uuid UUID;
+BEGIN
+    SELECT t.id INTO transcript_uuid
+    FROM transcripts t
+    WHERE t.video_id = transcript_video_id
+      AND t.language = transcript_language
+      AND t.engine = transcript_engine
+      AND t.model = transcript_model
+    FOR NO KEY UPDATE;
+    
+    IF transcript_uuid IS NULL THEN
+        RETURN NULL;
+    END IF;
+    
+    DELETE FROM captions WHERE task_id = task_uuid;
+    DELETE FROM caption_blobs WHERE task_id = task_uuid;
+    
+    UPDATE caption_tasks
+    SET transcript_id = transcript_uuid,
+        status = 'completed',
+        progress = 100,
+        eta_seconds = 0,
+        error_message = NULL,
+        updated_at = NOW()
+    WHERE id = task_uuid;
+    
+    RETURN transcript_uuid;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Create a function to get captions for a task with proper ordering, from its
+-- caption rows or, for tasks stored as a shared transcript, from the transcript
+CREATE OR REPLACE FUNCTION get_captions_for_task(task_uuid UUID)
+RETURNS TABLE (
+    id UUID,
+    text TEXT,
+    start_time DECIMAL(10,3),
+    end_time DECIMAL(10,3),
+    confidence DECIMAL(5,4),
+    sequence_order INTEGER
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT 
+        c.id,
+        c.text,
+        c.start_time,
+        c.end_time,
+        c.confidence,
+        c.sequence_order
+    FROM captions c
+    WHERE c.task_id = task_uuid
+    ORDER BY c.sequence_order ASC;
+    
+    IF NOT FOUND THEN
+        RETURN QUERY
+        SELECT
+            -- Stable per-caption ids, as the app keys its list by them
+            md5(t.id::TEXT || ':' || e.ordinality)::UUID,
+            e.value->>'text',
+            (e.value->>'startTime')::DECIMAL(10,3),
+            (e.value->>'endTime')::DECIMAL(10,3),
+            (e.value->>'confidence')::DECIMAL(5,4),
+            (e.ordinality - 1)::INTEGER
+        FROM caption_tasks k
+        JOIN transcripts t ON t.id = k.transcript_id
+        CROSS JOIN LATERAL jsonb_array_elements(t.captions) WITH ORDINALITY AS e(value, ordinality)
+        WHERE k.id = task_uuid
+        ORDER BY e.ordinality;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Commit marker for caption uploads: drop rows left over from an earlier, longer
+-- upload, check every caption landed in each expected storage, and only then
+-- mark the task completed.
+CREATE OR REPLACE FUNCTION finalize_captions_for_task(
+    task_uuid UUID,
+    caption_count INTEGER,
+    expect_rows BOOLEAN DEFAULT TRUE,
+    expect_packed BOOLEAN DEFAULT FALSE
+)
+RETURNS INTEGER AS $$
+DECLARE
+    stored_count INTEGER := 0;
+    packed_count INTEGER;
+BEGIN
+    IF expect_rows THEN
+        DELETE FROM captions WHERE task_id = task_uuid AND sequence_order >= caption_count;
+        
+        SELECT COUNT(*) INTO stored_count FROM captions WHERE task_id = task_uuid;
+        IF stored_count <> caption_count THEN
+            RAISE EXCEPTION 'Task % has % of % captions stored', task_uuid, stored_count, caption_count;
+        END IF;
+    ELSE
+        -- Packed only: rows from an earlier upload would be stale
+        DELETE FROM captions WHERE task_id = task_uuid;
+    END IF;
+    
+    IF expect_packed THEN
+        SELECT b.caption_count INTO packed_count FROM caption_blobs b WHERE b.task_id = task_uuid;
+        IF packed_count IS DISTINCT FROM caption_count THEN
+            RAISE EXCEPTION 'Task % has % of % packed captions', task_uuid, packed_count, caption_count;
+        END IF;
+    ELSE
+        DELETE FROM caption_blobs WHERE task_id = task_uuid;
+    END IF;
+    
+    -- Stored per task now: release any shared transcript it pointed at
+    UPDATE caption_tasks
+    SET status = 'completed',
+        progress = 100,
+        eta_seconds = 0,
+        transcript_id = NULL,
+        updated_at = NOW()
+    WHERE id = task_uuid;
+    
+    RETURN caption_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Saved captions are stored once, in the shared transcript they came from
+ALTER TABLE saved_transcriptions ADD COLUMN IF NOT EXISTS transcript_id UUID REFERENCES transcripts(id);
+ALTER TABLE saved_transcriptions ALTER COLUMN captions DROP NOT NULL;
+
+-- Moves the captions of a saved transcription into the transcript a task
+-- produced them from, or else into one keyed by their content, so saving the
+-- same captions again stores no new copy
+CREATE OR REPLACE FUNCTION intern_saved_transcription()
+RETURNS TRIGGER AS $$
+DECLARE
+    saved_video_id TEXT;
+    saved_texts TEXT[];
+    transcript_uuid UUID;
+BEGIN
+    IF NEW.captions IS NULL OR jsonb_typeof(NEW.captions) <> 'array' THEN
+        RETURN NEW;
+    END IF;
+    
+    saved_video_id := substring(NEW.video_url FROM '(?:v=|youtu\.be/|embed/)([^&?#/]+)');
+    IF saved_video_id IS NULL THEN
+        RETURN NEW;
+    END IF;
+    
+    saved_texts := ARRAY(
+        SELECT e.value->>'text'
+        FROM jsonb_array_elements(NEW.captions) WITH ORDINALITY AS e(value, ordinality)
+        ORDER BY e.ordinality
+    );
+    
+    SELECT t.id INTO transcript_uuid
+    FROM transcripts t
+    WHERE t.video_id = saved_video_id
+      AND t.language = NEW.language
+      AND t.caption_count = cardinality(saved_texts)
+      AND ARRAY(
+          SELECT e.value->>'text'
+          FROM jsonb_array_elements(t.captions) WITH ORDINALITY AS e(value, ordinality)
+          ORDER BY e.ordinality
+      ) = saved_texts
+    ORDER BY t.last_used_at DESC
+    LIMIT 1
+    FOR NO KEY UPDATE;
+    
+    IF transcript_uuid IS NULL THEN
+        INSERT INTO transcripts (video_id, language, engine, model, captions, caption_count)
+        VALUES (saved_video_id, NEW.language, 'saved', md5(NEW.captions::TEXT),
+                NEW.captions, jsonb_array_length(NEW.captions))
+        ON CONFLICT (video_id, language, engine, model) DO UPDATE SET last_used_at = NOW()
+        RETURNING id INTO transcript_uuid;
+    END IF;
+    
+    NEW.transcript_id := transcript_uuid;
+    NEW.captions := NULL;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS saved_transcriptions_intern ON saved_transcriptions;
+CREATE TRIGGER saved_transcriptions_intern
+    BEFORE INSERT OR UPDATE OF captions ON saved_transcriptions
+    FOR EACH ROW EXECUTE FUNCTION intern_saved_transcription();
+
+DROP TRIGGER IF EXISTS saved_transcriptions_transcript_refs ON saved_transcriptions;
+CREATE TRIGGER saved_transcriptions_transcript_refs
+    AFTER INSERT OR DELETE ON saved_transcriptions
+    FOR EACH ROW EXECUTE FUNCTION track_transcript_refs();
+
+DROP TRIGGER IF EXISTS saved_transcriptions_transcript_ref_change ON saved_transcriptions;
+CREATE TRIGGER saved_transcriptions_transcript_ref_change
+    AFTER UPDATE ON saved_transcriptions
+    FOR EACH ROW WHEN (OLD.transcript_id IS DISTINCT FROM NEW.transcript_id)
+    EXECUTE FUNCTION track_transcript_refs();
+
+-- Move captions already saved into shared transcripts
+UPDATE saved_transcriptions SET captions = captions WHERE captions IS NOT NULL;
@@ -0,0 +1,582 @@
+import os
+import json
+import uuid
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
+
+from task_storage import (TaskStorage, TASK_COLUMNS, PENDING_TASK_COLUMNS, PENDING_TASK_LIMIT, STALE_TASK_ERROR,
+                          caption_storage_mode, retention_cutoff)
+from caption_window import MAX_SEGMENT_SECONDS, caption_window, decode_cursor, encode_cursor, page_size
+from caption_codec import encode_captions, decode_captions
+from transcripts import video_id_from_url
+
+# Same tables as setup_database.sql and setup_captions_table.sql, in SQLite types
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    id TEXT PRIMARY KEY,
+    video_id TEXT NOT NULL,
+    language TEXT NOT NULL,
+    engine TEXT NOT NULL,
+    model TEXT NOT NULL,
+    captions TEXT NOT NULL,
+    caption_count INTEGER NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    last_used_at TEXT NOT NULL,
+    UNIQUE (video_id, language, engine, model)
+);
+
+CREATE TABLE IF NOT EXISTS caption_tasks (
+    id TEXT PRIMARY KEY,
+    video_url TEXT NOT NULL,
+    language TEXT NOT NULL DEFAULT 'en',
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'processing', 'completed', 'failed')),
+    captions TEXT,
+    error_message TEXT,
+    progress INTEGER NOT NULL DEFAULT 0 CHECK (progress >= 0 AND progress <= 100),
+    progress_message TEXT,
+    eta_seconds INTEGER,
+    deadline_seconds INTEGER,
+    quality_tier TEXT CHECK (quality_tier IN ('fast', 'balanced', 'best')),
+    transcript_id TEXT REFERENCES transcripts(id),
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_caption_tasks_pending ON caption_tasks(created_at) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_caption_tasks_created_at ON caption_tasks(created_at);
+CREATE INDEX IF NOT EXISTS idx_caption_tasks_video_url ON caption_tasks(video_url, status);
+
+CREATE TABLE IF NOT EXISTS captions (
+    id TEXT PRIMARY KEY,
+    task_id TEXT NOT NULL REFERENCES caption_tasks(id) ON DELETE CASCADE,
+    text TEXT NOT NULL,
+    start_time REAL NOT NULL,
+    end_time REAL NOT NULL,
+    confidence REAL,
+    sequence_order INTEGER NOT NULL,
+    UNIQUE (task_id, sequence_order)
+);
+
+CREATE INDEX IF NOT EXISTS idx_captions_task_start ON captions(task_id, start_time, sequence_order);
+-- Captions longer than MAX_SEGMENT_SECONDS; normally none, so it stays tiny
+CREATE INDEX IF NOT EXISTS idx_captions_long_segments ON captions(task_id, start_time, sequence_order)
+    WHERE end_time - start_time > 30;
+
+CREATE TABLE IF NOT EXISTS caption_blobs (
+    task_id TEXT PRIMARY KEY REFERENCES caption_tasks(id) ON DELETE CASCADE,
+    caption_count INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+
+"""
+
+# Captions are NULL once moved into a shared transcript
+SAVED_TRANSCRIPTIONS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS saved_transcriptions (
+    id TEXT PRIMARY KEY,
+    video_url TEXT NOT NULL,
+    video_title TEXT NOT NULL,
+    captions TEXT,
+    language TEXT NOT NULL DEFAULT 'en',
+    transcript_id TEXT REFERENCES transcripts(id),
+    saved_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_saved_transcriptions_saved_at ON saved_transcriptions(saved_at);
+"""
+
+# Reference counting on shared transcripts, as the Postgres track_transcript_refs
+# triggers: a transcript is deleted with the last task or saved transcription using it
+TRANSCRIPT_REF_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS {table}_transcript_added AFTER INSERT ON {table}
+WHEN NEW.transcript_id IS NOT NULL
+BEGIN
+    UPDATE transcripts SET ref_count = ref_count + 1 WHERE id = NEW.transcript_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS {table}_transcript_changed AFTER UPDATE OF transcript_id ON {table}
+WHEN OLD.transcript_id IS NOT NEW.transcript_id
+BEGIN
+    UPDATE transcripts SET ref_count = ref_count + 1 WHERE id = NEW.transcript_id;
+    UPDATE transcripts SET ref_count = ref_count - 1 WHERE id = OLD.transcript_id;
+    DELETE FROM transcripts WHERE id = OLD.transcript_id AND ref_count <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS {table}_transcript_removed AFTER DELETE ON {table}
+WHEN OLD.transcript_id IS NOT NULL
+BEGIN
+    UPDATE transcripts SET ref_count = ref_count - 1 WHERE id = OLD.transcript_id;
+    DELETE FROM transcripts WHERE id = OLD.transcript_id AND ref_count <= 0;
+END;
+"""
+
+# Columns apply_task_updates may change, as in the Postgres function
+UPDATABLE_TASK_COLUMNS = ('status', 'error_message', 'progress', 'progress_message', 'eta_seconds')
+
+
+def _now() -> str:
+    # Fixed-width UTC timestamps sort correctly as text
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f+00:00')
+
+
+def _caption(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'startTime': row['start_time'],
+        'endTime': row['end_time'],
+        'confidence': row['confidence']
+    }
+
+
+class SQLiteTaskStorage(TaskStorage):
+    """
+    Task storage in an embedded SQLite database, for single-machine deployments,
+    offline development and benchmarks. Writes are local transactions instead of
+    HTTP round trips, so a status or progress update takes microseconds.
+
+    The database runs in WAL mode, so the poller and job threads read while
+    another thread writes, and several worker processes can share one file:
+    claiming is a single conditional UPDATE, as against Postgres.
+
+    Args:
+        path (str): Database file, created with its schema if missing
+        busy_timeout (float): Seconds a writer waits for another's lock before failing
+        synchronous (str): NORMAL (default) only syncs at WAL checkpoints, so a power
+            loss can drop the last commits but never corrupts the database; FULL
+            syncs every commit
+    """
+    def __init__(self, path: str, busy_timeout: float = None, synchronous: str = None):
+        self.path = path
+        self.busy_timeout = busy_timeout if busy_timeout is not None else float(os.getenv('SQLITE_BUSY_TIMEOUT', 5))
+        self.synchronous = (synchronous or os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')).upper()
+        if self.synchronous not in ('OFF', 'NORMAL', 'FULL'):
+            raise ValueError("SQLITE_SYNCHRONOUS must be OFF, NORMAL or FULL")
+        self.caption_storage = caption_storage_mode()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._create_schema(self._connection())
+        print(f"✅ SQLite task storage ready at {path}")
+
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection; sqlite3 connections must not be shared between threads"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit; writes open their own BEGIN IMMEDIATE transactions. Only this
+            # thread uses it, but close() may run on another one.
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _create_schema(self, conn: sqlite3.Connection):
+        conn.executescript(SCHEMA)
+        # Databases created before shared transcripts: add the reference column to
+        # tasks, and rebuild saved_transcriptions so its captions may be NULL
+        if 'transcript_id' not in self._columns(conn, 'caption_tasks'):
+            conn.execute("ALTER TABLE caption_tasks ADD COLUMN transcript_id TEXT REFERENCES transcripts(id)")
+        if self._columns(conn, 'saved_transcriptions') and 'transcript_id' not in self._columns(conn, 'saved_transcriptions'):
+            conn.execute("ALTER TABLE saved_transcriptions RENAME TO saved_transcriptions_old")
+            conn.execute("DROP INDEX IF EXISTS idx_saved_transcriptions_saved_at")
+        conn.executescript(SAVED_TRANSCRIPTIONS_SCHEMA)
+        if self._columns(conn, 'saved_transcriptions_old'):
+            with self._transaction() as conn:
+                conn.execute(
+                    "INSERT INTO saved_transcriptions (id, video_url, video_title, captions, language, saved_at) "
+                    "SELECT id, video_url, video_title, captions, language, saved_at FROM saved_transcriptions_old"
+                )
+                conn.execute("DROP TABLE saved_transcriptions_old")
+        for table in ('caption_tasks', 'saved_transcriptions'):
+            conn.executescript(TRANSCRIPT_REF_TRIGGERS.format(table=table))
+
+    @staticmethod
+    def _columns(conn: sqlite3.Connection, table: str) -> set:
+        return {row['name'] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction; takes the write lock up front so it can't deadlock on upgrade"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def is_transient_error(self, error: Exception) -> bool:
+        # Another process held the write lock past busy_timeout
+        return isinstance(error, sqlite3.OperationalError) and (
+            'locked' in str(error) or 'busy' in str(error)
+        )
+
+    # Tasks
+
+    def create_task(self, video_url: str, language: str = 'en', deadline_seconds: int = None,
+                    quality_tier: str = None) -> Dict[str, Any]:
+        """Queue a new pending task and return it"""
+        task_id = str(uuid.uuid4())
+        now = _now()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO caption_tasks (id, video_url, language, deadline_seconds, quality_tier, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (task_id, video_url, language, deadline_seconds, quality_tier, now, now)
+            )
+        return self.get_task(task_id)
+
+    def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """The task's row without its captions, or None"""
+        row = self._connection().execute(
+            f"SELECT {TASK_COLUMNS} FROM caption_tasks WHERE id = ?", (task_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def get_pending_tasks(self, limit: int = None) -> List[Dict[str, Any]]:
+        """Oldest pending tasks first, only the columns a worker needs, at most `limit` of them"""
+        try:
+            rows = self._connection().execute(
+                f"SELECT {PENDING_TASK_COLUMNS} FROM caption_tasks WHERE status = 'pending' AND created_at >= ? "
+                "ORDER BY created_at LIMIT ?",
+                (retention_cutoff(), limit or PENDING_TASK_LIMIT)
+            ).fetchall()
+            return [dict(row) for row in rows]
+        except sqlite3.Error as e:
+            print(f"❌ Error getting pending tasks: {e}")
+            return []
+
+    def count_pending_tasks(self) -> int:
+        """Number of pending tasks within the retention window"""
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM caption_tasks WHERE status = 'pending' AND created_at >= ?",
+            (retention_cutoff(),)
+        ).fetchone()[0]
+
+    def claim_task(self, task_id: str) -> bool:
+        """Atomically move a pending task to processing; False if another worker got it first"""
+        try:
+            with self._transaction() as conn:
+                claimed = conn.execute(
+                    "UPDATE caption_tasks SET status = 'processing', updated_at = ? WHERE id = ? AND status = 'pending'",
+                    (_now(), task_id)
+                ).rowcount == 1
+            if claimed:
+                print(f"✅ Claimed task {task_id}")
+            return claimed
+        except sqlite3.Error as e:
+            print(f"❌ Error claiming task {task_id}: {e}")
+            return False
+
+    def update_task_status(self, task_id: str, status: str, error_message: str = None):
+        """Set a task's status, and its error message if given"""
+        update = {'status': status}
+        if error_message:
+            update['error_message'] = error_message
+        try:
+            with self._transaction() as conn:
+                self._update_task(conn, task_id, update)
+            print(f"✅ Updated task {task_id} status to {status}")
+        except sqlite3.Error as e:
+            print(f"❌ Error updating task status: {e}")
+            raise
+
+    def update_task_progress(self, task_id: str, progress: int, message: str = None, eta_seconds: int = None):
+        """Report job progress; failures are logged but never fail the task"""
+        try:
+            with self._transaction() as conn:
+                self._update_task(conn, task_id, {
+                    'progress': progress,
+                    'progress_message': message,
+                    'eta_seconds': eta_seconds
+                })
+        except sqlite3.Error as e:
+            print(f"⚠️ Error updating task progress: {e}")
+
+    def apply_task_updates(self, updates: List[Dict[str, Any]]) -> int:
+        """Update several tasks in one transaction; each dict has an 'id' plus the columns to change"""
+        with self._transaction() as conn:
+            return sum(self._update_task(conn, update['id'], update) for update in updates)
+
+    def _update_task(self, conn: sqlite3.Connection, task_id: str, update: Dict[str, Any]) -> int:
+        columns = [column for column in UPDATABLE_TASK_COLUMNS if column in update]
+        values = [update[column] for column in columns]
+        if 'progress' in update and update['progress'] is not None:
+            values[columns.index('progress')] = int(round(update['progress']))
+        assignments = ''.join(f"{column} = ?, " for column in columns)
+        return conn.execute(
+            f"UPDATE caption_tasks SET {assignments}updated_at = ? WHERE id = ?",
+            (*values, _now(), task_id)
+        ).rowcount
+
+    # Captions
+
+    def save_captions(self, task_id: str, captions: list, transcript: Dict[str, str] = None):
+        """Replace a task's captions and mark it completed, all in one transaction"""
+        cleaned_captions = self.clean_captions(captions or [])
+        shared = self.shares_transcripts and transcript and cleaned_captions
+        # Shared storage without a key (not a YouTube video URL) falls back to rows
+        write_rows = not shared and self.caption_storage in ('rows', 'both', 'shared')
+        write_packed = self.caption_storage in ('packed', 'both')
+        try:
+            with self._transaction() as conn:
+                transcript_id = None
+                if shared:
+                    # The first task to store a key keeps its copy; later ones only point at it
+                    conn.execute(
+                        "INSERT INTO transcripts (id, video_id, language, engine, model, captions, caption_count, "
+                        "created_at, last_used_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT (video_id, language, engine, model) DO UPDATE SET last_used_at = excluded.last_used_at",
+                        (str(uuid.uuid4()), transcript['video_id'], transcript['language'], transcript['engine'],
+                         transcript['model'], json.dumps(cleaned_captions), len(cleaned_captions), _now(), _now())
+                    )
+                    transcript_id = self._find_transcript(conn, transcript)
+                if write_rows or shared:
+                    conn.execute("DELETE FROM captions WHERE task_id = ?", (task_id,))
+                if write_rows:
+                    conn.executemany(
+                        "INSERT INTO captions (id, task_id, text, start_time, end_time, confidence, sequence_order) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [(str(uuid.uuid4()), task_id, caption['text'], round(caption['startTime'], 3),
+                          round(caption['endTime'], 3), round(caption['confidence'], 4), order)
+                         for order, caption in enumerate(cleaned_captions)]
+                    )
+                if write_packed:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO caption_blobs (task_id, caption_count, data) VALUES (?, ?, ?)",
+                        (task_id, len(cleaned_captions), encode_captions(cleaned_captions))
+                    )
+                elif shared:
+                    conn.execute("DELETE FROM caption_blobs WHERE task_id = ?", (task_id,))
+                # Captions and completion commit together, so a task is never completed without them
+                self._complete_task(conn, task_id, transcript_id)
+            print(f"✅ Saved {len(cleaned_captions)} captions and marked task {task_id} completed")
+        except sqlite3.Error as e:
+            print(f"❌ Error saving captions: {e}")
+            raise
+
+    def reuse_transcript(self, task_id: str, transcript: Dict[str, str]) -> bool:
+        """Complete a task from the stored transcript for its key; False if there is none yet"""
+        with self._transaction() as conn:
+            transcript_id = self._find_transcript(conn, transcript)
+            if transcript_id is None:
+                return False
+            conn.execute("DELETE FROM captions WHERE task_id = ?", (task_id,))
+            conn.execute("DELETE FROM caption_blobs WHERE task_id = ?", (task_id,))
+            conn.execute("UPDATE transcripts SET last_used_at = ? WHERE id = ?", (_now(), transcript_id))
+            self._complete_task(conn, task_id, transcript_id)
+        print(f"♻️ Task {task_id} reused transcript {transcript_id}")
+        return True
+
+    def _find_transcript(self, conn: sqlite3.Connection, transcript: Dict[str, str]) -> Optional[str]:
+        row = conn.execute(
+            "SELECT id FROM transcripts WHERE video_id = ? AND language = ? AND engine = ? AND model = ?",
+            (transcript['video_id'], transcript['language'], transcript['engine'], transcript['model'])
+        ).fetchone()
+        return row['id'] if row else None
+
+    def _complete_task(self, conn: sqlite3.Connection, task_id: str, transcript_id: Optional[str]):
+        # Always setting transcript_id moves the task's reference, releasing any earlier transcript
+        conn.execute(
+            "UPDATE caption_tasks SET status = 'completed', progress = 100, eta_seconds = 0, error_message = NULL, "
+            "transcript_id = ?, updated_at = ? WHERE id = ?",
+            (transcript_id, _now(), task_id)
+        )
+
+    def get_transcript_captions(self, task_id: str):
+        """Captions of the shared transcript a task points at, or None if it has none"""
+        row = self._connection().execute(
+            "SELECT t.captions FROM caption_tasks k JOIN transcripts t ON t.id = k.transcript_id WHERE k.id = ?",
+            (task_id,)
+        ).fetchone()
+        return json.loads(row['captions']) if row else None
+
+    def _stored_caption_list(self, task_id: str):
+        """The task's captions from its packed blob or shared transcript, if it was stored as one"""
+        if self.caption_storage == 'shared':
+            return self.get_transcript_captions(task_id)
+        if self.caption_storage != 'rows':
+            return self.get_packed_captions(task_id)
+        return None
+
+    def get_packed_captions(self, task_id: str):
+        """Captions from the task's packed blob, or None if it has none"""
+        row = self._connection().execute(
+            "SELECT data FROM caption_blobs WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        return decode_captions(bytes(row['data'])) if row else None
+
+    def get_captions_for_task(self, task_id: str) -> List[Dict[str, Any]]:
+        """Get captions for a specific task, from its packed blob or shared transcript if it has one, else the captions table"""
+        stored = self._stored_caption_list(task_id)
+        if stored is not None:
+            return stored
+        return self._caption_rows(task_id)
+
+    def get_stored_captions(self, task_id: str) -> List[Dict[str, Any]]:
+        """A task's captions however they were stored, whatever CAPTION_STORAGE is now"""
+        for stored in (self.get_transcript_captions(task_id), self.get_packed_captions(task_id)):
+            if stored is not None:
+                return stored
+        return self._caption_rows(task_id)
+
+    def _caption_rows(self, task_id: str) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            "SELECT id, text, start_time, end_time, confidence FROM captions "
+            "WHERE task_id = ? ORDER BY sequence_order",
+            (task_id,)
+        ).fetchall()
+        return [_caption(row) for row in rows]
+
+    def get_captions_in_range(self, task_id: str, start: float = 0.0, end: float = None,
+                              after: str = None, limit: int = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One keyset page of the captions overlapping [start, end), and the cursor for the next page"""
+        limit = page_size(limit)
+
+        stored = self._stored_caption_list(task_id)
+        if stored is not None:
+            return caption_window(stored, start, end, after, limit)
+
+        after_start, after_sequence = decode_cursor(after) if after else (None, None)
+        # Same two index scans as the get_captions_in_range Postgres function: captions
+        # starting at most MAX_SEGMENT_SECONDS before the window, then longer ones from
+        # idx_captions_long_segments
+        window = ("AND end_time >= :start AND (:end IS NULL OR start_time < :end) "
+                  "AND (:after_start IS NULL OR (start_time, sequence_order) > (:after_start, :after_sequence)) "
+                  "ORDER BY start_time, sequence_order LIMIT :limit")
+        rows = self._connection().execute(
+            "SELECT * FROM (SELECT id, text, start_time, end_time, confidence, sequence_order FROM captions "
+            f"WHERE task_id = :task_id AND start_time >= :scan_from {window}) "
+            "UNION ALL "
+            "SELECT * FROM (SELECT id, text, start_time, end_time, confidence, sequence_order FROM captions "
+            f"WHERE task_id = :task_id AND end_time - start_time > 30 AND start_time < :scan_from {window}) "
+            "ORDER BY start_time, sequence_order LIMIT :limit",
+            {'task_id': task_id, 'start': start, 'end': end, 'scan_from': start - MAX_SEGMENT_SECONDS,
+             'after_start': after_start, 'after_sequence': after_sequence, 'limit': limit + 1}
+        ).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]['start_time'], rows[-1]['sequence_order'])
+        return [_caption(row) for row in rows], next_cursor
+
+    def check_existing_captions(self, video_url: str) -> Optional[str]:
+        """Check if we already have captions for a video URL"""
+        normalized_url = self.normalize_youtube_url(video_url)
+        row = self._connection().execute(
+            "SELECT id FROM caption_tasks WHERE video_url = ? AND status = 'completed' "
+            "ORDER BY updated_at DESC LIMIT 1",
+            (normalized_url,)
+        ).fetchone()
+        if row:
+            print(f"✅ Found existing captions for video: {normalized_url}")
+            return row['id']
+        return None
+
+    # Saved transcriptions
+
+    def save_transcription(self, video_url: str, video_title: str, captions: list, language: str = 'en') -> str:
+        """Save a transcription to the library and return its id, storing its captions as a shared transcript"""
+        transcription_id = str(uuid.uuid4())
+        with self._transaction() as conn:
+            transcript_id = self._intern_captions(conn, video_url, captions, language)
+            conn.execute(
+                "INSERT INTO saved_transcriptions (id, video_url, video_title, captions, language, transcript_id, saved_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (transcription_id, video_url, video_title, None if transcript_id else json.dumps(captions),
+                 language, transcript_id, _now())
+            )
+        return transcription_id
+
+    def _intern_captions(self, conn: sqlite3.Connection, video_url: str, captions: list, language: str) -> Optional[str]:
+        """
+        The transcript a task produced these captions from, or else one keyed by their
+        content, as the Postgres intern_saved_transcription trigger does
+        """
+        video_id = video_id_from_url(video_url)
+        if not video_id or not isinstance(captions, list):
+            return None
+        texts = [caption.get('text') for caption in captions]
+        candidates = conn.execute(
+            "SELECT id, captions FROM transcripts WHERE video_id = ? AND language = ? AND caption_count = ? "
+            "ORDER BY last_used_at DESC",
+            (video_id, language, len(captions))
+        ).fetchall()
+        for candidate in candidates:
+            if [caption.get('text') for caption in json.loads(candidate['captions'])] == texts:
+                return candidate['id']
+
+        data = json.dumps(captions)
+        key = {'video_id': video_id, 'language': language, 'engine': 'saved',
+               'model': hashlib.md5(data.encode('utf-8')).hexdigest()}
+        conn.execute(
+            "INSERT INTO transcripts (id, video_id, language, engine, model, captions, caption_count, created_at, last_used_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (video_id, language, engine, model) DO NOTHING",
+            (str(uuid.uuid4()), video_id, language, key['engine'], key['model'], data, len(captions), _now(), _now())
+        )
+        return self._find_transcript(conn, key)
+
+    def get_saved_transcriptions(self) -> List[Dict[str, Any]]:
+        """Saved transcriptions, newest first"""
+        rows = self._connection().execute(
+            "SELECT s.id, s.video_url, s.video_title, COALESCE(s.captions, t.captions) AS captions, s.language, "
+            "s.transcript_id, s.saved_at FROM saved_transcriptions s LEFT JOIN transcripts t ON t.id = s.transcript_id "
+            "ORDER BY s.saved_at DESC"
+        ).fetchall()
+        return [{**dict(row), 'captions': json.loads(row['captions'])} for row in rows]
+
+    def delete_saved_transcription(self, transcription_id: str):
+        """Remove a saved transcription"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM saved_transcriptions WHERE id = ?", (transcription_id,))
+
+    # Retention
+
+    def expire_stale_tasks(self, before: str) -> int:
+        """Fail pending and processing tasks created before `before` so they can be archived"""
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE caption_tasks SET status = 'failed', error_message = ?, updated_at = ? "
+                "WHERE status IN ('pending', 'processing') AND created_at < ?",
+                (STALE_TASK_ERROR, _now(), before)
+            ).rowcount
+
+    def get_expired_tasks(self, before: str, limit: int) -> List[Dict[str, Any]]:
+        """Completed and failed tasks created before `before`, oldest first, at most `limit`"""
+        rows = self._connection().execute(
+            f"SELECT {TASK_COLUMNS} FROM caption_tasks WHERE status IN ('completed', 'failed') AND created_at < ? "
+            "ORDER BY created_at LIMIT ?",
+            (before, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def delete_tasks(self, task_ids: List[str]) -> int:
+        """Delete tasks with their captions; the triggers release their shared transcripts"""
+        if not task_ids:
+            return 0
+        with self._transaction() as conn:
+            return conn.execute(
+                f"DELETE FROM caption_tasks WHERE id IN ({', '.join('?' * len(task_ids))})", task_ids
+            ).rowcount
@@ -0,0 +1,396 @@
+import os
+import queue
+import time
+import threading
+import itertools
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional, Dict, Any, Callable
+
+from hedging import CancellationToken, TranscriptionCancelled
+
+# Queue sentinel telling stage threads to exit
+_STOP = object()
+
+
+class StageMetrics:
+    """Counters and timings for one pipeline stage."""
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.started_at = time.time()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.busy = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.max_queue_depth = 0
+        self._lock = threading.Lock()
+
+    def on_submit(self, queue_depth: int):
+        with self._lock:
+            self.submitted += 1
+            self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+
+    def on_start(self, waited: float):
+        with self._lock:
+            self.busy += 1
+            self.wait_seconds += waited
+
+    def on_finish(self, seconds: float, ok: bool):
+        with self._lock:
+            self.busy -= 1
+            self.busy_seconds += seconds
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def snapshot(self, queue_depth: int) -> Dict[str, Any]:
+        with self._lock:
+            finished = self.completed + self.failed
+            elapsed = max(time.time() - self.started_at, 1e-6)
+            return {
+                'workers': self.workers,
+                'busy': self.busy,
+                'queued': queue_depth,
+                'max_queued': self.max_queue_depth,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'avg_wait_seconds': round(self.wait_seconds / finished, 3) if finished else None,
+                'avg_service_seconds': round(self.busy_seconds / finished, 3) if finished else None,
+                'utilization': round(min(1.0, self.busy_seconds / (elapsed * self.workers)), 3),
+            }
+
+
+class Stage:
+    """
+    A bounded queue drained by a fixed set of threads.
+
+    Args:
+        name (str): Stage name used in metrics and thread names
+        workers (int): Threads serving the queue
+        queue_size (int): Jobs that may wait; producers block beyond this
+        handler (callable): Called with each job on a stage thread; returning
+            False counts the job as failed in this stage
+    """
+    def __init__(self, name: str, workers: int, queue_size: int, handler: Callable[[Any], None]):
+        self.name = name
+        self.workers = max(1, workers)
+        self.handler = handler
+        self.metrics = StageMetrics(self.workers)
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self._threads = []
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._serve, name=f"{self.name}-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def put(self, job, timeout: float = None):
+        """Enqueue a job, blocking while the stage is full (backpressure on the previous stage)."""
+        self._queue.put((time.time(), job), timeout=timeout)
+        self.metrics.on_submit(self._queue.qsize())
+
+    def stop(self, wait: bool = True):
+        for _ in self._threads:
+            self._queue.put((time.time(), _STOP))
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _serve(self):
+        while True:
+            enqueued_at, job = self._queue.get()
+            if job is _STOP:
+                return
+            started = time.time()
+            self.metrics.on_start(started - enqueued_at)
+            ok = False
+            try:
+                ok = self.handler(job) is not False
+            except Exception as e:
+                print(f"❌ {self.name} stage error: {e}")
+            finally:
+                self.metrics.on_finish(time.time() - started, ok)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return self.metrics.snapshot(self._queue.qsize())
+
+
+class PipelineJob:
+    """One video moving through the stages."""
+    def __init__(self, transcriber, url: str, language: str, video_id: str,
+                 cancel_token: Optional[CancellationToken], routing: Dict[str, Any]):
+        self.transcriber = transcriber
+        self.url = url
+        self.language = language
+        self.video_id = video_id
+        self.cancel_token = cancel_token
+        self.routing = routing
+        self.audio_path: Optional[str] = None
+        self.wav_path: Optional[str] = None
+        self.future: Future = Future()
+
+
+# Set in each inference process by _init_inference_process
+_child_progress = None
+_child_cancelled = None
+
+
+def _init_inference_process(progress_queue, cancelled, preload_engine, preload_sizes, torch_threads):
+    """Warm the models once per inference process."""
+    global _child_progress, _child_cancelled
+    _child_progress = progress_queue
+    _child_cancelled = cancelled
+    if torch_threads and preload_engine == 'whisper':
+        import torch
+        torch.set_num_threads(torch_threads)
+    from transcription_engines import create_engine
+    for size in preload_sizes:
+        # Closing keeps the model warm in the process for the first job
+        create_engine(preload_engine, size).close()
+
+
+def _run_inference(run_id: int, engine_name: str, model_size: str, audio_path: str, language: str) -> Dict[str, Any]:
+    """Transcribe in an inference process, streaming window progress to the parent."""
+    from transcription_engines import run_engine
+
+    def on_window(fraction: float):
+        if _child_cancelled.get(run_id):
+            raise TranscriptionCancelled()
+        _child_progress.put((run_id, fraction))
+
+    return run_engine(engine_name, model_size, audio_path, language, on_window)
+
+
+def _warm_inference(model_size: str, local_engine: str):
+    """Load and exercise a model in an inference process."""
+    from engine_config import warm_local_model
+    warm_local_model(model_size, local_engine)
+    return os.getpid()
+
+
+class StagedPipeline:
+    """
+    Runs each job's stages on pools sized for the work they do, so network waits
+    overlap with CPU-bound work instead of holding one thread per job:
+
+    - download: many I/O threads running yt-dlp
+    - transcode: threads sized to cores, each driving an ffmpeg process
+    - api: I/O threads waiting on the OpenAI API
+    - inference: a small process pool with warm local engines, fed by one
+      dispatcher thread per process
+
+    Every stage has its own bounded queue and metrics.
+
+    Args:
+        download_workers (int): Concurrent downloads
+        transcode_workers (int): Concurrent ffmpeg transcodes
+        inference_processes (int): Local engine processes
+        api_workers (int): Concurrent OpenAI API calls in flight
+        queue_size (int): Per-stage queue bound
+        preload_sizes (list): Model sizes loaded when each inference process starts
+        preload_engine (str): Local engine those models are loaded for
+    """
+    def __init__(self, download_workers: int = None, transcode_workers: int = None,
+                 inference_processes: int = None, api_workers: int = None,
+                 queue_size: int = None, preload_sizes=None, preload_engine: str = None):
+        cores = os.cpu_count() or 2
+        self.download_workers = download_workers or int(os.getenv('PIPELINE_DOWNLOAD_WORKERS', 16))
+        self.transcode_workers = transcode_workers or int(os.getenv('PIPELINE_TRANSCODE_WORKERS', cores))
+        self.inference_processes = inference_processes or int(
+            os.getenv('PIPELINE_INFERENCE_PROCESSES', max(1, cores // 4))
+        )
+        self.api_workers = api_workers or int(os.getenv('PIPELINE_API_WORKERS', 8))
+        queue_size = queue_size or int(os.getenv('PIPELINE_QUEUE_SIZE', 32))
+        if preload_sizes is None:
+            preload_sizes = [s.strip() for s in os.getenv('PIPELINE_PRELOAD_MODELS', 'tiny').split(',') if s.strip()]
+        self.preload_sizes = preload_sizes
+        self.preload_engine = preload_engine or os.getenv('ENGINE_LOCAL_ENGINE', 'whisper')
+        # Split the cores between inference processes instead of oversubscribing them
+        self.torch_threads = max(1, cores // self.inference_processes)
+
+        self.stages = {
+            'download': Stage('download', self.download_workers, queue_size, self._download),
+            'transcode': Stage('transcode', self.transcode_workers, queue_size, self._transcode),
+            'api': Stage('api', self.api_workers, queue_size, self._transcribe),
+            'inference': Stage('inference', self.inference_processes, queue_size, self._transcribe),
+        }
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._progress_queue = None
+        self._cancelled = None
+        self._window_callbacks: Dict[int, Callable[[float], None]] = {}
+        self._run_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self):
+        """Start the stage threads; inference processes start on first use."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for stage in self.stages.values():
+            stage.start()
+        print(f"🏭 Staged pipeline: {self.download_workers} download, {self.transcode_workers} transcode, "
+              f"{self.api_workers} API threads, {self.inference_processes} inference processes")
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that already runs threads (and maybe torch) is unsafe
+                context = multiprocessing.get_context(os.getenv('PIPELINE_START_METHOD', 'spawn'))
+                self._manager = context.Manager()
+                self._progress_queue = self._manager.Queue()
+                self._cancelled = self._manager.dict()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.inference_processes,
+                    mp_context=context,
+                    initializer=_init_inference_process,
+                    initargs=(self._progress_queue, self._cancelled, self.preload_engine,
+                              self.preload_sizes, self.torch_threads),
+                )
+                threading.Thread(target=self._pump_progress, name='inference-progress', daemon=True).start()
+            return self._executor
+
+    def _pump_progress(self):
+        """Deliver window progress from inference processes to the jobs' callbacks."""
+        while True:
+            try:
+                item = self._progress_queue.get()
+            except (EOFError, OSError):
+                return
+            if item is None:
+                return
+            run_id, fraction = item
+            callback = self._window_callbacks.get(run_id)
+            if not callback:
+                continue
+            try:
+                callback(fraction)
+            except TranscriptionCancelled:
+                # The process stops at its next window
+                self._cancelled[run_id] = True
+            except Exception as e:
+                print(f"⚠️ Progress callback failed: {e}")
+
+    def run_local(self, engine_name: str, model_size: str, audio_path: str, language: str,
+                  on_window: Callable[[float], None]) -> Dict[str, Any]:
+        """
+        Local engine runner for YouTubeTranscriber: transcribes on a warm model
+        in an inference process and blocks until it finishes.
+        """
+        executor = self._ensure_executor()
+        run_id = next(self._run_ids)
+        if on_window:
+            self._window_callbacks[run_id] = on_window
+        try:
+            return executor.submit(_run_inference, run_id, engine_name, model_size, audio_path, language).result()
+        finally:
+            self._window_callbacks.pop(run_id, None)
+            self._cancelled.pop(run_id, None)
+
+    def warm(self, model_size: str, local_engine: str = 'whisper'):
+        """
+        Load a model size in the inference processes ahead of an engine swap.
+        Best effort: tasks are spread over the processes by the pool, not pinned.
+        """
+        executor = self._ensure_executor()
+        futures = [executor.submit(_warm_inference, model_size, local_engine) for _ in range(self.inference_processes)]
+        warmed = {future.result() for future in futures}
+        print(f"🔥 Warmed {local_engine}/{model_size} in {len(warmed)}/{self.inference_processes} inference processes")
+
+    def submit(self, transcriber, url: str, language: str = 'en',
+               progress=None, cancel_token: Optional[CancellationToken] = None, **routing) -> Future:
+        """
+        Queue a job; the future resolves to the same result as process_video.
+
+        Args:
+            transcriber (YouTubeTranscriber): Per-job transcriber, ideally built
+                with local_runner=pipeline.run_local
+            url (str): YouTube video URL
+            language (str): Language code for transcription
+            progress (ProgressTracker): Optional per-stage progress tracker
+            cancel_token (CancellationToken): Checked before every stage
+            **routing: router, deadline_seconds, quality_tier, queue_depth, task_id
+
+        Returns:
+            Future: Result dict, or None if the job failed or was cancelled
+        """
+        self.start()
+        transcriber.begin_job(progress, cancel_token)
+        job = PipelineJob(transcriber, url, language, transcriber.extract_video_id(url), cancel_token, routing)
+        if not job.video_id:
+            print("Invalid YouTube URL")
+            self._finish(job, None)
+            return job.future
+        self.stages['download'].put(job)
+        return job.future
+
+    def process_video(self, transcriber, url: str, language: str = 'en', **kwargs) -> Optional[Dict[str, Any]]:
+        """Blocking equivalent of YouTubeTranscriber.process_video on the staged pools."""
+        return self.submit(transcriber, url, language, **kwargs).result()
+
+    def _finish(self, job: PipelineJob, result: Optional[Dict[str, Any]]):
+        job.transcriber.end_job()
+        if not job.future.done():
+            job.future.set_result(result)
+
+    def _run_step(self, job: PipelineJob, step: Callable[[], Any]) -> Any:
+        """Run one stage step; any failure or cancellation ends the job with None."""
+        try:
+            if job.cancel_token:
+                job.cancel_token.raise_if_cancelled()
+            value = step()
+        except TranscriptionCancelled:
+            print("🛑 Video processing cancelled")
+            value = None
+        except Exception as e:
+            print(f"Error processing video: {str(e)}")
+            value = None
+        if value is None:
+            self._finish(job, None)
+        return value
+
+    def _download(self, job: PipelineJob):
+        job.audio_path = self._run_step(job, lambda: job.transcriber.download_stage(job.url, **job.routing))
+        if job.audio_path:
+            self.stages['transcode'].put(job)
+        return bool(job.audio_path)
+
+    def _transcode(self, job: PipelineJob):
+        job.wav_path = self._run_step(job, lambda: job.transcriber.convert_stage(job.audio_path))
+        if job.wav_path:
+            # Routed after download: API jobs wait on the network, local ones need a process
+            self.stages['api' if job.transcriber.use_fast_api else 'inference'].put(job)
+        return bool(job.wav_path)
+
+    def _transcribe(self, job: PipelineJob):
+        transcriber = job.transcriber
+
+        def transcribe_and_build():
+            transcription = transcriber.transcribe_stage(job.wav_path, job.language)
+            if not transcription:
+                return None
+            return transcriber.build_result(job.url, job.video_id, job.language, transcription)
+
+        result = self._run_step(job, transcribe_and_build)
+        if result is not None:
+            self._finish(job, result)
+        return result is not None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {name: stage.snapshot() for name, stage in self.stages.items()}
+
+    def shutdown(self, wait: bool = True):
+        """Stop the stage threads and inference processes once queued jobs finish."""
+        for name in ('download', 'transcode', 'api', 'inference'):
+            self.stages[name].stop(wait=wait)
+        if self._executor:
+            self._executor.shutdown(wait=wait)
+            self._progress_queue.put(None)
+            self._manager.shutdown()
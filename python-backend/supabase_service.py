@@ -1,11 +1,104 @@
 import os
-from supabase import create_client, Client
+import threading
+import httpx
+from postgrest import SyncPostgrestClient
+from postgrest.exceptions import APIError
+from postgrest.types import CountMethod, ReturnMethod
+from postgrest.utils import SyncClient
+from supabase import Client
+from supabase.lib.client_options import ClientOptions
 from dotenv import load_dotenv
 from datetime import datetime
+from resilience import RetryPolicy, CircuitOpenError, get_breaker, retry_call
+from http_pool import HTTPPool, get_http_pool
+from caption_upload import ChunkedUploader
+from caption_window import caption_window, decode_cursor, encode_cursor, page_size
+from caption_codec import encode_captions, decode_captions, to_postgres_bytea, from_postgres_bytea
+from task_storage import (TaskStorage, TASK_COLUMNS, PENDING_TASK_COLUMNS, PENDING_TASK_LIMIT, STALE_TASK_ERROR,
+                          caption_storage_mode, retention_cutoff)
 
 load_dotenv()
 
-class SupabaseService:
+SUPABASE_RETRY_POLICY = RetryPolicy.from_env('supabase', max_attempts=4, base_delay=0.2, max_delay=3.0)
+
+# PostgREST connection errors and Postgres serialization/deadlock/timeout codes
+RETRYABLE_POSTGREST_CODES = {'PGRST000', 'PGRST001', 'PGRST002', 'PGRST003', '40001', '40P01', '57014'}
+
+
+def is_retryable_supabase_error(error: Exception) -> bool:
+    """Network failures, 5xx responses and transient database errors are worth retrying."""
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    if isinstance(error, APIError):
+        return str(error.code) in RETRYABLE_POSTGREST_CODES
+    return False
+
+
+def copy_caption_rows(cursor, task_id: str, cleaned_captions: list) -> int:
+    """Stream cleaned captions into the captions table with COPY on a psycopg cursor"""
+    # Captions are partitioned by their task's month, which each row has to carry
+    cursor.execute("SELECT created_at FROM caption_tasks WHERE id = %s", (task_id,))
+    task = cursor.fetchone()
+    if task is None:
+        raise ValueError(f"Task {task_id} not found")
+    with cursor.copy(
+        "COPY captions (task_id, task_created_at, text, start_time, end_time, confidence, sequence_order) FROM STDIN"
+    ) as copy:
+        for order, caption in enumerate(cleaned_captions):
+            copy.write_row((
+                task_id,
+                task[0],
+                caption['text'],
+                round(caption['startTime'], 3),
+                round(caption['endTime'], 3),
+                round(caption['confidence'], 4),
+                order
+            ))
+    return len(cleaned_captions)
+
+
+def is_transient_supabase_error(error: Exception) -> bool:
+    """Errors a later attempt may get past, including an open breaker."""
+    if type(error).__module__.startswith('psycopg'):
+        return is_retryable_postgres_error(error)
+    return isinstance(error, CircuitOpenError) or is_retryable_supabase_error(error)
+
+
+def is_retryable_postgres_error(error: Exception) -> bool:
+    """Dropped connections and transient errors on a direct Postgres connection."""
+    import psycopg
+
+    if isinstance(error, psycopg.Error) and error.sqlstate:
+        return error.sqlstate in RETRYABLE_POSTGREST_CODES
+    return isinstance(error, psycopg.OperationalError)
+
+
+class PooledPostgrestClient(SyncPostgrestClient):
+    """PostgREST client whose session comes from a shared keep-alive pool"""
+    def __init__(self, base_url: str, pool: HTTPPool, **kwargs):
+        self.http_pool = pool
+        super().__init__(base_url, **kwargs)
+    
+    def create_session(self, base_url, headers, timeout) -> SyncClient:
+        # The pool's timeouts replace postgrest's 5-second default
+        return self.http_pool.client(SyncClient, base_url=base_url, headers=headers)
+
+
+class PooledSupabaseClient(Client):
+    """Supabase client that talks to PostgREST through a shared keep-alive pool"""
+    def __init__(self, supabase_url: str, supabase_key: str, pool: HTTPPool):
+        self.http_pool = pool
+        super().__init__(supabase_url, supabase_key, ClientOptions())
+        # Built now rather than lazily on first use, where two threads could race to build it
+        self.postgrest
+    
+    def _init_postgrest_client(self, rest_url, headers, schema, timeout=None):
+        return PooledPostgrestClient(rest_url, pool=self.http_pool, headers=headers, schema=schema)
+
+
+class SupabaseService(TaskStorage):
     def __init__(self):
         self.supabase_url = os.getenv('SUPABASE_URL')
         self.supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
@@ -13,7 +106,58 @@ class SupabaseService:
         if not self.supabase_url or not self.supabase_key:
             raise ValueError("Supabase credentials not found in environment variables")
         
-        self.supabase: Client = create_client(self.supabase_url, self.supabase_key)
+        # One thread-safe client for the poller and every job thread, reusing warm connections
+        self.supabase: Client = PooledSupabaseClient(
+            self.supabase_url,
+            self.supabase_key,
+            get_http_pool('supabase')
+        )
+        self.breaker = get_breaker('supabase')
+        
+        # Optional direct Postgres connection string; enables COPY for bulk caption writes
+        self.database_url = os.getenv('SUPABASE_DB_URL')
+        
+        # Long transcripts go up in chunks, so no single request hits size or timeout limits
+        self.caption_uploader = ChunkedUploader(
+            self._upsert_caption_chunk,
+            chunk_size=int(os.getenv('CAPTION_CHUNK_SIZE', 500)),
+            max_parallel=int(os.getenv('CAPTION_UPLOAD_CONCURRENCY', 4))
+        )
+        
+        self.caption_storage = caption_storage_mode()
+    
+    def _execute(self, query, description: str):
+        """Execute an idempotent PostgREST query with retries behind the Supabase breaker"""
+        return retry_call(
+            query.execute,
+            policy=SUPABASE_RETRY_POLICY,
+            breaker=self.breaker,
+            is_retryable=is_retryable_supabase_error,
+            description=description
+        )
+    
+    def is_transient_error(self, error: Exception) -> bool:
+        return is_transient_supabase_error(error)
+    
+    def create_task(self, video_url: str, language: str = 'en', deadline_seconds: int = None,
+                    quality_tier: str = None):
+        """Queue a new pending task and return it"""
+        task = {'video_url': video_url, 'language': language, 'status': 'pending'}
+        if deadline_seconds is not None:
+            task['deadline_seconds'] = deadline_seconds
+        if quality_tier is not None:
+            task['quality_tier'] = quality_tier
+        # Not retried: a lost response would queue the video twice
+        result = self.supabase.table('caption_tasks').insert(task).execute()
+        return result.data[0]
+    
+    def get_task(self, task_id: str):
+        """The task's row without its captions, or None"""
+        result = self._execute(
+            self.supabase.table('caption_tasks').select(TASK_COLUMNS).eq('id', task_id),
+            f"Task fetch for {task_id}"
+        )
+        return result.data[0] if result.data else None
     
     def update_task_status(self, task_id: str, status: str, error_message: str = None):
         """Update task status in Supabase"""
@@ -26,98 +170,325 @@ class SupabaseService:
             if error_message:
                 update_data['error_message'] = error_message
             
-            result = self.supabase.table('caption_tasks').update(update_data).eq('id', task_id).execute()
+            result = self._execute(
+                self.supabase.table('caption_tasks').update(update_data).eq('id', task_id),
+                f"Status update for task {task_id}"
+            )
             print(f"✅ Updated task {task_id} status to {status}")
             return result
         except Exception as e:
             print(f"❌ Error updating task status: {e}")
             raise
     
-    def save_captions(self, task_id: str, captions: list):
-        """Save captions to Supabase using the dedicated captions table"""
+    def apply_task_updates(self, updates: list) -> int:
+        """Update several tasks in one call; each dict has an 'id' plus the columns to change"""
+        result = self._execute(
+            self.supabase.rpc('apply_task_updates', {'updates': updates}),
+            f"Batched update of {len(updates)} tasks"
+        )
+        return int(result.data or 0)
+    
+    def claim_task(self, task_id: str) -> bool:
+        """Atomically move a pending task to processing; False if another worker got it first"""
+        try:
+            result = self._execute(
+                self.supabase.table('caption_tasks').update({
+                    'status': 'processing',
+                    'updated_at': datetime.now().isoformat()
+                }).eq('id', task_id).eq('status', 'pending'),
+                f"Claim for task {task_id}"
+            )
+            claimed = bool(result.data)
+            if claimed:
+                print(f"✅ Claimed task {task_id}")
+            return claimed
+        except Exception as e:
+            print(f"❌ Error claiming task {task_id}: {e}")
+            return False
+    
+    def update_task_progress(self, task_id: str, progress: int, message: str = None, eta_seconds: int = None):
+        """Report job progress; failures are logged but never fail the task"""
         try:
-            # First, update the task status to completed
             update_data = {
-                'status': 'completed',
+                'progress': progress,
+                'progress_message': message,
+                'eta_seconds': eta_seconds,
                 'updated_at': datetime.now().isoformat()
             }
+            # Progress is best-effort: one attempt, but still visible to the breaker
+            return retry_call(
+                self.supabase.table('caption_tasks').update(update_data).eq('id', task_id).execute,
+                policy=RetryPolicy(max_attempts=1),
+                breaker=self.breaker,
+                is_retryable=is_retryable_supabase_error,
+                description=f"Progress update for task {task_id}"
+            )
+        except Exception as e:
+            print(f"⚠️ Error updating task progress: {e}")
+            return None
+    
+    def save_captions(self, task_id: str, captions: list, transcript: dict = None):
+        """Save captions to the captions table, then mark the task completed once all of them landed"""
+        try:
+            # Clean and validate captions before saving
+            cleaned_captions = self.clean_captions(captions or [])
             
-            result = self.supabase.table('caption_tasks').update(update_data).eq('id', task_id).execute()
-            print(f"✅ Updated task {task_id} status to completed")
+            if self.shares_transcripts and transcript and cleaned_captions:
+                return self.save_transcript(task_id, transcript, cleaned_captions)
             
-            # Then, save captions to the dedicated captions table
-            if captions and len(captions) > 0:
-                # Clean and validate captions before saving
-                cleaned_captions = []
-                for caption in captions:
-                    cleaned_caption = {
-                        'text': caption.get('text', ''),
-                        'startTime': float(caption.get('startTime', 0)),
-                        'endTime': float(caption.get('endTime', 0)),
-                        'confidence': self.validate_confidence(caption.get('confidence', 0))
-                    }
-                    cleaned_captions.append(cleaned_caption)
-                
-                # Use the database function to insert captions
-                result = self.supabase.rpc('insert_captions_for_task', {
-                    'task_uuid': task_id,
-                    'captions_data': cleaned_captions
-                }).execute()
-                
-                print(f"✅ Saved {len(cleaned_captions)} captions to captions table for task {task_id}")
-            else:
+            # Shared storage without a key (not a YouTube video URL) falls back to rows
+            write_rows = self.caption_storage in ('rows', 'both', 'shared')
+            write_packed = self.caption_storage in ('packed', 'both')
+            
+            if not cleaned_captions:
                 print(f"⚠️ No captions to save for task {task_id}")
-                
+            elif write_rows and self.database_url:
+                # COPY streams all rows in one round trip, bypassing PostgREST
+                self.copy_captions(task_id, cleaned_captions)
+            elif write_rows:
+                self.upload_caption_chunks(task_id, cleaned_captions)
+            
+            if write_packed:
+                self.save_packed_captions(task_id, cleaned_captions)
+            
+            # Commit marker: only flips the task to completed if every caption is stored
+            result = self._execute(
+                self.supabase.rpc('finalize_captions_for_task', {
+                    'task_uuid': task_id,
+                    'caption_count': len(cleaned_captions),
+                    'expect_rows': write_rows,
+                    'expect_packed': write_packed
+                }),
+                f"Caption finalize for task {task_id}"
+            )
+            self.caption_uploader.forget(task_id)
+            
+            print(f"✅ Saved {len(cleaned_captions)} captions and marked task {task_id} completed")
             return result
         except Exception as e:
             print(f"❌ Error saving captions: {e}")
             raise
     
-    def validate_confidence(self, confidence):
-        """Validate and clean confidence values"""
-        try:
-            conf = float(confidence)
-            # Ensure confidence is within valid range (-1 to 1)
-            if conf < -1:
-                return -1.0
-            elif conf > 1:
-                return 1.0
-            return conf
-        except (ValueError, TypeError):
-            return 0.0
-    
-    def get_pending_tasks(self):
-        """Get all pending tasks from Supabase"""
+    def save_transcript(self, task_id: str, transcript: dict, cleaned_captions: list):
+        """Store captions once per transcript key and point the task at them, in one call"""
+        result = self._execute(
+            self.supabase.rpc('save_transcript_for_task', {
+                'task_uuid': task_id,
+                'transcript_video_id': transcript['video_id'],
+                'transcript_language': transcript['language'],
+                'transcript_engine': transcript['engine'],
+                'transcript_model': transcript['model'],
+                'captions_data': cleaned_captions
+            }),
+            f"Transcript save for task {task_id}"
+        )
+        print(f"✅ Saved {len(cleaned_captions)} captions as transcript {result.data} for task {task_id}")
+        return result
+    
+    def reuse_transcript(self, task_id: str, transcript: dict) -> bool:
+        """Complete a task from the stored transcript for its key; False if there is none yet"""
+        result = self._execute(
+            self.supabase.rpc('reuse_transcript_for_task', {
+                'task_uuid': task_id,
+                'transcript_video_id': transcript['video_id'],
+                'transcript_language': transcript['language'],
+                'transcript_engine': transcript['engine'],
+                'transcript_model': transcript['model']
+            }),
+            f"Transcript reuse for task {task_id}"
+        )
+        if not result.data:
+            return False
+        print(f"♻️ Task {task_id} reused transcript {result.data}")
+        return True
+    
+    def get_transcript_captions(self, task_id: str):
+        """Captions of the shared transcript a task points at, or None if it has none"""
+        result = self._execute(
+            self.supabase.table('caption_tasks').select('transcripts(captions)').eq('id', task_id),
+            f"Transcript fetch for task {task_id}"
+        )
+        if not result.data or not result.data[0].get('transcripts'):
+            return None
+        return result.data[0]['transcripts']['captions']
+    
+    def _stored_caption_list(self, task_id: str):
+        """The task's captions from its packed blob or shared transcript, if it was stored as one"""
+        if self.caption_storage == 'shared':
+            return self.get_transcript_captions(task_id)
+        if self.caption_storage != 'rows':
+            return self.get_packed_captions(task_id)
+        return None
+    
+    def upload_caption_chunks(self, task_id: str, cleaned_captions: list):
+        """Upsert captions in parallel chunks, resending only the chunks that haven't landed"""
+        rounds = max(1, int(os.getenv('CAPTION_UPLOAD_ROUNDS', 2)))
+        for attempt in range(1, rounds + 1):
+            try:
+                sent = self.caption_uploader.upload_all(task_id, cleaned_captions)
+                print(f"📤 Uploaded {sent} caption chunks for task {task_id}")
+                return
+            except Exception as e:
+                if attempt == rounds:
+                    raise
+                print(f"⚠️ Caption upload for task {task_id} incomplete ({e}), resuming")
+    
+    def save_packed_captions(self, task_id: str, cleaned_captions: list):
+        """Store all of a task's captions as one packed blob; replacing it makes retries safe"""
+        blob = encode_captions(cleaned_captions)
+        self._execute(
+            self.supabase.table('caption_blobs').upsert({
+                'task_id': task_id,
+                'caption_count': len(cleaned_captions),
+                'data': to_postgres_bytea(blob)
+            }, on_conflict='task_id'),
+            f"Packed caption write for task {task_id}"
+        )
+        print(f"📦 Packed {len(cleaned_captions)} captions into {len(blob)} bytes for task {task_id}")
+    
+    def get_packed_captions(self, task_id: str):
+        """Captions from the task's packed blob, or None if it has none"""
+        result = self._execute(
+            self.supabase.table('caption_blobs').select('data').eq('task_id', task_id),
+            f"Packed caption fetch for task {task_id}"
+        )
+        if not result.data:
+            return None
+        return decode_captions(from_postgres_bytea(result.data[0]['data']))
+    
+    def _upsert_caption_chunk(self, task_id: str, first_sequence: int, rows: list):
+        """Upsert one chunk by position, so resending it is safe"""
+        self._execute(
+            self.supabase.rpc('upsert_caption_chunk', {
+                'task_uuid': task_id,
+                'first_sequence': first_sequence,
+                'captions_data': rows
+            }),
+            f"Caption chunk {first_sequence}-{first_sequence + len(rows) - 1} for task {task_id}"
+        )
+    
+    def copy_captions(self, task_id: str, cleaned_captions: list) -> int:
+        """Replace a task's captions with COPY over a direct Postgres connection"""
+        import psycopg
+        
+        def copy():
+            # One transaction: a failed attempt leaves the previous captions in place
+            with psycopg.connect(self.database_url) as conn:
+                with conn.cursor() as cur:
+                    cur.execute("DELETE FROM captions WHERE task_id = %s", (task_id,))
+                    return copy_caption_rows(cur, task_id, cleaned_captions)
+        
+        return retry_call(
+            copy,
+            policy=SUPABASE_RETRY_POLICY,
+            breaker=self.breaker,
+            is_retryable=is_retryable_postgres_error,
+            description=f"Caption COPY for task {task_id}"
+        )
+    
+    def get_pending_tasks(self, limit: int = None):
+        """Oldest pending tasks first, only the columns a worker needs, at most `limit` of them"""
         try:
-            result = self.supabase.table('caption_tasks').select('*').eq('status', 'pending').execute()
+            result = self._execute(
+                self.supabase.table('caption_tasks')
+                    .select(PENDING_TASK_COLUMNS)
+                    .eq('status', 'pending')
+                    # Lets Postgres skip the partitions of months past the retention window
+                    .gte('created_at', retention_cutoff())
+                    .order('created_at')
+                    .limit(limit or PENDING_TASK_LIMIT),
+                "Pending task query"
+            )
             return result.data
         except Exception as e:
             print(f"❌ Error getting pending tasks: {e}")
             return []
     
+    def count_pending_tasks(self) -> int:
+        """Number of pending tasks within the retention window, counted in the database"""
+        result = self._execute(
+            self.supabase.rpc('count_pending_tasks', {'since': retention_cutoff()}),
+            "Pending task count"
+        )
+        return int(result.data or 0)
+    
     def get_captions_for_task(self, task_id: str):
-        """Get captions for a specific task from the captions table"""
+        """Get captions for a specific task, from its packed blob or shared transcript if it has one, else the captions table"""
         try:
-            result = self.supabase.rpc('get_captions_for_task', {
-                'task_uuid': task_id
-            }).execute()
-            
-            # Convert the result to the expected format
-            captions = []
-            for row in result.data:
-                captions.append({
-                    'id': row['id'],
-                    'text': row['text'],
-                    'startTime': float(row['start_time']),
-                    'endTime': float(row['end_time']),
-                    'confidence': float(row['confidence']) if row['confidence'] else None
-                })
-            
-            return captions
+            stored = self._stored_caption_list(task_id)
+            if stored is not None:
+                return stored
+            return self._caption_rows(task_id)
         except Exception as e:
             print(f"❌ Error getting captions for task {task_id}: {e}")
             return []
     
+    def get_stored_captions(self, task_id: str):
+        """A task's captions however they were stored, whatever CAPTION_STORAGE is now; errors raise"""
+        for read in (self.get_transcript_captions, self.get_packed_captions):
+            stored = read(task_id)
+            if stored is not None:
+                return stored
+        return self._caption_rows(task_id)
+    
+    def _caption_rows(self, task_id: str):
+        result = self._execute(
+            self.supabase.rpc('get_captions_for_task', {
+                'task_uuid': task_id
+            }),
+            f"Caption fetch for task {task_id}"
+        )
+        
+        # Convert the result to the expected format
+        captions = []
+        for row in result.data:
+            captions.append({
+                'id': row['id'],
+                'text': row['text'],
+                'startTime': float(row['start_time']),
+                'endTime': float(row['end_time']),
+                'confidence': float(row['confidence']) if row['confidence'] else None
+            })
+        
+        return captions
+    
+    def get_captions_in_range(self, task_id: str, start: float = 0.0, end: float = None,
+                              after: str = None, limit: int = None):
+        """One keyset page of the captions overlapping [start, end), and the cursor for the next page"""
+        limit = page_size(limit)
+        
+        stored = self._stored_caption_list(task_id)
+        if stored is not None:
+            return caption_window(stored, start, end, after, limit)
+        
+        after_start, after_sequence = decode_cursor(after) if after else (None, None)
+        result = self._execute(
+            self.supabase.rpc('get_captions_in_range', {
+                'task_uuid': task_id,
+                'from_time': start,
+                'to_time': end,
+                'after_start': after_start,
+                'after_sequence': after_sequence,
+                # One extra row tells whether another page follows
+                'page_size': limit + 1
+            }),
+            f"Caption range fetch for task {task_id}"
+        )
+        rows = result.data or []
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(float(rows[-1]['start_time']), rows[-1]['sequence_order'])
+        
+        captions = [{
+            'id': row['id'],
+            'text': row['text'],
+            'startTime': float(row['start_time']),
+            'endTime': float(row['end_time']),
+            'confidence': float(row['confidence']) if row['confidence'] else None
+        } for row in rows]
+        return captions, next_cursor
+    
     def check_existing_captions(self, video_url: str):
         """Check if we already have captions for a video URL"""
         try:
@@ -125,7 +496,10 @@ class SupabaseService:
             normalized_url = self.normalize_youtube_url(video_url)
             
             # Check for completed tasks with this video URL
-            result = self.supabase.table('caption_tasks').select('id, status').eq('video_url', normalized_url).eq('status', 'completed').execute()
+            result = self._execute(
+                self.supabase.table('caption_tasks').select('id, status').eq('video_url', normalized_url).eq('status', 'completed'),
+                "Existing caption lookup"
+            )
             
             if result.data and len(result.data) > 0:
                 # Get the most recent completed task
@@ -138,18 +512,100 @@ class SupabaseService:
             print(f"❌ Error checking existing captions: {e}")
             return None
     
-    def normalize_youtube_url(self, url: str):
-        """Normalize YouTube URL to handle different formats"""
-        # Remove playlist parameters and other extras
-        if '&list=' in url:
-            url = url.split('&list=')[0]
-        if '&index=' in url:
-            url = url.split('&index=')[0]
-        if '&start_radio=' in url:
-            url = url.split('&start_radio=')[0]
-        
-        # Convert mobile URLs to desktop
-        if 'm.youtube.com' in url:
-            url = url.replace('m.youtube.com', 'www.youtube.com')
-        
-        return url
+    def save_transcription(self, video_url: str, video_title: str, captions: list, language: str = 'en') -> str:
+        """Save a transcription to the library and return its id; the database moves the captions into a shared transcript"""
+        result = self.supabase.table('saved_transcriptions').insert({
+            'video_url': video_url,
+            'video_title': video_title,
+            'captions': captions,
+            'language': language,
+            'saved_at': datetime.now().isoformat()
+        }).execute()
+        return result.data[0]['id']
+    
+    def get_saved_transcriptions(self):
+        """Saved transcriptions, newest first"""
+        result = self._execute(
+            self.supabase.table('saved_transcriptions').select('*, transcripts(captions)').order('saved_at', desc=True),
+            "Saved transcription list"
+        )
+        saved = []
+        for row in result.data or []:
+            transcript = row.pop('transcripts', None)
+            if row.get('captions') is None and transcript:
+                row['captions'] = transcript['captions']
+            saved.append(row)
+        return saved
+    
+    def delete_saved_transcription(self, transcription_id: str):
+        """Remove a saved transcription"""
+        self._execute(
+            self.supabase.table('saved_transcriptions').delete().eq('id', transcription_id),
+            f"Saved transcription delete for {transcription_id}"
+        )
+    
+    def expire_stale_tasks(self, before: str) -> int:
+        """Fail pending and processing tasks created before `before` so they can be archived"""
+        result = self._execute(
+            self.supabase.table('caption_tasks')
+                .update({'status': 'failed', 'error_message': STALE_TASK_ERROR},
+                        count=CountMethod.exact, returning=ReturnMethod.minimal)
+                .in_('status', ['pending', 'processing'])
+                .lt('created_at', before),
+            "Stale task expiry"
+        )
+        return result.count or 0
+    
+    def get_expired_tasks(self, before: str, limit: int):
+        """Completed and failed tasks created before `before`, oldest first, at most `limit`; only old partitions are read"""
+        result = self._execute(
+            self.supabase.table('caption_tasks')
+                .select(TASK_COLUMNS)
+                .in_('status', ['completed', 'failed'])
+                .lt('created_at', before)
+                .order('created_at')
+                .limit(limit),
+            "Expired task query"
+        )
+        return result.data
+    
+    def delete_tasks(self, task_ids: list) -> int:
+        """Delete tasks; their captions and blobs cascade and the triggers release their shared transcripts"""
+        if not task_ids:
+            return 0
+        result = self._execute(
+            self.supabase.table('caption_tasks')
+                .delete(count=CountMethod.exact, returning=ReturnMethod.minimal)
+                .in_('id', task_ids),
+            f"Delete of {len(task_ids)} expired tasks"
+        )
+        return result.count or 0
+    
+    def ensure_partitions(self, months_ahead: int):
+        """Create the monthly task and caption partitions for the coming months"""
+        result = self._execute(
+            self.supabase.rpc('ensure_task_partitions', {'months_ahead': months_ahead}),
+            "Partition creation"
+        )
+        return result.data or []
+    
+    def drop_expired_partitions(self, before: str):
+        """Drop task and caption partitions of months before `before` that retention has emptied"""
+        result = self._execute(
+            self.supabase.rpc('drop_expired_task_partitions', {'cutoff': before}),
+            "Partition drop"
+        )
+        return result.data or []
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_supabase_service() -> SupabaseService:
+    """Shared service, created on first use so importing modules stays side-effect free"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = SupabaseService()
+        return _service
@@ -0,0 +1,235 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional, Tuple
+
+# What a worker reads from a pending task; never the (possibly large) captions column
+PENDING_TASK_COLUMNS = 'id, video_url, language, deadline_seconds, quality_tier, created_at'
+
+# A task's row without its (possibly large) captions column
+TASK_COLUMNS = ('id, video_url, language, status, error_message, progress, progress_message, '
+                'eta_seconds, deadline_seconds, quality_tier, transcript_id, created_at, updated_at')
+
+# Tasks fetched per poll; the worker claims only as many as it has free slots, and
+# the router only needs to know whether the backlog is past its degrade threshold
+PENDING_TASK_LIMIT = int(os.getenv('PENDING_TASK_LIMIT', 50))
+
+# Where captions are written: 'rows' (one row each, what the app reads), 'packed'
+# (one compressed blob per task, see caption_codec.py), 'both', or 'shared' (one
+# canonical transcript per video, language, engine and model, see transcripts.py)
+CAPTION_STORAGE_MODES = ('rows', 'packed', 'both', 'shared')
+
+TASK_STATUSES = ('pending', 'processing', 'completed', 'failed')
+
+# Tasks older than this are archived and deleted by the retention job
+# (retention.py). Pending-task polls don't look further back, so on Postgres
+# they only read the partitions of recent months.
+TASK_RETENTION_DAYS = float(os.getenv('TASK_RETENTION_DAYS', 90))
+
+# Error recorded on tasks still pending or processing when they leave the retention window
+STALE_TASK_ERROR = 'Expired before processing finished'
+
+
+def caption_storage_mode() -> str:
+    mode = os.getenv('CAPTION_STORAGE', 'rows').lower()
+    if mode not in CAPTION_STORAGE_MODES:
+        raise ValueError(f"CAPTION_STORAGE must be one of {', '.join(CAPTION_STORAGE_MODES)}")
+    return mode
+
+
+def retention_cutoff(days: float = None) -> str:
+    """UTC timestamp `days` (TASK_RETENTION_DAYS) ago, fixed-width so it compares with stored ones as text"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=TASK_RETENTION_DAYS if days is None else days)
+    return cutoff.strftime('%Y-%m-%dT%H:%M:%S.%f+00:00')
+
+
+class TaskStorage(ABC):
+    """
+    Where caption tasks, their captions and saved transcriptions live. Workers,
+    the write-behind queue and the HTTP tier only use this interface, so the
+    hosted Supabase backend and the embedded SQLite one are interchangeable.
+    """
+    caption_storage = 'rows'
+
+    @property
+    def shares_transcripts(self) -> bool:
+        """Whether tasks store and reuse canonical transcripts (CAPTION_STORAGE=shared)"""
+        return self.caption_storage == 'shared'
+
+    # Tasks
+
+    @abstractmethod
+    def create_task(self, video_url: str, language: str = 'en', deadline_seconds: int = None,
+                    quality_tier: str = None) -> Dict[str, Any]:
+        """Queue a new pending task and return it"""
+
+    @abstractmethod
+    def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """The task's row without its captions, or None"""
+
+    @abstractmethod
+    def get_pending_tasks(self, limit: int = None) -> List[Dict[str, Any]]:
+        """Oldest pending tasks within the retention window first, only PENDING_TASK_COLUMNS, at most `limit` of them"""
+
+    @abstractmethod
+    def count_pending_tasks(self) -> int:
+        """Number of pending tasks within the retention window"""
+
+    @abstractmethod
+    def claim_task(self, task_id: str) -> bool:
+        """Atomically move a pending task to processing; False if another worker got it first"""
+
+    @abstractmethod
+    def update_task_status(self, task_id: str, status: str, error_message: str = None):
+        """Set a task's status, and its error message if given"""
+
+    @abstractmethod
+    def update_task_progress(self, task_id: str, progress: int, message: str = None, eta_seconds: int = None):
+        """Report job progress; failures are logged but never fail the task"""
+
+    @abstractmethod
+    def apply_task_updates(self, updates: List[Dict[str, Any]]) -> int:
+        """Update several tasks at once; each dict has an 'id' plus only the columns to change"""
+
+    # Captions
+
+    @abstractmethod
+    def save_captions(self, task_id: str, captions: list, transcript: Dict[str, str] = None):
+        """
+        Store a task's captions, then mark it completed once all of them are stored.
+        With shared transcripts and a `transcript` key (transcripts.transcript_key),
+        they are stored once per key instead of per task.
+        """
+
+    @abstractmethod
+    def reuse_transcript(self, task_id: str, transcript: Dict[str, str]) -> bool:
+        """Complete a task from the stored transcript for its key; False if there is none yet"""
+
+    @abstractmethod
+    def get_captions_for_task(self, task_id: str) -> List[Dict[str, Any]]:
+        """All of a task's captions in order"""
+
+    @abstractmethod
+    def get_stored_captions(self, task_id: str) -> List[Dict[str, Any]]:
+        """
+        A task's captions however they were stored (rows, packed blob or shared
+        transcript), whatever CAPTION_STORAGE is now. Unlike get_captions_for_task,
+        which serves reads and logs errors, failures raise: the retention job must
+        not archive an empty list in place of captions it couldn't read.
+        """
+
+    @abstractmethod
+    def get_captions_in_range(self, task_id: str, start: float = 0.0, end: float = None,
+                              after: str = None, limit: int = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One keyset page of the captions overlapping [start, end), and the cursor for the next page"""
+
+    @abstractmethod
+    def check_existing_captions(self, video_url: str) -> Optional[str]:
+        """Id of a completed task for this video, if there is one"""
+
+    # Saved transcriptions
+
+    @abstractmethod
+    def save_transcription(self, video_url: str, video_title: str, captions: list, language: str = 'en') -> str:
+        """Save a transcription to the library and return its id"""
+
+    @abstractmethod
+    def get_saved_transcriptions(self) -> List[Dict[str, Any]]:
+        """Saved transcriptions, newest first"""
+
+    @abstractmethod
+    def delete_saved_transcription(self, transcription_id: str):
+        """Remove a saved transcription"""
+
+    # Retention (retention.py)
+
+    @abstractmethod
+    def expire_stale_tasks(self, before: str) -> int:
+        """Fail pending and processing tasks created before `before` so they can be archived; returns how many"""
+
+    @abstractmethod
+    def get_expired_tasks(self, before: str, limit: int) -> List[Dict[str, Any]]:
+        """Completed and failed tasks created before `before`, oldest first, TASK_COLUMNS only, at most `limit`"""
+
+    @abstractmethod
+    def delete_tasks(self, task_ids: List[str]) -> int:
+        """Delete tasks with their captions, releasing their shared transcripts; returns how many"""
+
+    def ensure_partitions(self, months_ahead: int) -> List[str]:
+        """Create the monthly partitions upcoming tasks need; names of the ones created"""
+        return []
+
+    def drop_expired_partitions(self, before: str) -> List[str]:
+        """Drop emptied monthly partitions that end before `before`; names of the ones dropped"""
+        return []
+
+    # Shared behaviour
+
+    def is_transient_error(self, error: Exception) -> bool:
+        """Whether a failed write may succeed if tried again later"""
+        return False
+
+    def clean_captions(self, captions: list) -> list:
+        """Captions reduced to the fields stored, with numeric times and a valid confidence"""
+        return [
+            {
+                'text': caption.get('text', ''),
+                'startTime': float(caption.get('startTime', 0)),
+                'endTime': float(caption.get('endTime', 0)),
+                'confidence': self.validate_confidence(caption.get('confidence', 0))
+            }
+            for caption in captions
+        ]
+
+    def validate_confidence(self, confidence):
+        """Validate and clean confidence values"""
+        try:
+            conf = float(confidence)
+            # Ensure confidence is within valid range (-1 to 1)
+            if conf < -1:
+                return -1.0
+            elif conf > 1:
+                return 1.0
+            return conf
+        except (ValueError, TypeError):
+            return 0.0
+
+    def normalize_youtube_url(self, url: str):
+        """Normalize YouTube URL to handle different formats"""
+        # Remove playlist parameters and other extras
+        if '&list=' in url:
+            url = url.split('&list=')[0]
+        if '&index=' in url:
+            url = url.split('&index=')[0]
+        if '&start_radio=' in url:
+            url = url.split('&start_radio=')[0]
+
+        # Convert mobile URLs to desktop
+        if 'm.youtube.com' in url:
+            url = url.replace('m.youtube.com', 'www.youtube.com')
+
+        return url
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_task_storage() -> TaskStorage:
+    """
+    Shared storage backend picked by TASK_STORAGE: 'supabase' (default, hosted)
+    or 'sqlite' (embedded, at SQLITE_PATH). Created on first use.
+    """
+    global _storage
+    backend = os.getenv('TASK_STORAGE', 'supabase').lower()
+    if backend == 'supabase':
+        from supabase_service import get_supabase_service
+        return get_supabase_service()
+    if backend != 'sqlite':
+        raise ValueError("TASK_STORAGE must be 'supabase' or 'sqlite'")
+    with _storage_lock:
+        if _storage is None:
+            from sqlite_storage import SQLiteTaskStorage
+            _storage = SQLiteTaskStorage(os.getenv('SQLITE_PATH', 'matric.db'))
+        return _storage
@@ -0,0 +1,255 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional, Callable, Dict, Any
+
+from youtube_transcriber import YouTubeTranscriber
+from progress_tracker import ProgressTracker
+from engine_router import EngineRouter
+from worker_lifecycle import DrainController
+from staged_pipeline import StagedPipeline
+from engine_config import EngineManager, get_engine_manager
+from write_behind import WriteBehindStore, write_behind_enabled
+from transcripts import configured_source, transcript_key
+
+
+class TaskWorker:
+    """
+    Claims pending tasks and transcribes them on a bounded pool of
+    worker threads. Runs either inside the HTTP process or on its own via
+    `python -m backend worker`.
+
+    Args:
+        storage: Task storage (TaskStorage: Supabase or SQLite)
+        concurrency (int): Jobs processed at the same time
+        poll_interval (float): Seconds between polls when idle
+        drain (DrainController): Shutdown coordination
+        router (EngineRouter): Engine and model-size routing
+        extra_queue_depth (callable): Other local jobs competing for this machine
+        pipeline (StagedPipeline): Run stages on dedicated download, transcode and
+            inference pools instead of one thread per job
+        engines (EngineManager): Hot-swappable engine settings for new jobs
+        write_behind (bool): Queue status, progress and caption writes and flush them
+            in the background, so jobs never wait on storage round trips
+            (default: WRITE_BEHIND)
+    """
+    def __init__(self, storage, concurrency: int = 1, poll_interval: float = None,
+                 drain: DrainController = None, router: EngineRouter = None,
+                 extra_queue_depth: Callable[[], int] = None,
+                 pipeline: Optional[StagedPipeline] = None,
+                 engines: Optional[EngineManager] = None, write_behind: bool = None):
+        if write_behind if write_behind is not None else write_behind_enabled():
+            storage = WriteBehindStore(
+                storage,
+                spool_dir=os.getenv('WRITE_BEHIND_SPOOL_DIR',
+                                    os.path.join(os.path.expanduser('~'), '.cache', 'matric', 'write-behind')),
+                flush_interval=float(os.getenv('WRITE_BEHIND_FLUSH_MS', 500)) / 1000,
+                max_batch=int(os.getenv('WRITE_BEHIND_BATCH', 50)),
+                is_retryable=storage.is_transient_error
+            )
+        self.storage = storage
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval if poll_interval is not None else float(os.getenv('WORKER_POLL_INTERVAL', 5))
+        self.drain = drain or DrainController()
+        self.pipeline = pipeline
+        self.engines = engines or get_engine_manager()
+        if pipeline:
+            # Swapped-in models have to be warm in the inference processes
+            self.engines.warmer = pipeline.warm
+        # Inference processes parallelise across jobs, so chunked runs don't pay off there
+        self.router = router or EngineRouter(max_chunk_workers=1 if pipeline else None)
+        self.extra_queue_depth = extra_queue_depth or (lambda: 0)
+        self._active = 0
+        self._slot_freed = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='transcribe')
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._writes_flushed = True
+        self.close_timeout = float(os.getenv('WRITE_BEHIND_CLOSE_TIMEOUT', 30))
+
+    @property
+    def active(self) -> int:
+        with self._slot_freed:
+            return self._active
+
+    def start(self) -> threading.Thread:
+        """Run the poll loop on a background thread."""
+        self._thread = threading.Thread(target=self.run, name='task-poller', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def wait_stopped(self, timeout: float = None) -> bool:
+        """Whether run() has finished shutting down with every queued write flushed"""
+        return self._stopped.wait(timeout) and self._writes_flushed
+
+    def run(self):
+        """Poll and claim tasks until a drain starts, then wait for running jobs."""
+        # A signal-triggered exit waits for the shutdown below, not just the drain
+        self.drain.add_exit_barrier(lambda: self.wait_stopped(self.close_timeout + self.drain.abandon_grace))
+        try:
+            self._poll()
+        finally:
+            self._shutdown()
+
+    def _poll(self):
+        print(f"🔄 Background processor started - {self.concurrency} slots, polling every {self.poll_interval:.0f}s")
+        while self.drain.should_accept():
+            try:
+                free = self.concurrency - self.active
+                if free <= 0:
+                    # Wake up as soon as a slot frees instead of sleeping a full interval
+                    with self._slot_freed:
+                        self._slot_freed.wait_for(lambda: self._active < self.concurrency, timeout=self.poll_interval)
+                    continue
+
+                # Get pending tasks from storage
+                pending_tasks = self.storage.get_pending_tasks()
+                print(f"📊 Found {len(pending_tasks)} pending tasks")
+
+                claimed = 0
+                for index, task in enumerate(pending_tasks):
+                    if claimed >= free or not self.drain.should_accept():
+                        break
+                    # Another worker may have taken it since the poll
+                    if not self.storage.claim_task(task['id']):
+                        continue
+                    claimed += 1
+                    self._submit(task, queue_depth=len(pending_tasks) - index - 1)
+
+                if claimed < free:
+                    # Wait before checking for new tasks
+                    time.sleep(self.poll_interval)
+
+            except Exception as e:
+                print(f"❌ Error in background processor: {e}")
+                print(f"   Error details: {str(e)}")
+                time.sleep(self.poll_interval * 2)
+
+        print("🛑 Background processor stopped claiming tasks")
+
+    def _shutdown(self):
+        try:
+            self._executor.shutdown(wait=True)
+            if self.pipeline:
+                self.pipeline.shutdown()
+            if isinstance(self.storage, WriteBehindStore):
+                # Queued writes, including drain hand-backs, land before the process exits;
+                # what doesn't stays in the spool for the next worker to replay
+                self._writes_flushed = self.storage.close(timeout=self.close_timeout)
+        finally:
+            self._stopped.set()
+
+    def _submit(self, task: Dict[str, Any], queue_depth: int):
+        with self._slot_freed:
+            self._active += 1
+
+        def run_and_release():
+            try:
+                self.process_task(task, queue_depth)
+            finally:
+                with self._slot_freed:
+                    self._active -= 1
+                    self._slot_freed.notify_all()
+
+        self._executor.submit(run_and_release)
+
+    def process_task(self, task: Dict[str, Any], queue_depth: int = 0):
+        """Process one claimed task, handing it back to pending if a drain cancels it"""
+        print(f"🔄 Processing task: {task['id']}")
+        print(f"   Video URL: {task['video_url']}")
+        print(f"   Language: {task['language']}")
+
+        def requeue():
+            self.storage.update_task_status(task['id'], 'pending')
+
+        with self.drain.track(task['id'], 'supabase', requeue=requeue) as cancel_token, \
+                self.engines.checkout() as engine:
+            transcriber = None
+            try:
+                # Someone already transcribed this video with the same engine and model
+                transcript = transcript_key(task['video_url'], task['language'], engine) \
+                    if self.storage.shares_transcripts else None
+                if transcript and self.storage.reuse_transcript(task['id'], transcript):
+                    print(f"✅ Task {task['id']} completed from a shared transcript")
+                    return
+
+                # Initialize transcriber with fast API enabled and optimized for speed
+                print(f"   Initializing transcriber with fast API and speed optimizations...")
+                transcriber = YouTubeTranscriber(
+                    model_size=engine.model_size,
+                    use_fast_api=engine.use_fast_api,
+                    hedge_short_clips=engine.hedge_short_clips,
+                    local_engine=engine.local_engine,
+                    local_runner=self.pipeline.run_local if self.pipeline else None
+                )
+
+                # Report progress to storage at most every few seconds
+                def report_progress(status):
+                    self.storage.update_task_progress(
+                        task['id'],
+                        status['progress'],
+                        status['message'],
+                        status['eta_seconds']
+                    )
+                progress = ProgressTracker(callback=report_progress, min_interval=3.0)
+
+                # Process video
+                print(f"   Processing video...")
+                run = partial(self.pipeline.process_video, transcriber) if self.pipeline else transcriber.process_video
+                result = run(
+                    task['video_url'],
+                    task['language'],
+                    progress=progress,
+                    router=self.router,
+                    deadline_seconds=task.get('deadline_seconds'),
+                    quality_tier=task.get('quality_tier') or engine.quality_tier,
+                    queue_depth=queue_depth + self.active - 1 + self.extra_queue_depth(),
+                    task_id=task['id'],
+                    cancel_token=cancel_token
+                )
+
+                if self.drain.handed_back(task['id']):
+                    # The drain already returned this task to the queue
+                    return
+
+                if result and result.get('captions'):
+                    if transcript:
+                        # Only share what the configured engine and model produced, not a
+                        # routed-down size, a hedged local win or a fallback
+                        transcript = transcript_key(task['video_url'], task['language'], engine,
+                                                    source=result.get('produced_by') or {})
+                        if not transcript:
+                            print(f"   Transcribed with {result.get('produced_by')}, not sharing it as "
+                                  f"{configured_source(engine)}")
+                    # Save captions to storage
+                    print(f"   Saving {len(result['captions'])} captions...")
+                    self.storage.save_captions(task['id'], result['captions'], transcript=transcript)
+                    print(f"✅ Task {task['id']} completed successfully")
+                elif cancel_token.cancelled:
+                    # Shutting down: let another worker redo it instead of failing it
+                    print(f"↩️ Task {task['id']} interrupted by drain, returning to pending")
+                    requeue()
+                else:
+                    # Update status to failed
+                    print(f"   No captions generated, marking as failed")
+                    self.storage.update_task_status(
+                        task['id'],
+                        'failed',
+                        'No captions generated'
+                    )
+                    print(f"❌ Task {task['id']} failed - no captions")
+
+            except Exception as e:
+                print(f"❌ Error processing task {task['id']}: {e}")
+                print(f"   Error details: {str(e)}")
+                self.storage.update_task_status(
+                    task['id'],
+                    'failed',
+                    str(e)
+                )
+            finally:
+                # Clean up
+                if transcriber:
+                    transcriber.cleanup()
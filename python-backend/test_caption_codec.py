@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test script for the packed caption format.
+"""
+
+from caption_codec import encode_captions, decode_captions, to_postgres_bytea, from_postgres_bytea
+
+
+def test_round_trip_keeps_captions():
+    """Times survive to the millisecond, confidence to 1/127, text exactly."""
+    print("🧪 Testing round trip...")
+    captions = [
+        {'text': 'Hello there', 'startTime': 0.0, 'endTime': 2.5, 'confidence': -0.25},
+        {'text': 'Grüße, 世界 🎬', 'startTime': 2.5, 'endTime': 4.123, 'confidence': 0.9},
+        {'text': '', 'startTime': 4.2, 'endTime': 4.2, 'confidence': None},
+        # Out of order and overlapping segments still round-trip
+        {'text': 'line one\nline two', 'startTime': 3.9, 'endTime': 7.0004, 'confidence': 1.0},
+    ]
+    decoded = decode_captions(encode_captions(captions))
+
+    assert len(decoded) == len(captions)
+    for original, restored in zip(captions, decoded):
+        assert restored['text'] == original['text']
+        assert abs(restored['startTime'] - original['startTime']) <= 0.0005, restored
+        assert abs(restored['endTime'] - original['endTime']) <= 0.0005, restored
+        assert abs(restored['confidence'] - (original['confidence'] or 0)) <= 0.5 / 127 + 1e-9, restored
+    assert decode_captions(encode_captions([])) == []
+
+    print("✅ Captions restored within quantization")
+
+
+def test_packed_is_much_smaller_than_json():
+    """A long transcript packs to a fraction of its JSON size."""
+    print("🧪 Testing size...")
+    import json
+    words = ['so', 'the', 'model', 'we', 'trained', 'here', 'really', 'does', 'work', 'on', 'long', 'videos']
+    captions = [
+        {
+            'text': ' '.join(words[(i + j) % len(words)] for j in range(8)),
+            'startTime': i * 3.2,
+            'endTime': i * 3.2 + 3.0,
+            'confidence': -0.1 - (i % 5) * 0.03,
+        }
+        for i in range(5000)
+    ]
+    packed = encode_captions(captions)
+    as_json = json.dumps(captions).encode('utf-8')
+
+    assert len(packed) * 10 < len(as_json), (len(packed), len(as_json))
+    assert decode_captions(packed)[4999]['text'] == captions[4999]['text']
+
+    print(f"✅ {len(as_json)} bytes of JSON packed into {len(packed)}")
+
+
+def test_bytea_transport_and_damage():
+    """Blobs survive PostgREST's hex bytea encoding; foreign or cut-off blobs are rejected."""
+    print("🧪 Testing bytea encoding and damaged blobs...")
+    blob = encode_captions([{'text': 'hi', 'startTime': 1, 'endTime': 2, 'confidence': 0.5}])
+    assert from_postgres_bytea(to_postgres_bytea(blob)) == blob
+    assert from_postgres_bytea(memoryview(blob)) == blob
+
+    for damaged in (b'JSON[]', blob[:5], blob[:-3]):
+        try:
+            decode_captions(damaged)
+            raise AssertionError(f"{damaged!r} should not decode")
+        except ValueError:
+            pass
+
+    print("✅ Hex round trip works, damaged blobs raise ValueError")
+
+
+def main():
+    print("🚀 Caption Codec Tests")
+    print("=" * 50)
+    tests = [
+        test_round_trip_keeps_captions,
+        test_packed_is_much_smaller_than_json,
+        test_bytea_transport_and_damage,
+    ]
+    for test in tests:
+        test()
+    print(f"\n📊 {len(tests)}/{len(tests)} tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test script for chunked caption uploads.
+"""
+
+import time
+import threading
+
+from caption_upload import ChunkedUploader, chunk_captions
+from conftest import make_captions
+
+
+def test_chunks_cover_every_position():
+    """Chunks are consecutive, tagged with their first position, and the last one may be short."""
+    print("🧪 Testing chunking...")
+    captions = make_captions(1050)
+    chunks = chunk_captions(captions, 500)
+
+    assert [first for first, _ in chunks] == [0, 500, 1000], chunks
+    assert [len(rows) for _, rows in chunks] == [500, 500, 50]
+    assert [row for _, rows in chunks for row in rows] == captions
+    assert chunk_captions([], 500) == []
+
+    print("✅ 1050 captions split into 500/500/50")
+
+
+def test_parallelism_is_bounded():
+    """No more than max_parallel chunks are in flight at once."""
+    print("🧪 Testing bounded parallelism...")
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+    stored = {}
+
+    def upload(task_id, first_sequence, rows):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.02)
+        with lock:
+            in_flight -= 1
+            for offset, row in enumerate(rows):
+                stored[first_sequence + offset] = row
+
+    uploader = ChunkedUploader(upload, chunk_size=10, max_parallel=3)
+    captions = make_captions(200)
+    assert uploader.upload_all('task', captions) == 20
+
+    assert peak <= 3, peak
+    assert [stored[i] for i in range(200)] == captions
+
+    print(f"✅ 20 chunks uploaded with at most {peak} in flight")
+
+
+def test_failed_upload_resumes_missing_chunks():
+    """After a failure, only chunks that didn't land are sent again; changed captions are resent."""
+    print("🧪 Testing resume...")
+    sent = []
+    failing = {20}
+
+    def upload(task_id, first_sequence, rows):
+        if first_sequence in failing:
+            failing.discard(first_sequence)
+            raise ConnectionError("statement timeout")
+        sent.append(first_sequence)
+
+    uploader = ChunkedUploader(upload, chunk_size=10, max_parallel=1)
+    captions = make_captions(40)
+    try:
+        uploader.upload_all('task', captions)
+        raise AssertionError("chunk error should propagate")
+    except ConnectionError:
+        pass
+    first_round = list(sent)
+    assert 20 not in first_round
+
+    sent.clear()
+    uploader.upload_all('task', captions)
+    assert sorted(sent) == sorted({0, 10, 20, 30} - set(first_round)), (first_round, sent)
+
+    # Re-transcribed captions differ, so nothing is skipped
+    sent.clear()
+    captions[0] = dict(captions[0], text='corrected')
+    uploader.upload_all('task', captions)
+    assert sent == [0], sent
+
+    uploader.forget('task')
+    assert uploader.landed('task') == set()
+
+    print("✅ Second attempt sent only the missing chunks")
+
+
+def main():
+    print("🚀 Caption Upload Tests")
+    print("=" * 50)
+    tests = [
+        test_chunks_cover_every_position,
+        test_parallelism_is_bounded,
+        test_failed_upload_resumes_missing_chunks,
+    ]
+    for test in tests:
+        test()
+    print(f"\n📊 {len(tests)}/{len(tests)} tests passed")
+
+
+if __name__ == "__main__":
+    main()
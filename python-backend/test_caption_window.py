@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script for time-range caption windows.
+"""
+
+from caption_window import caption_window, decode_cursor, encode_cursor
+from conftest import make_captions
+
+
+def test_window_returns_overlapping_captions():
+    """Captions that overlap the window are returned, including one that started before it."""
+    print("🧪 Testing window bounds...")
+    captions = make_captions(100, step=3.0, length=3.0)
+    window, cursor = caption_window(captions, start=31.0, end=40.0)
+
+    assert [c['text'] for c in window] == ['line 10', 'line 11', 'line 12', 'line 13'], window
+    assert cursor is None
+
+    # Open-ended window runs to the end of the video
+    window, _ = caption_window(captions, start=294.5)
+    assert [c['text'] for c in window] == ['line 98', 'line 99'], window
+
+    print("✅ Window 31-40s returned captions 10-13")
+
+
+def test_keyset_pages_cover_window_once():
+    """Following cursors visits every caption in the window exactly once, in time order."""
+    print("🧪 Testing keyset pagination...")
+    captions = make_captions(1000, step=3.0, length=3.0)
+    # Two captions starting at the same time are ordered by position
+    captions.insert(500, {'text': 'duplicate start', 'startTime': captions[500]['startTime'], 'endTime': 1500.5})
+
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        page, cursor = caption_window(captions, start=0, end=3000, after=cursor, limit=64)
+        seen.extend(c['text'] for c in page)
+        pages += 1
+        if cursor is None:
+            break
+
+    expected = [c['text'] for _, c in sorted(enumerate(captions), key=lambda item: (item[1]['startTime'], item[0]))]
+    assert seen == expected, seen[495:505]
+    assert pages == 16, pages
+
+    print(f"✅ {len(seen)} captions in {pages} pages, none repeated")
+
+
+def test_long_segments_overlapping_the_window():
+    """A caption longer than MAX_SEGMENT_SECONDS is returned for every window it overlaps."""
+    print("🧪 Testing long segments...")
+    captions = make_captions(100, step=3.0, length=3.0)
+    captions.append({'text': 'imported', 'startTime': 0.0, 'endTime': 250.0})
+    window, _ = caption_window(captions, start=241.0, end=245.0)
+    assert [c['text'] for c in window] == ['imported', 'line 80', 'line 81'], window
+
+    print("✅ Long segment returned with the window it overlaps")
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    """Cursors round-trip and malformed ones raise ValueError."""
+    print("🧪 Testing cursors...")
+    assert decode_cursor(encode_cursor(12.3456, 7)) == (12.346, 7)
+    for bad in ('', 'abc', '1.0', '1.0:x', None):
+        try:
+            decode_cursor(bad)
+            raise AssertionError(f"{bad!r} should be rejected")
+        except ValueError:
+            pass
+
+    print("✅ Cursor encoding verified")
+
+
+def main():
+    print("🚀 Caption Window Tests")
+    print("=" * 50)
+    tests = [
+        test_window_returns_overlapping_captions,
+        test_keyset_pages_cover_window_once,
+        test_long_segments_overlapping_the_window,
+        test_cursor_round_trip_and_rejects_garbage,
+    ]
+    for test in tests:
+        test()
+    print(f"\n📊 {len(tests)}/{len(tests)} tests passed")
+
+
+if __name__ == "__main__":
+    main()
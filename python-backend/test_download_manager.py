@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test script for audio format selection and the shared download budget.
+"""
+
+import threading
+
+from download_manager import (
+    BandwidthBudget, select_audio_format, is_fragmented, is_retryable_download_error, parse_bytes
+)
+
+FORMATS = [
+    {'format_id': '139', 'vcodec': 'none', 'acodec': 'mp4a.40.5', 'abr': 48.8, 'protocol': 'https'},
+    {'format_id': '249', 'vcodec': 'none', 'acodec': 'opus', 'abr': 50.1, 'protocol': 'https'},
+    {'format_id': '599', 'vcodec': 'none', 'acodec': 'mp4a.40.5', 'abr': 30.9, 'protocol': 'https'},
+    {'format_id': '251', 'vcodec': 'none', 'acodec': 'opus', 'abr': 129.5, 'protocol': 'https'},
+    {'format_id': '160', 'vcodec': 'avc1', 'acodec': 'none', 'tbr': 20.0, 'protocol': 'https'},
+    {'format_id': 'sb0', 'vcodec': 'none', 'acodec': 'none', 'protocol': 'mhtml'},
+]
+
+
+def test_select_smallest_adequate_format():
+    """The lowest bitrate at or above the speech floor should win, not the lowest overall."""
+    print("🧪 Testing audio format selection...")
+    assert select_audio_format(FORMATS, min_kbps=32)['format_id'] == '139'
+    assert select_audio_format(FORMATS, min_kbps=0)['format_id'] == '599'
+    # Nothing adequate: take the best available
+    assert select_audio_format(FORMATS[:3], min_kbps=200)['format_id'] == '249'
+    # Video-only and storyboard formats are never picked
+    assert select_audio_format(FORMATS[4:]) is None
+
+    print("✅ Picked the smallest speech-adequate audio-only format")
+
+
+def test_helpers():
+    """Fragment detection, retry classification and size parsing."""
+    print("🧪 Testing helpers...")
+    assert is_fragmented({'protocol': 'm3u8_native'})
+    assert is_fragmented({'protocol': 'https', 'fragments': [{'url': 'a'}]})
+    assert not is_fragmented({'protocol': 'https'})
+    assert not is_fragmented(None)
+
+    assert is_retryable_download_error(ConnectionResetError())
+    assert is_retryable_download_error(TimeoutError())
+    assert not is_retryable_download_error(ValueError('unsupported URL'))
+
+    class FakeHTTPError(Exception):
+        def __init__(self, status):
+            self.status = status
+
+    assert is_retryable_download_error(FakeHTTPError(503))
+    assert not is_retryable_download_error(FakeHTTPError(403))
+
+    assert parse_bytes('10M') == 10 * 1024 ** 2
+    assert parse_bytes('800KB') == 800 * 1024
+    assert parse_bytes('') == 0
+
+    print("✅ Helpers behave")
+
+
+def test_budget_shares_bandwidth_and_connections():
+    """Leases should split the bandwidth per connection and cap total connections."""
+    print("🧪 Testing shared bandwidth budget...")
+    budget = BandwidthBudget(bytes_per_second=1000, max_connections=4)
+    first, second = {}, {}
+
+    with budget.lease(3, first) as granted_first:
+        assert granted_first == 3
+        assert first['ratelimit'] == 333
+        with budget.lease(3, second) as granted_second:
+            # Only one connection left
+            assert granted_second == 1
+            assert first['ratelimit'] == second['ratelimit'] == 250
+
+            blocked = threading.Event()
+            acquired = threading.Event()
+
+            def third():
+                blocked.set()
+                with budget.lease(1, {}):
+                    acquired.set()
+
+            thread = threading.Thread(target=third)
+            thread.start()
+            blocked.wait()
+            assert not acquired.wait(0.1)
+        thread.join(1.0)
+        assert acquired.is_set()
+        assert first['ratelimit'] == 333
+
+    assert budget.snapshot()['connections_in_use'] == 0
+    assert budget.snapshot()['waits'] == 1
+
+    unlimited = {}
+    with BandwidthBudget(bytes_per_second=0).lease(2, unlimited):
+        assert 'ratelimit' not in unlimited
+
+    print("✅ Bandwidth rebalanced as downloads came and went")
+
+
+def main():
+    print("🚀 Download Manager Tests")
+    print("=" * 50)
+    tests = [
+        test_select_smallest_adequate_format,
+        test_helpers,
+        test_budget_shares_bandwidth_and_connections,
+    ]
+    for test in tests:
+        test()
+    print(f"\n📊 {len(tests)}/{len(tests)} tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test script for cross-job micro-batching.
+"""
+
+import time
+import threading
+
+from encoder_batcher import MicroBatcher
+
+
+def test_concurrent_requests_share_a_batch():
+    """Requests arriving within the wait window run as one batch and get their own results."""
+    print("🧪 Testing concurrent requests...")
+    batches = []
+
+    def run_batch(requests):
+        batches.append([item for _, item in requests])
+        return [item * 10 for _, item in requests]
+
+    batcher = MicroBatcher(run_batch, max_batch=4, max_wait=0.2)
+    results = {}
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, batcher(i))) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {0: 0, 1: 10, 2: 20, 3: 30}, results
+    assert len(batches) == 1 and sorted(batches[0]) == [0, 1, 2, 3], batches
+    assert batcher.snapshot()['largest_batch'] == 4
+
+    print("✅ Four requests ran as one batch")
+
+
+def test_lone_request_waits_at_most_max_wait():
+    """A request with no company runs once the wait window closes."""
+    print("🧪 Testing lone request latency...")
+    batcher = MicroBatcher(lambda requests: [item for _, item in requests], max_batch=8, max_wait=0.05)
+    started = time.time()
+    assert batcher('only') == 'only'
+    assert time.time() - started < 0.5
+
+    print("✅ Lone request ran after the wait window")
+
+
+def test_batch_errors_reach_every_caller():
+    """A failing batch fails each of its requests, and the batcher keeps serving."""
+    print("🧪 Testing batch failures...")
+    calls = []
+
+    def run_batch(requests):
+        calls.append(len(requests))
+        if len(calls) == 1:
+            raise RuntimeError("encoder failed")
+        return [context for context, _ in requests]
+
+    batcher = MicroBatcher(run_batch, max_batch=2, max_wait=0.01)
+    try:
+        batcher(1)
+        raise AssertionError("batch error should propagate")
+    except RuntimeError as e:
+        assert 'encoder failed' in str(e)
+    assert batcher(2, context='encoder') == 'encoder'
+
+    print("✅ Failure propagated, next batch succeeded")
+
+
+def main():
+    print("🚀 Encoder Batcher Tests")
+    print("=" * 50)
+    tests = [
+        test_concurrent_requests_share_a_batch,
+        test_lone_request_waits_at_most_max_wait,
+        test_batch_errors_reach_every_caller,
+    ]
+    for test in tests:
+        test()
+    print(f"\n📊 {len(tests)}/{len(tests)} tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test script for hot-swapping engine settings.
+"""
+
+import os
+import json
+import time
+import tempfile
+import threading
+
+from engine_config import EngineConfig, EngineManager
+from engine_router import EngineRouter
+from progress_tracker import ThroughputModel
+
+
+class FakePool:
+    def __init__(self):
+        self.retired = []
+
+    def retire(self, model_size):
+        self.retired.append(model_size)
+        return 1
+
+
+def test_swap_waits_for_in_flight_jobs():
+    """New jobs get the new model at once; the old one is released after its last job."""
+    print("🧪 Testing engine swap with an in-flight job...")
+    pool = FakePool()
+    warmed = []
+    manager = EngineManager(EngineConfig(model_size='tiny', use_fast_api=False),
+                            warmer=lambda size, engine: (time.sleep(0.05), warmed.append(size)), model_pool=pool)
+
+    release_job = threading.Event()
+    seen = []
+
+    def old_job():
+        with manager.checkout() as engine:
+            seen.append(engine.model_size)
+            release_job.wait()
+
+    thread = threading.Thread(target=old_job)
+    thread.start()
+    time.sleep(0.02)
+
+    manager.swap({'model_size': 'base'}, wait=True)
+    assert warmed == ['base']
+    assert manager.active.model_size == 'base'
+    with manager.checkout() as engine:
+        assert engine.model_size == 'base'
+
+    status = manager.status()
+    assert status['active']['generation'] == 2
+    assert [g['in_flight'] for g in status['draining']] == [1]
+    assert pool.retired == []
+
+    release_job.set()
+    thread.join()
+    assert seen == ['tiny']
+    assert pool.retired == ['tiny']
+    assert manager.status()['draining'] == []
+
+    print("✅ Old model released once its job finished")
+
+
+def test_failed_warmup_keeps_old_config():
+    """A model that fails to load must not replace the working one."""
+    print("🧪 Testing failed warm-up...")
+
+    def broken_warmer(size, engine):
+        raise RuntimeError("out of memory")
+
+    manager = EngineManager(EngineConfig(model_size='tiny', use_fast_api=False),
+                            warmer=broken_warmer, model_pool=FakePool())
+    status = manager.swap({'model_size': 'small'}, wait=True)
+    assert status['swap']['state'] == 'failed'
+    assert manager.active.model_size == 'tiny'
+
+    for bad in ({'model_size': 'huge'}, {'quality_tier': 'ultra'}, {'colour': 'blue'}):
+        try:
+            manager.swap(bad)
+            assert False, bad
+        except ValueError:
+            pass
+
+    print("✅ Invalid or failed swaps left the engine untouched")
+
+
+def test_reload_from_file():
+    """Workers follow a shared config file and ignore unchanged content."""
+    print("🧪 Testing config file reload...")
+    manager = EngineManager(EngineConfig(model_size='tiny', use_fast_api=False),
+                            warmer=lambda size, engine: None, model_pool=FakePool())
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'engine.json')
+        with open(path, 'w') as f:
+            json.dump({'model_size': 'tiny', 'use_fast_api': False}, f)
+        assert manager.reload_from_file(path) is None
+
+        with open(path, 'w') as f:
+            json.dump({'model_size': 'base', 'quality_tier': 'balanced'}, f)
+        manager.reload_from_file(path)
+        deadline = time.time() + 1
+        while manager.active.model_size != 'base' and time.time() < deadline:
+            time.sleep(0.01)
+        assert manager.active.model_size == 'base'
+        assert manager.active.quality_tier == 'balanced'
+
+    print("✅ Config file changes were applied")
+
+
+def test_swapped_size_is_routed():
+    """Jobs after a swap route to the new model size, including sizes no tier picks on its own."""
+    print("🧪 Testing routing after a swap...")
+    work_dir = tempfile.mkdtemp()
+    router = EngineRouter(ThroughputModel(os.path.join(work_dir, 'stage_stats.json')),
+                          log_path=os.path.join(work_dir, 'routing.log'), max_chunk_workers=1)
+    router.openai_available = True
+    manager = EngineManager(EngineConfig(model_size='tiny', use_fast_api=False),
+                            warmer=lambda size, engine: None, model_pool=FakePool())
+
+    def routed_size():
+        with manager.checkout() as engine:
+            decision = router.route(60, quality_tier=engine.quality_tier, allow_api=engine.use_fast_api,
+                                    max_model_size=engine.model_size)
+        assert decision.engine == 'local', decision
+        return decision.model_size
+
+    assert routed_size() == 'tiny'
+    manager.swap({'model_size': 'medium'}, wait=True)
+    assert routed_size() == 'medium'
+    manager.swap({'model_size': 'large', 'quality_tier': 'best'}, wait=True)
+    assert routed_size() == 'large'
+    manager.swap({'quality_tier': 'balanced'}, wait=True)
+    assert routed_size() == 'base'
+
+    print("✅ Swapped model sizes reached the router")
+
+
+def main():
+    print("🚀 Engine Config Tests")
+    print("=" * 50)
+    tests = [
+        test_swap_waits_for_in_flight_jobs,
+        test_failed_warmup_keeps_old_config,
+        test_reload_from_file,
+        test_swapped_size_is_routed,
+    ]
+    for test in tests:
+        test()
+    print(f"\n📊 {len(tests)}/{len(tests)} tests passed")
+
+
+if __name__ == "__main__":
+    main()
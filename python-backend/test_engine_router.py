@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test script for deadline-aware engine and model-size routing.
+"""
+
+import os
+import tempfile
+
+from engine_router import EngineRouter
+from progress_tracker import ThroughputModel
+
+
+def make_router(openai_available):
+    work_dir = tempfile.mkdtemp()
+    model = ThroughputModel(os.path.join(work_dir, 'stage_stats.json'))
+    # Measured rates in audio-seconds per second
+    model.record('convert', 'default', 600, 1)
+    model.record('transcribe', 'openai-api', 20, 1)
+    model.record('transcribe', 'local-tiny', 10, 1)
+    model.record('transcribe', 'local-base', 4, 1)
+    model.record('transcribe', 'local-small', 1, 1)
+    router = EngineRouter(model, log_path=os.path.join(work_dir, 'routing.log'),
+                          max_chunk_workers=4, degrade_queue_depth=2)
+    router.openai_available = openai_available
+    return router
+
+
+def test_best_quality_within_deadline():
+    """With a generous deadline the best allowed local model should win."""
+    print("🧪 Testing best quality within deadline...")
+    router = make_router(openai_available=False)
+    decision = router.route(60, deadline_seconds=100, quality_tier='best', max_model_size='small')
+    assert decision.engine == 'local' and decision.model_size == 'small', decision
+    assert decision.meets_deadline
+
+    print("✅ Picked small model within deadline")
+
+
+def test_tight_deadline_prefers_faster_engine():
+    """A tight deadline should fall back to a faster engine or smaller model."""
+    print("🧪 Testing tight deadline...")
+    router = make_router(openai_available=True)
+    decision = router.route(600, deadline_seconds=40, quality_tier='best')
+    assert decision.engine == 'openai-api', decision
+
+    router = make_router(openai_available=False)
+    decision = router.route(600, deadline_seconds=40, quality_tier='best')
+    assert decision.engine == 'chunked-parallel' and decision.model_size == 'tiny', decision
+
+    print("✅ Tight deadline routed to a faster engine")
+
+
+def test_load_degrades_model_size():
+    """Queue depth should shrink the allowed model size."""
+    print("🧪 Testing load degradation...")
+    router = make_router(openai_available=False)
+    decision = router.route(60, quality_tier='best', queue_depth=4, max_model_size='small')
+    assert decision.model_size == 'tiny', decision
+    assert 'degraded' in decision.reason
+
+    print("✅ Model size degraded under load")
+
+
+def test_local_engine_throughput():
+    """Routing uses the selected local engine's throughput and respects its chunking support."""
+    print("🧪 Testing local engine selection...")
+    router = make_router(openai_available=False)
+    router.model.record('transcribe', 'ctranslate2-small', 6, 1)
+    decision = router.route(600, deadline_seconds=200, quality_tier='best',
+                            local_engine='ctranslate2', allow_chunked=False)
+    assert decision.engine == 'local' and decision.model_size == 'small', decision
+    assert all(c['engine'] != 'chunked-parallel' for c in decision.candidates)
+
+    print("✅ Faster local engine allowed the larger model")
+
+
+def test_job_settings_bound_the_route():
+    """Routing never picks the API for jobs without it, nor a model larger than the configured one."""
+    print("🧪 Testing job engine settings...")
+    router = make_router(openai_available=True)
+    decision = router.route(60, allow_api=False, max_model_size='base')
+    assert decision.engine == 'local' and decision.model_size == 'base', decision
+    assert all(c['engine'] != 'openai-api' for c in decision.candidates)
+
+    # A tier can ask for less than the configured size, never for more
+    decision = router.route(60, quality_tier='best', allow_api=False, max_model_size='tiny')
+    assert decision.model_size == 'tiny', decision
+    decision = router.route(60, quality_tier='fast', allow_api=False, max_model_size='small')
+    assert decision.model_size == 'tiny', decision
+
+    # Without keys and without a tier, the configured size is used instead of the default tier's
+    router = make_router(openai_available=False)
+    decision = router.route(60, max_model_size='small')
+    assert decision.model_size == 'small' and decision.quality_tier is None, decision
+
+    # The API's local fallback is the configured size too
+    router = make_router(openai_available=True)
+    decision = router.route(60, max_model_size='base')
+    assert decision.engine == 'openai-api' and decision.model_size == 'base', decision
+
+    print("✅ Routes stayed within the job's engine settings")
+
+
+def main():
+    print("🚀 Engine Router Tests")
+    print("=" * 50)
+    tests = [
+        test_best_quality_within_deadline,
+        test_tight_deadline_prefers_faster_engine,
+        test_load_degrades_model_size,
+        test_local_engine_throughput,
+        test_job_settings_bound_the_route,
+    ]
+    for test in tests:
+        test()
+    print(f"\n📊 {len(tests)}/{len(tests)} tests passed")
+
+
+if __name__ == "__main__":
+    main()
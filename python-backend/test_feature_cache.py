@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test script for the memory and disk tiers of the feature cache.
+"""
+
+import time
+import tempfile
+
+from feature_cache import MemoryTier, DiskTier, FeatureCache
+
+
+def test_memory_tier_evicts_least_recently_used():
+    """The memory tier stays within its budget, evicting the least recently used entry."""
+    print("🧪 Testing memory tier eviction...")
+    tier = MemoryTier(max_bytes=10)
+    tier.put('a', b'1234')
+    tier.put('b', b'1234')
+    assert tier.get('a') == b'1234'
+    tier.put('c', b'1234')
+    assert tier.get('b') is None, "b was least recently used"
+    assert tier.get('a') and tier.get('c')
+    tier.put('huge', b'x' * 11)
+    assert tier.get('huge') is None and tier.get('a')
+    assert tier.snapshot()['bytes'] == 8 and tier.evictions == 1
+
+    print("✅ Memory tier evicted b")
+
+
+def test_disk_tier_evicts_oldest_files():
+    """The disk tier evicts the least recently read files once over budget."""
+    print("🧪 Testing disk tier eviction...")
+    tier = DiskTier(tempfile.mkdtemp(), max_bytes=300)
+    for key in ('a', 'b', 'c'):
+        tier.put(key, b'x' * 100)
+        time.sleep(0.01)
+    # Reading a marks it as recently used
+    assert tier.get('a')
+    tier.put('d', b'x' * 100)
+    assert tier.get('b') is None, "b was the oldest entry"
+    assert tier.get('a') and tier.get('d')
+    assert tier.snapshot()['bytes'] <= 270
+
+    print("✅ Disk tier evicted down to its budget")
+
+
+def test_disk_hits_are_promoted():
+    """A value only on disk (e.g. after a restart) is served and promoted to memory."""
+    print("🧪 Testing disk to memory promotion...")
+    disk_dir = tempfile.mkdtemp()
+    FeatureCache(1024, disk_dir, 1024).put_json('lang:base:abc', {'language': 'de'})
+
+    cache = FeatureCache(1024, disk_dir, 1024)
+    assert cache.get_json('lang:base:abc') == {'language': 'de'}
+    assert cache.memory.snapshot()['entries'] == 1
+    assert cache.get_json('lang:base:missing') is None
+    snapshot = cache.snapshot()
+    assert snapshot['hits'] == {'lang': 1} and snapshot['misses'] == {'lang': 1}, snapshot
+
+    print("✅ Disk entry promoted to memory")
+
+
+def main():
+    print("🚀 Feature Cache Tests")
+    print("=" * 50)
+    tests = [
+        test_memory_tier_evicts_least_recently_used,
+        test_disk_tier_evicts_oldest_files,
+        test_disk_hits_are_promoted,
+    ]
+    for test in tests:
+        test()
+    print(f"\n📊 {len(tests)}/{len(tests)} tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test script for hedged engine calls and latency-based hedge delays.
+"""
+
+import time
+
+from hedging import LatencyTracker, hedged_call
+
+
+def slow_engine(seconds, result):
+    def run(token):
+        deadline = time.time() + seconds
+        while time.time() < deadline:
+            # Engines check the token between windows
+            token.raise_if_cancelled()
+            time.sleep(0.01)
+        return result
+    return run
+
+
+def test_fast_primary_skips_hedge():
+    """A primary answering within the delay should never start the hedge."""
+    print("🧪 Testing fast primary...")
+    started = []
+
+    def secondary(token):
+        started.append(True)
+        return "local"
+
+    winner, result = hedged_call(('api', slow_engine(0.02, "api")), ('local', secondary), delay=0.5)
+    assert (winner, result) == ('api', "api")
+    assert not started
+
+    print("✅ Fast primary wins without hedging")
+
+
+def test_slow_primary_is_hedged():
+    """A slow primary should lose to the hedge, which cancels it."""
+    print("🧪 Testing slow primary...")
+    start = time.time()
+    winner, result = hedged_call(('api', slow_engine(2.0, "api")), ('local', slow_engine(0.05, "local")), delay=0.1)
+    assert (winner, result) == ('local', "local")
+    assert time.time() - start < 1.0
+
+    print("✅ Hedge won and cut tail latency")
+
+
+def test_failed_primary_starts_hedge_immediately():
+    """If the primary fails early there's no reason to wait out the delay."""
+    print("🧪 Testing failed primary...")
+    start = time.time()
+    winner, result = hedged_call(('api', lambda token: None), ('local', slow_engine(0.02, "local")), delay=5.0)
+    assert winner == 'local'
+    assert time.time() - start < 1.0
+
+    print("✅ Failed primary falls through to the hedge")
+
+
+def test_latency_percentiles():
+    """Percentiles should come from the recorded samples."""
+    print("🧪 Testing latency percentiles...")
+    tracker = LatencyTracker(window=100)
+    for i in range(1, 101):
+        tracker.record('api', float(i))
+    assert tracker.percentile('api', 0.5) == 51.0
+    assert tracker.percentile('api', 0.95) == 95.0
+    assert tracker.percentile('local', 0.95) is None
+
+    print("✅ Latency percentiles work")
+
+
+def main():
+    print("🚀 Hedging Tests")
+    print("=" * 50)
+    tests = [
+        test_fast_primary_skips_hedge,
+        test_slow_primary_is_hedged,
+        test_failed_primary_starts_hedge_immediately,
+        test_latency_percentiles,
+    ]
+    for test in tests:
+        test()
+    print(f"\n📊 {len(tests)}/{len(tests)} tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared keep-alive pool behind the Supabase client.
+"""
+
+from benchmark_supabase_pool import start_stub
+from http_pool import HTTPPool, CountingTransport
+from supabase_service import PooledPostgrestClient, PooledSupabaseClient
+
+# Any JWT-shaped key passes the Supabase client's format check; the stub ignores it
+STUB_KEY = 'eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.c3R1Yg'
+
+
+def test_postgrest_session_uses_the_pool():
+    """The PostgREST session is built on the pool's transport and keeps one connection warm."""
+    print("🧪 Testing pooled PostgREST session...")
+    server, rest_url = start_stub(tls=False, latency=0.0)
+    try:
+        pool = HTTPPool('test-postgrest', max_connections=4)
+        client = PooledPostgrestClient(rest_url, pool=pool, headers={'apikey': STUB_KEY})
+        transport = client.session._transport
+        assert isinstance(transport, CountingTransport) and transport in set(pool._transports)
+
+        for _ in range(5):
+            client.table('caption_tasks').select('id').eq('status', 'pending').execute()
+        client.rpc('count_pending_tasks', {}).execute()
+        stats = pool.snapshot()
+        assert stats['requests'] == 6 and stats['connects'] == 1, stats
+        client.session.close()
+    finally:
+        server.shutdown()
+
+    print("✅ Six calls over one pooled connection")
+
+
+def test_supabase_client_shares_one_session():
+    """Every table and RPC call of a PooledSupabaseClient goes through the same pooled session."""
+    print("🧪 Testing pooled Supabase client...")
+    server, rest_url = start_stub(tls=False, latency=0.0)
+    try:
+        pool = HTTPPool('test-supabase', max_connections=4)
+        client = PooledSupabaseClient(rest_url[:-len('/rest/v1')], STUB_KEY, pool)
+        session = client.postgrest.session
+        assert client.postgrest.session is session and session._transport in set(pool._transports)
+
+        client.table('caption_tasks').select('id').execute()
+        client.rpc('count_pending_tasks', {}).execute()
+        client.table('captions').select('id').execute()
+        assert client.postgrest.session is session
+        stats = pool.snapshot()
+        assert stats['requests'] == 3 and stats['connects'] == 1, stats
+        session.close()
+    finally:
+        server.shutdown()
+
+    print("✅ Supabase calls reused the shared transport")
+
+
+def main():
+    print("🚀 HTTP Pool Tests")
+    print("=" * 50)
+    tests = [
+        test_postgrest_session_uses_the_pool,
+        test_supabase_client_shares_one_session,
+    ]
+    for test in tests:
+        test()
+    print(f"\n📊 {len(tests)}/{len(tests)} tests passed")
+
+
+if __name__ == "__main__":
+    main()
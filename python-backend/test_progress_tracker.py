@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test script for weighted pipeline progress and the throughput-based ETA model.
+"""
+
+import os
+import tempfile
+
+from progress_tracker import ProgressTracker, ThroughputModel
+
+
+def test_weighted_progress():
+    """Stage fractions should combine into one weighted percentage."""
+    print("🧪 Testing weighted progress...")
+    stats_path = os.path.join(tempfile.mkdtemp(), 'stage_stats.json')
+    updates = []
+    tracker = ProgressTracker(callback=updates.append, throughput_model=ThroughputModel(stats_path))
+    tracker.set_duration(60)
+
+    tracker.start_stage('download')
+    tracker.ytdlp_hook({'status': 'downloading', 'downloaded_bytes': 50, 'total_bytes': 100})
+    assert tracker.percent == 18, tracker.percent
+    tracker.finish_stage('download', units=100)
+    tracker.start_stage('convert')
+    tracker.finish_stage('convert', units=60)
+    tracker.start_stage('transcribe')
+    tracker.update('transcribe', 0.5)
+    assert tracker.percent == 72, tracker.percent
+    assert updates[-1]['eta_seconds'] is not None
+
+    print("✅ Weighted progress works")
+
+
+def test_throughput_model():
+    """Recorded throughput should persist and drive job estimates."""
+    print("🧪 Testing throughput model...")
+    stats_path = os.path.join(tempfile.mkdtemp(), 'stage_stats.json')
+    model = ThroughputModel(stats_path, alpha=0.5)
+    model.record('transcribe', 'local-tiny', units=100, seconds=10)
+    model.record('transcribe', 'local-tiny', units=100, seconds=5)
+    assert abs(model.rate('transcribe', 'local-tiny') - 15.0) < 1e-6
+
+    reloaded = ThroughputModel(stats_path)
+    assert reloaded.samples('transcribe', 'local-tiny') == 2
+    estimate = reloaded.estimate_job_seconds(150, 'local-tiny', size_bytes=1_000_000)
+    assert abs(estimate['transcribe'] - 10.0) < 1e-6
+    assert estimate['total'] > estimate['transcribe']
+
+    print("✅ Throughput model works")
+
+
+def main():
+    print("🚀 Progress Tracker Tests")
+    print("=" * 50)
+    tests = [
+        test_weighted_progress,
+        test_throughput_model,
+    ]
+    for test in tests:
+        test()
+    print(f"\n📊 {len(tests)}/{len(tests)} tests passed")
+
+
+if __name__ == "__main__":
+    main()
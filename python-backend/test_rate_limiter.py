@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test script for the OpenAI token-bucket rate limiter and key rotation.
+"""
+
+import time
+import tempfile
+import threading
+
+from rate_limiter import TokenBucket, FileTokenBucket, OpenAIQuotaGovernor, RateLimitTimeout
+
+
+def test_token_bucket_queues_instead_of_failing():
+    """Calls beyond the burst should wait for refill rather than fail."""
+    print("🧪 Testing token bucket...")
+    bucket = TokenBucket(capacity=2, refill_per_second=20)
+    assert bucket.try_acquire(1) == 0 and bucket.try_acquire(1) == 0
+    wait = bucket.try_acquire(1)
+    assert 0 < wait <= 0.06, wait
+    time.sleep(wait)
+    assert bucket.try_acquire(1) == 0
+
+    print("✅ Token bucket refills")
+
+
+def test_file_bucket_is_shared():
+    """Two buckets on the same file should share one quota."""
+    print("🧪 Testing shared file bucket...")
+    path = f"{tempfile.mkdtemp()}/bucket.json"
+    first = FileTokenBucket(path, capacity=2, refill_per_second=0.001)
+    second = FileTokenBucket(path, capacity=2, refill_per_second=0.001)
+    assert first.try_acquire(1) == 0
+    assert second.try_acquire(1) == 0
+    assert first.try_acquire(1) > 0
+
+    print("✅ Quota shared through the state file")
+
+
+def test_governor_rotates_keys_and_waits():
+    """Concurrent calls should spread over keys and queue once quota is used up."""
+    print("🧪 Testing quota governor...")
+    governor = OpenAIQuotaGovernor(['sk-aaaa', 'sk-bbbb'], requests_per_minute=60,
+                                   audio_seconds_per_minute=600, max_concurrency=1)
+    used = []
+
+    def call():
+        with governor.acquire(audio_seconds=10) as slot:
+            used.append(slot.key_id)
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(used) == ['...aaaa', '...aaaa', '...bbbb', '...bbbb'], used
+
+    exhausted = OpenAIQuotaGovernor(['sk-cccc'], requests_per_minute=1)
+    with exhausted.acquire():
+        pass
+    try:
+        with exhausted.acquire(timeout=0.1):
+            assert False, "expected RateLimitTimeout"
+    except RateLimitTimeout:
+        pass
+
+    print("✅ Governor rotates keys and queues calls")
+
+
+def main():
+    print("🚀 Rate Limiter Tests")
+    print("=" * 50)
+    tests = [
+        test_token_bucket_queues_instead_of_failing,
+        test_file_bucket_is_shared,
+        test_governor_rotates_keys_and_waits,
+    ]
+    for test in tests:
+        test()
+    print(f"\n📊 {len(tests)}/{len(tests)} tests passed")
+
+
+if __name__ == "__main__":
+    main()
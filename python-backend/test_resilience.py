@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script for retry backoff and circuit breaker behaviour.
+"""
+
+import time
+
+from resilience import RetryPolicy, CircuitBreaker, CircuitOpenError, retry_call, OPEN, HALF_OPEN, CLOSED
+
+
+class TransientError(Exception):
+    pass
+
+
+def test_retry_recovers_from_blip():
+    """A short outage should be absorbed by retries."""
+    print("🧪 Testing retry on transient failure...")
+    calls = []
+
+    def flaky():
+        calls.append(time.time())
+        if len(calls) < 3:
+            raise TransientError("blip")
+        return "ok"
+
+    start = time.time()
+    result = retry_call(flaky, policy=RetryPolicy(max_attempts=3, base_delay=0.05, max_delay=0.1))
+    assert result == "ok" and len(calls) == 3
+    assert time.time() - start < 0.5
+
+    print("✅ Retry absorbed the blip")
+
+
+def test_non_retryable_error_is_raised():
+    """Errors that aren't transient should not be retried."""
+    print("🧪 Testing non-retryable errors...")
+    calls = []
+
+    def bad_request():
+        calls.append(1)
+        raise ValueError("bad input")
+
+    try:
+        retry_call(bad_request, is_retryable=lambda e: isinstance(e, TransientError))
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    assert len(calls) == 1
+
+    print("✅ Non-retryable error raised immediately")
+
+
+def test_breaker_opens_and_recovers():
+    """The breaker should refuse calls while open and close after a good trial."""
+    print("🧪 Testing circuit breaker...")
+    breaker = CircuitBreaker('test', failure_threshold=2, cooldown=0.1)
+
+    def failing():
+        raise TransientError("down")
+
+    for _ in range(2):
+        try:
+            retry_call(failing, policy=RetryPolicy(max_attempts=1), breaker=breaker)
+        except TransientError:
+            pass
+    assert breaker.state == OPEN
+
+    try:
+        retry_call(lambda: "ok", breaker=breaker)
+        assert False, "expected CircuitOpenError"
+    except CircuitOpenError:
+        pass
+
+    time.sleep(0.15)
+    assert breaker.state == HALF_OPEN
+    assert retry_call(lambda: "ok", breaker=breaker) == "ok"
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()['times_opened'] == 1
+
+    print("✅ Circuit breaker opens and recovers")
+
+
+def main():
+    print("🚀 Resilience Tests")
+    print("=" * 50)
+    tests = [
+        test_retry_recovers_from_blip,
+        test_non_retryable_error_is_raised,
+        test_breaker_opens_and_recovers,
+    ]
+    for test in tests:
+        test()
+    print(f"\n📊 {len(tests)}/{len(tests)} tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test script for the retention job, against the embedded SQLite backend.
+"""
+
+import os
+import glob
+import tempfile
+
+from conftest import make_captions, make_storage
+from retention import RetentionWorker, read_archive
+from task_storage import STALE_TASK_ERROR, retention_cutoff
+from transcripts import transcript_key
+from engine_config import EngineConfig
+
+
+def backdate(storage, task_id, days):
+    with storage._transaction() as conn:
+        conn.execute("UPDATE caption_tasks SET created_at = ? WHERE id = ?", (retention_cutoff(days), task_id))
+
+
+def test_old_tasks_are_archived_with_their_captions_and_deleted():
+    """Finished tasks past the window go to gzip files with their captions, in throttled batches."""
+    print("🧪 Testing archival of old tasks...")
+    storage = make_storage()
+    old = [storage.create_task(f"https://www.youtube.com/watch?v=old{i}") for i in range(5)]
+    for index, task in enumerate(old):
+        storage.save_captions(task['id'], make_captions(10 + index))
+        backdate(storage, task['id'], 120 + index)
+    recent = storage.create_task('https://www.youtube.com/watch?v=recent')
+    storage.save_captions(recent['id'], make_captions(3))
+
+    archive_dir = tempfile.mkdtemp()
+    worker = RetentionWorker(storage, archive_dir=archive_dir, retention_days=90,
+                             batch_size=2, batch_pause=0, max_batches=2)
+    first = worker.run_cycle()
+    # Two batches of two per cycle: one old task is left for the next cycle
+    assert first['archived'] == 4 and len(first['files']) == 2, first
+    second = worker.run_cycle()
+    assert second['archived'] == 1 and worker.run_cycle()['archived'] == 0
+
+    records = [record for path in sorted(glob.glob(os.path.join(archive_dir, '*', '*.jsonl.gz')))
+               for record in read_archive(path)]
+    assert sorted(record['task']['id'] for record in records) == sorted(task['id'] for task in old)
+    by_id = {record['task']['id']: record for record in records}
+    assert [len(by_id[task['id']]['captions']) for task in old] == [10, 11, 12, 13, 14]
+    assert by_id[old[0]['id']]['captions'][3]['text'] == 'line 3'
+    assert by_id[old[0]['id']]['task']['status'] == 'completed'
+
+    assert all(storage.get_task(task['id']) is None for task in old)
+    assert storage._connection().execute("SELECT COUNT(*) FROM captions").fetchone()[0] == 3
+    assert len(storage.get_captions_for_task(recent['id'])) == 3
+    assert not glob.glob(os.path.join(archive_dir, '*', '*.tmp'))
+    storage.close()
+
+    print(f"✅ {len(records)} tasks archived over 2 cycles, recent task untouched")
+
+
+def test_stale_tasks_leave_the_queue_and_are_archived():
+    """Pending tasks past the window aren't polled, then are failed and archived."""
+    print("🧪 Testing stale pending tasks...")
+    storage = make_storage()
+    stale = storage.create_task('https://www.youtube.com/watch?v=stale')
+    stuck = storage.create_task('https://www.youtube.com/watch?v=stuck')
+    storage.claim_task(stuck['id'])
+    fresh = storage.create_task('https://www.youtube.com/watch?v=fresh')
+    backdate(storage, stale['id'], 100)
+    backdate(storage, stuck['id'], 100)
+
+    assert [task['id'] for task in storage.get_pending_tasks()] == [fresh['id']]
+    assert storage.count_pending_tasks() == 1
+
+    archive_dir = tempfile.mkdtemp()
+    stats = RetentionWorker(storage, archive_dir=archive_dir, retention_days=90, batch_pause=0).run_cycle()
+    assert stats['expired'] == 2 and stats['archived'] == 2, stats
+    records = read_archive(stats['files'][0])
+    assert {record['task']['error_message'] for record in records} == {STALE_TASK_ERROR}
+    assert all(record['task']['status'] == 'failed' and record['captions'] == [] for record in records)
+    assert storage.get_task(fresh['id'])['status'] == 'pending'
+    # SQLite isn't partitioned: nothing to create or drop
+    assert stats['partitions_created'] == [] and stats['partitions_dropped'] == []
+    storage.close()
+
+    print("✅ Stale tasks skipped by polls, failed and archived")
+
+
+def test_archiving_releases_shared_transcripts():
+    """Archived tasks keep their transcript's captions; the transcript goes with its last reference."""
+    print("🧪 Testing archival of shared transcripts...")
+    storage = make_storage('shared')
+    url = 'https://www.youtube.com/watch?v=popular'
+    key = transcript_key(url, 'en', EngineConfig(model_size='base', use_fast_api=False))
+    old, recent = storage.create_task(url), storage.create_task(url)
+    storage.save_captions(old['id'], make_captions(20), transcript=key)
+    assert storage.reuse_transcript(recent['id'], key)
+    backdate(storage, old['id'], 200)
+
+    def references():
+        return storage._connection().execute("SELECT COALESCE(SUM(ref_count), 0) FROM transcripts").fetchone()[0]
+
+    worker = RetentionWorker(storage, archive_dir=tempfile.mkdtemp(), retention_days=90, batch_pause=0)
+    stats = worker.run_cycle()
+    assert len(read_archive(stats['files'][0])[0]['captions']) == 20
+    assert references() == 1 and len(storage.get_captions_for_task(recent['id'])) == 20
+
+    backdate(storage, recent['id'], 200)
+    worker.run_cycle()
+    assert references() == 0
+    assert storage._connection().execute("SELECT COUNT(*) FROM transcripts").fetchone()[0] == 0
+    storage.close()
+
+    print("✅ Transcript archived with each task and deleted with the last one")
+
+
+def main():
+    print("🚀 Retention Tests")
+    print("=" * 50)
+    tests = [
+        test_old_tasks_are_archived_with_their_captions_and_deleted,
+        test_stale_tasks_leave_the_queue_and_are_archived,
+        test_archiving_releases_shared_transcripts,
+    ]
+    for test in tests:
+        test()
+    print(f"\n📊 {len(tests)}/{len(tests)} tests passed")
+
+
+if __name__ == "__main__":
+    main()
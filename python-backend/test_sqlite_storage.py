@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Test script for the embedded SQLite task storage backend.
+"""
+
+import threading
+
+from conftest import make_captions, make_storage
+from transcripts import transcript_key
+from engine_config import EngineConfig
+
+
+def test_task_lifecycle_and_concurrent_claims():
+    """Pending tasks are polled oldest first and each is claimed by exactly one thread."""
+    print("🧪 Testing task lifecycle and claiming...")
+    storage = make_storage()
+    tasks = [storage.create_task(f"https://www.youtube.com/watch?v={i}", quality_tier='fast') for i in range(20)]
+    assert storage.count_pending_tasks() == 20
+    pending = storage.get_pending_tasks(limit=5)
+    assert [task['id'] for task in pending] == [task['id'] for task in tasks[:5]]
+    assert set(pending[0]) == {'id', 'video_url', 'language', 'deadline_seconds', 'quality_tier', 'created_at'}
+
+    claims = []
+    lock = threading.Lock()
+
+    def claimer():
+        for task in tasks:
+            if storage.claim_task(task['id']):
+                with lock:
+                    claims.append(task['id'])
+
+    threads = [threading.Thread(target=claimer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claims) == sorted(task['id'] for task in tasks), len(claims)
+    assert storage.count_pending_tasks() == 0
+
+    storage.update_task_progress(tasks[0]['id'], 40, 'Transcribing', 12)
+    storage.update_task_status(tasks[1]['id'], 'failed', 'boom')
+    assert storage.apply_task_updates([
+        {'id': tasks[2]['id'], 'status': 'pending', 'progress': 12.6},
+        {'id': 'missing', 'status': 'failed'},
+    ]) == 1
+    first, second, third = (storage.get_task(task['id']) for task in tasks[:3])
+    assert (first['progress'], first['progress_message'], first['eta_seconds']) == (40, 'Transcribing', 12)
+    assert (second['status'], second['error_message']) == ('failed', 'boom')
+    assert (third['status'], third['progress']) == ('pending', 13)
+    storage.close()
+
+    print(f"✅ {len(claims)} tasks claimed once each across 4 threads")
+
+
+def test_captions_and_range_queries():
+    """Saving captions completes the task; range reads page like the Postgres function."""
+    print("🧪 Testing captions and range queries...")
+    storage = make_storage()
+    task = storage.create_task('https://m.youtube.com/watch?v=abc&list=xyz')
+    storage.save_captions(task['id'], make_captions(100))
+    # Saving again replaces rather than duplicates
+    storage.save_captions(task['id'], make_captions(100))
+
+    assert storage.get_task(task['id'])['status'] == 'completed'
+    captions = storage.get_captions_for_task(task['id'])
+    assert len(captions) == 100 and captions[3]['text'] == 'line 3' and captions[3]['startTime'] == 6.0
+
+    page, cursor = storage.get_captions_in_range(task['id'], 20.0, 60.0, limit=8)
+    assert [c['text'] for c in page] == [f"line {i}" for i in range(9, 17)], [c['text'] for c in page]
+    rest, cursor = storage.get_captions_in_range(task['id'], 20.0, 60.0, after=cursor, limit=8)
+    assert [c['text'] for c in rest] == [f"line {i}" for i in range(17, 25)] and cursor
+    last, cursor = storage.get_captions_in_range(task['id'], 20.0, 60.0, after=cursor, limit=8)
+    assert [c['text'] for c in last] == [f"line {i}" for i in range(25, 30)] and cursor is None
+
+    # Lookups normalize the URL; the first task was stored with the raw mobile one
+    assert storage.check_existing_captions('https://m.youtube.com/watch?v=abc') is None
+    other = storage.create_task('https://www.youtube.com/watch?v=abc')
+    storage.save_captions(other['id'], make_captions(1))
+    assert storage.check_existing_captions('https://m.youtube.com/watch?v=abc&list=xyz') == other['id']
+    storage.close()
+
+    print("✅ Captions stored, paged by time range and found by URL")
+
+
+def test_range_queries_include_long_segments():
+    """Captions longer than MAX_SEGMENT_SECONDS are found however long before the window they start."""
+    print("🧪 Testing long segments in range queries...")
+    storage = make_storage()
+    task = storage.create_task('https://www.youtube.com/watch?v=long')
+    captions = make_captions(100)
+    captions.insert(10, {'text': 'imported', 'startTime': 20.0, 'endTime': 150.0, 'confidence': 0.5})
+    storage.save_captions(task['id'], captions)
+
+    page, cursor = storage.get_captions_in_range(task['id'], 120.0, 126.0)
+    assert [c['text'] for c in page] == ['imported', 'line 59', 'line 60', 'line 61', 'line 62'], page
+    # The long segment sorts by its start, so it leads the first page only
+    first, cursor = storage.get_captions_in_range(task['id'], 120.0, 126.0, limit=2)
+    rest, cursor = storage.get_captions_in_range(task['id'], 120.0, 126.0, after=cursor, limit=10)
+    assert [c['text'] for c in first + rest] == [c['text'] for c in page] and cursor is None
+    assert storage.get_captions_in_range(task['id'], 151.0, 152.0)[0][0]['text'] == 'line 75'
+    storage.close()
+
+    print("✅ Long segment returned with the window it overlaps")
+
+
+def test_packed_storage_and_saved_transcriptions():
+    """Packed captions are read back from the blob; the library lists newest first."""
+    print("🧪 Testing packed captions and saved transcriptions...")
+    storage = make_storage('packed')
+    task = storage.create_task('https://www.youtube.com/watch?v=packed')
+    storage.save_captions(task['id'], make_captions(50))
+    assert storage._connection().execute("SELECT COUNT(*) FROM captions").fetchone()[0] == 0
+    captions = storage.get_captions_for_task(task['id'])
+    assert len(captions) == 50 and captions[10]['text'] == 'line 10'
+    page, cursor = storage.get_captions_in_range(task['id'], 0.0, None, limit=20)
+    assert len(page) == 20 and cursor
+
+    first = storage.save_transcription('https://www.youtube.com/watch?v=1', 'First', make_captions(2))
+    second = storage.save_transcription('https://www.youtube.com/watch?v=2', 'Second', make_captions(3), 'es')
+    saved = storage.get_saved_transcriptions()
+    assert [item['id'] for item in saved] == [second, first]
+    assert saved[0]['language'] == 'es' and len(saved[0]['captions']) == 3
+    storage.delete_saved_transcription(first)
+    assert [item['id'] for item in storage.get_saved_transcriptions()] == [second]
+    storage.close()
+
+    print("✅ Packed captions and saved transcriptions round-trip")
+
+
+def test_shared_transcripts_are_stored_once_and_refcounted():
+    """Tasks and saved transcriptions for one video share a transcript, deleted with its last reference."""
+    print("🧪 Testing shared transcripts...")
+    storage = make_storage('shared')
+    engine = EngineConfig(model_size='base', use_fast_api=False)
+    url = 'https://www.youtube.com/watch?v=popular'
+    key = transcript_key(url, 'en', engine)
+    assert key == {'video_id': 'popular', 'language': 'en', 'engine': 'whisper', 'model': 'base'}
+    assert transcript_key(url, 'en', EngineConfig(use_fast_api=True))['engine'] == 'openai-api'
+    # Captions from another engine or model than configured (routing, hedging, fallback) get no key
+    assert transcript_key(url, 'en', engine, source={'engine': 'whisper', 'model': 'base'}) == key
+    assert transcript_key(url, 'en', engine, source={'engine': 'whisper', 'model': 'tiny'}) is None
+    assert transcript_key(url, 'en', engine, source={}) is None
+
+    first, second, third = (storage.create_task(url) for _ in range(3))
+    assert not storage.reuse_transcript(first['id'], key)
+    storage.save_captions(first['id'], make_captions(40), transcript=key)
+    assert storage.reuse_transcript(second['id'], key)
+    # A late duplicate save keeps the first copy
+    storage.save_captions(third['id'], make_captions(41), transcript=key)
+
+    def counts():
+        conn = storage._connection()
+        return (conn.execute("SELECT COUNT(*), COALESCE(SUM(ref_count), 0) FROM transcripts").fetchone()[:],
+                conn.execute("SELECT COUNT(*) FROM captions").fetchone()[0])
+
+    assert counts() == ((1, 3), 0), counts()
+    for task in (first, second, third):
+        assert storage.get_task(task['id'])['status'] == 'completed'
+        assert len(storage.get_captions_for_task(task['id'])) == 40
+    page, cursor = storage.get_captions_in_range(second['id'], 10.0, 20.0)
+    assert [c['text'] for c in page] == [f"line {i}" for i in range(4, 10)] and cursor is None
+
+    # Saving the captions a task produced points at its transcript; other captions get their own
+    saved = storage.save_transcription(url, 'Popular', storage.get_captions_for_task(first['id']))
+    edited = storage.save_transcription(url, 'Edited', make_captions(3))
+    storage.save_transcription(url, 'Edited again', make_captions(3))
+    assert counts() == ((2, 6), 0), counts()
+    assert len(storage.get_saved_transcriptions()[-1]['captions']) == 40
+
+    storage.delete_saved_transcription(saved)
+    with storage._transaction() as conn:
+        conn.execute("DELETE FROM caption_tasks")
+    assert counts() == ((1, 2), 0), counts()
+    storage.delete_saved_transcription(edited)
+    storage.close()
+
+    print("✅ 3 tasks and 3 saves stored 2 transcripts, released with their references")
+
+
+def main():
+    print("🚀 SQLite Task Storage Tests")
+    print("=" * 50)
+    tests = [
+        test_task_lifecycle_and_concurrent_claims,
+        test_captions_and_range_queries,
+        test_range_queries_include_long_segments,
+        test_packed_storage_and_saved_transcriptions,
+        test_shared_transcripts_are_stored_once_and_refcounted,
+    ]
+    for test in tests:
+        test()
+    print(f"\n📊 {len(tests)}/{len(tests)} tests passed")
+
+
+if __name__ == "__main__":
+    main()
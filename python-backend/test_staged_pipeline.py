@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Test script for the staged download/transcode/inference pipeline.
+"""
+
+import time
+import threading
+
+from hedging import CancellationToken
+from staged_pipeline import StagedPipeline, Stage
+
+
+class FakeTranscriber:
+    """Stands in for YouTubeTranscriber with sleeps instead of real work."""
+    def __init__(self, download_seconds=0.0, convert_seconds=0.0, transcribe_seconds=0.0, use_fast_api=False):
+        self.download_seconds = download_seconds
+        self.convert_seconds = convert_seconds
+        self.transcribe_seconds = transcribe_seconds
+        self.use_fast_api = use_fast_api
+        self.ended = False
+
+    def begin_job(self, progress=None, cancel_token=None):
+        self.cancel_token = cancel_token
+
+    def end_job(self):
+        self.ended = True
+
+    def extract_video_id(self, url):
+        return url.rsplit('=', 1)[-1] if '=' in url else None
+
+    def download_stage(self, url, **routing):
+        time.sleep(self.download_seconds)
+        return f"/tmp/{self.extract_video_id(url)}.webm"
+
+    def convert_stage(self, audio_path):
+        time.sleep(self.convert_seconds)
+        return audio_path.replace('.webm', '.wav')
+
+    def transcribe_stage(self, wav_path, language):
+        time.sleep(self.transcribe_seconds)
+        return {'segments': [], 'text': wav_path}
+
+    def build_result(self, url, video_id, language, transcription):
+        return {'video_id': video_id, 'language': language, 'text': transcription['text']}
+
+
+def settled_snapshot(pipeline):
+    """Stage metrics are recorded just after the job's future resolves."""
+    deadline = time.time() + 1.0
+    while time.time() < deadline and any(stage['busy'] for stage in pipeline.snapshot().values()):
+        time.sleep(0.01)
+    return pipeline.snapshot()
+
+
+def make_pipeline(**kwargs):
+    defaults = dict(download_workers=8, transcode_workers=2, inference_processes=1,
+                    api_workers=2, queue_size=16, preload_sizes=[])
+    defaults.update(kwargs)
+    return StagedPipeline(**defaults)
+
+
+def test_job_runs_through_stages():
+    """A job should pass every stage and resolve its future with the result."""
+    print("🧪 Testing a job through all stages...")
+    pipeline = make_pipeline()
+    transcriber = FakeTranscriber()
+    result = pipeline.process_video(transcriber, 'https://www.youtube.com/watch?v=abc', 'en')
+    assert result == {'video_id': 'abc', 'language': 'en', 'text': '/tmp/abc.wav'}
+    assert transcriber.ended
+
+    stages = settled_snapshot(pipeline)
+    assert stages['download']['completed'] == 1
+    assert stages['transcode']['completed'] == 1
+    assert stages['inference']['completed'] == 1
+    assert stages['api']['submitted'] == 0
+    pipeline.shutdown()
+
+    print("✅ Job passed download, transcode and inference")
+
+
+def test_api_jobs_use_io_stage():
+    """Jobs routed to the API wait on I/O threads, not inference slots."""
+    print("🧪 Testing API routing...")
+    pipeline = make_pipeline()
+    pipeline.process_video(FakeTranscriber(use_fast_api=True), 'https://www.youtube.com/watch?v=api', 'en')
+    stages = settled_snapshot(pipeline)
+    assert stages['api']['completed'] == 1
+    assert stages['inference']['submitted'] == 0
+    pipeline.shutdown()
+
+    print("✅ API job skipped the inference stage")
+
+
+def test_downloads_overlap_with_inference():
+    """Slow downloads should overlap instead of queueing behind the single inference slot."""
+    print("🧪 Testing stage overlap...")
+    pipeline = make_pipeline(download_workers=8, inference_processes=1)
+    jobs = 6
+    started = time.time()
+    futures = [
+        pipeline.submit(FakeTranscriber(download_seconds=0.3, transcribe_seconds=0.05),
+                        f'https://www.youtube.com/watch?v=v{i}', 'en')
+        for i in range(jobs)
+    ]
+    results = [future.result(timeout=5) for future in futures]
+    elapsed = time.time() - started
+    pipeline.shutdown()
+
+    assert all(results)
+    # Serial would be 6 * 0.35 = 2.1s; overlapped downloads leave only the inference queue
+    assert elapsed < 1.0, elapsed
+    print(f"✅ {jobs} jobs in {elapsed:.2f}s (serial would take {jobs * 0.35:.2f}s)")
+
+
+def test_cancelled_job_stops_between_stages():
+    """A cancelled token should end the job with None before the next stage."""
+    print("🧪 Testing cancellation...")
+    pipeline = make_pipeline()
+    token = CancellationToken()
+    token.cancel()
+    transcriber = FakeTranscriber()
+    result = pipeline.process_video(transcriber, 'https://www.youtube.com/watch?v=x', 'en', cancel_token=token)
+    assert result is None and transcriber.ended
+    assert pipeline.snapshot()['transcode']['submitted'] == 0
+    pipeline.shutdown()
+
+    print("✅ Cancelled job stopped")
+
+
+def test_full_stage_applies_backpressure():
+    """Producers should block while a stage queue is full."""
+    print("🧪 Testing bounded stage queues...")
+    release = threading.Event()
+    stage = Stage('slow', workers=1, queue_size=1, handler=lambda job: release.wait())
+    stage.start()
+    stage.put('running')
+    time.sleep(0.05)
+    stage.put('queued')
+
+    blocked = threading.Event()
+
+    def producer():
+        stage.put('blocked')
+        blocked.set()
+
+    threading.Thread(target=producer, daemon=True).start()
+    assert not blocked.wait(0.1)
+    release.set()
+    assert blocked.wait(1.0)
+    stage.stop()
+    assert stage.snapshot()['completed'] == 3
+
+    print("✅ Full stage blocked its producer")
+
+
+def main():
+    print("🚀 Staged Pipeline Tests")
+    print("=" * 50)
+    tests = [
+        test_job_runs_through_stages,
+        test_api_jobs_use_io_stage,
+        test_downloads_overlap_with_inference,
+        test_cancelled_job_stops_between_stages,
+        test_full_stage_applies_backpressure,
+    ]
+    for test in tests:
+        test()
+    print(f"\n📊 {len(tests)}/{len(tests)} tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,29 @@ Test script to verify YouTube transcriber functionality.
 """
 
 from youtube_transcriber import YouTubeTranscriber
+from transcription_engines import TranscriptionEngine, register_engine
+from engine_config import EngineConfig, EngineManager
+from engine_router import EngineRouter
+from progress_tracker import ThroughputModel
+from transcripts import transcript_key
+from types import SimpleNamespace
 import tempfile
 import os
 
+
+@register_engine
+class RecordingEngine(TranscriptionEngine):
+    """Local engine that only records which model sizes were loaded."""
+    name = 'recording'
+    loaded = []
+
+    def __init__(self, model_size='base'):
+        super().__init__(model_size)
+        RecordingEngine.loaded.append(model_size)
+
+    def transcribe(self, audio, language, on_window=None):
+        return {'text': '', 'language': language, 'segments': []}
+
 def test_transcriber_initialization():
     """Test if the transcriber can be initialized."""
     print("Testing YouTubeTranscriber initialization...")
@@ -102,6 +122,56 @@ def test_caption_formatting():
     except Exception as e:
         print(f"✗ Caption formatting error: {e}")
 
+def test_swapped_model_size_is_loaded():
+    """After an engine swap, routed jobs load the new model size instead of a tier's."""
+    print("\nTesting model size after an engine swap...")
+    work_dir = tempfile.mkdtemp()
+    router = EngineRouter(ThroughputModel(os.path.join(work_dir, 'stage_stats.json')),
+                          log_path=os.path.join(work_dir, 'routing.log'), max_chunk_workers=1)
+    manager = EngineManager(EngineConfig(model_size='tiny', use_fast_api=False, local_engine='recording'),
+                            warmer=lambda size, engine: None)
+    manager.swap({'model_size': 'medium'}, wait=True)
+
+    with manager.checkout() as engine:
+        transcriber = YouTubeTranscriber(model_size=engine.model_size, use_fast_api=engine.use_fast_api,
+                                         local_engine=engine.local_engine)
+        transcriber.download_audio = lambda url: (setattr(transcriber, 'video_info', {'duration': 60}),
+                                                  '/tmp/audio.wav')[1]
+        transcriber.download_stage('https://www.youtube.com/watch?v=dQw4w9WgXcQ', router=router,
+                                   quality_tier=engine.quality_tier)
+    try:
+        assert not transcriber.use_fast_api
+        assert transcriber.model_size == 'medium' and transcriber.local_engine.model_size == 'medium'
+        assert RecordingEngine.loaded == ['medium'], RecordingEngine.loaded
+        print("✓ Job loaded the swapped-in medium model")
+    finally:
+        transcriber.cleanup()
+
+
+def test_fallback_is_not_shared_as_api_transcript():
+    """Captions from a local fallback name the local model, so they never get the API's transcript key."""
+    print("\nTesting the engine reported after an API fallback...")
+    def fail(audio_path, language):
+        raise RuntimeError('API down')
+
+    engine = EngineConfig(model_size='small', use_fast_api=True, local_engine='recording')
+    transcriber = YouTubeTranscriber(model_size=engine.model_size, use_fast_api=True, local_engine='recording')
+    transcriber.api_engine = SimpleNamespace(name='openai-api', transcribe=fail,
+                                             capabilities=SimpleNamespace(max_upload_mb=24))
+    audio_path = os.path.join(tempfile.mkdtemp(), 'audio.wav')
+    with open(audio_path, 'wb') as f:
+        f.write(b'\0' * 1024)
+    try:
+        transcription = transcriber.transcribe_audio(audio_path, 'en')
+        assert transcription['produced_by'] == {'engine': 'recording', 'model': 'small'}
+        url = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+        assert transcript_key(url, 'en', engine)['engine'] == 'openai-api'
+        assert transcript_key(url, 'en', engine, source=transcription['produced_by']) is None
+        print("✓ Fallback captions reported the local model and were not keyed as the API's")
+    finally:
+        transcriber.cleanup()
+
+
 def main():
     """Run all tests."""
     print("YouTube Transcriber Functionality Test")
@@ -122,6 +192,12 @@ def main():
     # Test caption formatting
     test_caption_formatting()
     
+    # Test engine swaps reaching the loaded model
+    test_swapped_model_size_is_loaded()
+    
+    # Test the engine reported after a fallback
+    test_fallback_is_not_shared_as_api_transcript()
+    
     print("\n" + "=" * 50)
     print("✅ YouTube Transcriber functionality tests completed!")
     print("\nThe transcriber is ready to use. You can now:")
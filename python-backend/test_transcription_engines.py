@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test script for the pluggable transcription engine interface.
+"""
+
+from transcription_engines import (
+    TranscriptionEngine, EngineCapabilities, WhisperEngine, ENGINES,
+    create_engine, local_engine_names, register_engine, run_engine, model_language
+)
+
+
+class FakePool:
+    def __init__(self):
+        self.checked_out = 0
+
+    def acquire(self, model_size):
+        self.checked_out += 1
+        return f"model-{model_size}"
+
+    def release(self, model_size, model):
+        self.checked_out -= 1
+
+
+class EchoEngine(TranscriptionEngine):
+    name = 'echo'
+    capabilities = EngineCapabilities(window_progress=True)
+
+    def transcribe(self, audio, language, on_window=None):
+        if on_window:
+            on_window(0.5)
+            on_window(1.0)
+        return {'text': f"{audio}/{self.model_size}", 'language': language,
+                'segments': [{'id': 0, 'start': 0.0, 'end': 1.0, 'text': str(audio)}]}
+
+
+def test_registry():
+    """Registered engines are selectable by name; remote and unknown ones are not."""
+    print("🧪 Testing engine registry...")
+    register_engine(EchoEngine)
+    try:
+        assert 'echo' in local_engine_names()
+        assert 'whisper' in local_engine_names() and 'ctranslate2' in local_engine_names()
+        assert 'openai-api' not in local_engine_names()
+
+        windows = []
+        result = run_engine('echo', 'tiny', 'clip.wav', 'en', windows.append)
+        assert result['text'] == 'clip.wav/tiny' and windows == [0.5, 1.0]
+
+        for name in ('openai-api', 'missing'):
+            try:
+                create_engine(name, 'tiny')
+                raise AssertionError(f"{name} should not be creatable")
+            except ValueError:
+                pass
+    finally:
+        ENGINES.pop('echo', None)
+
+    print("✅ Engines resolved by name")
+
+
+def test_runner_engine():
+    """A runner engine forwards the engine name, size and progress callback."""
+    print("🧪 Testing runner engine...")
+    calls = []
+
+    def runner(engine_name, model_size, audio, language, on_window):
+        calls.append((engine_name, model_size, audio, language))
+        on_window(1.0)
+        return {'text': 'ok', 'language': language, 'segments': []}
+
+    engine = create_engine('ctranslate2', 'base', runner=runner)
+    assert engine.name == 'ctranslate2'
+    assert not engine.capabilities.parallel_chunks and not engine.capabilities.accepts_pcm
+    windows = []
+    assert engine.transcribe('clip.wav', 'de', windows.append)['text'] == 'ok'
+    assert calls == [('ctranslate2', 'base', 'clip.wav', 'de')] and windows == [1.0]
+
+    print("✅ Runner engine delegated the run")
+
+
+def test_whisper_engine_returns_model():
+    """The Whisper engine holds one pooled model until closed."""
+    print("🧪 Testing Whisper engine model checkout...")
+    pool = FakePool()
+    with WhisperEngine('small', model_pool=pool) as engine:
+        assert pool.checked_out == 1 and engine.model == 'model-small'
+        assert engine.capabilities.parallel_chunks
+    assert pool.checked_out == 0
+    engine.close()
+    assert pool.checked_out == 0
+
+    print("✅ Model returned to the pool once")
+
+
+def test_auto_language_is_detected():
+    """'auto' reaches local models as None, so every engine detects the language."""
+    print("🧪 Testing automatic language...")
+    assert model_language('auto') is None and model_language(None) is None
+    assert model_language('es') == 'es'
+
+    print("✅ 'auto' mapped to language detection")
+
+
+def main():
+    print("🚀 Transcription Engine Tests")
+    print("=" * 50)
+    tests = [
+        test_registry,
+        test_runner_engine,
+        test_whisper_engine_returns_model,
+        test_auto_language_is_detected,
+    ]
+    for test in tests:
+        test()
+    print(f"\n📊 {len(tests)}/{len(tests)} tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for graceful drain of in-flight jobs.
+"""
+
+import time
+import threading
+
+from worker_lifecycle import DrainController
+
+
+def run_job(controller, task_id, seconds, requeued, finished):
+    def requeue():
+        requeued.append(task_id)
+
+    with controller.track(task_id, requeue=requeue) as token:
+        deadline = time.time() + seconds
+        while time.time() < deadline:
+            if token.cancelled:
+                requeue()
+                return
+            time.sleep(0.01)
+        finished.append(task_id)
+
+
+def test_drain_lets_jobs_finish():
+    """Jobs that finish before the deadline should complete normally."""
+    print("🧪 Testing drain with short jobs...")
+    controller = DrainController(drain_timeout=1.0, abandon_grace=0.1)
+    requeued, finished = [], []
+    thread = threading.Thread(target=run_job, args=(controller, 'a', 0.1, requeued, finished))
+    thread.start()
+    time.sleep(0.02)
+
+    controller.begin_drain()
+    assert not controller.should_accept()
+    assert controller.wait_until_drained(2.0)
+    thread.join()
+    assert finished == ['a'] and not requeued
+
+    print("✅ In-flight job finished during drain")
+
+
+def test_drain_hands_back_slow_jobs():
+    """Jobs still running at the deadline should be cancelled and handed back."""
+    print("🧪 Testing drain deadline...")
+    controller = DrainController(drain_timeout=0.1, abandon_grace=0.5)
+    requeued, finished = [], []
+    thread = threading.Thread(target=run_job, args=(controller, 'b', 5.0, requeued, finished))
+    thread.start()
+    time.sleep(0.02)
+
+    start = time.time()
+    controller.begin_drain()
+    assert controller.wait_until_drained(2.0)
+    thread.join()
+    assert requeued == ['b'] and not finished
+    assert time.time() - start < 1.0
+
+    print("✅ Slow job handed back at the deadline")
+
+
+def test_exit_waits_for_shutdown():
+    """The exit after a drain waits for exit barriers, e.g. a worker flushing queued writes."""
+    print("🧪 Testing exit after drain...")
+    controller = DrainController(drain_timeout=0.1, abandon_grace=0.1)
+    flushed = threading.Event()
+    exited = []
+    controller.add_exit_barrier(lambda: flushed.wait(2.0))
+    exit_thread = threading.Thread(target=controller.exit_after_drain, args=(exited.append,))
+    exit_thread.start()
+
+    controller.begin_drain()
+    assert controller.wait_until_drained(2.0)
+    time.sleep(0.05)
+    assert exited == []
+    flushed.set()
+    exit_thread.join(2.0)
+    assert exited == [0]
+
+    print("✅ Exit waited for shutdown to finish")
+
+
+def main():
+    print("🚀 Worker Lifecycle Tests")
+    print("=" * 50)
+    tests = [
+        test_drain_lets_jobs_finish,
+        test_drain_hands_back_slow_jobs,
+        test_exit_waits_for_shutdown,
+    ]
+    for test in tests:
+        test()
+    print(f"\n📊 {len(tests)}/{len(tests)} tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test script for the write-behind task storage queue.
+"""
+
+import os
+import time
+import tempfile
+import threading
+
+from write_behind import WriteBehindStore
+
+
+class MemoryStorage:
+    """Records writes; fails while `down` is set."""
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.down = False
+        self.calls = []
+        self.tasks = {}
+        self.captions = {}
+        self.lock = threading.Lock()
+
+    def _call(self, name):
+        time.sleep(self.latency)
+        if self.down:
+            raise ConnectionError("storage unreachable")
+        with self.lock:
+            self.calls.append(name)
+
+    def apply_task_updates(self, updates):
+        self._call('apply_task_updates')
+        with self.lock:
+            for update in updates:
+                self.tasks.setdefault(update['id'], {}).update({k: v for k, v in update.items() if k != 'id'})
+        return len(updates)
+
+    def save_captions(self, task_id, captions):
+        self._call('save_captions')
+        with self.lock:
+            self.captions[task_id] = captions
+            self.tasks.setdefault(task_id, {}).update({'status': 'completed', 'progress': 100})
+
+    def claim_task(self, task_id):
+        return True
+
+
+def test_writes_return_immediately_and_coalesce():
+    """Callers don't wait on storage, and many tasks' latest states go out in one batch."""
+    print("🧪 Testing coalescing and batching...")
+    storage = MemoryStorage(latency=0.2)
+    store = WriteBehindStore(storage, flush_interval=0.1, max_batch=50)
+
+    started = time.perf_counter()
+    for task in range(10):
+        for progress in range(0, 100, 10):
+            store.update_task_progress(f"task-{task}", progress, f"step {progress}", 100 - progress)
+    store.update_task_status('task-3', 'failed', 'boom')
+    enqueue_time = time.perf_counter() - started
+    assert store.claim_task('task-0') is True  # reads pass through
+
+    assert store.flush(timeout=5)
+    assert enqueue_time < 0.1, enqueue_time
+    assert storage.calls == ['apply_task_updates'], storage.calls
+    assert storage.tasks['task-0'] == {'progress': 90, 'progress_message': 'step 90', 'eta_seconds': 10}
+    assert storage.tasks['task-3']['status'] == 'failed' and storage.tasks['task-3']['progress'] == 90
+    assert store.snapshot()['coalesced'] == 91
+    store.close()
+
+    print(f"✅ 101 writes queued in {enqueue_time * 1000:.1f}ms, flushed as one batch")
+
+
+def test_captions_supersede_progress_and_retry_after_outage():
+    """Captions win over earlier progress; failed writes are kept and retried."""
+    print("🧪 Testing captions and retries...")
+    storage = MemoryStorage()
+    storage.down = True
+    store = WriteBehindStore(storage, flush_interval=0.05, max_retry_delay=0.1)
+
+    store.update_task_progress('task', 95, 'Saving', 2)
+    store.save_captions('task', [{'text': 'hi', 'startTime': 0, 'endTime': 1}])
+    time.sleep(0.3)
+    assert storage.calls == [] and store.snapshot()['failed_flushes'] >= 1
+
+    storage.down = False
+    assert store.flush(timeout=5)
+    assert storage.calls == ['save_captions'], storage.calls
+    assert storage.tasks['task'] == {'status': 'completed', 'progress': 100}
+    store.close()
+
+    print("✅ Captions saved once storage came back, stale progress dropped")
+
+
+def test_spool_survives_a_crash():
+    """Writes still queued when a worker dies are replayed by the next one."""
+    print("🧪 Testing spool recovery...")
+    spool_dir = tempfile.mkdtemp()
+    storage = MemoryStorage()
+    storage.down = True
+    crashed = WriteBehindStore(storage, spool_dir=spool_dir, flush_interval=10)
+    crashed.update_task_progress('task-a', 40, 'Transcribing', 30)
+    crashed.update_task_status('task-b', 'pending')
+    crashed.save_captions('task-c', [{'text': 'kept', 'startTime': 0, 'endTime': 1}])
+    # Simulate a crash: abandon the store without flushing, leaving a torn last line
+    with open(crashed.spool_path, 'a') as f:
+        f.write('{"task_id": "task-d", "upd')
+
+    storage.down = False
+    recovered = WriteBehindStore(storage, spool_dir=spool_dir, flush_interval=0.05)
+    assert recovered.flush(timeout=5)
+    assert storage.tasks['task-a']['progress'] == 40
+    assert storage.tasks['task-b'] == {'status': 'pending'}
+    assert storage.captions['task-c'][0]['text'] == 'kept'
+    recovered.close()
+    with open(recovered.spool_path, 'r') as f:
+        assert f.read() == ''
+    assert os.listdir(spool_dir) == [os.path.basename(recovered.spool_path)], os.listdir(spool_dir)
+
+    print("✅ Spooled writes replayed after restart")
+
+
+def test_close_reports_unfinished_flush():
+    """close() says whether the flush finished; what it couldn't write stays in the spool."""
+    print("🧪 Testing close timeout...")
+    spool_dir = tempfile.mkdtemp()
+    storage = MemoryStorage(latency=0.5)
+    store = WriteBehindStore(storage, spool_dir=spool_dir, flush_interval=0.01)
+    store.update_task_status('task-1', 'pending')
+    time.sleep(0.05)
+
+    assert store.close(timeout=0.05) is False
+    with open(store.spool_path) as f:
+        assert 'task-1' in f.read()
+    assert store.close(timeout=5) is True
+    assert storage.tasks['task-1'] == {'status': 'pending'}
+
+    print("✅ Unfinished close reported, then completed")
+
+
+def main():
+    print("🚀 Write-Behind Tests")
+    print("=" * 50)
+    tests = [
+        test_writes_return_immediately_and_coalesce,
+        test_captions_supersede_progress_and_retry_after_outage,
+        test_spool_survives_a_crash,
+        test_close_reports_unfinished_flush,
+    ]
+    for test in tests:
+        test()
+    print(f"\n📊 {len(tests)}/{len(tests)} tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,470 @@
+import os
+import wave
+import threading
+from abc import ABC, abstractmethod
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Callable, Union, Tuple, Type
+
+from resilience import RetryPolicy, get_breaker, retry_call
+
+# A transient API error should cost a few hundred milliseconds, not a local-model run
+OPENAI_RETRY_POLICY = RetryPolicy.from_env('openai', max_attempts=3, base_delay=0.2, max_delay=2.0)
+
+# How long a call may queue for OpenAI quota before falling back to the local model
+OPENAI_QUOTA_WAIT_TIMEOUT = float(os.getenv('OPENAI_QUOTA_WAIT_TIMEOUT', 300))
+
+# A file path, or 16 kHz mono float32 PCM samples
+AudioInput = Union[str, Any]
+
+# Called with the fraction of audio decoded so far; raising stops the run
+WindowCallback = Callable[[float], None]
+
+
+def audio_duration(audio_path: str) -> Optional[float]:
+    """Duration of a WAV file in seconds, read from its header."""
+    try:
+        with wave.open(audio_path, 'rb') as wav_file:
+            return wav_file.getnframes() / float(wav_file.getframerate())
+    except (wave.Error, OSError, ZeroDivisionError):
+        return None
+
+
+def model_language(language: Optional[str]) -> Optional[str]:
+    """Language to pass to a local model: None for 'auto', which lets the model detect it."""
+    return None if language in (None, '', 'auto') else language
+
+
+def is_retryable_openai_error(error: Exception) -> bool:
+    """Connection problems, timeouts, rate limits and 5xx responses are transient."""
+    import openai
+
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+@dataclass(frozen=True)
+class EngineCapabilities:
+    """What the transcriber may ask of an engine."""
+    # Network API: subject to quota, circuit breaking and upload limits
+    remote: bool = False
+    # Takes PCM arrays as well as file paths
+    accepts_pcm: bool = True
+    # Calls on_window as it decodes, so progress and cancellation work mid-run
+    window_progress: bool = True
+    # Chunks of one job can run concurrently on separate engine instances
+    parallel_chunks: bool = False
+    # Largest upload accepted, in MB
+    max_upload_mb: Optional[float] = None
+
+
+class TranscriptionEngine(ABC):
+    """
+    A speech-to-text backend. Engines take audio and return a Whisper-format
+    result: {'text', 'language', 'segments': [{'id', 'start', 'end', 'text', ...}]}.
+
+    Args:
+        model_size (str): Whisper model size the engine runs
+    """
+    name = 'engine'
+    capabilities = EngineCapabilities()
+
+    def __init__(self, model_size: str = 'base'):
+        self.model_size = model_size
+
+    @abstractmethod
+    def transcribe(self, audio: AudioInput, language: str,
+                   on_window: Optional[WindowCallback] = None) -> Dict[str, Any]:
+        """
+        Transcribe audio.
+
+        Args:
+            audio (str or numpy.ndarray): File path, or PCM if the engine accepts it
+            language (str): Language code
+            on_window (callable): Progress callback; exceptions it raises abort the run
+
+        Returns:
+            dict: Whisper-format transcription
+        """
+
+    def close(self):
+        """Release models or connections held by the engine."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class OpenAIAPIEngine(TranscriptionEngine):
+    """
+    OpenAI's hosted whisper-1, called through the shared quota governor with
+    retries and the 'openai' circuit breaker.
+
+    Args:
+        governor: OpenAIGovernor handing out rate-limited clients
+        quota_timeout (float): Seconds to wait for quota before giving up
+    """
+    name = 'openai-api'
+    capabilities = EngineCapabilities(remote=True, accepts_pcm=False, window_progress=False, max_upload_mb=24)
+
+    def __init__(self, governor, model_size: str = 'large', quota_timeout: float = None):
+        super().__init__(model_size)
+        self.governor = governor
+        self.quota_timeout = quota_timeout if quota_timeout is not None else OPENAI_QUOTA_WAIT_TIMEOUT
+
+    def transcribe(self, audio: AudioInput, language: str,
+                   on_window: Optional[WindowCallback] = None) -> Dict[str, Any]:
+        import openai
+
+        duration = audio_duration(audio) or 0.0
+
+        def send_request():
+            # Wait for request and audio-minute quota instead of provoking a 429
+            with self.governor.acquire(duration, timeout=self.quota_timeout) as slot:
+                try:
+                    # Reopen the file on every attempt so retries upload from the start
+                    with open(audio, "rb") as audio_file:
+                        return slot.client.audio.transcriptions.create(
+                            model="whisper-1",
+                            file=audio_file,
+                            response_format="verbose_json",
+                            # Omitted, the API detects the language itself
+                            **({} if language in (None, 'auto') else {'language': language})
+                        )
+                except openai.RateLimitError as e:
+                    retry_after = e.response.headers.get('retry-after') if e.response is not None else None
+                    self.governor.report_throttled(slot, float(retry_after) if retry_after else None)
+                    raise
+
+        response = retry_call(
+            send_request,
+            policy=OPENAI_RETRY_POLICY,
+            breaker=get_breaker('openai'),
+            is_retryable=is_retryable_openai_error,
+            description="OpenAI transcription"
+        )
+
+        # Convert OpenAI response to Whisper format
+        result = {
+            "text": response.text,
+            "language": response.language,
+            "segments": []
+        }
+        for segment in getattr(response, 'segments', None) or []:
+            result["segments"].append({
+                "id": segment.get("id", 0),
+                "seek": segment.get("seek", 0),
+                "start": segment.get("start", 0),
+                "end": segment.get("end", 0),
+                "text": segment.get("text", ""),
+                "tokens": segment.get("tokens", []),
+                "temperature": segment.get("temperature", 0),
+                "avg_logprob": segment.get("avg_logprob", 0),
+                "compression_ratio": segment.get("compression_ratio", 0),
+                "no_speech_prob": segment.get("no_speech_prob", 0)
+            })
+        return result
+
+
+class WhisperEngine(TranscriptionEngine):
+    """
+    openai-whisper on a model checked out from the process pool for the
+    engine's lifetime. With a feature cache, mel spectrograms, encoder outputs
+    and detected languages are reused across runs on the same audio; with
+    ENCODER_BATCHING, concurrent jobs' windows share encoder batches.
+
+    Args:
+        model_size (str): Whisper model size
+        model_pool: Pool to check the model out of (defaults to the process pool)
+        feature_cache (FeatureCache): Defaults to the process cache, if enabled
+    """
+    name = 'whisper'
+    capabilities = EngineCapabilities(parallel_chunks=True)
+
+    def __init__(self, model_size: str = 'base', model_pool=None, feature_cache=None):
+        super().__init__(model_size)
+        if model_pool is None:
+            from model_pool import get_model_pool
+            model_pool = get_model_pool()
+        if feature_cache is None:
+            from feature_cache import get_feature_cache
+            feature_cache = get_feature_cache()
+        self.model_pool = model_pool
+        self.feature_cache = feature_cache
+        self.model = model_pool.acquire(model_size)
+        from encoder_batcher import encoder_batching_enabled
+        if encoder_batching_enabled():
+            from model_pool import enable_encoder_batching
+            enable_encoder_batching(self.model, model_size)
+        if feature_cache is not None:
+            from model_pool import enable_feature_cache
+            enable_feature_cache(self.model, model_size, feature_cache)
+
+    @staticmethod
+    def transcribe_options(language: str) -> Dict[str, Any]:
+        """Decoding options shared by every local Whisper run."""
+        return dict(
+            language=language,
+            verbose=False,  # Reduce verbosity for speed
+            word_timestamps=False,  # Disable word timestamps for speed
+            fp16=False,  # Use FP32 for better compatibility
+            temperature=0.0,  # Deterministic output
+            compression_ratio_threshold=2.4,  # More aggressive compression
+            logprob_threshold=-1.0,  # More permissive threshold
+            no_speech_threshold=0.6,  # More permissive threshold
+        )
+
+    def transcribe(self, audio: AudioInput, language: str,
+                   on_window: Optional[WindowCallback] = None) -> Dict[str, Any]:
+        from progress_tracker import whisper_window_progress
+
+        language = model_language(language)
+        if self.feature_cache is None:
+            features = nullcontext()
+        else:
+            import whisper
+            from feature_cache import audio_fingerprint
+            from model_pool import cached_mel_features
+
+            if isinstance(audio, str):
+                audio = whisper.load_audio(audio)
+            audio_hash = audio_fingerprint(audio)
+            if language is None:
+                language = self.detect_language(audio, audio_hash)
+            features = cached_mel_features(self.feature_cache, audio_hash)
+
+        with features, whisper_window_progress(on_window) if on_window else nullcontext():
+            return self.model.transcribe(audio, **self.transcribe_options(language))
+
+    def detect_language(self, audio, audio_hash: str) -> str:
+        """Language of the first window, cached per audio hash and model."""
+        import whisper
+
+        key = f"lang:{self.model_size}:{audio_hash}"
+        cached = self.feature_cache.get_json(key)
+        if cached is not None:
+            return cached['language']
+        if not self.model.is_multilingual:
+            return 'en'
+        mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), self.model.dims.n_mels)
+        _, probs = self.model.detect_language(mel.to(self.model.device))
+        language = max(probs, key=probs.get)
+        self.feature_cache.put_json(key, {'language': language, 'probability': probs[language]})
+        print(f"🌐 Detected language {language} ({probs[language]:.0%})")
+        return language
+
+    def close(self):
+        if self.model is not None:
+            self.model_pool.release(self.model_size, self.model)
+            self.model = None
+
+
+class CTranslate2ModelCache:
+    """
+    faster-whisper models shared by every CTranslate2 engine in the process.
+
+    CTranslate2 runs concurrent calls on its own worker threads (num_workers),
+    so unlike openai-whisper models these are shared rather than checked out.
+    """
+    def __init__(self):
+        self._models: Dict[Tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_size: str, compute_type: str):
+        key = (model_size, compute_type)
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                try:
+                    from faster_whisper import WhisperModel
+                except ImportError as e:
+                    raise RuntimeError(
+                        "The ctranslate2 engine needs faster-whisper: pip install 'faster-whisper>=1.1.0'"
+                    ) from e
+                print(f"📦 Loading CTranslate2 Whisper model: {model_size} ({compute_type})")
+                model = WhisperModel(
+                    model_size,
+                    device='cpu',
+                    compute_type=compute_type,
+                    cpu_threads=int(os.getenv('CT2_CPU_THREADS', 0)),
+                    num_workers=int(os.getenv('CT2_NUM_WORKERS', 2)),
+                    download_root=os.getenv('CT2_MODEL_DIR') or None,
+                )
+                self._models[key] = model
+            return model
+
+    def retire(self, model_size: str) -> int:
+        """Drop every cached model of a size; returns how many were dropped."""
+        with self._lock:
+            keys = [key for key in self._models if key[0] == model_size]
+            for key in keys:
+                del self._models[key]
+            return len(keys)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'loaded': [f"{size}/{compute_type}" for size, compute_type in self._models]}
+
+
+_ctranslate2_models = CTranslate2ModelCache()
+
+
+def get_ctranslate2_models() -> CTranslate2ModelCache:
+    return _ctranslate2_models
+
+
+class CTranslate2Engine(TranscriptionEngine):
+    """
+    faster-whisper (CTranslate2) with int8 weights on the CPU and batched
+    beam search: 30 s windows are decoded `batch_size` at a time.
+
+    Args:
+        model_size (str): Whisper model size
+        compute_type (str): CTranslate2 compute type (CT2_COMPUTE_TYPE, default int8)
+        beam_size (int): Beam width (CT2_BEAM_SIZE)
+        batch_size (int): Windows decoded per batch (CT2_BATCH_SIZE)
+    """
+    name = 'ctranslate2'
+    capabilities = EngineCapabilities()
+
+    def __init__(self, model_size: str = 'base', compute_type: str = None,
+                 beam_size: int = None, batch_size: int = None):
+        super().__init__(model_size)
+        self.compute_type = compute_type or os.getenv('CT2_COMPUTE_TYPE', 'int8')
+        self.beam_size = beam_size or int(os.getenv('CT2_BEAM_SIZE', 5))
+        self.batch_size = batch_size or int(os.getenv('CT2_BATCH_SIZE', 8))
+        self.model = get_ctranslate2_models().get(model_size, self.compute_type)
+
+    def transcribe(self, audio: AudioInput, language: str,
+                   on_window: Optional[WindowCallback] = None) -> Dict[str, Any]:
+        from faster_whisper import BatchedInferencePipeline
+
+        segments, info = BatchedInferencePipeline(model=self.model).transcribe(
+            audio,
+            language=model_language(language),
+            beam_size=self.beam_size,
+            batch_size=self.batch_size,
+            word_timestamps=False,
+            compression_ratio_threshold=2.4,
+            log_prob_threshold=-1.0,
+            no_speech_threshold=0.6,
+        )
+        # Segments are decoded lazily as the generator is consumed
+        result_segments = []
+        for segment in segments:
+            result_segments.append({
+                'id': len(result_segments),
+                'seek': segment.seek,
+                'start': segment.start,
+                'end': segment.end,
+                'text': segment.text,
+                'tokens': list(segment.tokens),
+                'temperature': segment.temperature,
+                'avg_logprob': segment.avg_logprob,
+                'compression_ratio': segment.compression_ratio,
+                'no_speech_prob': segment.no_speech_prob,
+            })
+            if on_window and info.duration:
+                on_window(min(1.0, segment.end / info.duration))
+        return {
+            'text': ''.join(segment['text'] for segment in result_segments),
+            'language': info.language,
+            'segments': result_segments,
+        }
+
+
+class RunnerEngine(TranscriptionEngine):
+    """
+    Runs a local engine somewhere else, e.g. in StagedPipeline's inference
+    processes, through a runner called as
+    runner(engine_name, model_size, audio, language, on_window).
+
+    Args:
+        engine_name (str): Local engine the runner should use
+        model_size (str): Whisper model size
+        runner (callable): Executes the transcription and returns its result
+    """
+    def __init__(self, engine_name: str, model_size: str, runner: Callable[..., Dict[str, Any]]):
+        super().__init__(model_size)
+        self.name = engine_name
+        # Each run already occupies a whole worker, so chunks aren't split further
+        self.capabilities = EngineCapabilities(
+            accepts_pcm=False,
+            window_progress=ENGINES[engine_name].capabilities.window_progress
+        )
+        self.runner = runner
+
+    def transcribe(self, audio: AudioInput, language: str,
+                   on_window: Optional[WindowCallback] = None) -> Dict[str, Any]:
+        return self.runner(self.name, self.model_size, audio, language, on_window)
+
+
+# Engine name -> class. Local engines are the ones create_engine can build from a model size.
+ENGINES: Dict[str, Type[TranscriptionEngine]] = {
+    OpenAIAPIEngine.name: OpenAIAPIEngine,
+    WhisperEngine.name: WhisperEngine,
+    CTranslate2Engine.name: CTranslate2Engine,
+}
+
+
+def local_engine_names():
+    return [name for name, cls in ENGINES.items() if not cls.capabilities.remote]
+
+
+def register_engine(engine_class: Type[TranscriptionEngine]):
+    """Make an engine selectable by name, e.g. through ENGINE_LOCAL_ENGINE."""
+    ENGINES[engine_class.name] = engine_class
+    return engine_class
+
+
+def create_engine(name: str, model_size: str, runner: Callable[..., Dict[str, Any]] = None,
+                  **kwargs) -> TranscriptionEngine:
+    """
+    Build a local engine by name.
+
+    Args:
+        name (str): Registered local engine name, e.g. 'whisper' or 'ctranslate2'
+        model_size (str): Whisper model size
+        runner (callable): Run the engine through this runner instead of in-process
+
+    Returns:
+        TranscriptionEngine: Ready-to-use engine; close() it when done
+
+    Raises:
+        ValueError: If no local engine has that name
+    """
+    if name not in local_engine_names():
+        raise ValueError(f"Unknown local engine '{name}', expected one of {', '.join(local_engine_names())}")
+    if runner is not None:
+        return RunnerEngine(name, model_size, runner)
+    return ENGINES[name](model_size, **kwargs)
+
+
+def run_engine(engine_name: str, model_size: str, audio: AudioInput, language: str,
+               on_window: Optional[WindowCallback] = None) -> Dict[str, Any]:
+    """Create a local engine, transcribe once and release it (the runner-side half of RunnerEngine)."""
+    with create_engine(engine_name, model_size) as engine:
+        return engine.transcribe(audio, language, on_window)
+
+
+def release_local_models(engine_name: str, model_size: str, model_pool=None) -> int:
+    """Free idle models of a size held for a local engine; returns how many were freed."""
+    if engine_name == CTranslate2Engine.name:
+        return get_ctranslate2_models().retire(model_size)
+    if model_pool is None:
+        from model_pool import get_model_pool
+        model_pool = get_model_pool()
+    return model_pool.retire(model_size)
+
+
+def warm_engine(engine_name: str, model_size: str):
+    """Load a local engine's model and run one window so the first job isn't cold."""
+    import numpy as np
+
+    with create_engine(engine_name, model_size) as engine:
+        engine.transcribe(np.zeros(16000, dtype=np.float32), 'en')
@@ -0,0 +1,61 @@
+import re
+from typing import Dict, Optional
+
+# Watch, short and embed URLs all carry the same 11-character id
+VIDEO_ID_PATTERNS = [
+    r'(?:youtube\.com\/watch\?v=|youtu\.be\/|youtube\.com\/embed\/)([^&\n?#]+)',
+    r'youtube\.com\/watch\?.*v=([^&\n?#]+)',
+]
+
+# The hosted API always runs the same model, whatever size is configured locally
+API_ENGINE = 'openai-api'
+API_MODEL = 'whisper-1'
+
+
+def video_id_from_url(url: str) -> Optional[str]:
+    """YouTube video id of a URL, or None if it isn't a YouTube video URL"""
+    for pattern in VIDEO_ID_PATTERNS:
+        match = re.search(pattern, url or '')
+        if match:
+            return match.group(1)
+    return None
+
+
+def produced_by(engine: str, model: str) -> Dict[str, str]:
+    """Tag a transcription carries naming the engine and model that actually produced it"""
+    return {'engine': engine, 'model': model}
+
+
+def configured_source(engine) -> Dict[str, str]:
+    """Engine and model the engine settings (EngineConfig) ask for"""
+    if engine.use_fast_api:
+        return produced_by(API_ENGINE, API_MODEL)
+    return produced_by(engine.local_engine, engine.model_size)
+
+
+def transcript_key(video_url: str, language: str, engine,
+                   source: Optional[Dict[str, str]] = None) -> Optional[Dict[str, str]]:
+    """
+    What identifies a canonical transcript: the same video in the same language
+    from the same engine and model yields the same captions, so every task and
+    saved transcription asking for it can share one stored copy.
+
+    Args:
+        video_url (str): Task's video URL
+        language (str): Requested language code
+        engine: Engine settings the job runs with (EngineConfig)
+        source (dict): `produced_by` tag of the transcription being stored. Routing,
+            hedging and fallbacks can produce it with another engine or model than
+            configured; such captions get no key, so they are never shared as the
+            configured engine's transcript.
+
+    Returns:
+        dict: video_id, language, engine and model, or None for URLs without a video id
+    """
+    video_id = video_id_from_url(video_url)
+    if not video_id:
+        return None
+    configured = configured_source(engine)
+    if source is not None and source != configured:
+        return None
+    return {'video_id': video_id, 'language': language, **configured}
@@ -0,0 +1,188 @@
+import os
+import time
+import signal
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional, Dict, Any, List
+
+from hedging import CancellationToken
+
+
+class _InFlightJob:
+    def __init__(self, task_id: str, source: str, requeue: Optional[Callable[[], None]]):
+        self.task_id = task_id
+        self.source = source
+        self.requeue = requeue
+        self.token = CancellationToken()
+        self.started_at = time.time()
+        self.handed_back = False
+
+
+class DrainController:
+    """
+    Tracks in-flight jobs and coordinates a graceful drain before shutdown.
+
+    Once draining, no new work is accepted; running jobs get until the drain
+    deadline to finish, after which they are cancelled and handed back via
+    their `requeue` callbacks so another worker can pick them up.
+
+    Args:
+        drain_timeout (float): Default seconds in-flight jobs get to finish
+        abandon_grace (float): Extra seconds after cancelling before jobs are
+            handed back without waiting for them
+    """
+    def __init__(self, drain_timeout: float = None, abandon_grace: float = None):
+        self.drain_timeout = drain_timeout if drain_timeout is not None else float(os.getenv('DRAIN_TIMEOUT', 120))
+        self.abandon_grace = abandon_grace if abandon_grace is not None else float(os.getenv('DRAIN_ABANDON_GRACE', 10))
+        self._jobs: Dict[str, _InFlightJob] = {}
+        self._lock = threading.Condition()
+        self._draining = threading.Event()
+        self._drained = threading.Event()
+        self._exit_barriers: List[Callable[[], bool]] = []
+        self.drain_started_at: Optional[float] = None
+        self.drain_deadline: Optional[float] = None
+
+    @property
+    def draining(self) -> bool:
+        return self._draining.is_set()
+
+    def should_accept(self) -> bool:
+        """Whether new tasks may be claimed."""
+        return not self._draining.is_set()
+
+    @contextmanager
+    def track(self, task_id: str, source: str = 'supabase', requeue: Callable[[], None] = None):
+        """
+        Register a job for the duration of the block.
+
+        Args:
+            task_id (str): Task being processed
+            source (str): Where the task came from, for status output
+            requeue (callable): Hands the task back if the drain deadline passes
+
+        Yields:
+            CancellationToken: Cancelled when the drain deadline passes
+        """
+        job = _InFlightJob(task_id, source, requeue)
+        with self._lock:
+            self._jobs[task_id] = job
+        try:
+            yield job.token
+        finally:
+            with self._lock:
+                self._jobs.pop(task_id, None)
+                self._lock.notify_all()
+
+    def handed_back(self, task_id: str) -> bool:
+        """True if the drain already requeued this task, so the job must not overwrite it."""
+        with self._lock:
+            job = self._jobs.get(task_id)
+            return bool(job and job.handed_back)
+
+    def in_flight(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                job.task_id: {
+                    'source': job.source,
+                    'running_seconds': round(time.time() - job.started_at, 1),
+                    'cancelled': job.token.cancelled,
+                }
+                for job in self._jobs.values()
+            }
+
+    def begin_drain(self, timeout: float = None, reason: str = 'requested') -> bool:
+        """
+        Stop accepting work and finish or hand back in-flight jobs.
+
+        Returns:
+            bool: False if a drain was already in progress
+        """
+        with self._lock:
+            if self._draining.is_set():
+                return False
+            timeout = self.drain_timeout if timeout is None else timeout
+            self.drain_started_at = time.time()
+            self.drain_deadline = self.drain_started_at + timeout
+            self._draining.set()
+        print(f"🛑 Draining ({reason}): {len(self._jobs)} jobs in flight, deadline {timeout:.0f}s")
+        threading.Thread(target=self._run_drain, daemon=True, name='drain').start()
+        return True
+
+    def _run_drain(self):
+        with self._lock:
+            self._lock.wait_for(lambda: not self._jobs, timeout=max(0.0, self.drain_deadline - time.time()))
+            remaining = list(self._jobs.values())
+            for job in remaining:
+                job.token.cancel()
+        if remaining:
+            print(f"⏰ Drain deadline passed, cancelling {len(remaining)} jobs")
+            with self._lock:
+                self._lock.wait_for(lambda: not self._jobs, timeout=self.abandon_grace)
+                stuck = list(self._jobs.values())
+            for job in stuck:
+                self._hand_back(job)
+        print("✅ Drain complete")
+        self._drained.set()
+
+    def _hand_back(self, job: _InFlightJob):
+        with self._lock:
+            if job.handed_back:
+                return
+            job.handed_back = True
+        if job.requeue:
+            try:
+                job.requeue()
+                print(f"↩️ Handed task {job.task_id} back")
+            except Exception as e:
+                print(f"❌ Could not hand back task {job.task_id}: {e}")
+
+    def wait_until_drained(self, timeout: float = None) -> bool:
+        return self._drained.wait(timeout)
+
+    def add_exit_barrier(self, wait: Callable[[], bool]):
+        """
+        Make the exit after a drain also wait for `wait`, e.g. a worker shutting
+        down its pools and flushing queued writes once its jobs are done.
+        `wait` blocks until that finishes or gives up, returning which.
+        """
+        with self._lock:
+            self._exit_barriers.append(wait)
+
+    def exit_after_drain(self, exit_process: Callable[[int], None] = os._exit):
+        """Wait for the drain, then for every exit barrier, then end the process."""
+        self.wait_until_drained()
+        with self._lock:
+            barriers = list(self._exit_barriers)
+        for wait in barriers:
+            try:
+                if not wait():
+                    print("⚠️ Shutdown did not finish in time, exiting anyway")
+            except Exception as e:
+                print(f"❌ Shutdown step failed: {e}")
+        exit_process(0)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'draining': self.draining,
+            'drained': self._drained.is_set(),
+            'deadline_in_seconds': round(max(0.0, self.drain_deadline - time.time()), 1)
+            if self.drain_deadline else None,
+            'in_flight': self.in_flight(),
+        }
+
+    def install_signal_handlers(self, exit_when_drained: bool = True):
+        """
+        Drain on SIGTERM/SIGINT, then exit once the drain and the exit
+        barriers are done; a second signal exits immediately.
+        Must be called from the main thread.
+        """
+        def handle(signum, frame):
+            if self.draining:
+                print("⚠️ Second shutdown signal, exiting now")
+                os._exit(1)
+            self.begin_drain(reason=signal.Signals(signum).name)
+            if exit_when_drained:
+                threading.Thread(target=self.exit_after_drain, daemon=True, name='drain-exit').start()
+
+        signal.signal(signal.SIGTERM, handle)
+        signal.signal(signal.SIGINT, handle)
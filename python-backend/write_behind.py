@@ -0,0 +1,326 @@
+import os
+import json
+import time
+import threading
+from typing import Callable, Dict, Any, Optional
+
+
+def write_behind_enabled() -> bool:
+    return os.getenv('WRITE_BEHIND', 'false').lower() == 'true'
+
+
+def _merge(older: Dict[str, Any], newer: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Combine two pending states of one task. A state holds `captions` (saved first,
+    which also completes the task, with the `transcript` key they are shared under)
+    and `update` (column changes applied after). Newer captions replace everything
+    before them; newer column changes are layered over older ones.
+    """
+    if newer.get('captions') is not None:
+        return {'captions': newer['captions'], 'transcript': newer.get('transcript'), 'update': newer.get('update')}
+    update = dict(older.get('update') or {})
+    update.update(newer.get('update') or {})
+    return {'captions': older.get('captions'), 'transcript': older.get('transcript'), 'update': update or None}
+
+
+class WriteBehindStore:
+    """
+    Task storage wrapper that queues status, progress and caption writes and
+    returns immediately; a background thread writes them to the real storage.
+
+    Pending writes are coalesced per task, so only a task's latest state is
+    written. Status and progress changes for many tasks go out in one
+    `apply_task_updates` call. A flush starts once `max_batch` tasks are
+    waiting or the oldest write is `flush_interval` seconds old. Every queued
+    write is first appended to a spool file and fsynced; a worker starting
+    after a crash replays spools left by dead processes.
+
+    Writes are delivered at least once: a crash between a flush and the spool
+    rewrite replays writes that already landed, which the storage's writes
+    (idempotent upserts and column updates) absorb.
+
+    Reads (`get_pending_tasks`, `claim_task`, ...) go straight to the storage.
+
+    Args:
+        storage: Task storage with save_captions and apply_task_updates (TaskStorage)
+        spool_dir (str): Where spool files are kept, None for no spool
+        flush_interval (float): Longest a write waits before being flushed, in seconds
+        max_batch (int): Tasks per batched update call, and the size that triggers a flush
+        is_retryable (callable): Whether a failed write should be kept and retried
+            (default: always); others are logged and dropped
+        max_retry_delay (float): Cap on the backoff between failed flushes
+    """
+    def __init__(self, storage, spool_dir: Optional[str] = None, flush_interval: float = 0.5,
+                 max_batch: int = 50, is_retryable: Callable[[Exception], bool] = None,
+                 max_retry_delay: float = 30.0):
+        self.storage = storage
+        self.flush_interval = flush_interval
+        self.max_batch = max(1, max_batch)
+        self.is_retryable = is_retryable or (lambda error: True)
+        self.max_retry_delay = max_retry_delay
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._oldest: Optional[float] = None
+        self._retry_delay = 0.0
+        self._inflight = 0
+        self._closing = False
+        self._condition = threading.Condition()
+        self.flushes = 0
+        self.writes = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.dropped = 0
+
+        self._spool = None
+        self.spool_path = None
+        if spool_dir:
+            os.makedirs(spool_dir, exist_ok=True)
+            self.spool_path = os.path.join(spool_dir, f"writes-{os.getpid()}.jsonl")
+            self._recover(spool_dir)
+            self._rewrite_spool_locked()
+
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+
+    def __getattr__(self, name):
+        # Anything not queued is passed through to the real storage
+        return getattr(self.storage, name)
+
+    # Queued writes
+
+    def update_task_status(self, task_id: str, status: str, error_message: str = None):
+        update = {'status': status}
+        if error_message:
+            update['error_message'] = error_message
+        self._enqueue(task_id, {'captions': None, 'update': update})
+
+    def update_task_progress(self, task_id: str, progress: int, message: str = None, eta_seconds: int = None):
+        self._enqueue(task_id, {'captions': None, 'update': {
+            'progress': progress,
+            'progress_message': message,
+            'eta_seconds': eta_seconds,
+        }})
+
+    def save_captions(self, task_id: str, captions: list, transcript: Dict[str, str] = None):
+        self._enqueue(task_id, {'captions': list(captions or []), 'transcript': transcript, 'update': None})
+
+    def _enqueue(self, task_id: str, state: Dict[str, Any]):
+        with self._condition:
+            if self._closing:
+                raise RuntimeError("Write-behind store is closed")
+            self._append_spool_locked(task_id, state)
+            if task_id in self._pending:
+                self.coalesced += 1
+                self._pending[task_id] = _merge(self._pending[task_id], state)
+            else:
+                self._pending[task_id] = state
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            self._condition.notify_all()
+
+    # Spool
+
+    def _append_spool_locked(self, task_id: str, state: Dict[str, Any]):
+        if self._spool is None:
+            return
+        self._spool.write(json.dumps({'task_id': task_id, **state}) + '\n')
+        self._spool.flush()
+        os.fsync(self._spool.fileno())
+
+    def _rewrite_spool_locked(self):
+        """Replace the spool with the writes still pending."""
+        if not self.spool_path:
+            return
+        if self._spool is not None:
+            self._spool.close()
+        tmp_path = f"{self.spool_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            for task_id, state in self._pending.items():
+                f.write(json.dumps({'task_id': task_id, **state}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.spool_path)
+        self._spool = open(self.spool_path, 'a')
+
+    def _recover(self, spool_dir: str):
+        """Adopt spools of processes that are gone (or of a previous run with our pid)."""
+        for name in sorted(os.listdir(spool_dir)):
+            if not (name.startswith('writes-') and name.endswith('.jsonl')):
+                continue
+            try:
+                pid = int(name[len('writes-'):-len('.jsonl')])
+            except ValueError:
+                continue
+            if pid != os.getpid() and _process_alive(pid):
+                continue
+            path = os.path.join(spool_dir, name)
+            claimed = f"{path}.recovering.{os.getpid()}"
+            try:
+                # Only one starting worker wins the rename
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            recovered = 0
+            with open(claimed, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A crash mid-append leaves at most one torn last line
+                        continue
+                    task_id = record.pop('task_id')
+                    previous = self._pending.get(task_id)
+                    self._pending[task_id] = _merge(previous, record) if previous else record
+                    recovered += 1
+            os.remove(claimed)
+            if recovered:
+                print(f"♻️ Recovered {recovered} spooled writes from {name}")
+        if self._pending:
+            self._oldest = time.monotonic()
+
+    # Flushing
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    if self._closing and not self._pending:
+                        return
+                    if self._pending:
+                        due = self._oldest + max(self.flush_interval, self._retry_delay)
+                        if self._closing or len(self._pending) >= self.max_batch and not self._retry_delay:
+                            break
+                        remaining = due - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    else:
+                        self._condition.wait()
+                batch = self._pending
+                self._pending = {}
+                self._oldest = None
+                self._inflight = len(batch)
+
+            failed = self._flush(batch)
+
+            with self._condition:
+                for task_id, state in failed.items():
+                    newer = self._pending.get(task_id)
+                    self._pending[task_id] = _merge(state, newer) if newer else state
+                if failed:
+                    self.failures += 1
+                    self._retry_delay = min(self.max_retry_delay, max(self.flush_interval, self._retry_delay * 2 or 1.0))
+                    if self._closing:
+                        # Shutting down with the storage unreachable: leave it to the spool
+                        print(f"⚠️ Write-behind leaving {len(self._pending)} tasks in the spool")
+                        self._rewrite_spool_locked()
+                        if self._spool is not None:
+                            self._spool.close()
+                            self._spool = None
+                        self._pending = {}
+                        self._inflight = 0
+                        self._condition.notify_all()
+                        return
+                else:
+                    self._retry_delay = 0.0
+                if self._pending and self._oldest is None:
+                    self._oldest = time.monotonic()
+                self._inflight = 0
+                self.flushes += 1
+                self._rewrite_spool_locked()
+                self._condition.notify_all()
+
+    def _flush(self, batch: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Write a batch; returns the states that should be retried."""
+        failed = {}
+        updates = {}
+        for task_id, state in batch.items():
+            if state.get('captions') is not None:
+                try:
+                    if state.get('transcript'):
+                        self.storage.save_captions(task_id, state['captions'], transcript=state['transcript'])
+                    else:
+                        self.storage.save_captions(task_id, state['captions'])
+                    self.writes += 1
+                except Exception as e:
+                    if self.is_retryable(e):
+                        failed[task_id] = state
+                        continue
+                    # Same outcome as a synchronous save failing inside the job
+                    print(f"❌ Dropping captions for task {task_id}: {e}")
+                    self.dropped += 1
+                    state = {'captions': None, 'update': {**(state.get('update') or {}),
+                                                         'status': 'failed', 'error_message': str(e)}}
+            if state.get('update'):
+                updates[task_id] = state['update']
+
+        items = list(updates.items())
+        for start in range(0, len(items), self.max_batch):
+            chunk = items[start:start + self.max_batch]
+            try:
+                self.storage.apply_task_updates([{'id': task_id, **update} for task_id, update in chunk])
+                self.writes += len(chunk)
+            except Exception as e:
+                if self.is_retryable(e):
+                    for task_id, update in chunk:
+                        failed[task_id] = {'captions': None, 'update': update}
+                else:
+                    print(f"❌ Dropping {len(chunk)} task updates: {e}")
+                    self.dropped += len(chunk)
+        return failed
+
+    def flush(self, timeout: float = None) -> bool:
+        """Write everything queued so far; False if it didn't finish within `timeout`."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._condition:
+            if self._pending:
+                # Due now
+                self._oldest = time.monotonic() - max(self.flush_interval, self._retry_delay)
+                self._condition.notify_all()
+            while self._pending or self._inflight:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    def close(self, timeout: float = None) -> bool:
+        """
+        Flush what can be flushed, then stop; anything left stays in the spool.
+
+        Returns:
+            bool: Whether the flush thread stopped within `timeout`
+        """
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            return True
+        with self._condition:
+            left = len(self._pending) + self._inflight
+        where = f"only in the spool {self.spool_path}" if self.spool_path else "unspooled and will be lost"
+        print(f"⚠️ Write-behind still flushing after {timeout:g}s: writes for {left} tasks are {where}")
+        return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._condition:
+            pending = len(self._pending)
+        return {
+            'pending_tasks': pending,
+            'flushes': self.flushes,
+            'writes': self.writes,
+            'coalesced': self.coalesced,
+            'failed_flushes': self.failures,
+            'dropped': self.dropped,
+            'spool': self.spool_path,
+        }
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,10 @@
+"""
+WSGI entry point for the HTTP tier, e.g.
+
+    gunicorn -w 4 -b 0.0.0.0:5001 wsgi:app
+
+No task worker runs here; start those with `python -m backend worker`.
+"""
+from api_server import create_app
+
+app = create_app()
@@ -1,15 +1,26 @@
 import os
-import re
-from typing import Optional, Dict, Any, List
+import time
+from typing import Optional, Dict, Any, List, Callable
 from urllib.parse import urlparse, parse_qs
 import whisper
 import yt_dlp
 from pydub import AudioSegment
 import tempfile
 import json
+import math
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import openai
 from dotenv import load_dotenv
+from progress_tracker import ProgressTracker, engine_key
+from transcripts import API_ENGINE, API_MODEL, produced_by, video_id_from_url
+from resilience import CircuitOpenError, get_breaker
+from hedging import CancellationToken, TranscriptionCancelled, get_latency_tracker, hedge_delay, hedged_call
+from rate_limiter import get_openai_governor
+from engine_router import EngineRouter, RoutingDecision
+from download_manager import get_download_manager
+from transcription_engines import (
+    TranscriptionEngine, OpenAIAPIEngine, create_engine, audio_duration, OPENAI_QUOTA_WAIT_TIMEOUT
+)
 
 # Load environment variables
 load_dotenv()
@@ -21,35 +32,68 @@ class YouTubeTranscriber:
     Args:
         model_size (str): Whisper model size ('tiny', 'base', 'small', 'medium', 'large')
         use_fast_api (bool): Whether to use OpenAI's Whisper API for faster processing
+        hedge_short_clips (bool): Race the local model against a slow API call for
+            short clips (defaults to the HEDGE_SHORT_CLIPS environment variable)
+        local_runner (callable): Runs the local engine elsewhere (e.g. StagedPipeline's
+            inference processes) instead of in this process; called as
+            local_runner(engine_name, model_size, audio_path, language, on_window)
+        local_engine (str): Local engine name, e.g. 'whisper' or 'ctranslate2'
+            (defaults to the ENGINE_LOCAL_ENGINE environment variable)
     """
-    def __init__(self, model_size: str = "base", use_fast_api: bool = True):
+    def __init__(self, model_size: str = "base", use_fast_api: bool = True,
+                 hedge_short_clips: Optional[bool] = None,
+                 local_runner: Optional[Callable[..., Dict[str, Any]]] = None,
+                 local_engine: Optional[str] = None):
         self.model_size = model_size
+        # Routing may pick a smaller model under load or deadlines, never a larger one
+        self.configured_model_size = model_size
+        self.local_engine_name = local_engine or os.getenv('ENGINE_LOCAL_ENGINE', 'whisper')
         self.use_fast_api = use_fast_api
+        if hedge_short_clips is None:
+            hedge_short_clips = os.getenv('HEDGE_SHORT_CLIPS', 'false').lower() == 'true'
+        self.hedge_short_clips = hedge_short_clips
+        self.hedge_max_duration = float(os.getenv('HEDGE_MAX_DURATION', 120))
         self.temp_dir = tempfile.mkdtemp()
+        self.progress: Optional[ProgressTracker] = None
+        self.video_info: Optional[Dict[str, Any]] = None
+        self.chunk_workers = 1
+        self.api_engine: Optional[OpenAIAPIEngine] = None
+        self.cancel_token: Optional[CancellationToken] = None
+        self.job_started = time.time()
+        self.local_runner = local_runner
         
-        # Initialize OpenAI client if using fast API
+        # Use the shared, rate-limited OpenAI clients if using fast API
         if self.use_fast_api:
-            api_key = os.getenv('OPENAI_API_KEY')
-            if api_key:
-                self.openai_client = openai.OpenAI(api_key=api_key)
-                print(f"🚀 Using OpenAI Whisper API for fast processing")
+            governor = get_openai_governor()
+            if governor.slots:
+                self.api_engine = OpenAIAPIEngine(governor, quota_timeout=OPENAI_QUOTA_WAIT_TIMEOUT)
+                print(f"🚀 Using OpenAI Whisper API for fast processing ({len(governor.slots)} keys)")
             else:
                 print(f"⚠️ OpenAI API key not found, falling back to local Whisper model")
                 self.use_fast_api = False
-                self.openai_client = None
         
-        # Initialize local Whisper model with optimizations
-        if not self.use_fast_api:
-            print(f"📦 Loading optimized local Whisper model: {model_size}")
-            self.model = whisper.load_model(model_size)
-        else:
-            # Still load local model for fallback
-            print(f"📦 Loading optimized local Whisper model for fallback: {model_size}")
-            self.model = whisper.load_model(model_size)
+        # Warm local engine, also the fallback for the fast API
+        self.local_engine: Optional[TranscriptionEngine] = self._create_local_engine(model_size)
+    
+    def _create_local_engine(self, model_size: str) -> TranscriptionEngine:
+        return create_engine(self.local_engine_name, model_size, runner=self.local_runner)
+    
+    def apply_routing(self, decision: RoutingDecision):
+        """
+        Switch engine, model size and parallelism to a router decision.
         
-        # Set model to evaluation mode for faster inference
-        if hasattr(self.model, 'eval'):
-            self.model.eval()
+        Args:
+            decision (RoutingDecision): Output of EngineRouter.route
+        """
+        self.use_fast_api = decision.use_fast_api and self.api_engine is not None
+        self.chunk_workers = decision.chunk_workers if decision.engine == 'chunked-parallel' else 1
+        if not self.local_engine.capabilities.parallel_chunks:
+            # Remote inference parallelises across jobs, batched engines within their own calls
+            self.chunk_workers = 1
+        if decision.model_size != self.model_size:
+            self.local_engine.close()
+            self.local_engine = self._create_local_engine(decision.model_size)
+            self.model_size = decision.model_size
     
     def extract_video_id(self, url: str) -> Optional[str]:
         """
@@ -61,17 +105,8 @@ class YouTubeTranscriber:
         Returns:
             str: Video ID or None if invalid
         """
-        # Handle different YouTube URL formats
-        patterns = [
-            r'(?:youtube\.com\/watch\?v=|youtu\.be\/|youtube\.com\/embed\/)([^&\n?#]+)',
-            r'youtube\.com\/watch\?.*v=([^&\n?#]+)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
-        return None
+        # Same id the transcript store keys shared transcripts by
+        return video_id_from_url(url)
     
     def download_audio(self, url: str) -> Optional[str]:
         """
@@ -89,31 +124,29 @@ class YouTubeTranscriber:
             # Create temporary file path
             audio_path = os.path.join(self.temp_dir, "audio.%(ext)s")
             
-            # Configure yt-dlp options for faster download
-            ydl_opts = {
-                'format': 'worstaudio/worst',  # Use worst audio for faster download
-                'outtmpl': audio_path,
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'wav',
-                }],
-                'quiet': True,
-                'nocheckcertificate': True,  # Skip SSL verification for speed
-                'no_warnings': True,
-                'extractaudio': True,
-                'audioformat': 'wav',
-                'audioquality': '0',  # Best quality within format
-            }
-            
-            # Download audio
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                # Get video info
-                info = ydl.extract_info(url, download=False)
+            def on_info(info, fmt):
+                self.video_info = info
                 print(f"Video Title: {info.get('title', 'Unknown')}")
                 print(f"Video Duration: {info.get('duration', 0)} seconds")
                 
-                # Download the audio
-                ydl.download([url])
+                if self.progress:
+                    self.progress.set_duration(info.get('duration'))
+                    size = (fmt or {}).get('filesize') or (fmt or {}).get('filesize_approx')
+                    self.progress.set_download_size(size or info.get('filesize') or info.get('filesize_approx'))
+            
+            # Smallest speech-adequate audio stream, concurrent fragments, resumable
+            # partial files and the process-wide bandwidth budget
+            get_download_manager().download(
+                url,
+                audio_path,
+                progress_hooks=[self.progress.ytdlp_hook] if self.progress else None,
+                postprocessor_hooks=[self.progress.ytdlp_postprocessor_hook] if self.progress else None,
+                postprocessors=[{
+                    'key': 'FFmpegExtractAudio',
+                    'preferredcodec': 'wav',
+                }],
+                on_info=on_info
+            )
             
             # Find the actual downloaded file
             wav_path = os.path.join(self.temp_dir, "audio.wav")
@@ -166,6 +199,9 @@ class YouTubeTranscriber:
                         
                         print(f"Audio converted: {size_mb:.2f}MB (sample_rate={sample_rate}Hz, bit_depth={bit_depth}bit)")
                         
+                        if self.progress:
+                            self.progress.update('convert', 0.75)
+                        
                         # If under 24MB (safety margin), we're good
                         if size_mb < 24:
                             print(f"✅ Audio optimized for OpenAI API: {size_mb:.2f}MB")
@@ -206,13 +242,23 @@ class YouTubeTranscriber:
         try:
             print(f"Transcribing audio in {language}...")
             
-            if self.use_fast_api and self.openai_client:
+            openai_breaker = get_breaker('openai')
+            if self.use_fast_api and self.api_engine and not openai_breaker.is_available():
+                # Skip the API outright instead of rediscovering the outage for every job
+                print(f"⚡ OpenAI circuit open, using local model (retry in {openai_breaker.retry_in():.0f}s)...")
+                return self._transcribe_with_local_model(audio_path, language)
+            elif self.use_fast_api and self.api_engine and self._should_hedge(audio_path):
+                return self._transcribe_hedged(audio_path, language)
+            elif self.use_fast_api and self.api_engine:
                 print("🚀 Using OpenAI Whisper API for fast transcription...")
                 result = self._transcribe_with_openai_api(audio_path, language)
                 if result is None:
                     print("🔄 Fast API skipped, using local model...")
                     return self._transcribe_with_local_model(audio_path, language)
                 return result
+            elif self.chunk_workers > 1:
+                print(f"🧩 Using {self.chunk_workers} parallel local Whisper models...")
+                return self._transcribe_chunked_parallel(audio_path, language)
             else:
                 print("📦 Using local Whisper model...")
                 return self._transcribe_with_local_model(audio_path, language)
@@ -221,87 +267,174 @@ class YouTubeTranscriber:
             print(f"Error transcribing audio: {str(e)}")
             return None
     
-    def _transcribe_with_openai_api(self, audio_path: str, language: str) -> Optional[Dict[str, Any]]:
+    def _should_hedge(self, audio_path: str) -> bool:
+        """Hedging only pays off for short clips, where API overhead dominates."""
+        if not self.hedge_short_clips:
+            return False
+        duration = audio_duration(audio_path)
+        return duration is not None and duration <= self.hedge_max_duration
+    
+    def _transcribe_hedged(self, audio_path: str, language: str) -> Optional[Dict[str, Any]]:
+        """
+        Start the API call and, if it hasn't answered within the hedge delay
+        (a high percentile of observed API latency), race the local model
+        against it and keep whichever finishes first.
+        """
+        delay = hedge_delay('openai-api')
+        print(f"🏇 Hedged transcription: API first, local model after {delay:.2f}s")
+        winner, result = hedged_call(
+            ('openai-api', lambda token: self._transcribe_with_openai_api(audio_path, language, fallback=False)),
+            (self.local_engine_key(),
+             lambda token: self._transcribe_with_local_model(audio_path, language, cancel_token=token)),
+            delay
+        )
+        if self.progress and winner:
+            self.progress.set_engine(winner)
+        return result
+    
+    def _transcribe_with_openai_api(self, audio_path: str, language: str,
+                                    fallback: bool = True) -> Optional[Dict[str, Any]]:
         """
         Transcribe audio using OpenAI's Whisper API for fast processing.
+        With `fallback` disabled, failures return None instead of running the local model.
         """
         try:
             # Check file size before attempting API call
             file_size = os.path.getsize(audio_path)
             size_mb = file_size / (1024 * 1024)
             
-            if size_mb > 24:  # Safety margin under 25MB limit
+            if size_mb > self.api_engine.capabilities.max_upload_mb:  # Safety margin under 25MB limit
                 print(f"⚠️ Audio file too large for OpenAI API ({size_mb:.2f}MB), skipping fast API")
                 return None
             
-            with open(audio_path, "rb") as audio_file:
-                print(f"📤 Sending audio to OpenAI Whisper API ({size_mb:.2f}MB)...")
-                
-                # Use OpenAI's Whisper API
-                response = self.openai_client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    language=language,
-                    response_format="verbose_json"
-                )
-                
-                print("✅ OpenAI API transcription completed!")
-                
-                # Convert OpenAI response to Whisper format
-                result = {
-                    "text": response.text,
-                    "language": response.language,
-                    "segments": []
-                }
-                
-                # Process segments if available
-                if hasattr(response, 'segments') and response.segments:
-                    for segment in response.segments:
-                        result["segments"].append({
-                            "id": segment.get("id", 0),
-                            "seek": segment.get("seek", 0),
-                            "start": segment.get("start", 0),
-                            "end": segment.get("end", 0),
-                            "text": segment.get("text", ""),
-                            "tokens": segment.get("tokens", []),
-                            "temperature": segment.get("temperature", 0),
-                            "avg_logprob": segment.get("avg_logprob", 0),
-                            "compression_ratio": segment.get("compression_ratio", 0),
-                            "no_speech_prob": segment.get("no_speech_prob", 0)
-                        })
-                
-                return result
-                
+            print(f"📤 Sending audio to OpenAI Whisper API ({size_mb:.2f}MB)...")
+            started = time.time()
+            result = self.api_engine.transcribe(audio_path, language)
+            
+            print("✅ OpenAI API transcription completed!")
+            self._record_latency(self.api_engine.name, audio_path, time.time() - started)
+            return self._tag(result, API_ENGINE, API_MODEL)
+            
+        except CircuitOpenError as e:
+            print(f"⚡ {e}")
+            if not fallback:
+                return None
+            print("🔄 Falling back to local model...")
+            return self._transcribe_with_local_model(audio_path, language)
         except Exception as e:
             print(f"❌ OpenAI API transcription failed: {str(e)}")
+            if not fallback:
+                return None
             print("🔄 Falling back to local model...")
             return self._transcribe_with_local_model(audio_path, language)
     
-    def _transcribe_with_local_model(self, audio_path: str, language: str) -> Optional[Dict[str, Any]]:
+    def _transcribe_with_local_model(self, audio_path: str, language: str,
+                                     cancel_token: Optional[CancellationToken] = None) -> Optional[Dict[str, Any]]:
         """
-        Transcribe audio using local Whisper model (fallback).
+        Transcribe audio using the local engine (fallback).
+        A cancelled `cancel_token` stops decoding at the next window.
         """
         try:
-            # Transcribe with optimized local Whisper model
-            result = self.model.transcribe(
-                audio_path,
-                language=language,
-                verbose=False,  # Reduce verbosity for speed
-                word_timestamps=False,  # Disable word timestamps for speed
-                fp16=False,  # Use FP32 for better compatibility
-                temperature=0.0,  # Deterministic output
-                compression_ratio_threshold=2.4,  # More aggressive compression
-                logprob_threshold=-1.0,  # More permissive threshold
-                no_speech_threshold=0.6,  # More permissive threshold
-            )
-            
-            print("✅ Local Whisper transcription completed!")
-            return result
-            
+            if self.progress and cancel_token is None:
+                self.progress.set_engine(self.local_engine_key())
+            started = time.time()
+            
+            # Report progress as each window is decoded
+            def on_window(fraction: float):
+                if cancel_token:
+                    cancel_token.raise_if_cancelled()
+                if self.cancel_token:
+                    self.cancel_token.raise_if_cancelled()
+                if self.progress:
+                    self.progress.update('transcribe', fraction, 'Transcribing audio...')
+            
+            result = self.local_engine.transcribe(audio_path, language, on_window)
+            
+            print(f"✅ Local {self.local_engine.name} transcription completed!")
+            self._record_latency(self.local_engine_key(), audio_path, time.time() - started)
+            return self._tag(result, self.local_engine_name, self.model_size)
+            
+        except TranscriptionCancelled:
+            print("🛑 Local transcription cancelled")
+            return None
+        except Exception as e:
+            print(f"❌ Local transcription failed: {str(e)}")
+            return None
+    
+    @staticmethod
+    def _tag(result: Optional[Dict[str, Any]], engine: str, model: str) -> Optional[Dict[str, Any]]:
+        """Record which engine and model produced a transcription, whichever path ran."""
+        if result is not None:
+            result['produced_by'] = produced_by(engine, model)
+        return result
+    
+    def local_engine_key(self) -> str:
+        """Throughput key of the local engine at the current model size."""
+        return engine_key(False, self.model_size, self.local_engine_name)
+    
+    def _transcribe_chunked_parallel(self, audio_path: str, language: str) -> Optional[Dict[str, Any]]:
+        """
+        Split the audio into 30 s-aligned chunks and transcribe them concurrently,
+        each on its own engine instance, then stitch the segments back together.
+        """
+        try:
+            if self.progress:
+                self.progress.set_engine(f"chunked-{self.model_size}")
+            audio = whisper.load_audio(audio_path)
+            window = 30 * whisper.audio.SAMPLE_RATE
+            chunk_samples = max(1, math.ceil(len(audio) / self.chunk_workers / window)) * window
+            offsets = list(range(0, len(audio), chunk_samples))
+            fractions = [0.0] * len(offsets)
+            
+            def run_chunk(index: int):
+                offset = offsets[index]
+                
+                def on_window(fraction: float):
+                    if self.cancel_token:
+                        self.cancel_token.raise_if_cancelled()
+                    fractions[index] = fraction
+                    if self.progress:
+                        self.progress.update('transcribe', sum(fractions) / len(fractions), 'Transcribing audio...')
+                
+                chunk = audio[offset:offset + chunk_samples]
+                # The first chunk runs on this job's own engine, the rest on extra instances
+                if index == 0:
+                    return self.local_engine.transcribe(chunk, language, on_window)
+                with self._create_local_engine(self.model_size) as engine:
+                    return engine.transcribe(chunk, language, on_window)
+            
+            with ThreadPoolExecutor(max_workers=len(offsets)) as executor:
+                results = list(executor.map(run_chunk, range(len(offsets))))
+            
+            segments = []
+            for offset, result in zip(offsets, results):
+                shift = offset / whisper.audio.SAMPLE_RATE
+                for segment in result['segments']:
+                    segment = dict(segment, start=segment['start'] + shift, end=segment['end'] + shift)
+                    segment['id'] = len(segments)
+                    segments.append(segment)
+            
+            print(f"✅ Chunked Whisper transcription completed ({len(offsets)} chunks)!")
+            # Chunk boundaries change the segmentation, so this isn't the plain engine's transcript
+            return self._tag({
+                'text': ''.join(result['text'] for result in results),
+                'language': results[0].get('language', language) if results else language,
+                'segments': segments
+            }, f"chunked-{self.local_engine_name}", self.model_size)
+            
+        except TranscriptionCancelled:
+            print("🛑 Chunked Whisper transcription cancelled")
+            return None
         except Exception as e:
-            print(f"❌ Local Whisper transcription failed: {str(e)}")
+            print(f"❌ Chunked Whisper transcription failed: {str(e)}")
             return None
     
+    def _record_latency(self, engine: str, audio_path: str, seconds: float):
+        """Feed short-clip latencies into the distribution used for hedge delays."""
+        duration = audio_duration(audio_path)
+        if duration is not None and duration <= self.hedge_max_duration:
+            get_latency_tracker().record(engine, seconds)
+    
     def format_captions(self, transcription: Dict[str, Any]) -> list:
         """
         Format transcription result into caption segments.
@@ -327,18 +460,157 @@ class YouTubeTranscriber:
         
         return captions
     
-    def process_video(self, url: str, language: str = "en") -> Optional[Dict[str, Any]]:
+    def begin_job(self, progress: Optional[ProgressTracker] = None,
+                  cancel_token: Optional[CancellationToken] = None):
+        """Attach per-job progress reporting and cancellation before running stages."""
+        self.progress = progress
+        self.cancel_token = cancel_token
+        self.job_started = time.time()
+    
+    def end_job(self):
+        self.progress = None
+        self.cancel_token = None
+    
+    def download_stage(self, url: str, router: Optional[EngineRouter] = None,
+                       deadline_seconds: Optional[float] = None,
+                       quality_tier: Optional[str] = None,
+                       queue_depth: int = 0,
+                       task_id: str = None) -> Optional[str]:
+        """
+        Download audio, then route the job now that its duration is known.
+        
+        Returns:
+            str: Path to downloaded audio or None if failed
+        """
+        # Download audio (optimized for speed)
+        print("⚡ Downloading audio (optimized for speed)...")
+        if self.progress:
+            self.progress.start_stage('download', 'Downloading audio...')
+        audio_path = self.download_audio(url)
+        if not audio_path:
+            return None
+        if self.progress:
+            self.progress.finish_stage('download', units=self.progress.size_bytes)
+        if self.cancel_token:
+            self.cancel_token.raise_if_cancelled()
+        
+        # Route now that the duration is known; the deadline budget shrinks by the download time
+        if router:
+            remaining = None
+            if deadline_seconds is not None:
+                remaining = max(0.0, deadline_seconds - (time.time() - self.job_started))
+            self.apply_routing(router.route(
+                (self.video_info or {}).get('duration') or 0,
+                deadline_seconds=remaining,
+                quality_tier=quality_tier,
+                queue_depth=queue_depth,
+                task_id=task_id,
+                local_engine=self.local_engine_name,
+                allow_chunked=self.local_engine.capabilities.parallel_chunks,
+                allow_api=self.api_engine is not None,
+                max_model_size=self.configured_model_size
+            ))
+        return audio_path
+    
+    def convert_stage(self, audio_path: str) -> Optional[str]:
+        """
+        Convert downloaded audio for the chosen engine.
+        
+        Returns:
+            str: Path to WAV file or None if failed
+        """
+        # Convert to WAV (optimized for speed)
+        print("⚡ Converting audio (optimized for speed)...")
+        if self.progress:
+            self.progress.start_stage('convert', 'Decoding audio...')
+        wav_path = self.convert_to_wav(audio_path)
+        if not wav_path:
+            return None
+        if self.progress:
+            self.progress.finish_stage('convert', units=self.progress.duration)
+        if self.cancel_token:
+            self.cancel_token.raise_if_cancelled()
+        return wav_path
+    
+    def transcribe_stage(self, wav_path: str, language: str) -> Optional[Dict[str, Any]]:
+        """
+        Transcribe converted audio with the routed engine.
+        
+        Returns:
+            dict: Whisper-format transcription or None if failed
+        """
+        # Transcribe (optimized for speed)
+        print("⚡ Transcribing audio (optimized for speed)...")
+        if self.progress:
+            if self.chunk_workers > 1 and not self.use_fast_api:
+                self.progress.set_engine(f"chunked-{self.model_size}")
+            else:
+                self.progress.set_engine(engine_key(self.use_fast_api, self.model_size, self.local_engine_name))
+            self.progress.start_stage('transcribe', 'Transcribing audio...')
+        transcription = self.transcribe_audio(wav_path, language)
+        if not transcription:
+            return None
+        if self.progress:
+            self.progress.finish_stage('transcribe', units=self.progress.duration, key=self.progress.transcribe_key)
+        return transcription
+    
+    def build_result(self, url: str, video_id: str, language: str,
+                     transcription: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Combine video info and captions into the job result.
+        
+        Returns:
+            dict: Complete result with video info and captions
+        """
+        # Format captions
+        captions = self.format_captions(transcription)
+        
+        # Reuse the info fetched during download rather than asking YouTube again
+        info = self.video_info
+        if info is None:
+            with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
+                info = ydl.extract_info(url, download=False)
+        
+        return {
+            'video_id': video_id,
+            'title': info.get('title', 'Unknown'),
+            'duration': info.get('duration', 0),
+            'language': language,
+            'captions': captions,
+            'transcription': transcription,
+            'produced_by': transcription.get('produced_by'),
+            'processed_at': datetime.now().isoformat()
+        }
+    
+    def process_video(self, url: str, language: str = "en",
+                      progress: Optional[ProgressTracker] = None,
+                      router: Optional[EngineRouter] = None,
+                      deadline_seconds: Optional[float] = None,
+                      quality_tier: Optional[str] = None,
+                      queue_depth: int = 0,
+                      task_id: str = None,
+                      cancel_token: Optional[CancellationToken] = None) -> Optional[Dict[str, Any]]:
         """
         Complete pipeline: download, convert, and transcribe YouTube video.
-        Optimized for maximum speed.
+        Optimized for maximum speed. StagedPipeline runs the same stages on
+        separate worker pools instead of one thread.
         
         Args:
             url (str): YouTube video URL
             language (str): Language code for transcription
+            progress (ProgressTracker): Optional tracker receiving per-stage progress
+            router (EngineRouter): Picks engine and model size once the duration is known
+            deadline_seconds (float): Client deadline for the whole job, in seconds
+            quality_tier (str): 'fast', 'balanced' or 'best'
+            queue_depth (int): Other jobs currently queued or running
+            task_id (str): Task ID used in routing logs
+            cancel_token (CancellationToken): Stops the job between stages and
+                between local transcription windows when cancelled
             
         Returns:
             dict: Complete result with video info and captions
         """
+        self.begin_job(progress, cancel_token)
         try:
             # Extract video ID
             video_id = self.extract_video_id(url)
@@ -346,46 +618,28 @@ class YouTubeTranscriber:
                 print("Invalid YouTube URL")
                 return None
             
-            # Download audio (optimized for speed)
-            print("⚡ Downloading audio (optimized for speed)...")
-            audio_path = self.download_audio(url)
+            audio_path = self.download_stage(url, router, deadline_seconds, quality_tier, queue_depth, task_id)
             if not audio_path:
                 return None
             
-            # Convert to WAV (optimized for speed)
-            print("⚡ Converting audio (optimized for speed)...")
-            wav_path = self.convert_to_wav(audio_path)
+            wav_path = self.convert_stage(audio_path)
             if not wav_path:
                 return None
             
-            # Transcribe (optimized for speed)
-            print("⚡ Transcribing audio (optimized for speed)...")
-            transcription = self.transcribe_audio(wav_path, language)
+            transcription = self.transcribe_stage(wav_path, language)
             if not transcription:
                 return None
             
-            # Format captions
-            captions = self.format_captions(transcription)
-            
-            # Get video info using yt-dlp (optimized)
-            with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
-                info = ydl.extract_info(url, download=False)
-            
-            result = {
-                'video_id': video_id,
-                'title': info.get('title', 'Unknown'),
-                'duration': info.get('duration', 0),
-                'language': language,
-                'captions': captions,
-                'transcription': transcription,
-                'processed_at': datetime.now().isoformat()
-            }
-            
-            return result
+            return self.build_result(url, video_id, language, transcription)
             
+        except TranscriptionCancelled:
+            print("🛑 Video processing cancelled")
+            return None
         except Exception as e:
             print(f"Error processing video: {str(e)}")
             return None
+        finally:
+            self.end_job()
     
     def save_result(self, result: Dict[str, Any], filename: str = None) -> str:
         """
@@ -410,8 +664,11 @@ class YouTubeTranscriber:
         return filepath
     
     def cleanup(self):
-        """Clean up temporary files."""
+        """Clean up temporary files and release the local engine."""
         import shutil
+        if self.local_engine is not None:
+            self.local_engine.close()
+            self.local_engine = None
         try:
             shutil.rmtree(self.temp_dir)
             print("Temporary files cleaned up")
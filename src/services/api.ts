@@ -7,6 +7,7 @@ export interface ProcessingStatus {
   status: 'pending' | 'processing' | 'completed' | 'failed';
   progress?: number;
   message?: string;
+  eta_seconds?: number | null;
   error?: string;
 }
 
@@ -21,6 +22,11 @@ export interface CaptionResult {
   captions: Caption[];
 }
 
+export interface CaptionWindow {
+  captions: Caption[];
+  next_cursor: string | null;
+}
+
 class YouTubeAPI {
   private baseURL: string;
   private serverStarterURL: string;
@@ -180,6 +186,19 @@ class YouTubeAPI {
     }
   }
 
+  // Get one page of the captions overlapping [from, to) seconds; pass next_cursor as `after` for the next page
+  async getCaptionWindow(taskId: string, from: number, to?: number, after?: string, limit?: number): Promise<CaptionWindow> {
+    try {
+      const response = await axios.get(`${this.baseURL}/captions/${taskId}`, {
+        params: { from, to, after, limit }
+      });
+      return response.data;
+    } catch (error) {
+      console.error('Error getting caption window:', error);
+      throw error;
+    }
+  }
+
   // Health check (backend is always running)
   async healthCheck(): Promise<boolean> {
     try {
@@ -22,6 +22,9 @@ export interface CaptionTask {
   updated_at: string;
   captions?: Caption[];
   error_message?: string;
+  progress?: number;
+  progress_message?: string;
+  eta_seconds?: number | null;
 }
 
 export interface SavedTranscription {
@@ -250,9 +253,10 @@ export class SupabaseService {
   // Get all saved transcriptions
   static async getSavedTranscriptions(): Promise<SavedTranscription[]> {
     try {
+      // Captions live in the shared transcript the database moved them into
       const { data, error } = await supabase
         .from('saved_transcriptions')
-        .select('*')
+        .select('*, transcripts(captions)')
         .order('saved_at', { ascending: false });
 
       if (error) {
@@ -260,7 +264,10 @@ export class SupabaseService {
         throw error;
       }
 
-      return data || [];
+      return (data || []).map(({ transcripts, ...row }: any) => ({
+        ...row,
+        captions: row.captions ?? transcripts?.captions ?? [],
+      }));
     } catch (error) {
       console.error('❌ Failed to get saved transcriptions:', error);
       throw error;